@@ -0,0 +1,143 @@
+"""
+evc_batch_settings.py — Tab-4 batch-run settings, persisted per project.
+
+The Batch Run options of Tab 4 (Simulation Control, next to the Runs /
+Session spinner) are kept with the project,
+
+    <project>/evc_batch_settings.json
+
+written when a batch starts and read back when the project (or the Tab-4
+project folder) is opened, so a re-batch runs with the settings the rows
+already in the project DB were made with:
+
+    fdb_budget_mb   RAM budget of the shared FDB registry (fdb_store.
+                    REGISTRY) — LRU eviction above it
+    workers         process-pool size for the decks with an .evc
+                    (evc_parallel); 0 = one per CPU, 1 = serial
+    pin_seed, seed  pinned: every batch replays from `seed` (drawn on the
+                    first pinned batch and kept); otherwise each batch draws
+                    a fresh seed — evc_engine.iteration_rng
+    cache           keep pinned-seed batches in <project>/evc_cache/
+                    (evc_result_cache) — a re-batch only re-simulates the
+                    decks whose inputs changed; unpinned batches never are
+    dedupe          simulate alias decks (identical inputs once their FDBs
+                    are de-aliased by content) once — on by default
+    compact         float32 FDB cube + occupant kinematics (EVCEngine.
+                    COMPACT) — approximate, for batches short of memory
+    profile         per-phase timers on every run (evc_engine.RunProfile)
+                    and the per-deck profile table in the batch log — the
+                    "Simulation별 상세출력" (verbose) checkbox
+    adaptive, ...   adaptive iteration count per deck (evc_engine.
+                    AdaptiveIterations): from adaptive_min runs until the
+                    eq_fatal / evacuee means are within tolerance, capped at
+                    adaptive_max (0 = the Runs / Session spinner)
+
+A missing or unreadable file gives the defaults; unknown keys are ignored
+and missing ones take their default, so older files keep loading.
+"""
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from evc_engine import AdaptiveIterations
+from fdb_store import DEFAULT_BUDGET_MB
+
+log = logging.getLogger(__name__)
+
+FILENAME = 'evc_batch_settings.json'
+
+
+@dataclass
+class BatchSettings:
+    fdb_budget_mb: float = float(DEFAULT_BUDGET_MB)
+    workers: int = 0
+    pin_seed: bool = False
+    seed: Optional[int] = None
+    cache: bool = False
+    dedupe: bool = True
+    compact: bool = False
+    profile: bool = False
+    adaptive: bool = False
+    adaptive_min: int = AdaptiveIterations.min_iterations
+    adaptive_max: int = 0
+    eq_fatal_tol: float = AdaptiveIterations.eq_fatal_tol
+    evacuees_tol: float = AdaptiveIterations.evacuees_tol
+    rel_tol: float = AdaptiveIterations.rel_tol
+
+    @staticmethod
+    def path(project_dir) -> Path:
+        return Path(project_dir) / FILENAME
+
+    @classmethod
+    def load(cls, project_dir) -> 'BatchSettings':
+        """Settings stored in *project_dir* (defaults when there are none)."""
+        if not project_dir:
+            return cls()
+        try:
+            doc = json.loads(cls.path(project_dir).read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            return cls()
+        except (OSError, ValueError) as e:
+            log.warning(f"batch settings not read ({e}); using defaults")
+            return cls()
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in doc.items() if k in known})
+
+    def save(self, project_dir) -> Optional[Path]:
+        """Write to *project_dir* (atomically); None when it cannot be."""
+        if not project_dir:
+            return None
+        p = self.path(project_dir)
+        tmp = p.with_name(p.name + f".{os.getpid()}.tmp")
+        try:
+            tmp.write_text(json.dumps(asdict(self), indent=1), encoding='utf-8')
+            os.replace(tmp, p)
+        except OSError as e:
+            log.warning(f"batch settings not saved to {p.parent}: {e}")
+            return None
+        return p
+
+    def pool_workers(self) -> int:
+        """Worker processes for the batch (0 = one per CPU)."""
+        return int(self.workers) or os.cpu_count() or 1
+
+    def batch_seed(self) -> int:
+        """Seed of the next batch: the pinned one (drawn now if unset — save
+        the settings to keep it), else fresh entropy."""
+        if not self.pin_seed:
+            return int(np.random.SeedSequence().entropy)
+        if self.seed is None:
+            self.seed = int(np.random.SeedSequence().entropy)
+        return int(self.seed)
+
+    def result_cache(self, project_dir):
+        """ResultCache under *project_dir*/evc_cache for a cached batch with
+        a pinned seed, else None (an unpinned rerun adds new iterations)."""
+        if not (self.cache and self.pin_seed and project_dir):
+            return None
+        from evc_result_cache import ResultCache
+        return ResultCache(Path(project_dir) / 'evc_cache')
+
+    def adaptive_rule(self, n_run: int) -> Optional[AdaptiveIterations]:
+        """The batch's AdaptiveIterations (capped at *n_run*, the Runs /
+        Session count, unless adaptive_max is set), or None for the fixed
+        count. ValueError on an invalid rule (min_iterations < 4)."""
+        if not self.adaptive:
+            return None
+        return AdaptiveIterations(
+            min_iterations=int(self.adaptive_min),
+            max_iterations=int(self.adaptive_max) or int(n_run),
+            eq_fatal_tol=float(self.eq_fatal_tol),
+            evacuees_tol=float(self.evacuees_tol),
+            rel_tol=float(self.rel_tol))
+
+    def apply_fdb_budget(self, registry=None):
+        """Set the FDB registry budget (evicting down to it now)."""
+        if registry is None:
+            from fdb_store import REGISTRY as registry
+        registry.set_budget(float(self.fdb_budget_mb))
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+evc_bench.py — synthetic-input benchmark harness for the EVC engine.
+
+Writes an FDB field and an .evc deck from a handful of parameters (tunnel
+length, x-grid spacing, frame count, occupancy, traffic state, exits),
+times the engine stages on them and stores the timings as JSON, so two
+commits can be compared on the same cases — e.g. whether a change to
+evc_engine.py made the 4 km congested decks faster or slower.
+
+Timed per case (best of --repeat, seconds):
+  fdb_load   FDBData text parse (sidecar cache off)
+  queue      build_vb_vehicle_queue for one iteration
+  run_one    EVCEngine._run_one, one seeded iteration
+  run        EVCEngine.run, --iterations seeded iterations (batched path)
+
+Each sweep varies one parameter of the BASE case (4 km congested, 1 m grid).
+Everything runs offline in a temporary directory; nothing but numpy needed.
+
+With --compact the engines run in compact precision (EVCEngine.COMPACT:
+float32 cube and occupant kinematics); each case then also records
+cube_mb for both precisions and `parity` — the largest difference of
+the batch's per-run results from the same seeded float64 batch.
+
+USAGE
+  python evc_bench.py --out before.json                  # default sweeps
+  python evc_bench.py --sweep length=1000,4000 --sweep traffic=C,N --out after.json
+  python evc_bench.py --quick --out smoke.json           # small cases only
+  python evc_bench.py --quick --compact --out f32.json   # compact precision + parity
+  python evc_bench.py --compare before.json after.json   # ratio table
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+_here = os.path.dirname(os.path.abspath(__file__))
+if _here not in sys.path:
+    sys.path.insert(0, _here)
+
+SCHEMA = 1
+STAGES = ('fdb_load', 'queue', 'run_one', 'run')
+
+
+@dataclass
+class BenchCase:
+    """One synthetic scenario. traffic: 'C' congested / 'N' normal;
+    exits: 2 = the portals only, 3 = portals + a mid-length cross-passage
+    (the deck carries a single exit row ahead of its fire-point lines)."""
+    length: float = 4000.0          # tunnel length [m]
+    dx: float = 1.0                 # FDB x-grid spacing [m]
+    frames: int = 61                # FDB time frames over t_end
+    t_end: float = 600.0            # FDB span [s]
+    occupancy: float = 1.5          # occupants per car (deck L52)
+    traffic: str = 'C'
+    exits: int = 2
+    lanes: int = 2
+
+    @property
+    def stem(self) -> str:
+        return f"020{self.traffic}FV0_P3"     # HRR / traffic / wind code + position
+
+    def label(self) -> str:
+        return (f"L={self.length:g} dx={self.dx:g} nt={self.frames} "
+                f"occ={self.occupancy:g} {self.traffic} ex={self.exits}")
+
+
+BASE = BenchCase()
+SWEEPS = {
+    'length':    [1000.0, 2000.0, 4000.0],
+    'dx':        [2.0, 1.0, 0.5],
+    'frames':    [31, 61, 121],
+    'occupancy': [1.0, 1.5, 3.0],
+    'traffic':   ['C', 'N'],
+    'exits':     [2, 3],
+}
+QUICK_BASE = BenchCase(length=800.0, dx=2.0, frames=31)
+QUICK_SWEEPS = {'length': [400.0, 800.0], 'traffic': ['C', 'N']}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Synthetic inputs
+# ─────────────────────────────────────────────────────────────────────────────
+def write_fdb(path: Path, case: BenchCase) -> Path:
+    """Plume FDB in the EVC text layout: smoke spreads both ways from a
+    6 m fire at mid-tunnel, growing over the first 2 minutes."""
+    xs = np.linspace(0.0, case.length, int(round(case.length / case.dx)) + 1)
+    ts = np.linspace(0.0, case.t_end, case.frames)
+    f0 = 0.5 * case.length - 3.0
+    fc = f0 + 3.0
+    head = ["TUNNEL X COORDINATE",
+            "   MIN_X   MAX_X   NX GRID   FIRE PT",
+            f"   0.000   {case.length:.3f}   {len(xs)}   {f0:.3f}- {f0 + 6.0:.3f}",
+            "DATA START",
+            "  [SEC] [M] [KG/M3] [%] [PPM] [C] [KW/M2] [%]",
+            "  TIME  X-COOR  SOOT  CO2  CO  TEMP  RADI  OXYGEN"]
+    with open(path, 'w') as fh:
+        fh.write("\n".join(head) + "\n")
+        for t in ts:
+            p = min(t / 120.0, 1.0) * np.exp(-np.abs(xs - fc) / (20.0 + 0.5 * t))
+            block = np.column_stack([np.full_like(xs, t), xs, 300 * p, 0.04 + 3 * p,
+                                     900 * p, 20 + 250 * p, 0.419 + 6 * p, 21 - 4 * p])
+            np.savetxt(fh, block, fmt=["%8.1f", "%9.3f", "%10.4f", "%8.4f",
+                                       "%9.3f", "%8.3f", "%8.4f", "%8.4f"])
+        fh.write("DATA END\n")
+    return path
+
+
+def write_evc(path: Path, case: BenchCase) -> Path:
+    """Deck with the lines EVCParams reads (blank elsewhere); vehicle
+    counts scale with tunnel length and lane count."""
+    ln = [""] * 95
+
+    def put(i, v):
+        ln[i - 1] = v
+
+    fire = 0.5 * case.length
+    per_km = [125, 3, 1, 5, 3, 1, 0]
+    counts = [int(round(c * case.length / 1000.0 * case.lanes / 2)) for c in per_km]
+    mix = [80.0, 3.0, 1.0, 8.0, 5.0, 2.0, 1.0]
+    occ = [case.occupancy, 8, 30, 2, 2, 1, 1]
+    put(1, "BENCH TUNNEL"); put(2, "1 , 1")
+    put(3, f"{case.length}"); put(4, "0"); put(5, "-1.9"); put(6, "0"); put(7, "0")
+    put(8, f"{case.lanes}"); put(9, "0.5 , 0.5")
+    for i in range(7):
+        put(10 + i, f"{counts[i]}"); put(17 + i, "0")
+        put(24 + i, f"{mix[i]}"); put(31 + i, f"{mix[i]}")
+        put(38 + i, "1.0")
+        put(45 + i, f"{[4.5, 7.0, 12.0, 6.0, 8.0, 12.0, 15.0][i]}")
+        put(52 + i, f"{occ[i]}")
+    put(59, "0"); put(60, f"Fire_Point , {fire} , 2")
+    if case.exits >= 3:
+        put(61, "1"); put(62, f"1 , 0 , {0.25 * case.length}")
+    else:
+        put(61, "0"); put(62, "1 , 0 , 0")
+    put(63, f"{fire} , 320 , 320"); put(64, f"{fire}")
+    put(65, "150"); put(66, "2000"); put(68, "20"); put(69, "0.05")
+    put(72, f"{case.t_end + 120:g}"); put(73, "480"); put(74, "1800"); put(78, "5")
+    put(79, "True,False"); put(80, "180"); put(81, "60"); put(85, "1 , 1 , 216")
+    put(87, " 0.3  0.6  0.4 "); put(88, "3.5 , 1.0")
+    path.write_text("\r\n".join(ln) + "\r\n")
+    return path
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Timing
+# ─────────────────────────────────────────────────────────────────────────────
+def _best(fn, repeat):
+    best, out = float('inf'), None
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def parity(ref, new) -> dict:
+    """Largest per-run difference of two BatchResults of the same seeds:
+    ev_time [s], eq_fatal, evacuees and FED band counts."""
+    d = {'ev_time': 0.0, 'eq_fatal': 0.0, 'evacuees': 0, 'fed': 0}
+    for a, b in zip(ref.runs, new.runs):
+        d['ev_time'] = max(d['ev_time'], abs(a.ev_time - b.ev_time))
+        d['eq_fatal'] = max(d['eq_fatal'], abs(a.eq_fatal - b.eq_fatal))
+        d['evacuees'] = max(d['evacuees'], abs(a.evacuees - b.evacuees))
+        d['fed'] = max([d['fed']] + [abs(x - y) for x, y in zip(a.fed, b.fed)])
+    return d
+
+
+def bench_case(case: BenchCase, workdir: Path, iterations=5, repeat=3, seed=1,
+               compact=False) -> dict:
+    """Timings of one case → {'params', 'n_occ', 'timings'} (+ 'cube_mb',
+    'parity' when *compact*)."""
+    from evc_engine import EVCEngine, FDBData, build_vb_vehicle_queue
+
+    fdb_path = write_fdb(workdir / f"{case.stem[:7]}.FDB", case)
+    evc_path = write_evc(workdir / f"{case.stem}.evc", case)
+    timings = {}
+
+    use_sidecar = FDBData.USE_SIDECAR
+    FDBData.USE_SIDECAR = False             # time the parse, not the cache
+    try:
+        timings['fdb_load'], fdb = _best(lambda: FDBData(fdb_path), repeat)
+    finally:
+        FDBData.USE_SIDECAR = use_sidecar
+    if not fdb.is_loaded:
+        raise RuntimeError(f"synthetic FDB did not load: {fdb_path}")
+
+    eng = EVCEngine(evc_path, fdb_path, compact=compact)
+    p = eng.params
+    timings['queue'], q = _best(lambda: build_vb_vehicle_queue(
+        p, is_normal_traffic=eng._is_normal_traffic,
+        fire_x=float(np.clip(p.fire_pt_x, 0.0, max(1.0, p.tunnel_length))),
+        rng=np.random.default_rng(seed),
+        jam_density=p.max_congestion_vehicles), repeat)
+    timings['run_one'], r1 = _best(
+        lambda: eng._run_one(1, rng=eng._iter_rng(seed, 1)), repeat)
+    timings['run'], batch = _best(lambda: eng.run(n_iterations=iterations, seed=seed), repeat)
+    out = {'params': asdict(case), 'label': case.label(),
+           'n_occ': int(r1.n_occ_total), 'queue_n_occ': int(q['n_occ']) if q else 0,
+           'iterations': iterations, 'timings': timings}
+    if compact:
+        ref = EVCEngine(evc_path, fdb_path)
+        out['cube_mb'] = {'float64': ref.fdb.cube.nbytes / 1048576.0,
+                          'float32': eng.fdb.cube.nbytes / 1048576.0}
+        out['parity'] = parity(ref.run(n_iterations=iterations, seed=seed), batch)
+    return out
+
+
+def _sweep_cases(base: BenchCase, sweeps: dict):
+    for name, values in sweeps.items():
+        for v in values:
+            yield name, replace(base, **{name: type(getattr(base, name))(v)})
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=_here,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmarks(sweeps: dict, base: BenchCase = BASE, iterations=5, repeat=3,
+                   seed=1, log=print, compact=False) -> dict:
+    """All sweep cases → the JSON-ready result document."""
+    import evc_engine
+    cases = []
+    with tempfile.TemporaryDirectory(prefix='evc_bench_') as tmp:
+        for i, (name, case) in enumerate(_sweep_cases(base, sweeps)):
+            workdir = Path(tmp) / f"case{i:02d}"     # own FDB path per case
+            workdir.mkdir()
+            res = bench_case(case, workdir, iterations, repeat, seed, compact)
+            res['sweep'] = name
+            cases.append(res)
+            log(f"{name:<10} {case.label():<44} n_occ={res['n_occ']:>6}  " +
+                "  ".join(f"{k}={v:.3f}s" for k, v in res['timings'].items()))
+            if compact:
+                log(f"{'':<10} parity vs float64: " +
+                    "  ".join(f"{k}={v:g}" for k, v in res['parity'].items()))
+    return {'schema': SCHEMA,
+            'meta': {'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                     'commit': _git_commit(),
+                     'engine_version': evc_engine.__version__,
+                     'python': platform.python_version(),
+                     'numpy': np.__version__,
+                     'machine': platform.platform(),
+                     'cpus': os.cpu_count(),
+                     'iterations': iterations, 'repeat': repeat, 'seed': seed,
+                     'compact': bool(compact), 'base': asdict(base)},
+            'cases': cases}
+
+
+def compare(old: dict, new: dict) -> str:
+    """Per case and stage: old s, new s, new/old — cases matched on
+    (sweep, params)."""
+    def _key(c):
+        return (c['sweep'], json.dumps(c['params'], sort_keys=True))
+    before = {_key(c): c for c in old['cases']}
+    lines = [f"{'sweep':<10} {'case':<44} {'stage':<9} {'old s':>9} {'new s':>9} {'new/old':>8}"]
+    for c in new['cases']:
+        o = before.get(_key(c))
+        if o is None:
+            continue
+        for st in STAGES:
+            a, b = o['timings'].get(st), c['timings'].get(st)
+            if a and b is not None:
+                lines.append(f"{c['sweep']:<10} {c['label']:<44} {st:<9} "
+                             f"{a:9.3f} {b:9.3f} {b / a:8.2f}")
+    return "\n".join(lines)
+
+
+def _parse_sweep(spec: str):
+    name, _, vals = spec.partition('=')
+    if name not in SWEEPS or not vals:
+        raise argparse.ArgumentTypeError(
+            f"--sweep NAME=v1,v2 with NAME one of {', '.join(SWEEPS)}")
+    return name, [v.strip() for v in vals.split(',') if v.strip()]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark the EVC engine on synthetic decks.")
+    ap.add_argument("--sweep", action="append", type=_parse_sweep, default=[],
+                    help="NAME=v1,v2,... (repeatable; default: every sweep).")
+    ap.add_argument("--quick", action="store_true", help="small cases (smoke test).")
+    ap.add_argument("--iterations", type=int, default=5)
+    ap.add_argument("--repeat", type=int, default=3, help="best of N per timing.")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--compact", action="store_true",
+                    help="compact precision engines; records parity vs float64.")
+    ap.add_argument("--out", default=None, help="write the results JSON here.")
+    ap.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                    help="print the ratio table of two result files and exit.")
+    args = ap.parse_args(argv)
+
+    if args.compare:
+        old, new = (json.loads(Path(p).read_text()) for p in args.compare)
+        print(compare(old, new))
+        return 0
+
+    base = QUICK_BASE if args.quick else BASE
+    sweeps = dict(args.sweep) if args.sweep else (QUICK_SWEEPS if args.quick else SWEEPS)
+    doc = run_benchmarks(sweeps, base, args.iterations, args.repeat, args.seed,
+                         compact=args.compact)
+    if args.out:
+        Path(args.out).write_text(json.dumps(doc, indent=1) + "\n")
+        print(f"wrote {len(doc['cases'])} case(s) to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
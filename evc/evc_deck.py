@@ -22,28 +22,86 @@ parser.
 """
 import os, re
 
+_NUM_RE = re.compile(r'[-+]?[0-9]*\.?[0-9]+')
+
 def _num(s):
-    m = re.findall(r'[-+]?\d*\.?\d+', s)
+    m = _NUM_RE.findall(s)
     return float(m[0]) if m else None
 
+
+class DeckTable:
+    """A deck tokenized once: every line stripped, every number on it parsed.
+
+    All deck readers (EVCParams, EvcDeck, l74_check, the Tab-4 file scan)
+    go through this, so a property read is a list index, not a regex over
+    the raw line. Lines are 1-indexed as in the line map above.
+    """
+    ENCODINGS = ("cp949", "utf-8", "latin-1")
+
+    def __init__(self, lines):
+        self.lines = [ln.strip() for ln in lines]
+        self.nums = [tuple(float(x) for x in _NUM_RE.findall(ln)) for ln in self.lines]
+
+    @classmethod
+    def read(cls, path):
+        """Tokenize the deck at *path* (cp949 first: Korean tunnel names).
+        Each encoding is tried strictly; only the last one replaces
+        undecodable bytes."""
+        data = open(path, 'rb').read()
+        last = len(cls.ENCODINGS) - 1
+        for i, enc in enumerate(cls.ENCODINGS):
+            try:
+                text = data.decode(enc, errors="replace" if i == last else "strict")
+            except UnicodeDecodeError:
+                continue
+            return cls(text.splitlines())
+        raise ValueError(f"Failed to decode EVC file '{path}'")
+
+    def __len__(self):
+        return len(self.lines)
+
+    def line(self, idx):
+        return self.lines[idx - 1] if 0 < idx <= len(self.lines) else ''
+
+    def floats(self, idx):
+        return self.nums[idx - 1] if 0 < idx <= len(self.nums) else ()
+
+    def float(self, idx, pos=0, default=0.0):
+        fs = self.floats(idx)
+        return fs[pos] if pos < len(fs) else default
+
+    def rows(self, first, last, pos=0, default=0.0):
+        """Column *pos* of lines first..last inclusive (e.g. the L24-30 mix)."""
+        return [self.float(r, pos, default) for r in range(first, last + 1)]
+
+    def keyword(self, *prefixes):
+        """Numbers of the first line starting with one of *prefixes*
+        (case-insensitive) — for labelled lines that may move; None if absent."""
+        prefixes = tuple(p.lower() for p in prefixes)
+        for ln, fs in zip(self.lines, self.nums):
+            if ln.lower().startswith(prefixes):
+                return fs
+        return None
+
+
 class EvcDeck:
     def __init__(self, path):
         self.path = path
         self.stem = os.path.basename(path).replace('.evc', '')
         self.cls, self.pscen = self.stem.split('_')        # e.g. '030CFV0', 'P1'
-        L = open(path, encoding='ascii', errors='replace').read().replace('\r', '').split('\n')
-        self.lines = L
-        g = lambda n: L[n-1].strip() if n-1 < len(L) else ''
+        d = self.table = DeckTable.read(path)
+        self.lines = d.lines
+        g = d.line
         self.tunnel = g(1)
-        self.fire_pos = _num(g(64))          # generated by evc_engine, read here
+        self.fire_pos = d.float(64, default=None)   # generated by evc_engine, read here
         # FDB fire anchor: trailing value of L63 ("<pos> , <anchor> , <anchor>")
         l63 = [p.strip() for p in g(63).split(',')]
         self.fdb_fire_anchor = _num(l63[-1]) if l63 and l63[-1] else None
-        self.vehicle_count = _num(g(65))
-        self.hrr_mw = _num(g(68))
-        self.fire_load = _num(g(74))
-        self.occ_counts = [_num(g(n)) for n in range(11, 17)]
-        self.occ_pct = [_num(g(n)) for n in range(24, 31)]
+        self.vehicle_count = d.float(65, default=None)
+        self.hrr_mw = d.float(68, default=None)
+        self.fire_load = d.float(74, default=None)
+        self.occ_counts = d.rows(11, 16, default=None)
+        self.occ_pct = d.rows(24, 30, default=None)
 
     def fdb_x(self, tunnel_x, anchor=None):
         """Map an occupant's tunnel x to the class-FDB x coordinate by anchoring
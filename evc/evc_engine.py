@@ -3,7 +3,9 @@ import math
 import re
 import tempfile
 import os
-from dataclasses import dataclass, field
+import time
+import zlib
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 from typing import Callable, List, Optional, Tuple
 import numpy as np
@@ -104,6 +106,81 @@ def compute_vehicle_counts(n_cong, traffic, t_react, mix_rates):
  
     return n_enter, n_cong_list
  
+# ─────────────────────────────────────────────────────────────────────────────
+# Grid lookups (FDB time frames / x-mesh)
+# ─────────────────────────────────────────────────────────────────────────────
+def _axis_step(a, rtol: float = 1e-6) -> Optional[float]:
+    """Spacing of an evenly spaced increasing axis, or None.
+
+    FDS slice grids (x at 1 m, frames at a fixed output interval) are even
+    up to print rounding; *rtol* (of a step) is how far a node may sit off
+    a0 + i*step. The lookups below re-check each computed index against
+    the actual nodes, so this only decides whether the fast path is taken.
+    """
+    a = np.asarray(a, dtype=float)
+    if a.size < 2:
+        return None
+    step = (a[-1] - a[0]) / (a.size - 1)
+    if not (np.isfinite(step) and step > 0):
+        return None
+    off = np.abs(a - (a[0] + step * np.arange(a.size))).max()
+    return float(step) if off <= rtol * step else None
+
+
+def _frame_bracket(ts, step, t: float) -> Tuple[int, int, float]:
+    """(lo, hi, weight of hi) of the frame pair around *t*, clipped to the
+    span — the searchsorted(side='right') bracket, computed when *step*."""
+    n = len(ts)
+    t0 = float(ts[0])
+    t = min(max(float(t), t0), float(ts[-1]))
+    if step is None or n < 2:
+        hi = min(int(np.searchsorted(ts, t, side='right')), n - 1)
+        lo = max(hi - 1, 0)
+    else:
+        lo = min(int((t - t0) / step), n - 2)
+        if lo > 0 and t < ts[lo]:
+            lo -= 1
+        elif lo < n - 2 and t >= ts[lo + 1]:
+            lo += 1
+        hi = lo + 1
+    t_lo, t_hi = ts[lo], ts[hi]
+    dt = t_hi - t_lo
+    return lo, hi, float((t - t_lo) / dt) if dt > 0 else 0.0
+
+
+def _cell_index(xp: np.ndarray, step, x: np.ndarray) -> np.ndarray:
+    """j with xp[j] <= x < xp[j+1], clipped to [0, len(xp) - 2] — i.e.
+    searchsorted(xp, x, 'right') - 1 — computed rather than searched when
+    *step* is given (floor, then a one-node rounding fix-up)."""
+    nx = len(xp)
+    if step is None:
+        return np.clip(np.searchsorted(xp, x, side='right') - 1, 0, nx - 2)
+    # fmin/fmax also send NaN to a valid cell, as searchsorted does
+    j = np.fmin(np.fmax(np.floor((x - xp[0]) / step), 0), nx - 2).astype(np.intp)
+    j -= (j > 0) & (x < xp[j])
+    j += (j < nx - 2) & (x >= xp[j + 1])
+    return j
+
+
+def _interp_rows(rows: np.ndarray, xp: np.ndarray, step, x, fill) -> np.ndarray:
+    """np.interp(x, xp, row, left=fill, right=fill) for every row of
+    *rows* (..., nx) at once → (..., len(x)); *fill* broadcasts against
+    rows[..., :1]. The cell search is shared by all rows."""
+    x = np.asarray(x, dtype=float)
+    if len(xp) == 1:
+        return np.where(x == xp[0], rows[..., :1], fill)
+    j = _cell_index(xp, step, x)
+    x0 = xp[j]
+    f0, f1 = np.moveaxis(np.take(rows, (j, j + 1), axis=-1), -2, 0)
+    v = (f1 - f0) / (xp[j + 1] - x0) * (x - x0) + f0  # np.interp's form
+    at_end = (x == xp[-1])
+    if at_end.any():
+        v[..., at_end] = rows[..., -1:]
+    outside = (x < xp[0]) | (x > xp[-1])
+    if outside.any():
+        v[..., outside] = fill
+    return v
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Simulation result containers
 # ─────────────────────────────────────────────────────────────────────────────
@@ -120,7 +197,8 @@ class RunResult:
     n_occ_total: int = 0
     n_evac_zone: int = 0
     upstream_failed: int = 0
-    history: list = field(default_factory=list)   # per-timestep DAT.TEC rows (opt-in)
+    history: list = field(default_factory=list)   # DAT.TEC rows (opt-in; a HistoryRecorder)
+    profile: dict = field(default_factory=dict)   # RunProfile.as_dict() (PROFILE on)
  
 @dataclass
 class BatchResult:
@@ -129,11 +207,273 @@ class BatchResult:
     avg: RunResult
     exmax: int = 0
     exmin: int = 0
- 
+    profile: dict = field(default_factory=dict)   # runs' profiles summed + fdb_load
+    precision: dict = field(default_factory=dict) # AdaptiveIterations.precision + 'stop'
+    from_cache: bool = False                      # returned by evc_result_cache
+    alias_of: Optional[str] = None                # chid whose runs these are (evc_parallel.plan_aliases)
+
+
+class RunProfile:
+    """Wall-clock seconds per engine phase and loop counters of one run.
+
+    Lap-style: start() stamps the clock, lap(phase) charges the time since
+    the last stamp to *phase* and restamps, so consecutive sections cost
+    one perf_counter() each. Engines without PROFILE get NO_PROFILE, whose
+    methods do nothing.
+    """
+    PHASES = ('fdb_load', 'queue', 'sample', 'fed', 'move', 'history', 'tail')
+    COUNTERS = ('occupants', 'timesteps', 'substeps', 'agent_steps')
+    __slots__ = ('seconds', 'counts', '_t')
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(self.PHASES, 0.0)
+        self.counts = dict.fromkeys(self.COUNTERS, 0)
+        self._t = time.perf_counter()
+
+    def start(self):
+        self._t = time.perf_counter()
+
+    def lap(self, phase: str):
+        t = time.perf_counter()
+        self.seconds[phase] += t - self._t
+        self._t = t
+
+    def count(self, name: str, n: int = 1):
+        self.counts[name] += n
+
+    def as_dict(self) -> dict:
+        return {**self.seconds, **self.counts}
+
+
+class _NoProfile:
+    """RunProfile stand-in when profiling is off."""
+    __slots__ = ()
+
+    def start(self):
+        pass
+
+    def lap(self, phase):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+
+NO_PROFILE = _NoProfile()
+
+
+def sum_profiles(profiles) -> dict:
+    """Key-wise sum of RunProfile.as_dict() dicts (empty ones skipped)."""
+    out: dict = {}
+    for prof in profiles:
+        for k, v in prof.items():
+            out[k] = out.get(k, 0) + v
+    return out
+
+
+def profile_table(batches) -> str:
+    """Per-deck profile table of BatchResults run with PROFILE on: seconds
+    per phase (summed over the deck's runs), their total, and the loop
+    counters, one row per deck plus an ALL row."""
+    cols = RunProfile.PHASES + ('total',) + RunProfile.COUNTERS[1:]
+    rows = []
+    for b in batches:
+        if b.profile:
+            prof = dict(b.profile, total=sum(b.profile.get(k, 0.0)
+                                             for k in RunProfile.PHASES))
+            rows.append((b.chid, len(b.runs), prof))
+    if not rows:
+        return ''
+    rows.append(('ALL', sum(r[1] for r in rows), sum_profiles(r[2] for r in rows)))
+    head = f"{'deck':<16} {'runs':>5} " + ' '.join(f'{c:>11}' for c in cols)
+    lines = [head, '-' * len(head)]
+    for chid, n, prof in rows:
+        cells = [(f'{prof.get(c, 0.0):11.3f}' if c in RunProfile.PHASES + ('total',)
+                  else f'{int(round(prof.get(c, 0))):11d}') for c in cols]
+        lines.append(f'{chid[:16]:<16} {n:>5} ' + ' '.join(cells))
+    return '\n'.join(lines)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Adaptive iteration count
+# ─────────────────────────────────────────────────────────────────────────────
+def t_quantile(p: float, dof: float) -> float:
+    """Student-t quantile — Cornish-Fisher expansion about the normal one
+    (no scipy); within 1 % of the exact value from 3 degrees of freedom,
+    0.2 % at 95 %."""
+    from statistics import NormalDist
+    z = NormalDist().inv_cdf(p)
+    if not math.isfinite(dof):
+        return z
+    z2 = z * z
+    g = ((z2 + 1) * z / 4,
+         ((5 * z2 + 16) * z2 + 3) * z / 96,
+         (((3 * z2 + 19) * z2 + 17) * z2 - 15) * z / 384,
+         ((((79 * z2 + 776) * z2 + 1482) * z2 - 1920) * z2 - 945) * z / 92160)
+    return z + sum(gk / dof ** (k + 1) for k, gk in enumerate(g))
+
+
+def ci_half_width(values, confidence: float = 0.95) -> float:
+    """Half-width of the two-sided Student-t confidence interval of the
+    mean of *values* (inf for fewer than two)."""
+    v = np.asarray(values, dtype=float)
+    if v.size < 2:
+        return math.inf
+    return float(t_quantile(0.5 + confidence / 2.0, v.size - 1)
+                 * v.std(ddof=1) / math.sqrt(v.size))
+
+
+@dataclass
+class AdaptiveIterations:
+    """Stopping rule of an adaptive batch (EVCEngine.run(adaptive=...),
+    evc_parallel.ParallelBatch(adaptive=...)).
+
+    Iterations are added `step` at a time, from min_iterations up to
+    max_iterations, until the confidence half-width of the mean eq_fatal
+    and of the mean evacuee count are both within tolerance: the absolute
+    eq_fatal_tol / evacuees_tol [persons], or rel_tol × |mean| if looser.
+    Run k still draws from iteration_rng(seed, deck, k), so the first n
+    runs of an adaptive batch are the runs of a fixed n-iteration one.
+    min_iterations must be at least 4 (the t interval needs 3 dof).
+    """
+    min_iterations: int = 5
+    max_iterations: int = 50
+    step: int = 5
+    confidence: float = 0.95
+    eq_fatal_tol: float = 0.05
+    evacuees_tol: float = 2.0
+    rel_tol: float = 0.02
+
+    METRICS = ('eq_fatal', 'evacuees')
+
+    def __post_init__(self):
+        self.min_iterations = int(self.min_iterations)
+        if self.min_iterations < 4:                              # t from 3 dof
+            raise ValueError(f"AdaptiveIterations: min_iterations must be >= 4 "
+                             f"(got {self.min_iterations})")
+        self.max_iterations = max(self.min_iterations, int(self.max_iterations))
+        self.step = max(1, int(self.step))
+
+    def precision(self, runs) -> dict:
+        """Mean, half-width and tolerance of each metric over *runs*, and
+        whether all are within tolerance."""
+        out = {'n': len(runs), 'confidence': self.confidence, 'converged': True}
+        for m in self.METRICS:
+            vals = [float(getattr(r, m)) for r in runs]
+            mean = float(np.mean(vals)) if vals else 0.0
+            hw = ci_half_width(vals, self.confidence)
+            tol = max(getattr(self, f'{m}_tol'), self.rel_tol * abs(mean))
+            out[m] = {'mean': mean, 'half_width': hw, 'tol': tol}
+            out['converged'] &= hw <= tol
+        return out
+
+    def stop_reason(self, runs) -> Optional[str]:
+        """'converged' or 'max_iterations' once *runs* are enough, else None."""
+        if len(runs) < self.min_iterations:
+            return None
+        if self.precision(runs)['converged']:
+            return 'converged'
+        return 'max_iterations' if len(runs) >= self.max_iterations else None
+
+    def next_count(self, n_done: int) -> int:
+        """Iterations to add after *n_done* when stop_reason() said go on."""
+        if n_done < self.min_iterations:
+            return self.min_iterations - n_done
+        return max(0, min(self.step, self.max_iterations - n_done))
+
+
+@dataclass
+class FedRateField:
+    """FED rate [/min] pre-tabulated on an FDB's (time × x) grid.
+
+    sample() is the whole per-step dose lookup of the FED_RATE_FIELD mode.
+    max_abs_dev / max_rel_dev bound (at the probed quarter points) how far
+    the interpolated rate strays from the exact per-occupant one;
+    fed_bound(seconds) turns that into an accumulated-FED error.
+    """
+    times: np.ndarray
+    x_coords: np.ndarray
+    grid: np.ndarray                    # (nt, nx)
+    ambient: float                      # rate outside the x-mesh
+    max_abs_dev: float = 0.0
+    max_rel_dev: float = 0.0
+    t_step: Optional[float] = None      # FDBData.t_step / x_step
+    x_step: Optional[float] = None
+
+    def sample(self, t: float, x: np.ndarray) -> np.ndarray:
+        """Bilinear in (t, x), time clipped to the FDB span — as sample_all."""
+        lo, hi, w = _frame_bracket(self.times, self.t_step, t)
+        if w >= 1.0:
+            return _interp_rows(self.grid[hi], self.x_coords, self.x_step,
+                                x, self.ambient)
+        v = _interp_rows(self.grid[[lo, hi]], self.x_coords, self.x_step,
+                         x, self.ambient)
+        return (1.0 - w) * v[0] + w * v[1]
+
+    def fed_bound(self, seconds: float) -> float:
+        """Worst-case FED error accumulated over *seconds* of dosing."""
+        return self.max_abs_dev * float(seconds) / 60.0
+
+
+@dataclass
+class _RunState:
+    """Occupants of one iteration (or of several laid end to end, with
+    `seg` = iteration index per occupant) between draw and time loop."""
+    n_occ: int
+    pos: np.ndarray
+    exit_pos: np.ndarray
+    evac_dir: np.ndarray
+    walk_speed: np.ndarray
+    react_time: np.ndarray
+    entry_time: np.ndarray
+    evac_time: np.ndarray
+    fire_x: float
+    tunnel_len: float
+    abs_ws: float
+    premovement: float
+    seg: Optional[np.ndarray] = None
+
+    @classmethod
+    def concat(cls, states):
+        """Lay iterations of the same deck end to end (deck scalars shared)."""
+        def _cat(name):
+            return np.concatenate([getattr(s, name) for s in states])
+        s0 = states[0]
+        counts = [s.n_occ for s in states]
+        return cls(n_occ=int(sum(counts)), pos=_cat('pos'), exit_pos=_cat('exit_pos'),
+                   evac_dir=_cat('evac_dir'), walk_speed=_cat('walk_speed'),
+                   react_time=_cat('react_time'), entry_time=_cat('entry_time'),
+                   evac_time=_cat('evac_time'), fire_x=s0.fire_x,
+                   tunnel_len=s0.tunnel_len, abs_ws=s0.abs_ws,
+                   premovement=s0.premovement,
+                   seg=np.repeat(np.arange(len(states)), counts))
+
+    # Per-occupant kinematics held in float32 by compact runs; the clocks
+    # (react / entry / evac time) and the FED accumulator stay float64.
+    KINEMATICS = ('pos', 'exit_pos', 'evac_dir', 'walk_speed')
+
+    def compact(self) -> '_RunState':
+        """This state with KINEMATICS in float32 (EVCEngine.COMPACT)."""
+        return replace(self, **{k: np.asarray(getattr(self, k), dtype=np.float32)
+                                for k in self.KINEMATICS})
+
 # ─────────────────────────────────────────────────────────────────────────────
 # FDB/FDS data parser
 # ─────────────────────────────────────────────────────────────────────────────
 class FDBData:
+    # Species planes of the stacked field cube, in cube order, and the
+    # ambient (clean-air) value each one takes outside the FDB x-mesh.
+    SPECIES = ('co', 'co2', 'o2', 'temp', 'rad', 'soot')
+    AMBIENT = {'temp': 20.0, 'o2': 21.0, 'co2': 0.04,
+               'co': 0.0, 'soot': 0.0, 'rad': 0.419}
+    # Absolute deviation from AMBIENT counted as clean air by
+    # smoke_extent(tol=None) — opt-in, for the print / solver noise of real
+    # FDS output (TEMP 20.0001). At these limits the FED rate differs from
+    # the ambient rate by ~1e-5 /min at most (heat term: 3e-4 of its value).
+    SMOKE_TOL = {'co': 0.05, 'co2': 1e-3, 'o2': 1e-3, 'temp': 0.01, 'rad': 1e-3}
+    # Read/write the binary sidecar cache (fdb_store) around the text parse.
+    USE_SIDECAR = True
+
     def __init__(self, fdb_path: Path):
         self.path = Path(fdb_path)
         self.times = []
@@ -144,74 +484,328 @@ class FDBData:
         self.co = None
         self.rad = None
         self.o2 = None
+        self.cube = None          # (nt, len(SPECIES), nx) — see _stack_cube
         self.fire_center = None   # parsed from FDB "FIRE PT" header (x-center of fire)
+        self.fire_extent = None   # (fp_start, fp_end) from the same header line
+        self.md5 = None           # content digest (set when loaded via fdb_store)
         self._parse()
- 
+        self._stack_cube()
+        self._index_axes()
+
+    @classmethod
+    def from_cube(cls, fdb_path, times, x_coords, cube, fire_center=None,
+                  fire_extent=None, md5=None) -> 'FDBData':
+        """FDBData over an existing species cube — no file read, no copy.
+
+        Used for cubes that already live elsewhere (a shared-memory segment
+        in a batch worker, see fdb_store.attach_shared).
+        """
+        self = cls.__new__(cls)
+        self.path = Path(fdb_path)
+        self._adopt(times, x_coords, cube, fire_center, fire_extent, md5)
+        return self
+
+    def _adopt(self, times, x_coords, cube, fire_center=None,
+               fire_extent=None, md5=None):
+        self.times       = np.asarray(times, dtype=float)
+        self.x_coords    = np.asarray(x_coords, dtype=float)
+        self.cube        = np.asarray(cube)
+        self.fire_center = fire_center
+        self.fire_extent = tuple(fire_extent) if fire_extent else None
+        self.md5         = md5
+        for plane, name in enumerate(self.SPECIES):
+            setattr(self, name, self.cube[:, plane, :])
+        self._index_axes()
+
+    def astype(self, dtype) -> 'FDBData':
+        """This field with its cube in *dtype* (self when it already is) —
+        float32 is the compact mode (EVCEngine.COMPACT): half the resident
+        cube, same axes / fire point / md5. Samples are still interpolated
+        in float64 (the x-mesh is), only the stored values are rounded."""
+        dtype = np.dtype(dtype)
+        if self.cube is None or self.cube.dtype == dtype:
+            return self
+        return FDBData.from_cube(self.path, self.times, self.x_coords,
+                                 self.cube.astype(dtype), self.fire_center,
+                                 self.fire_extent, self.md5)
+
+    def _index_axes(self):
+        """Record the frame interval and x spacing when they are even (the
+        FDS output grid always is): t_step / x_step, None when irregular.
+        Every time/x lookup then computes its bracket instead of searching.
+        """
+        self.t_step = _axis_step(self.times) if len(self.times) else None
+        self.x_step = _axis_step(self.x_coords) if len(self.x_coords) else None
+
+    def frame_pair(self, t: float) -> Tuple[int, int, float]:
+        """(lo, hi, w): the frames bracketing *t* (clipped to the FDB span)
+        and the weight of frame hi."""
+        return _frame_bracket(self.times, self.t_step, t)
+
+    def cell_index(self, x) -> np.ndarray:
+        """x-mesh cell j of each x: x_coords[j] <= x < x_coords[j+1]."""
+        return _cell_index(self.x_coords, self.x_step, np.asarray(x, dtype=float))
+
+    def _stack_cube(self):
+        """Stack the six species grids into one (nt × nspecies × nx) cube.
+
+        The per-species attributes (self.co, self.temp, …) are re-pointed at
+        views of the cube, so existing readers keep working and nothing is
+        held twice. sample_all() gathers every species from the cube in one
+        pass instead of six get_value() calls.
+        """
+        if self.cube is not None:
+            return                          # _parse_bulk fills the cube directly
+        grids = [getattr(self, k, None) for k in self.SPECIES]
+        if any(g is None for g in grids):
+            self.cube = None
+            return
+        self.cube = np.ascontiguousarray(np.stack(grids, axis=1), dtype=float)
+        for i, k in enumerate(self.SPECIES):
+            setattr(self, k, self.cube[:, i, :])
+ 
+    # FDB column → (cube plane, value when the column is absent from a row,
+    # value of a grid cell no row writes). Mirrors the line parser's
+    # _g()/_fill() defaults exactly.
+    _COLUMNS = (('co',   'co',     0.0,  0.0),
+                ('co2',  'co2',    0.0,  0.04),
+                ('o2',   'oxygen', 21.0, 21.0),
+                ('temp', 'temp',   20.0, 20.0),
+                ('rad',  'radi',   0.0,  0.0),
+                ('soot', 'soot',   0.0,  0.0))
+    _DEFAULT_COL_MAP = {'time': 0, 'x': 1, 'soot': 2, 'co2': 3,
+                        'co': 4, 'temp': 5, 'radi': 6, 'oxygen': 7}
+
+    @staticmethod
+    def _col_map_from_header(parts) -> dict:
+        """Map a DATA-block column header line (split) to column indices."""
+        up = [p.upper() for p in parts]
+        col_map = {}
+        for i, h in enumerate(up):
+            if 'TIME' in h:                        col_map['time']   = i
+            elif h in ('X', 'X-COOR', 'XCOOR'):   col_map['x']      = i
+            elif 'SOOT' in h:                      col_map['soot']   = i
+            elif 'CO2' in h:                       col_map['co2']    = i
+            elif 'CO' in h and 'CO2' not in h:     col_map['co']     = i
+            elif 'TEMP' in h:                      col_map['temp']   = i
+            elif 'RADI' in h:                      col_map['radi']   = i
+            elif 'OXY' in h or h == 'O2':          col_map['oxygen'] = i
+        return col_map
+
+    def _scan_fire_pt(self, lines):
+        """🔥 Parse FIRE PT from the TUNNEL X COORDINATE header block.
+
+        Format:
+          TUNNEL X COORDINATE
+                         MIN_X     MAX_X     NX GRID     FIRE PT
+                         0.000     640.000   641         317.000- 323.000
+        The fire center is `(fp_start + fp_end) / 2` — typically x=320
+        for these tunnels, regardless of HRR level. Without this we
+        auto-detect via peak temperature, which is ~10-15 m off for
+        larger fires (100 MW plume peaks upstream of the fuel source).
+        """
+        in_tunnel_x = False
+        tunnel_x_header_seen = False
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith('!') or line.startswith('#'):
+                continue
+            if 'TUNNEL X COORDINATE' in line.upper():
+                in_tunnel_x = True
+                tunnel_x_header_seen = False
+                continue
+            if in_tunnel_x and self.fire_center is None:
+                if 'MIN_X' in line.upper() and 'FIRE' in line.upper():
+                    tunnel_x_header_seen = True
+                    continue
+                if tunnel_x_header_seen:
+                    # Look for a fire-pt range like "317.000- 323.000" (with
+                    # optional space around dash) in the FIRE PT column(s)
+                    # after MIN_X / MAX_X / NX; either end may be signed
+                    # ("-20.000- -14.000") on a mesh starting below x = 0.
+                    parts = line.split()
+                    tail = ' '.join(parts[3:]) if len(parts) >= 4 else line
+                    m = re.search(r'([-+]?[\d.]+)\s*-\s*([-+]?[\d.]+)\s*$', tail)
+                    if m:
+                        fp_start = float(m.group(1))
+                        fp_end   = float(m.group(2))
+                        self.fire_center = (fp_start + fp_end) / 2.0
+                        self.fire_extent = (fp_start, fp_end)
+                        in_tunnel_x = False
+                    else:
+                        # Maybe single-value fire pt at end of line
+                        if len(parts) >= 4:
+                            try:
+                                self.fire_center = float(parts[-1])
+                                self.fire_extent = (self.fire_center,) * 2
+                                in_tunnel_x = False
+                            except ValueError:
+                                pass
+            if self.fire_center is not None:
+                return
+
     def _parse(self):
-        """Robust FDB parser that handles the structured text format."""
+        """Load the FDB: binary sidecar if current, else parse the text.
+
+        Text parsing is the bulk numeric parse with the line parser as its
+        fallback; a successful text parse writes the sidecar (fdb_store) so
+        the next load of the same content is a memory-map, not a parse.
+        """
         if not self.path.exists():
             return
+        store = None
+        if self.USE_SIDECAR:
+            try:
+                import fdb_store as store
+            except ImportError:
+                store = None
+        if store is not None:
+            hit = store.read_sidecar(self.path)
+            if hit is not None:
+                self._adopt(**hit)                      # mmap-backed cube
+                log.info(f"FDB loaded from sidecar: {self.path.name}")
+                return
         try:
-            # Decode with multiple encoding fallbacks (Korean filenames use cp949)
-            raw = None
-            for enc in ('utf-8', 'cp949', 'latin-1', 'cp1252'):
+            stamp = self.path.stat()
+            data = self.path.read_bytes()
+        except Exception as e:
+            log.warning(f"Failed to read FDB file {self.path}: {e}")
+            return
+        try:
+            ok = self._parse_bulk(data)
+        except Exception as e:
+            log.debug(f"FDB bulk parse failed for {self.path.name} ({e}); "
+                      f"falling back to the line parser")
+            ok = False
+        if not ok:
+            self.fire_center = self.fire_extent = None
+            self.times, self.x_coords, self.cube = [], [], None
+            self._parse_lines(data)
+            self._stack_cube()
+        import hashlib
+        self.md5 = hashlib.md5(data).hexdigest()
+        if store is not None and self.cube is not None:
+            store.write_sidecar(self.path, self, self.md5,
+                                stamp={'size': stamp.st_size,
+                                       'mtime_ns': stamp.st_mtime_ns})
+
+    def _parse_bulk(self, data: bytes) -> bool:
+        """Vectorized parse of the DATA START … DATA END block.
+
+        The numeric block is handed to np.fromstring in one call (no per-row
+        Python work) and the species grids come from a reshape when the rows
+        are time-major / x-minor — the layout every FDB writer here emits —
+        or from a searchsorted scatter otherwise. Returns False (caller falls
+        back to _parse_lines) whenever the block is not a clean rectangle of
+        numbers: comment/separator lines, ragged rows, repeated headers.
+        """
+        m_start = re.search(rb'(?i)DATA START[^\n]*\n', data)
+        if m_start is None:
+            return False
+        m_end = re.search(rb'(?i)DATA END', data[m_start.end():])
+        stop = m_start.end() + m_end.start() if m_end else len(data)
+        self._scan_fire_pt(self._decode(data[:m_start.start()]).splitlines())
+
+        # Column header lines precede the first numeric row
+        pos = m_start.end()
+        col_map = None
+        ncols = 0
+        while pos < stop:
+            nl = data.find(b'\n', pos, stop)
+            nl = stop if nl < 0 else nl
+            line = data[pos:nl].decode('latin-1').strip()
+            if line and not (line.startswith('!') or line.startswith('#')
+                             or all(c in '*|-= \t' for c in line)):
+                parts = line.split()
                 try:
-                    raw = self.path.read_bytes().decode(enc, errors='replace')
+                    [float(p) for p in parts]
+                except ValueError:
+                    col_map = self._col_map_from_header(parts)
+                else:
+                    ncols = len(parts)
                     break
-                except Exception:
-                    continue
-            if raw is None:
-                log.warning(f"Failed to decode FDB file {self.path}")
-                return
+            pos = nl + 1
+        if ncols < 2:
+            return False
+        if col_map is None:
+            col_map = dict(self._DEFAULT_COL_MAP)
+
+        block = data[pos:stop].strip()
+        import warnings
+        with warnings.catch_warnings():
+            # older numpy warns (and truncates) instead of raising
+            warnings.simplefilter('error', DeprecationWarning)
+            vals = np.fromstring(block, dtype=float, sep=' ')
+        n_blank = len(re.findall(rb'\n[ \t\r]*(?=\n)', block))
+        n_rows = block.count(b'\n') + 1 - n_blank
+        if vals.size != n_rows * ncols:
+            return False
+        arr = vals.reshape(n_rows, ncols)
+
+        def _col(key, absent):
+            idx = col_map.get(key)
+            if idx is None or idx >= ncols:
+                return np.full(n_rows, absent)
+            return arr[:, idx]
+
+        t_col = _col('time', 0.0)
+        x_col = _col('x', 0.0)
+        times_u  = np.unique(t_col)
+        x_coords = np.unique(x_col)
+        nt, nx = len(times_u), len(x_coords)
+
+        cube = np.empty((nt, len(self.SPECIES), nx), dtype=float)
+        rectangular = (n_rows == nt * nx
+                       and np.all(t_col.reshape(nt, nx) == times_u[:, None])
+                       and np.all(x_col.reshape(nt, nx) == x_coords[None, :]))
+        if not rectangular:
+            ti = np.searchsorted(times_u, t_col)
+            xi = np.searchsorted(x_coords, x_col)
+        for plane, (name, key, absent, unset) in enumerate(self._COLUMNS):
+            v = _col(key, absent)
+            if rectangular:
+                cube[:, plane, :] = v.reshape(nt, nx)
+            else:
+                cube[:, plane, :] = unset
+                cube[ti, plane, xi] = v          # later rows win, as before
+
+        self.times    = times_u
+        self.x_coords = x_coords
+        self.cube     = cube
+        for plane, name in enumerate(self.SPECIES):
+            setattr(self, name, cube[:, plane, :])
+
+        log.info(f"FDB parsed: {self.path.name}  "
+                 f"t=[{times_u[0]:.0f}..{times_u[-1]:.0f}]s  "
+                 f"x=[{x_coords[0]:.1f}..{x_coords[-1]:.1f}]m  "
+                 f"rows={n_rows}")
+        return True
+
+    @staticmethod
+    def _decode(data: bytes) -> str:
+        # Decode with multiple encoding fallbacks (Korean filenames use cp949)
+        for enc in ('utf-8', 'cp949', 'latin-1', 'cp1252'):
+            try:
+                return data.decode(enc, errors='replace')
+            except Exception:
+                continue
+        return data.decode('latin-1')
+
+    def _parse_lines(self, data: bytes):
+        """Line-by-line FDB parser — fallback for blocks _parse_bulk rejects."""
+        try:
+            raw = self._decode(data)
+            self._scan_fire_pt(raw.splitlines())
  
             rows = []
             col_map = None
             in_data = False
-            in_tunnel_x = False
-            tunnel_x_header_seen = False
  
             for line in raw.splitlines():
                 line = line.strip()
                 if not line or line.startswith('!') or line.startswith('#'):
                     continue
  
-                # 🔥 Parse FIRE PT from the TUNNEL X COORDINATE header block.
-                # Format:
-                #   TUNNEL X COORDINATE
-                #                  MIN_X     MAX_X     NX GRID     FIRE PT
-                #                  0.000     640.000   641         317.000- 323.000
-                # The fire center is `(fp_start + fp_end) / 2` — typically x=320
-                # for these tunnels, regardless of HRR level. Without this we
-                # auto-detect via peak temperature, which is ~10-15 m off for
-                # larger fires (100 MW plume peaks upstream of the fuel source).
-                if 'TUNNEL X COORDINATE' in line.upper():
-                    in_tunnel_x = True
-                    tunnel_x_header_seen = False
-                    continue
-                if in_tunnel_x and self.fire_center is None:
-                    if 'MIN_X' in line.upper() and 'FIRE' in line.upper():
-                        tunnel_x_header_seen = True
-                        continue
-                    if tunnel_x_header_seen:
-                        # Try to parse: "0.000  640.000  641  317.000- 323.000"
-                        import re as _re
-                        # Look for a fire-pt range like "317.000- 323.000" (with optional space around dash)
-                        m = _re.search(r'([\d.]+)\s*-\s*([\d.]+)\s*$', line)
-                        if m:
-                            fp_start = float(m.group(1))
-                            fp_end   = float(m.group(2))
-                            self.fire_center = (fp_start + fp_end) / 2.0
-                            in_tunnel_x = False
-                        else:
-                            # Maybe single-value fire pt at end of line
-                            parts = line.split()
-                            if len(parts) >= 4:
-                                try:
-                                    self.fire_center = float(parts[-1])
-                                    in_tunnel_x = False
-                                except ValueError:
-                                    pass
- 
                 # Detect DATA START sentinel — skip all header text before it
                 if 'DATA START' in line.upper():
                     in_data = True
@@ -233,17 +827,7 @@ class FDBData:
                     nums = [float(p) for p in parts]
                 except ValueError:
                     # Non-numeric line inside DATA block → column header
-                    up = [p.upper() for p in parts]
-                    col_map = {}
-                    for i, h in enumerate(up):
-                        if 'TIME' in h:                        col_map['time']   = i
-                        elif h in ('X', 'X-COOR', 'XCOOR'):   col_map['x']      = i
-                        elif 'SOOT' in h:                      col_map['soot']   = i
-                        elif 'CO2' in h:                       col_map['co2']    = i
-                        elif 'CO' in h and 'CO2' not in h:     col_map['co']     = i
-                        elif 'TEMP' in h:                      col_map['temp']   = i
-                        elif 'RADI' in h:                      col_map['radi']   = i
-                        elif 'OXY' in h or h == 'O2':          col_map['oxygen'] = i
+                    col_map = self._col_map_from_header(parts)
                     continue
  
                 if len(nums) < 2:
@@ -251,10 +835,7 @@ class FDBData:
  
                 # Default column positions if no header line was found
                 if col_map is None:
-                    col_map = {
-                        'time': 0, 'x': 1, 'soot': 2, 'co2': 3,
-                        'co': 4, 'temp': 5, 'radi': 6, 'oxygen': 7
-                    }
+                    col_map = dict(self._DEFAULT_COL_MAP)
  
                 def _g(key, default=0.0):
                     idx = col_map.get(key)
@@ -314,56 +895,133 @@ class FDBData:
         # Agents far downstream of fire (after EVC↔FDB offset) can produce
         # x-queries beyond the FDB x_max; returning row-edge values there would
         # leak fire-zone contamination. Use ambient values instead.
-        _defaults = {'temp': 20.0, 'o2': 21.0, 'co2': 0.04,
-                     'co': 0.0, 'soot': 0.0, 'rad': 0.419}
-        default = _defaults.get(key, 0.0)
- 
-        t_clipped = float(np.clip(t, self.times[0], self.times[-1]))
-        ti_hi = int(np.searchsorted(self.times, t_clipped, side='right'))
-        ti_hi = min(ti_hi, len(self.times) - 1)
-        ti_lo = max(ti_hi - 1, 0)
-        t_lo, t_hi = self.times[ti_lo], self.times[ti_hi]
-        dt = t_hi - t_lo
-        wt_hi = (t_clipped - t_lo) / dt if dt > 0 else 0.0
-        wt_lo = 1.0 - wt_hi
- 
-        row_lo = arr_2d[ti_lo]
-        row_hi = arr_2d[ti_hi]
-        val_lo = np.interp(x_batch, self.x_coords, row_lo,
-                           left=default, right=default)
-        val_hi = np.interp(x_batch, self.x_coords, row_hi,
-                           left=default, right=default)
-        return wt_lo * val_lo + wt_hi * val_hi
+        default = self.AMBIENT.get(key, 0.0)
  
+        ti_lo, ti_hi, wt_hi = self.frame_pair(t)
+        wt_lo = 1.0 - wt_hi
+        x = np.asarray(x_batch, dtype=float)
+        val_lo, val_hi = _interp_rows(arr_2d[[ti_lo, ti_hi]], self.x_coords,
+                                      self.x_step, x.reshape(-1), default)
+        return (wt_lo * val_lo + wt_hi * val_hi).reshape(x.shape)
+
+    def sample_all(self, t: float, x_batch: np.ndarray) -> np.ndarray:
+        """All species at (t, x_batch) in one gather → array (nspecies, n).
+
+        Rows follow SPECIES order (co, co2, o2, temp, rad, soot). Same
+        numbers as calling get_value() per species — time bracket clipped to
+        the FDB span, linear in x exactly as np.interp computes it, ambient
+        AMBIENT values outside the x-mesh — but the time bracket and the
+        x-bracket indices are found once for all six planes.
+        """
+        x = np.asarray(x_batch, dtype=float)
+        ns = len(self.SPECIES)
+        if self.cube is None or len(self.times) == 0 or len(self.x_coords) == 0:
+            return np.zeros((ns,) + x.shape, dtype=float)
+        amb_col = np.array([self.AMBIENT[k] for k in self.SPECIES])[:, None]
+
+        ti_lo, ti_hi, wt_hi = self.frame_pair(t)
+        wt_lo = 1.0 - wt_hi
+
+        # Both bracketing frames at once: pair[0] = ti_lo, pair[1] = ti_hi;
+        # the x-cell of each query is found once for every plane.
+        pair = self.cube[[ti_lo, ti_hi]]                  # (2, ns, nx)
+        v = _interp_rows(pair, self.x_coords, self.x_step, x, amb_col)
+        return wt_lo * v[0] + wt_hi * v[1]
+ 
+    def smoke_extent(self, tol: Optional[float] = 0.0) -> np.ndarray:
+        """Per frame, the open x-interval (lo, hi) outside which every dose
+        species (all but soot) is ambient. Frames with no smoke give
+        (inf, -inf). (nt, 2) array, cached per tol.
+
+        *tol* a float: within that relative tol of AMBIENT (scaled by
+        max(|AMBIENT|, 1)); 0.0 (default) is exactly ambient, where
+        sample_all() outside the interval returns the ambient values bit for
+        bit. None: within the absolute per-species SMOKE_TOL — CO 0.05 ppm,
+        CO2 / O2 1e-3 %, TEMP 0.01 C, RAD 1e-3 kW/m2 — so FDS print noise
+        counts as clean air. A float32 cube is compared in float32 (its
+        stored ambient).
+        """
+        cache = self.__dict__.setdefault('_smoke_extent', {})
+        ext = cache.get(tol)
+        if ext is None:
+            dt = self.cube.dtype if self.cube.dtype == np.float32 else np.float64
+            amb = np.array([self.AMBIENT[k] for k in self.SPECIES[:5]], dtype=dt)[:, None]
+            if tol is None:
+                lim = np.array([self.SMOKE_TOL[k] for k in self.SPECIES[:5]], dtype=dt)[:, None]
+            else:
+                lim = tol * np.maximum(np.abs(amb), 1.0)
+            dep = (np.abs(np.asarray(self.cube[:, :5], dtype=dt) - amb)
+                   > lim).any(axis=1)                                   # (nt, nx)
+            xp = np.asarray(self.x_coords, dtype=float)
+            nx = xp.size
+            jmin = np.argmax(dep, axis=1)
+            jmax = nx - 1 - np.argmax(dep[:, ::-1], axis=1)
+            lo = np.where(jmin > 0, xp[np.maximum(jmin - 1, 0)], -np.inf)
+            hi = np.where(jmax < nx - 1, xp[np.minimum(jmax + 1, nx - 1)], np.inf)
+            smoky = dep.any(axis=1)
+            ext = cache[tol] = np.column_stack([np.where(smoky, lo, np.inf),
+                                                np.where(smoky, hi, -np.inf)])
+        return ext
+
+    def smoke_bounds(self, t: float, tol: Optional[float] = 0.0) -> Tuple[float, float]:
+        """smoke_extent over the frame pair sample_all(t, ·) interpolates."""
+        ext = self.smoke_extent(tol)
+        lo, hi, _ = self.frame_pair(t)
+        return min(ext[lo, 0], ext[hi, 0]), max(ext[lo, 1], ext[hi, 1])
+
     @property
     def is_loaded(self) -> bool:
         return len(self.times) > 0 and self.co is not None
  
+def _shared_fdb(fdb_path: Path, dtype=None) -> FDBData:
+    """FDBData from the process-wide registry (fdb_store.REGISTRY).
+
+    Every engine of a batch that points at the same FDB (the six fire
+    positions of one scenario) shares one parsed field. Falls back to a
+    private FDBData when fdb_store is not importable (evc/ not on sys.path).
+    *dtype* (np.float32 for compact engines) selects the cube precision.
+    """
+    try:
+        from fdb_store import load_fdb
+    except ImportError:
+        fdb = FDBData(fdb_path)
+        return fdb.astype(dtype) if dtype is not None else fdb
+    return load_fdb(fdb_path, dtype=dtype)
+
 # ─────────────────────────────────────────────────────────────────────────────
 # EVC parameter parser
 # ─────────────────────────────────────────────────────────────────────────────
 class EVCParams:
     def __init__(self, evc_path: Path):
         self.path = evc_path
-        self._raw_lines = []
+        self._deck = None
         self._parse()
  
     def _parse(self):
-        for enc in ("cp949", "utf-8", "latin-1"):
-            try:
-                raw = self.path.read_bytes().decode(enc, errors="replace")
-                self._raw_lines = raw.splitlines(keepends=False)
-                return
-            except Exception: continue
-        raise EVCFileError(f"Failed to decode EVC file '{self.path}'")
+        # 🔧 Tokenize the deck ONCE (evc_deck.DeckTable): every property
+        # below used to re-run re.findall on its raw line per read — and
+        # L68 / the mix rows are read per timestep / per queue build.
+        # Re-reading the file (_read) is the only invalidation.
+        from evc_deck import DeckTable
+        try:
+            self._deck = DeckTable.read(self.path)
+        except (OSError, ValueError) as e:
+            raise EVCFileError(f"Failed to decode EVC file '{self.path}': {e}")
+        self._jam_density = self._deck.keyword("jamdensity", "maxvehicles")
+
+    def _read(self):
+        """Re-tokenize the deck from disk — drops the cached DeckTable."""
+        self._parse()
+ 
+    @property
+    def _raw_lines(self) -> List[str]:
+        return self._deck.lines
  
     def _line(self, idx: int) -> str:
-        if 0 < idx <= len(self._raw_lines): return self._raw_lines[idx - 1].strip()
-        return ""
+        return self._deck.line(idx)
  
     def _float(self, idx: int, pos: int = 0, default: float = 0.0) -> float:
-        fs = [float(x) for x in re.findall(r"[-+]?[0-9]*\.?[0-9]+", self._line(idx))]
-        return fs[pos] if pos < len(fs) else default
+        return self._deck.float(idx, pos, default)
  
     @property
     def abs_min_speed(self) -> float:
@@ -422,12 +1080,9 @@ class EVCParams:
         # Optional: a jam density persisted by the writer as a labelled line,
         # e.g. "JamDensity , 165" or "MaxVehicles , 165". Keyword search keeps
         # it robust to line-number shifts. Returns None when absent.
-        for ln in self._raw_lines:
-            s = ln.strip().lower()
-            if s.startswith("jamdensity") or s.startswith("maxvehicles"):
-                nums = re.findall(r"[-+]?[0-9]*\.?[0-9]+", s)
-                if nums and float(nums[-1]) > 0:
-                    return float(nums[-1])
+        nums = self._jam_density
+        if nums and nums[-1] > 0:
+            return nums[-1]
         return None
     @property
     def detection_time(self) -> float: return self._float(81, default=60.0)
@@ -438,7 +1093,7 @@ class EVCParams:
     @property
     def normal_traffic(self) -> float: return self._float(66, default=2000.0)
     @property
-    def veh_lengths(self) -> List[float]: return [self._float(r) for r in range(45, 52)]
+    def veh_lengths(self) -> List[float]: return self._deck.rows(45, 51)
     @property
     def veh_counts_dir1(self) -> List[int]:
         """EVC L10–L16: vehicle counts per type, direction 1
@@ -450,14 +1105,14 @@ class EVCParams:
         (VB input array DAT_004a61a4[2][1..7]; zeros for one-way bores)."""
         return [int(round(self._float(r, default=0.0))) for r in range(17, 24)]
     @property
-    def veh_pcu(self) -> List[float]: return [self._float(r) for r in range(38, 45)]
+    def veh_pcu(self) -> List[float]: return self._deck.rows(38, 44)
     @property
-    def veh_occ(self) -> List[float]: return [self._float(r) for r in range(52, 59)]
+    def veh_occ(self) -> List[float]: return self._deck.rows(52, 58)
     @property
     def num_lanes(self) -> int: return int(self._float(8, default=2))
     @property
     def is_two_way(self) -> bool:
-        vals = [float(x) for x in re.findall(r'[-+]?[0-9]*\.?[0-9]+', self._line(2))]
+        vals = self._deck.floats(2)
         dir_flag = vals[1] if len(vals) >= 2 else vals[0] if vals else 0.0
         return dir_flag == -1 or (len(vals) == 1 and vals[0] == -1)
  
@@ -466,7 +1121,7 @@ class EVCParams:
         n_seg = int(self._float(61))
         ex = []
         for r in range(62, 62 + n_seg):
-            fs = [float(x) for x in re.findall(r"[-+]?[0-9]*\.?[0-9]+", self._line(r))]
+            fs = self._deck.floats(r)
             if len(fs) >= 3: ex.append(fs[2])
             elif len(fs) >= 2: ex.append(fs[1])
         return ex if ex else [0.0, self.tunnel_length]
@@ -565,7 +1220,7 @@ class EVCParams:
             # Fallback inference: L10-L16 (vehicle counts in tunnel at fire
             # moment). All zeros → Normal. Any nonzero → Congested.
             try:
-                veh_counts_rows = [self._float(r, default=0.0) for r in range(10, 17)]
+                veh_counts_rows = self._deck.rows(10, 16)
                 is_normal_traffic = (sum(veh_counts_rows) < 1.0)
             except Exception:
                 is_normal_traffic = False
@@ -575,9 +1230,9 @@ class EVCParams:
         # EVC L45-51 = vehicle body length (m) per type
         # EVC L52-58 = occupants per vehicle per type
         try:
-            mix_pct = [self._float(r, default=0.0) for r in range(24, 31)]
-            veh_len = [self._float(r, default=0.0) for r in range(45, 52)]
-            occ_pv  = [self._float(r, default=0.0) for r in range(52, 59)]
+            mix_pct = self._deck.rows(24, 30)
+            veh_len = self._deck.rows(45, 51)
+            occ_pv  = self._deck.rows(52, 58)
         except Exception:
             mix_pct = veh_len = occ_pv = []
  
@@ -647,7 +1302,7 @@ class EVCParams:
         if pcpkpl_override is not None:
             pcpkpl = float(pcpkpl_override)
         else:
-            r85 = [float(x) for x in re.findall(r"[-+]?[0-9]*\.?[0-9]+", self._line(85))]
+            r85 = self._deck.floats(85)
             pcpkpl = r85[2] if len(r85) >= 3 else 216.0
  
         dir_mult = float(dir_mult_override) if dir_mult_override else 2.41
@@ -795,6 +1450,90 @@ def build_vb_vehicle_queue(params: "EVCParams",
         averages here; fractional values use per-vehicle stochastic
         rounding (mean-exact), integers reproduce VB bit-identically.
     """
+    skel = vb_queue_skeleton(params, is_normal_traffic, fire_x,
+                             slow_prob=slow_prob, jam_density=jam_density,
+                             truncate_at_queue_len=truncate_at_queue_len,
+                             occ_override=occ_override)
+    return skel.draw(rng) if skel is not None else None
+
+
+@dataclass
+class VBQueueSkeleton:
+    """The deterministic part of the VB queue for one deck — per-type
+    apportionment, per-lane vehicle multisets, slot geometry and the
+    traffic-mode clamps. Only the lane shuffles and the occupant draws
+    differ between iterations; draw(rng) makes those (FUN_004552b0
+    placement + FUN_0045d560), so an engine builds this once per deck."""
+    lanes: List[Tuple[int, np.ndarray]]     # (0-based lane, unshuffled types)
+    lengths: np.ndarray                     # L45–L51 vehicle lengths (m)
+    occ_f: np.ndarray                       # occupant slots per type
+    gap: float
+    queue_len: float
+    tunnel_len: float
+    slow_prob: float
+    is_normal_traffic: bool
+    truncate_at_queue_len: bool = False
+
+    def draw(self, rng) -> Optional[dict]:
+        """One iteration's queue — the build_vb_vehicle_queue() dict."""
+        pos_l, slow_l, type_l, lane_l = [], [], [], []
+        n_veh_placed = 0
+        for ln, types in self.lanes:
+            lane_types = types.copy()
+            # Random-empty-slot placement ≡ random permutation of the lane
+            # multiset (rtcRandomize + rejection sampling in the binary).
+            rng.shuffle(lane_types)
+            x_occ, u_slow, occ_type, n_placed = _vb_lane_occupants(
+                lane_types, self.lengths, self.occ_f, self.gap, rng,
+                self.queue_len if self.truncate_at_queue_len else None)
+            n_veh_placed += n_placed
+            # VarTstLe guard: register a person only if x_occ > 0 — the
+            # confirmed source of VB's ±1–3 per-run Evacuee variance (only
+            # the first vehicle per lane can lose occupants).
+            keep = x_occ > 0.0
+            x_occ = x_occ[keep]
+            # 🔧 VB-PARITY (normal-traffic queue extent): the lane cursor's
+            # slot arithmetic can overflow a vehicle or two PAST queue_len
+            # (= fire_x in normal mode) because slot widths exceed
+            # 1000/density for long vehicles. Those spill-over occupants
+            # landed at pos ≥ fire_x, were classified on the HIGH side of
+            # the fire barrier, and walked the long way out THROUGH the
+            # plume — inflating shallow-fire NORMAL EV times (P1: 560 s vs
+            # VB 164 s) and creating phantom NORMAL fatalities that VB
+            # (queue strictly upstream of the fire) never produces. Clamp
+            # the queue into [0, queue_len) for normal traffic; congested
+            # keeps the full-tunnel clamp.
+            if self.is_normal_traffic:
+                x_occ = np.minimum(x_occ, max(1.0, self.queue_len - 1.0))
+            pos_l.append(np.minimum(x_occ, self.tunnel_len))
+            slow_l.append(u_slow[keep] < self.slow_prob)
+            type_l.append(occ_type[keep])
+            lane_l.append(np.full(x_occ.size, ln, dtype=int))
+
+        pos = np.concatenate(pos_l) if pos_l else np.zeros(0)
+        if not pos.size:
+            return None
+        return {
+            "pos":      pos,
+            "is_slow":  np.concatenate(slow_l),
+            "veh_type": np.concatenate(type_l),
+            "lane":     np.concatenate(lane_l),
+            "n_veh":    int(n_veh_placed),
+            "n_occ":    int(pos.size),
+        }
+
+
+def vb_queue_skeleton(params: "EVCParams",
+                      is_normal_traffic: bool,
+                      fire_x: float,
+                      slow_prob: Optional[float] = None,
+                      jam_density: Optional[float] = None,
+                      truncate_at_queue_len: bool = False,
+                      occ_override: Optional[List[float]] = None
+                      ) -> Optional[VBQueueSkeleton]:
+    """The VBQueueSkeleton of build_vb_vehicle_queue() (same parameters,
+    no rng), or None when the EVC file carries no usable vehicle-count
+    data."""
     counts_d1 = params.veh_counts_dir1
     counts_d2 = params.veh_counts_dir2
     lengths   = params.veh_lengths
@@ -846,15 +1585,14 @@ def build_vb_vehicle_queue(params: "EVCParams",
     total_veh = vb_cint(float(jam_density) * (queue_len / 1000.0) * lanes_per_dir)
     if total_veh <= 0:
         return None
-    mix = [params._float(r, default=0.0) for r in range(24, 31)]
+    mix = params._deck.rows(24, 30)
     if sum(mix) <= 0:
         s = float(sum(max(0, c) for c in counts_d1)) or 1.0
         mix = [100.0 * max(0, c) / s for c in counts_d1]
     mix_sum = sum(mix) or 100.0
  
     share = VB_LANE_SHARE[lanes_per_dir]
-    pos_l, slow_l, type_l, lane_l = [], [], [], []
-    n_veh_placed = 0
+    lanes = []
  
     # 🔧 VB-PARITY FIX (direction loop): second direction only for two-way
     # tunnels — see lanes_per_dir note above. Non-zero L17–L23 counts on a
@@ -870,7 +1608,7 @@ def build_vb_vehicle_queue(params: "EVCParams",
         # for direction 2 when it carries data, else fall back to dir 1.
         mix_d, mix_d_sum = mix, mix_sum
         if d_idx == 1:
-            mix2 = [params._float(r, default=0.0) for r in range(31, 38)]
+            mix2 = params._deck.rows(31, 37)
             if sum(mix2) > 0:
                 mix_d, mix_d_sum = mix2, (sum(mix2) or 100.0)
         # Per-type queued counts via LARGEST-REMAINDER apportionment so they
@@ -890,80 +1628,103 @@ def build_vb_vehicle_queue(params: "EVCParams",
                 n_type[_order[_i]] += 1
         # Per-lane-per-type counts: CInt(share × n_type)  (FUN_004552b0)
         for ln in range(lanes_per_dir):
-            lane_types = []
-            for t in range(1, 8):
-                n_tl = vb_cint(share[ln][t - 1] * n_type[t - 1])
-                lane_types.extend([t] * min(n_tl, VB_MAX_VEH_PER_LANE))
-            if not lane_types:
-                continue
-            lane_types = np.asarray(lane_types[:VB_MAX_VEH_PER_LANE], dtype=int)
-            # Random-empty-slot placement ≡ random permutation of the lane
-            # multiset (rtcRandomize + rejection sampling in the binary).
-            rng.shuffle(lane_types)
-            # Position pass: cumulative slot = gap + length[type]
-            cursor = 0.0
-            for t in lane_types:
-                L_t  = float(lengths[t - 1])
-                slot = gap + L_t
-                if truncate_at_queue_len and cursor + slot > queue_len:
-                    break
-                cursor += slot
-                x_slot_end = cursor                 # front of this vehicle's slot
-                n_veh_placed += 1
-                # 🔧 VB-PARITY: occupant slots from the project's occupancy
-                # table (occ_f, see occ_override note above). Integer values
-                # behave exactly as before; fractional averages (e.g. 1.5
-                # riders/car) use stochastic rounding per vehicle so the
-                # population mean equals total_veh × avg_occ exactly.
-                _occ_t  = occ_f[t - 1]
-                n_slots = int(_occ_t)
-                _frac   = _occ_t - n_slots
-                if _frac > 0.0 and rng.random() < _frac:
-                    n_slots += 1
-                if n_slots <= 0:
-                    continue
-                # FUN_0045d560 slot loop, with FUN_0045d410 = Uniform(a, b):
-                #   x_occ = x_slot − Uniform(0, length+2.33)   (in-slot spread)
-                #   register person only if x_occ > 0 (VarTstLe guard) — the
-                #   confirmed source of VB's ±1–3 per-run Evacuee variance
-                #   (only the first vehicle per lane can lose occupants).
-                offs  = rng.uniform(0.0, L_t + VB_OCC_SLOT_SPREAD, n_slots)
-                draws = rng.random(n_slots)         # 0.5/0.3 group selection
-                for off, d in zip(offs, draws):
-                    x_occ = x_slot_end - off
-                    if x_occ <= 0.0:
-                        continue                    # VB drops this person
-                    # 🔧 VB-PARITY (normal-traffic queue extent): the lane
-                    # cursor's slot arithmetic can overflow a vehicle or two
-                    # PAST queue_len (= fire_x in normal mode) because slot
-                    # widths exceed 1000/density for long vehicles. Those
-                    # spill-over occupants landed at pos ≥ fire_x, were
-                    # classified on the HIGH side of the fire barrier, and
-                    # walked the long way out THROUGH the plume — inflating
-                    # shallow-fire NORMAL EV times (P1: 560 s vs VB 164 s)
-                    # and creating phantom NORMAL fatalities that VB (queue
-                    # strictly upstream of the fire) never produces. Clamp
-                    # the queue into [0, queue_len) for normal traffic;
-                    # congested keeps the full-tunnel clamp.
-                    if is_normal_traffic:
-                        x_occ = min(x_occ, max(1.0, queue_len - 1.0))
-                    pos_l.append(min(x_occ, tunnel_len))
-                    slow_l.append(bool(d < slow_prob))
-                    type_l.append(int(t))
-                    lane_l.append(int(ln))
- 
-    if not pos_l:
-        return None
-    return {
-        "pos":      np.asarray(pos_l, dtype=float),
-        "is_slow":  np.asarray(slow_l, dtype=bool),
-        "veh_type": np.asarray(type_l, dtype=int),
-        "lane":     np.asarray(lane_l, dtype=int),
-        "n_veh":    int(n_veh_placed),
-        "n_occ":    int(len(pos_l)),
-    }
- 
- 
+            n_tl = [min(vb_cint(share[ln][t] * n_type[t]), VB_MAX_VEH_PER_LANE)
+                    for t in range(7)]
+            lane_types = np.repeat(np.arange(1, 8), n_tl)[:VB_MAX_VEH_PER_LANE]
+            if lane_types.size:
+                lanes.append((ln, lane_types))
+
+    return VBQueueSkeleton(
+        lanes=lanes, lengths=np.asarray(lengths, dtype=float),
+        occ_f=np.asarray(occ_f, dtype=float), gap=gap, queue_len=queue_len,
+        tunnel_len=tunnel_len, slow_prob=slow_prob,
+        is_normal_traffic=is_normal_traffic,
+        truncate_at_queue_len=truncate_at_queue_len)
+
+
+def _vb_lane_occupants(lane_types, lengths, occ_f, gap, rng, queue_len=None):
+    """Position pass + FUN_0045d560 occupant draws for one shuffled lane.
+
+    Returns (x_occ, u_slow, veh_type, n_veh): every occupant slot of the
+    lane's placed vehicles — x before the VarTstLe (x > 0) guard, the
+    0.5/0.3 group-selection draw, the vehicle type — and the number of
+    vehicles placed. queue_len clips the lane (truncate_at_queue_len).
+
+    Vectorized over the lane, drawing the exact stream the per-vehicle loop
+    did: per vehicle [frac draw if the type's occupancy is fractional],
+    n_slots offsets Uniform(0, length+2.33), n_slots group draws — so a
+    given generator yields bit-identical queues.
+    """
+    L_veh = np.asarray(lengths, dtype=float)[lane_types - 1]
+    # Position pass: cumulative slot = gap + length[type] (cumsum adds in
+    # order, same as the old running cursor)
+    x_end = np.cumsum(gap + L_veh)
+    if queue_len is not None:
+        n_fit = int(np.searchsorted(x_end > queue_len, True))
+        lane_types, L_veh, x_end = lane_types[:n_fit], L_veh[:n_fit], x_end[:n_fit]
+    n_veh = lane_types.size
+
+    # 🔧 VB-PARITY: occupant slots from the project's occupancy table (occ_f,
+    # see build_vb_vehicle_queue's occ_override note). Integer values behave
+    # exactly as VB; fractional averages (e.g. 1.5 riders/car) use
+    # stochastic rounding per vehicle so the population mean equals
+    # total_veh × avg_occ exactly.
+    occ = np.asarray(occ_f, dtype=float)
+    base_t = occ.astype(int)
+    frac_t = occ - base_t
+    n_slots = base_t[lane_types - 1]
+    has_frac = frac_t[lane_types - 1] > 0.0
+    if has_frac.any():
+        # A vehicle's slot count decides where the next one's draws start,
+        # so the rounding draws are found by a scan over the lane (integer
+        # bookkeeping only); the generator is then advanced by exactly the
+        # draws the loop made.
+        frac = frac_t[lane_types - 1].tolist()
+        n_lo = n_slots.tolist()
+        state = rng.bit_generator.state
+        buf = rng.random(int(np.sum(has_frac) + 2 * np.sum(n_slots + has_frac)))
+        u = buf.tolist()
+        start = np.empty(n_veh, dtype=np.int64)
+        p = 0
+        for v in range(n_veh):
+            n = n_lo[v]
+            if frac[v] > 0.0:
+                if u[p] < frac[v]:
+                    n += 1
+                    n_slots[v] = n
+                p += 1
+            start[v] = p
+            p += 2 * n
+        rng.bit_generator.state = state
+        rng.random(p)
+    else:
+        start = np.cumsum(2 * n_slots) - 2 * n_slots
+        buf = rng.random(int(2 * np.sum(n_slots)))
+
+    veh = np.repeat(np.arange(n_veh), n_slots)
+    k = np.arange(veh.size) - np.repeat(np.cumsum(n_slots) - n_slots, n_slots)
+    i_off = start[veh] + k
+    # FUN_0045d410 = Uniform(a, b) = a + (b − a)·Rnd():
+    #   x_occ = x_slot − Uniform(0, length+2.33)   (in-slot spread)
+    offs = 0.0 + (L_veh[veh] + VB_OCC_SLOT_SPREAD) * buf[i_off]
+    return x_end[veh] - offs, buf[i_off + n_slots[veh]], lane_types[veh], n_veh
+
+
+def iteration_rng(seed: int, deck_stem: str, run_no: int) -> np.random.Generator:
+    """Generator of one (deck, iteration) — a SeedSequence leaf keyed by the
+    batch seed, the deck stem and the run number.
+
+    The stream of run k of 020CFV0_P3 is the same whichever process runs
+    it, in whatever order or chunk, so a seeded batch gives identical
+    results serially (EVCEngine.run(seed=...)) and on a process pool
+    (evc_parallel). crc32 keeps the stem key stable across interpreters
+    (str hash() is salted per process).
+    """
+    key = zlib.crc32(str(deck_stem).encode('utf-8'))
+    return np.random.default_rng(
+        np.random.SeedSequence(int(seed), spawn_key=(key, int(run_no))))
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # EVC Engine
 # ─────────────────────────────────────────────────────────────────────────────
@@ -987,6 +1748,41 @@ class EVCEngine:
     # the EQ-Fatal band mapping against VB Raw_Senario rows under this FED.
     # Leave False to preserve the validated aggregate.
     VB_PURSER_FED = False
+    # 🔧 Batched iterations (see run / _run_batch): FDB runs without TEC
+    # output advance BATCH_ITER_CHUNK iterations per time loop.
+    BATCH_ITERATIONS = True
+    BATCH_ITER_CHUNK = 32
+    # 🔧 Active-set compaction (see _advance_fdb): the time loops run on the
+    # occupants still in the tunnel only, re-compacted whenever the live
+    # share of the working set drops below ACTIVE_COMPACT_FRAC.
+    ACTIVE_SET_COMPACT = True
+    ACTIVE_COMPACT_FRAC = 0.5
+    # 🔧 Post-FDB walk-out solved event by event (_egress_tail) instead of
+    # stepped at 5 s; the 'fade' dose mode always steps.
+    ANALYTIC_TAIL = True
+    # 🔧 Screening mode: dose from a FED-rate grid pre-tabulated per FDB
+    # (rate_field) — one lookup per step, error bound in its max_abs_dev.
+    FED_RATE_FIELD = False
+    # 🔧 FED kernel only inside each frame's smoke extent (FDBData.
+    # smoke_extent). SMOKE_EXTENT_TOL 0.0 (default): exactly ambient —
+    # results identical to the dense kernel. Opt-in, approximate: None
+    # counts cells within FDBData.SMOKE_TOL of ambient (FDS print noise) as
+    # clean air — FED rate off by ~1e-5 /min at most there — and a float
+    # is a relative tol.
+    SPARSE_FED = True
+    SMOKE_EXTENT_TOL = 0.0
+    # 🔧 Per-phase timers / loop counters on every RunResult and
+    # BatchResult (RunProfile, profile_table); off = no clock reads.
+    PROFILE = False
+    # 🔧 Compact precision (opt-in, approximate): the FDB cube and the
+    # occupant kinematics (_RunState.KINEMATICS) in float32 — half the
+    # resident field, half the gather traffic of sample_all. FED totals,
+    # clocks and the FED kernels stay float64. Set per engine with
+    # EVCEngine(..., compact=True) so it reaches pool workers.
+    COMPACT = False
+    # 🔧 DAT.TEC history: keep every k-th FDB frame (1 = all, VB parity).
+    # Recorded into evc_history.HistoryRecorder's preallocated columns.
+    HISTORY_EVERY = 1
     # 🔧 BAND SHIFT (Gopo Upper reference workbook Raw_Senario, 020C/FVM
     # P1-P6 x 5 iters): recorded FED bins + recorded EQ Fatal fit EXACTLY with
     # thresholds one band HIGHER than the previous (0.1/0.2/0.3) table:
@@ -1010,11 +1806,24 @@ class EVCEngine:
                  hrr_ref: float = 15.0,
                  hrr_sat_c: float = 1082.47,
                  hrr_sat_k: float = 14.45,
-                 lth_override: Optional[float] = None):
+                 lth_override: Optional[float] = None,
+                 profile: Optional[bool] = None,
+                 compact: Optional[bool] = None):
+        # every override as passed (evc_result_cache keys batches on them)
+        self.init_kwargs = {k: v for k, v in locals().items()
+                            if k not in ('self', 'evc_path', 'fdb_path')}
+        if profile is not None:
+            self.PROFILE = bool(profile)    # per engine — reaches pool workers
+        if compact is not None:
+            self.COMPACT = bool(compact)
         self.evc_path = Path(evc_path)
         self.fdb_path = Path(fdb_path) if fdb_path else None
         self.params = EVCParams(self.evc_path)
-        self.fdb = FDBData(self.fdb_path) if self.fdb_path and self.fdb_path.exists() else None
+        _t0 = time.perf_counter()
+        self.fdb = (_shared_fdb(self.fdb_path, np.float32 if self.COMPACT else None)
+                    if self.fdb_path and self.fdb_path.exists() else None)
+        # FDB parse (or sidecar map / registry hit) time — BatchResult.profile
+        self.fdb_load_seconds = time.perf_counter() - _t0
 
         # 🔥 Wind-code detection + smoke-field orientation.
         # GROUNDING UPDATE (VB reference decks + FDBs, Gopo Upper):
@@ -1248,6 +2057,13 @@ class EVCEngine:
                 is_normal_traffic=self._is_normal_traffic,
             )
         self._n_occ_float = float(getattr(self.params, '_n_occ_float_computed', self._n_occ))
+        # Deterministic half of the VB queue, once per deck (every pool
+        # worker rebuilding this engine gets it here too). A build error is
+        # kept and reported per run by _init_run, as before.
+        try:
+            self.queue_skeleton()
+        except Exception:
+            pass
  
     # ------------------------------------------------------------------
     # Binary-exact FED rate (per minute), reverse-engineered from the VB6
@@ -1326,10 +2142,12 @@ class EVCEngine:
     _POST_FDB_DOSE = 'freeze'
  
     def _fed_rate_binary(self, co_arr, co2_arr, o2_arr, temp_arr, radi_arr=None):
-        """Per-minute binary-exact FED rate. Returns an array over occupants."""
-        co  = np.asarray(co_arr,  dtype=float)
-        co2 = np.asarray(co2_arr, dtype=float)
-        T   = np.asarray(temp_arr, dtype=float)
+        """Per-minute binary-exact FED rate. Returns an array over occupants.
+
+        The terms are computed by fed_kernels.binary_rate (in place, in the
+        engine's scratch workspace); the comments below document each term.
+        """
+        from fed_kernels import binary_rate
  
         # CO (-> FED2): CO^1.036 / VB_FED_CO_DIV * exp(0.1903*CO2 + 2.004) [/7.1]
         # 🔧 VB_FED_CO_DIV is calibratable. The .SET reverse-engineering of VB's
@@ -1338,10 +2156,6 @@ class EVCEngine:
         # systematic FED≥0.1 over-crossing. Default left at 36177.26 so nothing
         # changes unless the knob is set; calibrate against the FED≥0.1 bands.
         _co_div = float(getattr(self, 'VB_FED_CO_DIV', 36177.26))
-        rmv = np.exp(0.1903 * co2 + 2.004)
-        if self._FED_CO_RMV_DIV_71:
-            rmv = rmv / 7.1
-        r_co = np.where(co > 0.0, (co ** 1.036) / _co_div * rmv, 0.0)
  
         # heat (-> FED4): exp(0.0273*T - 5.1849), active when T > 40 °C.
         # 🔧 GUARD SENSE CORRECTED against the decompile (FUN_004956E0 /
@@ -1361,11 +2175,6 @@ class EVCEngine:
         # 900-1550 s evacuations -> 0.15-0.25 baseline), made harmless by the
         # shifted EQ bands ([0.1,0.2)->0). FED_HEAT_ALWAYS=True reproduces
         # this; set False to restore the >40C-gated form.
-        if getattr(self, 'FED_HEAT_ALWAYS', True):
-            r_heat = np.exp(0.0273 * T - 5.1849)
-        else:
-            r_heat = np.where(T > self.FED_HEAT_THRESHOLD_C,
-                              np.exp(0.0273 * T - 5.1849), 0.0)
  
         # 🔧 RADIANT TERM (was entirely missing). Grounding: the movement
         # loop's FED accumulator carries the Purser radiant form 80/q^1.33
@@ -1379,28 +2188,29 @@ class EVCEngine:
         # RAD_FED_GATE_KW (Purser tolerance threshold ~2.5 kW/m^2; the
         # FDB ambient RADI ~0.42 stays inert). Knobs: RAD_FED_GATE_KW,
         # RAD_FED_DENOM.
-        if radi_arr is not None:
-            q = np.asarray(radi_arr, dtype=float)
-            _gate  = float(getattr(self, 'RAD_FED_GATE_KW', 2.5))
-            _denom = float(getattr(self, 'RAD_FED_DENOM', 80.0))
-            r_rad = np.where(q > _gate, np.power(np.maximum(q, 1e-9), 1.33) / _denom, 0.0)
-        else:
-            r_rad = 0.0
-
-        rate = r_co + r_heat + r_rad
  
         # CO2 hyperventilation (small; guard CO2 < 11 per binary)
-        r_co2 = np.where(co2 < 11.0, np.exp((co2 - 20.721) * 0.511 - 8.55), 0.0)
-        rate = rate + r_co2
  
         # O2 depletion (dormant unless enabled; constants from binary, form
         # uses depletion below ambient 20.72 — NOT yet validated against data)
-        if self._FED_INCLUDE_O2:
-            o2 = np.asarray(o2_arr, dtype=float)
-            depl = np.maximum(20.72 - o2, 0.0)
-            rate = rate + np.exp(0.5189 * depl - 6.1623)
- 
-        return rate
+        return binary_rate(
+            co_arr, co2_arr, o2_arr, temp_arr, radi_arr,
+            co_div=_co_div,
+            rmv_div_7_1=bool(self._FED_CO_RMV_DIV_71),
+            heat_always=bool(getattr(self, 'FED_HEAT_ALWAYS', True)),
+            heat_gate=float(self.FED_HEAT_THRESHOLD_C),
+            rad_gate=float(getattr(self, 'RAD_FED_GATE_KW', 2.5)),
+            rad_denom=float(getattr(self, 'RAD_FED_DENOM', 80.0)),
+            include_o2=bool(self._FED_INCLUDE_O2),
+            ws=self._fed_workspace())
+
+    def _fed_workspace(self):
+        """Scratch buffers of the FED kernels, created on first use."""
+        ws = getattr(self, '_fed_ws', None)
+        if ws is None:
+            from fed_kernels import Workspace
+            ws = self._fed_ws = Workspace()
+        return ws
  
     def _fed_rate_purser_vb(self, co_arr, co2_arr, o2_arr, temp_arr,
                             radi_arr=None):
@@ -1421,45 +2231,23 @@ class EVCEngine:
         reuses the tuned-path knobs; the soot field (+0x80) is omitted (it
         feeds walk-speed, not the toxic FED sum, in the VB loop).
         """
-        co  = np.asarray(co_arr,  dtype=float)
-        co2 = np.asarray(co2_arr, dtype=float)
-        o2  = np.asarray(o2_arr,  dtype=float)
-        T   = np.asarray(temp_arr, dtype=float)
-
-        vco2 = np.exp(0.1903 * co2 + 2.004)
-        if getattr(self, '_FED_CO_RMV_DIV_71', False):
-            vco2 = vco2 / 7.1
-        _co_div = float(getattr(self, 'VB_FED_CO_DIV', 36177.26))
-        r_co  = np.where(co > 0.0, (co ** 1.036) / _co_div * vco2, 0.0)
-
-        r_heat = np.where(T > 40.0, np.exp(0.0273 * T - 5.1849), 0.0)
+        from fed_kernels import purser_vb_rate
 
         # CO2-direct incapacitation -- gate CO2 > 1.0 % (MOV.txt:403-432)
-        r_co2 = np.where(co2 > 1.0, np.exp(0.5189 * co2 - 6.1623), 0.0)
-
         # O2 hypoxia -- gate O2 < 11 % (MOV.txt:307-339). Two-way bore uses the
         # 0.511/8.55 twin (MOV.txt:318-321); one-way uses 0.54/8.13.
         try:
             _tw = bool(self.params.is_two_way())
         except Exception:
             _tw = False
-        if _tw:
-            o2_slope, o2_inter = 0.511, 8.55
-        else:
-            o2_slope, o2_inter = 0.54, 8.13
-        r_o2 = np.where(o2 < 11.0,
-                        np.exp(o2_slope * (20.721 - o2) - o2_inter), 0.0)
-
-        rate = r_co + r_heat + r_co2 + r_o2
-
-        if radi_arr is not None:
-            q = np.asarray(radi_arr, dtype=float)
-            _gate  = float(getattr(self, 'RAD_FED_GATE_KW', 2.5))
-            _denom = float(getattr(self, 'RAD_FED_DENOM', 80.0))
-            rate = rate + np.where(q > _gate,
-                                   np.power(np.maximum(q, 1e-9), 1.33) / _denom,
-                                   0.0)
-        return rate
+        return purser_vb_rate(
+            co_arr, co2_arr, o2_arr, temp_arr, radi_arr,
+            co_div=float(getattr(self, 'VB_FED_CO_DIV', 36177.26)),
+            rmv_div_7_1=bool(getattr(self, '_FED_CO_RMV_DIV_71', False)),
+            two_way=_tw,
+            rad_gate=float(getattr(self, 'RAD_FED_GATE_KW', 2.5)),
+            rad_denom=float(getattr(self, 'RAD_FED_DENOM', 80.0)),
+            ws=self._fed_workspace())
 
     def _fed_rate(self, co_arr, co2_arr, o2_arr, temp_arr, radi_arr=None):
         """Dispatch to the faithful or tuned FED model per VB_PURSER_FED."""
@@ -1468,13 +2256,100 @@ class EVCEngine:
                                             radi_arr)
         return self._fed_rate_binary(co_arr, co2_arr, o2_arr, temp_arr, radi_arr)
 
+    def _field_cnv(self, co, co2, o2, temp, radi):
+        """FIELD_CNV_FAC occupant-height attenuation of sampled FDB values
+        (see the FIELD CONVERSION FACTOR note in _advance_fdb); soot is
+        never attenuated and is not passed."""
+        _cnv = float(getattr(self, 'FIELD_CNV_FAC', 0.5))
+        if _cnv == 1.0:
+            return co, co2, o2, temp, radi
+        _Tamb = 30.0
+        return (co * _cnv, co2 * _cnv, 20.95 - (20.95 - o2) * _cnv,
+                _Tamb + (temp - _Tamb) * _cnv, np.asarray(radi, dtype=float) * _cnv)
+
+    # Engine settings the dose rate at a field point depends on — the
+    # rate-field cache key beside the FDB itself.
+    _RATE_FIELD_KNOBS = ('FIELD_CNV_FAC', 'VB_PURSER_FED', 'VB_FED_CO_DIV',
+                         '_FED_CO_RMV_DIV_71', 'FED_HEAT_ALWAYS',
+                         'FED_HEAT_THRESHOLD_C', 'RAD_FED_GATE_KW',
+                         'RAD_FED_DENOM', '_FED_INCLUDE_O2',
+                         '_is_normal_traffic', 'VB_NORMAL_FED_SCALE')
+
+    def _dose_rate(self, co, co2, o2, temp, radi):
+        """FED rate [/min] at raw FDB values: cnv, FED model, NORMAL scale."""
+        rate = self._fed_rate(*self._field_cnv(co, co2, o2, temp, radi))
+        if getattr(self, '_is_normal_traffic', False):
+            rate = rate * self.VB_NORMAL_FED_SCALE
+        return rate
+
+    def rate_field(self) -> 'FedRateField':
+        """This engine's FedRateField for its FDB, built on first use and
+        kept on the FDBData (shared by every engine of the same field and
+        settings).
+
+        The grid is the dose rate at the FDB nodes; interpolating it is not
+        the rate of the interpolated species (the FED terms are convex), so
+        the build also evaluates both at the quarter points of every
+        x-interval of every frame and records the largest difference —
+        the screening error bound the mode carries.
+        """
+        fdb = self.fdb
+        key = tuple(getattr(self, k, None) for k in self._RATE_FIELD_KNOBS)
+        cache = fdb.__dict__.setdefault('_rate_fields', {})
+        rf = cache.get(key)
+        if rf is not None:
+            return rf
+        cube = np.asarray(fdb.cube, dtype=float)          # (nt, ns, nx)
+        planes = np.moveaxis(cube[:, :5], 1, 0)            # co..rad, (nt, nx) each
+        grid = self._dose_rate(*planes)
+        ambient = float(self._dose_rate(*(np.array([fdb.AMBIENT[k]])
+                                          for k in fdb.SPECIES[:5]))[0])
+        max_abs = max_rel = 0.0
+        if cube.shape[2] > 1:
+            for f in (0.25, 0.5, 0.75):
+                exact = self._dose_rate(*((1 - f) * planes[..., :-1] + f * planes[..., 1:]))
+                approx = (1 - f) * grid[:, :-1] + f * grid[:, 1:]
+                dev = np.abs(approx - exact)
+                max_abs = max(max_abs, float(dev.max()))
+                max_rel = max(max_rel, float((dev / np.maximum(np.abs(exact), 1e-12)).max()))
+        rf = cache[key] = FedRateField(np.asarray(fdb.times, dtype=float),
+                                       np.asarray(fdb.x_coords, dtype=float),
+                                       grid, ambient, max_abs, max_rel,
+                                       fdb.t_step, fdb.x_step)
+        log.info(f"FED rate field {Path(fdb.path).name}: {grid.shape[0]}x{grid.shape[1]}, "
+                 f"max |dev| {max_abs:.3g}/min ({max_rel:.1%} relative)")
+        return rf
+
 
     def run(self, n_iterations=5, exmax=0, exmin=0, progress_cb=None,
-            tec_output_dir=None):
+            tec_output_dir=None, seed=None,
+            adaptive: Optional[AdaptiveIterations] = None, cache=None):
         """Run the batch of iterations. If tec_output_dir is given, also
         record per-timestep evacuation history for every iteration and emit
         one VB-style DAT.TEC file per run (mirroring VB's P{pos}_{iter}
-        naming, e.g. P1_3_DAT.TEC for position 1, iteration 3)."""
+        naming, e.g. P1_3_DAT.TEC for position 1, iteration 3).
+        With *seed*, run k draws from iteration_rng(seed, deck stem, k) —
+        reproducible, and identical to the same batch on evc_parallel.
+        With *adaptive* (AdaptiveIterations), n_iterations is ignored: runs
+        are added until the eq_fatal / evacuee confidence intervals are
+        tight enough, and BatchResult.precision records why it stopped.
+        With *cache* (evc_result_cache.ResultCache), a seeded batch without
+        TEC output is looked up first and stored after running."""
+        key = None
+        if cache is not None and tec_output_dir is None:
+            from evc_result_cache import batch_key
+            key = batch_key(self, n_iterations, seed, exmax, exmin, adaptive)
+            hit = cache.get(key)
+            if hit is not None:
+                return hit
+        batch = self._run_batch_iterations(n_iterations, exmax, exmin, progress_cb,
+                                           tec_output_dir, seed, adaptive)
+        if key is not None:
+            cache.put(key, batch)
+        return batch
+
+    def _run_batch_iterations(self, n_iterations, exmax, exmin, progress_cb,
+                              tec_output_dir, seed, adaptive) -> BatchResult:
         emit_tec = tec_output_dir is not None
         if emit_tec:
             from pathlib import Path as _P
@@ -1485,27 +2360,160 @@ class EVCEngine:
             import re as _re
             m = _re.search(r'(_)(P\d+)$', self.evc_path.stem)
             pos_token = m.group(2) if m else self.evc_path.stem
-        runs = []
-        for k in range(1, n_iterations + 1):
-            res = self._run_one(run_no=k, record_history=emit_tec)
+        else:
+            tec_dir = pos_token = None
+        if adaptive is None:
+            runs = self._run_iterations(range(1, n_iterations + 1), seed,
+                                        progress_cb, n_iterations, tec_dir, pos_token)
+            return self.finish_batch(runs, exmax, exmin)
+        # 🔧 ADAPTIVE: `step` more iterations at a time until the eq_fatal /
+        # evacuee CIs are within tolerance (AdaptiveIterations); progress is
+        # reported against max_iterations.
+        runs, stop = [], None
+        while stop is None:
+            n = len(runs)
+            runs += self._run_iterations(range(n + 1, n + adaptive.next_count(n) + 1),
+                                         seed, progress_cb, adaptive.max_iterations,
+                                         tec_dir, pos_token)
+            stop = adaptive.stop_reason(runs)
+        return self.finish_batch(runs, exmax, exmin, adaptive=adaptive, stop=stop)
+
+    def _run_iterations(self, ks, seed, progress_cb=None, n_total=None,
+                        tec_dir=None, pos_token=None) -> List[RunResult]:
+        """RunResults of iterations *ks* (TEC files with tec_dir)."""
+        ks, runs = list(ks), []
+        # 🔧 BATCHED ITERATIONS: with an FDB and no per-run TEC history, the
+        # iterations are simulated BATCH_ITER_CHUNK at a time in one time
+        # loop (_run_batch) — same per-iteration draws, same RunResults.
+        if (getattr(self, 'BATCH_ITERATIONS', True) and tec_dir is None
+                and self.fdb is not None and self.fdb.is_loaded):
+            _chunk = max(1, int(getattr(self, 'BATCH_ITER_CHUNK', 32)))
+            for j in range(0, len(ks), _chunk):
+                kc = ks[j:j + _chunk]
+                runs.extend(self._run_batch(kc, [self._iter_rng(seed, k) for k in kc]))
+                if progress_cb:
+                    for k in kc: progress_cb(k, n_total)
+            return runs
+        for k in ks:
+            res = self._run_one(run_no=k, rng=self._iter_rng(seed, k),
+                                record_history=tec_dir is not None)
             runs.append(res)
-            if emit_tec and res.history:
+            if tec_dir is not None and len(res.history):
                 from evc_history import write_dat_tec
                 tec_path = tec_dir / f"{pos_token}_{k}_DAT.TEC"
                 write_dat_tec(res.history, tec_path,
                               zone_name=f"{self.evc_path.stem} run {k}")
-            if progress_cb: progress_cb(k, n_iterations)
-        
+            if progress_cb: progress_cb(k, n_total)
+        return runs
+
+    def _iter_rng(self, seed, run_no):
+        """Seeded generator of iteration *run_no*, or None (fresh entropy)."""
+        if seed is None:
+            return None
+        return iteration_rng(seed, self.evc_path.stem, run_no)
+
+    def finish_batch(self, runs, exmax=0, exmin=0, adaptive=None, stop='fixed') -> BatchResult:
+        """Trimmed-mean AVG over *runs* (ordered by run_no) → BatchResult.
+        precision holds the achieved CI half-widths (default tolerances for
+        a fixed batch) and the stop reason."""
+        runs = sorted(runs, key=lambda r: r.run_no)
         avg = self._compute_avg(runs, exmax, exmin)
         self.write_results_to_evc(avg, runs)
-        return BatchResult(chid=self.evc_path.stem, runs=runs, avg=avg, exmax=exmax, exmin=exmin)
+        profile = sum_profiles(r.profile for r in runs)
+        if profile:
+            profile['fdb_load'] = self.fdb_load_seconds
+        precision = dict((adaptive or AdaptiveIterations()).precision(runs), stop=stop)
+        return BatchResult(chid=self.evc_path.stem, runs=runs, avg=avg, exmax=exmax, exmin=exmin,
+                           profile=profile, precision=precision)
+
+    def queue_skeleton(self) -> Optional[VBQueueSkeleton]:
+        """This deck's VBQueueSkeleton (None: no vehicle data), built on the
+        first call and cached; a failed build re-raises on every call."""
+        if '_queue_skeleton' not in self.__dict__:
+            p = self.params
+            try:
+                self._queue_skeleton = vb_queue_skeleton(
+                    p,
+                    is_normal_traffic=getattr(self, '_is_normal_traffic', False),
+                    fire_x=float(np.clip(p.fire_pt_x, 0.0, max(1.0, p.tunnel_length))),
+                    jam_density=(getattr(self, '_jam_density_override', None)
+                                 or p.max_congestion_vehicles),
+                    occ_override=getattr(self, '_occ_per_veh_override', None))
+            except Exception as e:
+                self._queue_skeleton = e
+        if isinstance(self._queue_skeleton, Exception):
+            raise self._queue_skeleton
+        return self._queue_skeleton
+
+    def _new_profile(self):
+        """A fresh RunProfile with PROFILE on, else the no-op NO_PROFILE."""
+        return RunProfile() if getattr(self, 'PROFILE', False) else NO_PROFILE
  
     def _run_one(self, run_no: int, rng=None, timestep_cb=None,
                  record_history: bool = False) -> RunResult:
         # Per-timestep evacuation history (VB DAT.TEC parity). Opt-in: only
         # collected when record_history=True, so the default path is unchanged.
-        _history = [] if record_history else None
+        _history = None
+        if record_history and self.fdb is not None and self.fdb.is_loaded:
+            from evc_history import HistoryRecorder
+            _history = HistoryRecorder(self.fdb, len(self.fdb.times),
+                                       every=getattr(self, 'HISTORY_EVERY', 1))
         _rng = rng if rng is not None else np.random.default_rng()
+        _prof = self._new_profile()
+        st = self._init_run(_rng, _prof)
+        if self.fdb is not None and self.fdb.is_loaded:
+            fed_total, ev_source, escaped = self._advance_fdb(
+                st, _history=_history, timestep_cb=timestep_cb, _prof=_prof)
+        else:
+            # FDB-less fallback: the clean-air evac_time is the best estimate.
+            fed_total, ev_source, escaped = self._advance_synthetic(st), st.evac_time, None
+        res = self._tally_run(run_no, st, fed_total, ev_source, escaped, _history)
+        if _prof is not NO_PROFILE:
+            _prof.count('occupants', st.n_occ)
+            res.profile = _prof.as_dict()
+        return res
+
+    def _run_batch(self, run_nos, rngs=None) -> List[RunResult]:
+        """Simulate several iterations of this deck in ONE time loop.
+
+        Every iteration draws its own queue / speeds / reactions exactly as
+        _run_one does (one generator per iteration), then the occupants of
+        all iterations are laid end to end and advanced together through
+        the FDB frames — the per-frame numpy work is paid once per batch
+        instead of once per iteration. The iteration index (_RunState.seg)
+        keeps the portal-capacity throttle per (iteration, exit); every
+        other step is element-wise, and an iteration whose occupants are
+        all out is a no-op until the slowest one finishes. Results are
+        split back into one RunResult per iteration, bit-identical to
+        _run_one with the same generator. With PROFILE, the shared loop's
+        timers and counters are split evenly over the iterations (sums over
+        the runs stay wall-clock); queue time and occupants are per run.
+        """
+        run_nos = list(run_nos)
+        rngs = list(rngs) if rngs is not None else [None] * len(run_nos)
+        rngs = [r if r is not None else np.random.default_rng() for r in rngs]
+        if not (self.fdb is not None and self.fdb.is_loaded) or len(run_nos) < 2:
+            return [self._run_one(k, rng=r) for k, r in zip(run_nos, rngs)]
+        profs = [self._new_profile() for _ in rngs]
+        states = [self._init_run(r, pr) for r, pr in zip(rngs, profs)]
+        loop_prof = self._new_profile()
+        fed_total, ev_source, escaped = self._advance_fdb(_RunState.concat(states),
+                                                          _prof=loop_prof)
+        out, a = [], 0
+        for k, st, pr in zip(run_nos, states, profs):
+            b = a + st.n_occ
+            res = self._tally_run(k, st, fed_total[a:b], ev_source[a:b], escaped[a:b])
+            if pr is not NO_PROFILE:
+                share = {key: v / len(states) for key, v in loop_prof.as_dict().items()}
+                share['queue'] = pr.seconds['queue']
+                share['occupants'] = st.n_occ
+                res.profile = share
+            out.append(res)
+            a = b
+        return out
+
+    def _init_run(self, _rng, _prof=NO_PROFILE) -> '_RunState':
+        """Draw one iteration's occupants (queue, exits, speeds, start times)."""
         p     = self.params
  
         # 🔥 Per-run occupant generation — two paths:
@@ -1525,15 +2533,12 @@ class EVCEngine:
         self._last_queue_path = 'none'
         self._last_queue_error = None
         if getattr(self, 'use_vb_queue', False):
+            _prof.start()
             try:
-                _vbq = build_vb_vehicle_queue(
-                    p,
-                    is_normal_traffic=getattr(self, '_is_normal_traffic', False),
-                    fire_x=float(np.clip(p.fire_pt_x, 0.0, max(1.0, p.tunnel_length))),
-                    rng=_rng,
-                    jam_density=(getattr(self, '_jam_density_override', None)
-                                 or p.max_congestion_vehicles),
-                    occ_override=getattr(self, '_occ_per_veh_override', None))
+                # per-deck skeleton (apportionment, lane multisets, slot
+                # geometry); only the shuffles and draws are per run
+                _skel = self.queue_skeleton()
+                _vbq = _skel.draw(_rng) if _skel is not None else None
             except Exception as _e:
                 # 🔧 No longer swallowed silently — a failure here drops the
                 # run onto the deterministic density fallback (theoretical-max
@@ -1541,6 +2546,7 @@ class EVCEngine:
                 # occupants ~7-14% vs VB. Record it so the fallback is visible.
                 _vbq = None
                 self._last_queue_error = repr(_e)
+            _prof.lap('queue')
  
         if _vbq is not None:
             n_occ = _vbq["n_occ"]
@@ -1659,8 +2665,7 @@ class EVCEngine:
         # Low-side agents → nearest low-side exit (walk toward x=0 direction)
         if np.any(on_low_side):
             pl = pos[on_low_side]
-            idx = np.argmin(np.abs(pl[:, None] - low_exits[None, :]), axis=1)
-            chosen = low_exits[idx]
+            chosen = self._nearest_exit(pl, low_exits)
             dist_to_exit[on_low_side] = np.abs(pl - chosen)
             exit_pos[on_low_side]     = chosen
             evac_dir[on_low_side]     = np.where(chosen >= pl, 1.0, -1.0)
@@ -1669,8 +2674,7 @@ class EVCEngine:
         hi_mask = ~on_low_side
         if np.any(hi_mask):
             ph = pos[hi_mask]
-            idx = np.argmin(np.abs(ph[:, None] - high_exits[None, :]), axis=1)
-            chosen = high_exits[idx]
+            chosen = self._nearest_exit(ph, high_exits)
             dist_to_exit[hi_mask] = np.abs(ph - chosen)
             exit_pos[hi_mask]     = chosen
             evac_dir[hi_mask]     = np.where(chosen >= ph, 1.0, -1.0)
@@ -1918,6 +2922,152 @@ class EVCEngine:
                 entry_time = _ahead * (3600.0 / _q_in)
 
         evac_time = entry_time + react_time + dist_to_exit / walk_speed
+
+        st = _RunState(n_occ=n_occ, pos=pos, exit_pos=exit_pos, evac_dir=evac_dir,
+                       walk_speed=walk_speed, react_time=react_time,
+                       entry_time=entry_time, evac_time=evac_time,
+                       fire_x=fire_x, tunnel_len=tunnel_len,
+                       abs_ws=abs_ws, premovement=premovement)
+        return st.compact() if self.COMPACT else st
+
+    @staticmethod
+    def _nearest_exit(x, exits):
+        """Nearest of *exits* to each x (ties → the lower exit).
+
+        Bisection on the sorted exits — O(n log m) instead of the
+        n × m |x − exit| table an argmin needs.
+        """
+        ex = np.unique(exits)
+        if ex.size == 1:
+            return np.full(np.shape(x), ex[0])
+        i = np.clip(np.searchsorted(ex, x), 1, ex.size - 1)
+        lo, hi = ex[i - 1], ex[i]
+        return np.where(x - lo <= hi - x, lo, hi)
+
+    @staticmethod
+    def _exit_queue_rank(grp, depth):
+        """Place of each candidate in its exit group's queue this step:
+        deepest past the portal first, ties in (ascending) input order."""
+        order = np.lexsort((-depth, grp))
+        g = grp[order]
+        head = np.empty(g.size, dtype=bool)
+        head[:1] = True
+        np.not_equal(g[1:], g[:-1], out=head[1:])
+        at = np.arange(g.size)
+        rank = np.empty(g.size, dtype=np.intp)
+        rank[order] = at - np.maximum.accumulate(np.where(head, at, 0))
+        return rank
+
+    @staticmethod
+    def _first_crossing(pos, inc, exit_pos, evac_dir, never):
+        """First step k >= 1 at which pos + k·inc reaches exit_pos, and how
+        far past the portal it lands (*never* where it does not)."""
+        fwd = evac_dir > 0
+
+        def _past(x):
+            return np.where(fwd, x >= exit_pos, x <= exit_pos)
+        speed = np.abs(inc)
+        moving = speed > 0
+        k = np.full(pos.shape, float(never))
+        np.divide((exit_pos - pos) * evac_dir, speed, out=k, where=moving)
+        k = np.where(moving, np.clip(np.ceil(k), 1, never),
+                     np.where(_past(pos), 1, never)).astype(np.int64)
+        # k·inc rounds: settle the ceil on the exact crossing test
+        live = k < never
+        k += live & ~_past(pos + k * inc)
+        k -= live & (k > 1) & _past(pos + (k - 1) * inc)
+        return k, np.abs(pos + k * inc - exit_pos)
+
+    def _egress_tail(self, t_k, current_pos, exit_pos, evac_dir, walk_speed,
+                     exit_grp, movers, escaped, actual_evac_time, tunnel_len,
+                     step, cap):
+        """Post-FDB walk-out, event-driven (dose frozen, speed constant).
+
+        *t_k* are the tail's step times; *movers* the live, still-walking
+        agents. Each mover's crossing step is solved directly; only steps
+        at which someone reaches a portal are visited, and there the exit
+        cap (*cap* per group, None = off) admits the queue deepest-first
+        exactly as _throttle_exits does — held agents are parked at the
+        portal mouth and re-solved from there. Returns the updated
+        (escaped, actual_evac_time).
+        """
+        escaped, actual_evac_time = escaped.copy(), actual_evac_time.copy()
+        never = t_k.size + 1
+        pend = np.flatnonzero(movers)
+        inc = evac_dir[pend] * walk_speed[pend] * step
+        ex, ed = exit_pos[pend], evac_dir[pend]
+        k, depth = self._first_crossing(current_pos[pend], inc, ex, ed, never)
+        if cap is None:
+            ok = k < never
+            escaped[pend[ok]] = True
+            actual_evac_time[pend[ok]] = t_k[k[ok] - 1]
+            return escaped, actual_evac_time
+        # A held agent walks on from the portal mouth: its next crossing
+        # (steps after the hold) and depth are the same every time.
+        park = np.clip(ex + np.where(ed > 0, -0.5, 0.5), 0.0, tunnel_len)
+        k_re, depth_re = self._first_crossing(park, inc, ex, ed, never)
+        grp = exit_grp[pend]
+        while pend.size:
+            kk = int(k.min())
+            if kk >= never:
+                break
+            now = np.flatnonzero(k == kk)
+            if now.size > cap:
+                held = self._exit_queue_rank(grp[now], depth[now]) >= cap
+                win, held = now[~held], now[held]
+                k[held] = np.minimum(k_re[held] + kk, never)
+                depth[held] = depth_re[held]
+            else:
+                win = now
+            escaped[pend[win]] = True
+            actual_evac_time[pend[win]] = t_k[kk - 1]
+            keep = np.ones(pend.size, dtype=bool)
+            keep[win] = False
+            pend, k, depth, k_re, depth_re, grp = (
+                a[keep] for a in (pend, k, depth, k_re, depth_re, grp))
+        return escaped, actual_evac_time
+
+    @staticmethod
+    def _throttle_exits(crossed, new_pos, exit_pos, exit_grp, evac_dir, cap):
+        """Portal discharge cap, in place: per exit group at most *cap*
+        crossings this step, deepest past the portal first; the rest are
+        un-crossed and parked at the portal mouth. *exit_grp* numbers
+        each (iteration, exit) pair.
+
+        One grouped pass whatever the number of exits: lexsort by (group,
+        depth descending), rank within each group, hold rank >= cap.
+        """
+        _idx = np.flatnonzero(crossed)
+        if _idx.size <= cap:
+            return
+        # first-come: deepest past the portal cross first
+        _depth = np.abs(new_pos[_idx] - exit_pos[_idx])
+        _hold = _idx[EVCEngine._exit_queue_rank(exit_grp[_idx], _depth) >= cap]
+        if _hold.size:
+            crossed[_hold] = False
+            # park held agents at the portal mouth
+            new_pos[_hold] = exit_pos[_hold] + np.where(evac_dir[_hold] > 0, -0.5, 0.5)
+
+    def _advance_fdb(self, st: '_RunState', _history=None, timestep_cb=None,
+                     _prof=NO_PROFILE):
+        """Walk + dose occupants through the FDB field and past its end.
+
+        *st* is one iteration or several laid end to end (_run_batch);
+        _history / timestep_cb are single-iteration only. _prof collects the
+        per-phase times (RunProfile). Returns (fed_total, actual_evac_time,
+        escaped) per occupant.
+        """
+        p = self.params
+        n_occ, pos = st.n_occ, st.pos
+        exit_pos, evac_dir = st.exit_pos, st.evac_dir
+        walk_speed, react_time = st.walk_speed, st.react_time
+        entry_time, evac_time = st.entry_time, st.evac_time
+        fire_x, tunnel_len = st.fire_x, st.tunnel_len
+        # Portal-throttle groups: one per (iteration, exit)
+        _ex_u = np.unique(exit_pos)
+        exit_grp = np.searchsorted(_ex_u, exit_pos)
+        if st.seg is not None:
+            exit_grp = st.seg * len(_ex_u) + exit_grp
  
         # 🔥 FED saturation cap.
         # Previously fixed at 1.2 (slight over-shoot of incapacitation threshold
@@ -1932,123 +3082,209 @@ class EVCEngine:
         # highest threshold 1.0). Cap value lives in FED_CALIBRATION block
         # (self.FED_CAP) so it is tunable in one place.
  
-        if self.fdb is not None and self.fdb.is_loaded:
-            fdb = self.fdb
-            times_fdb = fdb.times
-            fed_total   = np.zeros(n_occ)
-            current_pos = pos.copy()
- 
-            # 🔥 Track actual (smoke-slowed) escape time per agent.
-            # The pre-computed `evac_time` = react_time + dist/walk_speed uses
-            # clean-air walking speed. But agents walking through smoke slow
-            # by up to 6.67× (clip floor 0.15). At 100 MW P5/P6 with CO reaching
-            # 2000+ ppm over long stretches, the actual exit time can be 200+s
-            # longer than the clean-air estimate. VB's simulator tracks this
-            # naturally because it advances positions each timestep; here we
-            # explicitly latch the exit-crossing time into `actual_evac_time`
-            # and use that for the final EV Time reporting.
-            actual_evac_time = evac_time.copy()  # fallback to clean-air estimate
- 
-            # 🔥 EVC↔FDB coordinate mapping.
-            # The FDB and EVC files almost always use different x-origins:
-            #   - EVC: fire at `fire_pt_x` (e.g. 26.7) in a 0..tunnel_length frame.
-            #   - FDB: fire at the mesh centre (e.g. 317-323 m in a 0..640 frame).
-            # We locate the FDB fire by finding the x with peak temperature and
-            # apply a rigid offset so `x_fdb = x_evc + (x_fire_fdb - fire_x_evc)`.
-            # Without this offset, zone-2 occupants (far from fire in EVC) get
-            # queried inside the FDB smoke plume, producing tens of spurious
-            # FED≥0.1 cases for 20 MW scenarios where VB reports zero.
-            # 🔥 EVC↔FDB coordinate offset.
-            # Prefer the FDB header's FIRE PT (the actual fire-source mesh
-            # location, always at x≈320 for these tunnels) over peak-
-            # temperature auto-detection. The 100 MW plume's hot-spot is
-            # ~14 m upstream of the fuel source due to convective drift,
-            # which was producing an offset error that systematically
-            # under-counted FED for zone-1 agents by ~10-15%.
+        fdb = self.fdb
+        times_fdb = fdb.times
+        fed_total   = np.zeros(n_occ)
+        current_pos = pos.copy()
+ 
+        # 🔥 Track actual (smoke-slowed) escape time per agent.
+        # The pre-computed `evac_time` = react_time + dist/walk_speed uses
+        # clean-air walking speed. But agents walking through smoke slow
+        # by up to 6.67× (clip floor 0.15). At 100 MW P5/P6 with CO reaching
+        # 2000+ ppm over long stretches, the actual exit time can be 200+s
+        # longer than the clean-air estimate. VB's simulator tracks this
+        # naturally because it advances positions each timestep; here we
+        # explicitly latch the exit-crossing time into `actual_evac_time`
+        # and use that for the final EV Time reporting.
+        actual_evac_time = evac_time.copy()  # fallback to clean-air estimate
+ 
+        # 🔥 EVC↔FDB coordinate mapping.
+        # The FDB and EVC files almost always use different x-origins:
+        #   - EVC: fire at `fire_pt_x` (e.g. 26.7) in a 0..tunnel_length frame.
+        #   - FDB: fire at the mesh centre (e.g. 317-323 m in a 0..640 frame).
+        # We locate the FDB fire by finding the x with peak temperature and
+        # apply a rigid offset so `x_fdb = x_evc + (x_fire_fdb - fire_x_evc)`.
+        # Without this offset, zone-2 occupants (far from fire in EVC) get
+        # queried inside the FDB smoke plume, producing tens of spurious
+        # FED≥0.1 cases for 20 MW scenarios where VB reports zero.
+        # 🔥 EVC↔FDB coordinate offset.
+        # Prefer the FDB header's FIRE PT (the actual fire-source mesh
+        # location, always at x≈320 for these tunnels) over peak-
+        # temperature auto-detection. The 100 MW plume's hot-spot is
+        # ~14 m upstream of the fuel source due to convective drift,
+        # which was producing an offset error that systematically
+        # under-counted FED for zone-1 agents by ~10-15%.
+        fdb_offset = 0.0
+        try:
+            if getattr(fdb, 'fire_center', None) is not None:
+                fdb_offset = float(fdb.fire_center) - fire_x
+            elif len(fdb.x_coords) > 1 and hasattr(fdb, 'temp') and fdb.temp is not None:
+                # Fallback: peak temperature across time as a fire locator.
+                tmax_per_x = np.max(fdb.temp, axis=0)
+                x_fire_fdb = float(fdb.x_coords[int(np.argmax(tmax_per_x))])
+                fdb_offset = x_fire_fdb - fire_x
+        except Exception:
             fdb_offset = 0.0
-            try:
-                if getattr(fdb, 'fire_center', None) is not None:
-                    fdb_offset = float(fdb.fire_center) - fire_x
-                elif len(fdb.x_coords) > 1 and hasattr(fdb, 'temp') and fdb.temp is not None:
-                    # Fallback: peak temperature across time as a fire locator.
-                    tmax_per_x = np.max(fdb.temp, axis=0)
-                    x_fire_fdb = float(fdb.x_coords[int(np.argmax(tmax_per_x))])
-                    fdb_offset = x_fire_fdb - fire_x
-            except Exception:
-                fdb_offset = 0.0
- 
-            # 🔥 Per-agent escape tracking.
-            # An agent is "escaped" once they reach their exit — after that
-            # point they should NOT accumulate further FED (they're outside the
-            # tunnel / at the safe entrance). The old logic used a single
-            # `still_in = evac_time > t_prev` mask based on a pre-computed
-            # evac_time, which:
-            #   1. Didn't account for CO-induced speed reduction (which slows
-            #      walking and delays real escape beyond `evac_time`).
-            #   2. Clipped current_pos to the tunnel, so agents whose
-            #      `current_pos` hit 0 kept being queried at x=0 (deep in the
-            #      FDB upstream smoke plume) and kept accumulating FED long
-            #      after they should have been safe.
-            # The fix: track a boolean `escaped` per-agent that latches True
-            # when the agent's walking trajectory crosses the exit position.
-            escaped = np.zeros(n_occ, dtype=bool)
- 
-            # 🔥 Cache the last CO/O2/temp/rad snapshot from the FDB so that,
-            # if we need to continue past the FDB time horizon (the 720 s case),
-            # we can hold the smoke field at its final value instead of jumping
-            # to zero. In practice the smoke field at end-of-FDB is already in
-            # decay phase for these scenarios — holding it static is a mild
-            # over-estimate of FED accumulation (safe side) while letting us
-            # finish the walk to the exit. This matches VB EVC.exe behavior:
-            # it keeps simulating until everyone has escaped or been
-            # incapacitated, regardless of the FDB time horizon.
-            last_co_arr   = np.zeros(n_occ)
-            last_co2_arr  = np.full(n_occ, 0.04)   # ambient CO2 vol%
-            last_o2_arr   = np.full(n_occ, 21.0)   # ambient O2
-            last_temp_arr = np.full(n_occ, 20.0)   # ambient temp
-            last_radi_arr = np.zeros(n_occ)
-            last_soot_arr = np.zeros(n_occ)        # ambient soot
- 
-            for ti in range(1, len(times_fdb)):
-                t_prev = times_fdb[ti - 1]
-                t_now  = times_fdb[ti]
-                dt     = t_now - t_prev
-                if dt <= 0: continue
-                # 🔥 Active agents = anyone still in the tunnel (not yet
-                # escaped). We do NOT use `(evac_time > t_prev)` here as we
-                # used to, because `evac_time` is the CLEAN-AIR estimate
-                # `react_time + dist / walk_speed`. When smoke slows the walk,
-                # the agent's actual exit time exceeds this estimate — but
-                # the old `active` mask would drop them out of the simulation
-                # at t > evac_time even if they hadn't actually reached the
-                # exit, leaving them stranded and reported with an incorrect
-                # EV Time. VB EVC.exe doesn't have this premature drop-out;
-                # it keeps simulating every agent until they cross their
-                # exit position. Match that behaviour.
-                active = ~escaped
-                if not np.any(active): break
- 
-                # Map agent positions from EVC to FDB coordinates.
-                # Native orientation:   x_db = fire_center + (x_evc − fire_x)
-                # Mirrored (FVM/FV0):   x_db = fire_center − (x_evc − fire_x)
-                # — the smoke field is applied reversed about the fire, per
-                # the wind-code grounding documented in __init__. With the
-                # rigid (+offset) form this reduces exactly to the previous
-                # `current_pos + fdb_offset`.
-                if getattr(self, 'smoke_mirrored', False):
-                    _fc = (float(fdb.fire_center)
-                           if getattr(fdb, 'fire_center', None) is not None
-                           else fire_x + fdb_offset)
-                    x_query = _fc - (current_pos - fire_x)
-                else:
-                    x_query = current_pos + fdb_offset
  
-                co_arr   = fdb.get_value('co',   t_now, x_query)
-                co2_arr  = fdb.get_value('co2',  t_now, x_query)
-                o2_arr   = fdb.get_value('o2',   t_now, x_query)
-                temp_arr = fdb.get_value('temp', t_now, x_query)
-                radi_arr = fdb.get_value('rad',  t_now, x_query)
-                soot_arr = fdb.get_value('soot', t_now, x_query)
+        # 🔥 Per-agent escape tracking.
+        # An agent is "escaped" once they reach their exit — after that
+        # point they should NOT accumulate further FED (they're outside the
+        # tunnel / at the safe entrance). The old logic used a single
+        # `still_in = evac_time > t_prev` mask based on a pre-computed
+        # evac_time, which:
+        #   1. Didn't account for CO-induced speed reduction (which slows
+        #      walking and delays real escape beyond `evac_time`).
+        #   2. Clipped current_pos to the tunnel, so agents whose
+        #      `current_pos` hit 0 kept being queried at x=0 (deep in the
+        #      FDB upstream smoke plume) and kept accumulating FED long
+        #      after they should have been safe.
+        # The fix: track a boolean `escaped` per-agent that latches True
+        # when the agent's walking trajectory crosses the exit position.
+        escaped = np.zeros(n_occ, dtype=bool)
+ 
+        # 🔧 ACTIVE-SET COMPACTION. Escaped agents are frozen — no dose, no
+        # walk, never read again — yet the masks above kept every step
+        # sampling the field, evaluating FED and moving the WHOLE population;
+        # in long congested runs the late tail is mostly empty slots. So the
+        # loops work on compacted arrays: _act maps working slot → occupant,
+        # and whenever fewer than ACTIVE_COMPACT_FRAC of the slots are still
+        # live, the escaped ones are written back to the *_out results and
+        # dropped. Element-wise physics and the index-ordered exit throttle
+        # give the same numbers either way. Off when a history recorder or
+        # timestep callback wants whole-population frames every step.
+        _compact_on = (getattr(self, 'ACTIVE_SET_COMPACT', True)
+                       and _history is None and timestep_cb is None)
+        _compact_frac = float(getattr(self, 'ACTIVE_COMPACT_FRAC', 0.5))
+        _act = np.arange(n_occ)
+        fed_out, evac_out = np.zeros(n_occ), actual_evac_time.copy()
+        esc_out = np.zeros(n_occ, dtype=bool)
+ 
+        # 🔥 Cache the last CO/O2/temp/rad snapshot from the FDB so that,
+        # if we need to continue past the FDB time horizon (the 720 s case),
+        # we can hold the smoke field at its final value instead of jumping
+        # to zero. In practice the smoke field at end-of-FDB is already in
+        # decay phase for these scenarios — holding it static is a mild
+        # over-estimate of FED accumulation (safe side) while letting us
+        # finish the walk to the exit. This matches VB EVC.exe behavior:
+        # it keeps simulating until everyone has escaped or been
+        # incapacitated, regardless of the FDB time horizon.
+        last_co_arr   = np.zeros(n_occ)
+        last_co2_arr  = np.full(n_occ, 0.04)   # ambient CO2 vol%
+        last_o2_arr   = np.full(n_occ, 21.0)   # ambient O2
+        last_temp_arr = np.full(n_occ, 20.0)   # ambient temp
+        last_radi_arr = np.zeros(n_occ)
+        last_soot_arr = np.zeros(n_occ)        # ambient soot
+
+        # Deck inputs of the analytic RAD path (L68 design MW, L69
+        # alpha) — loop-invariant, so parse them once, not per frame.
+        _hrr_des   = p._float(68, default=0.0)
+        _rad_alpha = p._float(69, default=0.0)
+        _rad_on    = _hrr_des > 0 and getattr(self, 'RAD_ANALYTIC_ENABLE', False)
+        dt = 0.0                                # last FDB frame step
+        # FED_RATE_FIELD screening mode — only where the tabulated rate is
+        # the whole per-step dose: no position-dependent analytic RAD term,
+        # no sub-stepping, no 'fade' tail (it needs the sampled species),
+        # no history frames (they record soot).
+        _rf = (self.rate_field()
+               if (getattr(self, 'FED_RATE_FIELD', False) and not _rad_on
+                   and int(getattr(self, 'FED_SUBSTEPS', 1)) <= 1
+                   and getattr(self, '_POST_FDB_DOSE', 'freeze') != 'fade'
+                   and _history is None and fdb.cube is not None)
+               else None)
+        # SPARSE_FED: the FED kernel only inside the smoke extent (exact at
+        # the default SMOKE_EXTENT_TOL = 0.0); not with the analytic RAD
+        # term, which doses by distance to the fire everywhere.
+        _sparse = (_rf is None and getattr(self, 'SPARSE_FED', True) and not _rad_on
+                   and fdb.cube is not None)
+        _sparse_tol = getattr(self, 'SMOKE_EXTENT_TOL', 0.0)
+        _sparse_tol = None if _sparse_tol is None else float(_sparse_tol)
+        if _sparse:
+            _fed_base = float(self._fed_rate(*self._field_cnv(
+                *(np.array([fdb.AMBIENT[k]]) for k in fdb.SPECIES[:5])))[0])
+
+        def _drop_escaped():
+            nonlocal _act, current_pos, exit_pos, evac_dir, walk_speed
+            nonlocal react_time, entry_time, exit_grp, fed_total
+            nonlocal actual_evac_time, escaped, last_co_arr, last_co2_arr
+            nonlocal last_o2_arr, last_temp_arr, last_radi_arr, last_soot_arr
+            gone = _act[escaped]
+            fed_out[gone] = fed_total[escaped]
+            evac_out[gone] = actual_evac_time[escaped]
+            esc_out[gone] = True
+            keep = ~escaped
+            _act = _act[keep]
+            (current_pos, exit_pos, evac_dir, walk_speed, react_time,
+             entry_time, exit_grp, fed_total, actual_evac_time,
+             last_co_arr, last_co2_arr, last_o2_arr, last_temp_arr,
+             last_radi_arr, last_soot_arr) = (
+                a[keep] for a in (
+                    current_pos, exit_pos, evac_dir, walk_speed, react_time,
+                    entry_time, exit_grp, fed_total, actual_evac_time,
+                    last_co_arr, last_co2_arr, last_o2_arr, last_temp_arr,
+                    last_radi_arr, last_soot_arr))
+            escaped = np.zeros(_act.size, dtype=bool)
+
+        def _live_after_compaction():
+            """Live-agent count; compacts the working set when it pays."""
+            n_live = escaped.size - np.count_nonzero(escaped)
+            if (_compact_on and 0 < n_live < _compact_frac * escaped.size):
+                _drop_escaped()
+            return n_live
+ 
+        _prof.start()
+        for ti in range(1, len(times_fdb)):
+            # Python floats: a numpy float64 scalar would promote compact
+            # (float32) positions back to float64 on the first move.
+            t_prev = float(times_fdb[ti - 1])
+            t_now  = float(times_fdb[ti])
+            dt     = t_now - t_prev
+            if dt <= 0: continue
+            # 🔥 Active agents = anyone still in the tunnel (not yet
+            # escaped). We do NOT use `(evac_time > t_prev)` here as we
+            # used to, because `evac_time` is the CLEAN-AIR estimate
+            # `react_time + dist / walk_speed`. When smoke slows the walk,
+            # the agent's actual exit time exceeds this estimate — but
+            # the old `active` mask would drop them out of the simulation
+            # at t > evac_time even if they hadn't actually reached the
+            # exit, leaving them stranded and reported with an incorrect
+            # EV Time. VB EVC.exe doesn't have this premature drop-out;
+            # it keeps simulating every agent until they cross their
+            # exit position. Match that behaviour.
+            _n_live = _live_after_compaction()
+            if not _n_live: break
+            _prof.count('timesteps')
+            _prof.count('agent_steps', int(_n_live))
+            _prof.lap('move')                   # compaction: working-set upkeep
+            active = ~escaped
+ 
+            # Map agent positions from EVC to FDB coordinates.
+            # Native orientation:   x_db = fire_center + (x_evc − fire_x)
+            # Mirrored (FVM/FV0):   x_db = fire_center − (x_evc − fire_x)
+            # — the smoke field is applied reversed about the fire, per
+            # the wind-code grounding documented in __init__. With the
+            # rigid (+offset) form this reduces exactly to the previous
+            # `current_pos + fdb_offset`.
+            if getattr(self, 'smoke_mirrored', False):
+                _fc = (float(fdb.fire_center)
+                       if getattr(fdb, 'fire_center', None) is not None
+                       else fire_x + fdb_offset)
+                x_query = _fc - (current_pos - fire_x)
+            else:
+                x_query = current_pos + fdb_offset
+ 
+            if _rf is not None:
+                # 🔧 RATE-FIELD MODE (FED_RATE_FIELD): one lookup in the
+                # pre-tabulated dose rate instead of six samples + the FED
+                # math — see rate_field() for the error it carries.
+                fed_rate = _rf.sample(t_now, x_query)
+                soot_arr = None
+                _prof.lap('sample')
+            else:
+                # One fused gather for all six species (FDBData.sample_all,
+                # rows in FDBData.SPECIES order) instead of six get_value
+                # passes that each re-bracket time and x.
+                (co_arr, co2_arr, o2_arr,
+                 temp_arr, radi_arr, soot_arr) = fdb.sample_all(t_now, x_query)
 
                 # 🔧 FIELD CONVERSION FACTOR (occupant-height sampling).
                 # Grounding: VB reads a conversion factor into DAT_004a6574
@@ -2072,14 +3308,8 @@ class EVCEngine:
                 # over-spreads dose to P2/P3 (VB is sharp at P1). The residual
                 # is per-class FIELD GEOMETRY over the queue, not a global
                 # factor -- the next lever is per-scenario FDB pairing, not cnv.
-                _cnv = float(getattr(self, 'FIELD_CNV_FAC', 0.5))
-                if _cnv != 1.0:
-                    _Tamb = 30.0
-                    co_arr   = co_arr * _cnv
-                    co2_arr  = co2_arr * _cnv
-                    temp_arr = _Tamb + (temp_arr - _Tamb) * _cnv
-                    o2_arr   = 20.95 - (20.95 - o2_arr) * _cnv
-                    radi_arr = np.asarray(radi_arr, dtype=float) * _cnv
+                co_arr, co2_arr, o2_arr, temp_arr, radi_arr = self._field_cnv(
+                    co_arr, co2_arr, o2_arr, temp_arr, radi_arr)
 
                 # ANALYTIC POINT-SOURCE RADIATION (decompile FUN_0049b270:
                 # chi*Q/(4*pi*r^2), 4*pi literal 0x402921FB...). The FDB RADI
@@ -2090,7 +3320,6 @@ class EVCEngine:
                 # L69, kW) capped at design MW (L68). Merged with the FDB
                 # column via element-wise max to avoid double counting.
                 # Knobs: RAD_CHI (radiative fraction, 0.30), RAD_MIN_R (m).
-                _hrr_des = p._float(68, default=0.0)
                 # DISABLED BY DEFAULT pending the EV-time fix: with
                 # chi=0.30 the analytic flux doses ~13% of occupants at
                 # EVERY position, but VB's >=0.4 groups appear only at
@@ -2099,10 +3328,9 @@ class EVCEngine:
                 # chi calibration wrong at one end or the other, so the
                 # term stays opt-in (RAD_ANALYTIC_ENABLE=True) until
                 # the EV-time profile matches VB (740->1512 s).
-                if _hrr_des > 0 and getattr(self, 'RAD_ANALYTIC_ENABLE', False):
-                    _alpha = p._float(69, default=0.0)
-                    _q_mw = (min(_alpha * t_now * t_now / 1000.0, _hrr_des)
-                             if _alpha > 0 else _hrr_des)
+                if _rad_on:
+                    _q_mw = (min(_rad_alpha * t_now * t_now / 1000.0, _hrr_des)
+                             if _rad_alpha > 0 else _hrr_des)
                     _chi  = float(getattr(self, 'RAD_CHI', 0.30))
                     _rmin = float(getattr(self, 'RAD_MIN_R', 2.0))
                     _r    = np.maximum(np.abs(current_pos - fire_x), _rmin)
@@ -2115,10 +3343,28 @@ class EVCEngine:
                 last_temp_arr = temp_arr
                 last_radi_arr = radi_arr
                 last_soot_arr = soot_arr
+                _prof.lap('sample')
  
                 # FED rate — binary-exact model (see _fed_rate_binary).
                 # Replaces the former tuned power-law CO/O2/heat/radi block.
-                fed_rate = self._fed_rate(co_arr, co2_arr, o2_arr, temp_arr, radi_arr)
+                # 🔧 SPARSE FED: outside this frame's smoke extent every
+                # agent breathes exactly ambient air, whose rate (the heat
+                # baseline) is _fed_base — the exp/pow kernel runs on the
+                # rest only (unless that is most of them: the gather would
+                # cost more than it saves).
+                _in = None
+                if _sparse:
+                    _lo, _hi = fdb.smoke_bounds(t_now, _sparse_tol)
+                    _in = np.flatnonzero((x_query > _lo) & (x_query < _hi))
+                if _in is not None and 2 * _in.size <= x_query.size:
+                    fed_rate = np.full(x_query.shape, _fed_base)
+                    if _in.size:
+                        fed_rate[_in] = self._fed_rate(co_arr[_in], co2_arr[_in],
+                                                       o2_arr[_in], temp_arr[_in],
+                                                       radi_arr[_in])
+                else:
+                    fed_rate = self._fed_rate(co_arr, co2_arr, o2_arr, temp_arr,
+                                              radi_arr)
                 # NORMAL-traffic FED scale: fit to the OLD power-law FED; likely
                 # redundant now the CO RMV /7.1 flag is explicit. FLAGGED for
                 # re-evaluation against the benchmark.
@@ -2126,413 +3372,429 @@ class EVCEngine:
                 if getattr(self, '_is_normal_traffic', False):
                     fed_rate = fed_rate * self.VB_NORMAL_FED_SCALE
  
-                # 🔧 VB-PARITY: FED keeps accumulating past 1.0 while the
-                # agent is in the tunnel — the reference output's ≥0.4…≥1.0
-                # buckets are well populated, which a freeze-at-1.0 cannot
-                # produce. Incapacitation (FED ≥ 1.0) stops the WALK (handled
-                # below), not the dose; only FED_CAP bounds the accumulator.
-                # 🔧 entry gating (normal-mode dynamic inflow): an occupant
-                # accumulates dose only once their vehicle has joined the
-                # queue (t_now ≥ entry_time); congested entry_time = 0.
-                in_tunnel = active & (t_now >= entry_time)
-                # 🔧 dose begins at DEPARTURE (started), per the
-                # staggered-departure grounding above — waiting occupants at
-                # their vehicles do not accrue (VB: slow EV + low dose).
-                _dose_mask = (in_tunnel * (t_now > entry_time + react_time)
-                              if getattr(self, 'VB_STAGGER_DEPART', True) else in_tunnel)
-                # 🔧 OPTIONAL sub-stepped FED path integral (FED_SUBSTEPS>1).
-                # OFF BY DEFAULT: VB itself doses coarsely — the decompile
-                # updates occupant position with a fixed velocity and
-                # accumulates dose once per FDB frame (soot enters only via the
-                # FED accumulators), with no sub-stepping. Refining the integral
-                # moves escaping occupants out of the plume mid-frame and
-                # collapses their dose, diverging from VB rather than matching
-                # it. Kept as an opt-in for physical-accuracy (non-VB) studies;
-                # leave at 1 to reproduce VB. Enabling it requires re-fitting the
-                # field dose calibration (FIELD_CNV_FAC), which was tuned to the
-                # single-sample integral.
-                _M = max(1, int(getattr(self, 'FED_SUBSTEPS', 1)))
-                if _M == 1:
-                    fed_total = np.minimum(fed_total + fed_rate * (dt / 60.0) * _dose_mask,
-                                           self.FED_CAP)
-                else:
-                    # ✅ SETTLED (previous_call.txt / FUN_0049f8a0, the movement
-                    # step): displacement = speed(+0x90) × dt(DAT_004a66e8) along
-                    # the atan heading; the loop NEVER reads the soot fields
-                    # (+0x60/+0x80). VB therefore walks every occupant at the
-                    # CONSTANT two-population speed — no smoke/visibility
-                    # reduction. (This resolves the long-standing question:
-                    # the "smoke-speed floor 0.28/0.30 m/s" idea is NOT in VB;
-                    # do not reintroduce a soot→speed term.)
-                    _vel = evac_dir * walk_speed          # m/s, smoke-independent (decompile-CONFIRMED)
-                    _fc_sub = (float(fdb.fire_center)
-                               if getattr(fdb, 'fire_center', None) is not None
-                               else fire_x + fdb_offset)
-                    _sub_dt_min = (dt / _M) / 60.0
-                    _dose_inc = np.zeros(n_occ)
-                    for _m in range(_M):
-                        _frac  = (_m + 0.5) / _M
-                        _t_sub = t_prev + _frac * dt
-                        _x_sub = current_pos + _vel * (_frac * dt) * _dose_mask
-                        if getattr(self, 'smoke_mirrored', False):
-                            _xq = _fc_sub - (_x_sub - fire_x)
-                        else:
-                            _xq = _x_sub + fdb_offset
-                        _co  = fdb.get_value('co',   _t_sub, _xq)
-                        _co2 = fdb.get_value('co2',  _t_sub, _xq)
-                        _o2  = fdb.get_value('o2',   _t_sub, _xq)
-                        _tp  = fdb.get_value('temp', _t_sub, _xq)
-                        _rd  = fdb.get_value('rad',  _t_sub, _xq)
-                        if _cnv != 1.0:
-                            _co  = _co * _cnv
-                            _co2 = _co2 * _cnv
-                            _tp  = 30.0 + (_tp - 30.0) * _cnv
-                            _o2  = 20.95 - (20.95 - _o2) * _cnv
-                            _rd  = _rd * _cnv
-                        _r = self._fed_rate(_co, _co2, _o2, _tp, _rd)
-                        if getattr(self, '_is_normal_traffic', False):
-                            _r = _r * self.VB_NORMAL_FED_SCALE
-                        _dose_inc += _r * _sub_dt_min * _dose_mask
-                    fed_total = np.minimum(fed_total + _dose_inc, self.FED_CAP)
- 
-                started = active & (t_now > entry_time + react_time)
-                # 🔥 Smoke-reduction of walking speed — visibility-only model.
-                #
-                # Physics rationale: CO is a toxic gas that impairs motor
-                # function via COHb binding over TIME, captured by the FED
-                # accumulation (separate model). The act of walking through
-                # CO does NOT directly slow walking speed — agents walk at
-                # their physiological capability until FED ≥ 1.0 incapacitates
-                # them. What slows WALKING is reduced VISIBILITY (smoke
-                # obscures path, signs, exits), which is governed by soot
-                # density.
-                #
-                # The previous formulation included a CO-based slowdown:
-                #   co_reduction = clip(1 - CO/1500, 0.15, 1.0)
-                # This was DOUBLE-COUNTING the CO effect (once in FED, once
-                # in walk speed) and the 0.15 floor combined with min(co_red,
-                # vis_red) yielded walking speeds as low as 0.09 m/s at 100 MW.
-                # That made marginal survivors (FED 0.7-1.0) walk so slowly
-                # that they took 800-900s to exit, dragging Python's EV time
-                # at 100 MW P1-P2 up by 25% vs VB.
-                #
-                # Removing the CO term and using ONLY visibility-based
-                # reduction matches VB's last-survivor walking speed at
-                # 100 MW (~0.56 m/s = 93% of base 0.60), which is much
-                # higher than the combined formula would predict.
-                #
-                # k_s [1/m] = K_m × m_soot [kg/m³]
-                #          = 7600 × soot_raw [mg/m³] × 1e-6
-                #          = 0.0076 × soot_raw
-                # vis_reduction = clip(1 - 0.15 * k_s, 0.60, 1.0)
-                #
-                # Calibration (slope 0.15, floor 0.60):
-                #   raw=100 mg/m³  (K_s=0.76):  factor = 0.89 (mild slow)
-                #   raw=200 mg/m³  (K_s=1.52):  factor = 0.77 (moderate)
-                #   raw=295 mg/m³  (K_s=2.24):  factor = 0.66 (heavy)
-                #   raw=425 mg/m³  (K_s=3.23):  factor = 0.60 (floor, 020 peak)
-                #   raw=891 mg/m³  (K_s=6.77):  factor = 0.60 (floor, 100 avg)
-                #
-                # The floor at 0.60 (NOT 0.30 of Frantzich-Jin) prevents
-                # excessive slowdown at high-HRR soot levels and matches VB's
-                # observed last-survivor walking speed at 100 MW.
-                k_s = 0.0076 * np.maximum(soot_arr, 0.0)
-                # 🔧 Smoke-speed floor calibratable. VB's .SET irritant
-                # reduction factor (col17/col15) bottoms at ~0.28, not 0.60 —
-                # in heavy smoke (e.g. the far-portal trap) VB occupants crawl
-                # and accumulate lethal dose. A 0.60 floor lets them escape the
-                # 0.3 cliff too fast (P6 eq_fatal shortfall). Default 0.50 = the EVC
-                # Abs Min Walk Speed; on a ~0.60 walk speed it yields a
-                # 0.30 m/s in-smoke minimum, matching the .SET col17 floor.
-                # 🔧 SPEED DECOUPLED FROM SMOKE (decompile-faithful).
-                # The movement loop (MOV.txt / FUN_004956E0) updates occupant
-                # position with a FIXED velocity term `DAT_004a6570 * 2.5`
-                # (the deck speed parameter) — there is NO soot/extinction
-                # input to the position update anywhere in the loop. Soot
-                # enters ONLY through the FED accumulators (struct +0x6c/+0x70/
-                # +0x74/+0x78 = CO/heat/O2/total), a separate code path. The
-                # prior Jin absolute-speed reduction had no binary basis (it
-                # was a v1 carry-over, see fed_eqfatal_model.py docstring) and
-                # was the cause of the normal-queue OVER-dosing: it slowed
-                # walkers in smoke, inflating their dwell time and FED. VB does
-                # not do this. Walk speed is therefore the smoke-independent
-                # value; dose comes purely from the FED chemistry.
-                wv = walk_speed
-
-                # L88 = lane width + shoulder width (GEOMETRY), not a movement
-                # pace. The old "queue-column pace" here misread the 3.62 m lane
-                # width as 3.62 s/m and capped walk speed at 1/3.62 = 0.276 m/s
-                # — a contributor to the ~1.85x EV-time inflation vs VB. VB has
-                # no such cap: each occupant advances at their own per-occupant
-                # speed (struct +0x90, assigned in FUN_0045b980 = 1.4 general /
-                # elderly_ws elderly), so wv stays = walk_speed. Cap removed.
- 
-                # 🔥 Incapacitated agents (FED >= 1.0) STOP walking. This
-                # matches VB's behavior: once an agent crosses the FED
-                # incapacitation threshold, they collapse where they are
-                # and don't keep walking. They're then excluded from EV
-                # Time (last-survivor-out semantics) but still counted in
-                # the FED bucket statistics. Without this, Python's
-                # incapacitated agents kept walking at smoke-floor speed,
-                # arriving at the exit eventually and inflating EV time
-                # by 200-500 s at high HRR.
-                # (not_incap gates the WALK only — the dose keeps
-                # accumulating up to FED_CAP, see the FED update above.)
-                not_incap = fed_total < 1.0
-                walk_mask = started & not_incap
- 
-                # Propose new position; detect exit crossing
-                new_pos = current_pos + evac_dir * wv * dt * walk_mask
-                # An agent has escaped if their new_pos crosses their exit_pos
-                crossed = walk_mask & (
-                    ((evac_dir > 0) & (new_pos >= exit_pos)) |
-                    ((evac_dir < 0) & (new_pos <= exit_pos))
-                )
-                # 🔧 PORTAL DISCHARGE CAPACITY. VB's DAT.TEC escape-rate
-                # profiles show queue-like discharge bursts (5-7 ppl/s peaks,
-                # lower sustained average) — the portal is a flow constraint,
-                # not a free boundary. Without it, hundreds of agents exit in
-                # the same timestep and EV times undershoot VB by 300+ s at
-                # long-queue positions. Cap crossings per exit per timestep
-                # at EXIT_FLOW_CAP [persons/s] x dt; surplus agents hold AT
-                # the portal and cross in subsequent steps (first-come order
-                # by how far past the exit they reached). Knob exposed; lock
-                # by constrained fit to the VB EV matrix. Set
-                # VB_EXIT_FLOW=False to disable.
-                if getattr(self, 'VB_EXIT_FLOW', True) and crossed.any():
-                    _cap = max(1, int(round(
-                        float(getattr(self, 'EXIT_FLOW_CAP', 2.0)) * dt)))
-                    for _exv in np.unique(exit_pos[crossed]):
-                        _sel = np.where(crossed & (exit_pos == _exv))[0]
-                        if len(_sel) <= _cap:
-                            continue
-                        # first-come: deepest past the portal cross first
-                        _depth = np.abs(new_pos[_sel] - _exv)
-                        _hold = _sel[np.argsort(-_depth)][_cap:]
-                        crossed[_hold] = False
-                        # park held agents at the portal mouth
-                        new_pos[_hold] = _exv + np.where(
-                            evac_dir[_hold] > 0, -0.5, 0.5)
-                # 🔥 Latch actual exit time for newly-escaped agents.
-                # For agents that JUST crossed in this timestep, their real
-                # exit time is somewhere between t_prev and t_now. Using t_now
-                # is a slight over-estimate (at most dt ≈ 2 s); for long smoke-
-                # slowed walks this correction restores the ~100-200 s gap to
-                # VB at 100 MW P5/P6 Congested scenarios.
-                newly_escaped = crossed & (~escaped)
-                actual_evac_time = np.where(newly_escaped, t_now, actual_evac_time)
-                escaped = escaped | crossed
-                current_pos = new_pos
-                current_pos = np.clip(current_pos, 0.0, tunnel_len)
- 
-                if _history is not None:
-                    from evc_history import smoke_front, snapshot
-                    smax, smin = smoke_front(fdb, t_now)
-                    _history.append(snapshot(
-                        t_now, escaped, fed_total, current_pos, exit_pos,
-                        soot_at_occ=soot_arr, smds_max=smax, smds_min=smin))
-                if timestep_cb is not None:
-                    timestep_cb(t_now, escaped, fed_total, current_pos)
- 
-            # 🔥 VB EVC.exe behaviour: continue simulating until ALL agents have
-            # escaped or been incapacitated (FED ≥ 1.0), regardless of the FDB
-            # time horizon. Previously the loop ended at times_fdb[-1] (~720 s)
-            # and any still-walking agent got their clean-air estimate as a
-            # fallback, producing a soft ceiling at 720 s in 60+ of 900 runs.
-            #
-            # Past the FDB window we:
-            #   (a) Hold the smoke field at its last FDB snapshot value,
-            #       fading linearly to ambient over `_post_fdb_fade_s` seconds.
-            #       This is a mild over-estimate (the fire has decayed by then)
-            #       but matches VB's "keep going until everyone is out" rule
-            #       without introducing free-walking artifacts.
-            #   (b) Use a coarser timestep (`_post_fdb_dt`) since smoke gradients
-            #       are gentle in this regime — saves CPU.
-            #   (c) Cap total wall-clock simulation at `_post_fdb_max_t_s`
-            #       (default 3600 s = 1 hour from the LAST FDB timestep) so
-            #       a pathological case can't loop forever. At 0.15 m/s
-            #       (smoke-floor walk speed) over 1000 m, that's ~6700 s —
-            #       so 3600 s extra is generous for typical 320–500 m tunnels.
-            _post_fdb_dt        = 5.0      # coarser than FDB's 2-3 s
-            _post_fdb_fade_s    = 600.0    # linearly fade smoke field to ambient
-            _post_fdb_max_t_s   = 3600.0   # safety net (1 hour past FDB end)
- 
-            if len(times_fdb) > 0:
-                t_post_start = float(times_fdb[-1])
+            # 🔧 VB-PARITY: FED keeps accumulating past 1.0 while the
+            # agent is in the tunnel — the reference output's ≥0.4…≥1.0
+            # buckets are well populated, which a freeze-at-1.0 cannot
+            # produce. Incapacitation (FED ≥ 1.0) stops the WALK (handled
+            # below), not the dose; only FED_CAP bounds the accumulator.
+            # 🔧 entry gating (normal-mode dynamic inflow): an occupant
+            # accumulates dose only once their vehicle has joined the
+            # queue (t_now ≥ entry_time); congested entry_time = 0.
+            in_tunnel = active & (t_now >= entry_time)
+            # 🔧 dose begins at DEPARTURE (started), per the
+            # staggered-departure grounding above — waiting occupants at
+            # their vehicles do not accrue (VB: slow EV + low dose).
+            _dose_mask = (in_tunnel * (t_now > entry_time + react_time)
+                          if getattr(self, 'VB_STAGGER_DEPART', True) else in_tunnel)
+            # 🔧 OPTIONAL sub-stepped FED path integral (FED_SUBSTEPS>1).
+            # OFF BY DEFAULT: VB itself doses coarsely — the decompile
+            # updates occupant position with a fixed velocity and
+            # accumulates dose once per FDB frame (soot enters only via the
+            # FED accumulators), with no sub-stepping. Refining the integral
+            # moves escaping occupants out of the plume mid-frame and
+            # collapses their dose, diverging from VB rather than matching
+            # it. Kept as an opt-in for physical-accuracy (non-VB) studies;
+            # leave at 1 to reproduce VB. Enabling it requires re-fitting the
+            # field dose calibration (FIELD_CNV_FAC), which was tuned to the
+            # single-sample integral.
+            _M = max(1, int(getattr(self, 'FED_SUBSTEPS', 1)))
+            if _M == 1:
+                fed_total = np.minimum(fed_total + fed_rate * (dt / 60.0) * _dose_mask,
+                                       self.FED_CAP)
             else:
-                t_post_start = 0.0
-            t_post_end_max = t_post_start + _post_fdb_max_t_s
- 
-            # Only run the continuation if there are still unescaped agents.
-            # VB-faithful behaviour: incapacitated agents (FED ≥ 1.0) keep
-            # walking — their FED is already saturated, but the body continues
-            # toward the exit until they cross or the safety cap fires. This
-            # matches the VB output where EV Time = time the LAST agent
-            # crosses their exit, regardless of FED outcome. (Previously the
-            # continuation loop excluded FED ≥ 1.0 agents, which caused them
-            # to be reported with their clean-air estimate instead of the
-            # smoke-slowed reality — producing EV Times that were too short
-            # for high-CO scenarios.)
-            t_now_post = t_post_start
-            while t_now_post < t_post_end_max:
-                # Anyone still in the tunnel?
-                active = ~escaped
-                if not np.any(active):
-                    break  # everyone out
- 
-                t_prev_post = t_now_post
-                t_now_post  = min(t_now_post + _post_fdb_dt, t_post_end_max)
-                dt_post     = t_now_post - t_prev_post
-                if dt_post <= 0:
-                    break
- 
-                # Smoke field: linear fade from last FDB snapshot to ambient.
-                # fade_frac = 1 at t_post_start, → 0 at t_post_start + fade_s.
-                age = t_now_post - t_post_start
-                fade_frac = max(0.0, 1.0 - age / _post_fdb_fade_s)
-                co_arr   = last_co_arr   * fade_frac
-                co2_arr  = 0.04 + (last_co2_arr - 0.04) * fade_frac
-                o2_arr   = 21.0 - (21.0 - last_o2_arr) * fade_frac
-                temp_arr = 20.0 + (last_temp_arr - 20.0) * fade_frac
-                radi_arr = last_radi_arr * fade_frac
-                soot_arr = last_soot_arr * fade_frac
- 
-                # not_incap gates the WALK below regardless of dose mode.
-                not_incap = fed_total < 1.0
-                # Dose past the FDB horizon — see _POST_FDB_DOSE.
-                #   'freeze': no smoke data exists past the FDB end, so VB
-                #             cannot dose here; agents walk out in clean air
-                #             and FED stays at its last in-window value.
-                #   'fade'  : legacy — keep accumulating during the fade.
-                if getattr(self, '_POST_FDB_DOSE', 'freeze') == 'fade':
-                    fed_rate = self._fed_rate(co_arr, co2_arr, o2_arr, temp_arr,
-                                                     last_radi_arr)
+                # ✅ SETTLED (previous_call.txt / FUN_0049f8a0, the movement
+                # step): displacement = speed(+0x90) × dt(DAT_004a66e8) along
+                # the atan heading; the loop NEVER reads the soot fields
+                # (+0x60/+0x80). VB therefore walks every occupant at the
+                # CONSTANT two-population speed — no smoke/visibility
+                # reduction. (This resolves the long-standing question:
+                # the "smoke-speed floor 0.28/0.30 m/s" idea is NOT in VB;
+                # do not reintroduce a soot→speed term.)
+                _vel = evac_dir * walk_speed          # m/s, smoke-independent (decompile-CONFIRMED)
+                _fc_sub = (float(fdb.fire_center)
+                           if getattr(fdb, 'fire_center', None) is not None
+                           else fire_x + fdb_offset)
+                _sub_dt_min = (dt / _M) / 60.0
+                _dose_inc = np.zeros(current_pos.size)
+                for _m in range(_M):
+                    _frac  = (_m + 0.5) / _M
+                    _t_sub = t_prev + _frac * dt
+                    _x_sub = current_pos + _vel * (_frac * dt) * _dose_mask
+                    if getattr(self, 'smoke_mirrored', False):
+                        _xq = _fc_sub - (_x_sub - fire_x)
+                    else:
+                        _xq = _x_sub + fdb_offset
+                    _prof.lap('fed')
+                    _co, _co2, _o2, _tp, _rd, _ = fdb.sample_all(_t_sub, _xq)
+                    _co, _co2, _o2, _tp, _rd = self._field_cnv(_co, _co2, _o2, _tp, _rd)
+                    _prof.lap('sample')
+                    _r = self._fed_rate(_co, _co2, _o2, _tp, _rd)
                     if getattr(self, '_is_normal_traffic', False):
-                        fed_rate = fed_rate * self.VB_NORMAL_FED_SCALE
-                    fed_total = np.minimum(
-                        fed_total + fed_rate * (dt_post / 60.0) * active,
-                        self.FED_CAP)
- 
-                # Visibility-only walking-speed reduction (same as FDB-loop
-                # above — see that block for the rationale and parameter
-                # sourcing).
-                k_s = 0.0076 * np.maximum(soot_arr, 0.0)
-                # 🔧 Smoke-speed floor calibratable. VB's .SET irritant
-                # reduction factor (col17/col15) bottoms at ~0.28, not 0.60 —
-                # in heavy smoke (e.g. the far-portal trap) VB occupants crawl
-                # and accumulate lethal dose. A 0.60 floor lets them escape the
-                # 0.3 cliff too fast (P6 eq_fatal shortfall). Default 0.50 = the EVC
-                # Abs Min Walk Speed; on a ~0.60 walk speed it yields a
-                # 0.30 m/s in-smoke minimum, matching the .SET col17 floor.
-                # 🔧 SPEED DECOUPLED FROM SMOKE (decompile-faithful) — see the
-                # companion note in the primary movement loop. VB's position
-                # update uses a fixed deck velocity; soot affects only FED.
-                wv = walk_speed
-
-                # L88 = lane width + shoulder width (GEOMETRY), not a movement
-                # pace. The old "queue-column pace" here misread the 3.62 m lane
-                # width as 3.62 s/m and capped walk speed at 1/3.62 = 0.276 m/s
-                # — a contributor to the ~1.85x EV-time inflation vs VB. VB has
-                # no such cap: each occupant advances at their own per-occupant
-                # speed (struct +0x90, assigned in FUN_0045b980 = 1.4 general /
-                # elderly_ws elderly), so wv stays = walk_speed. Cap removed.
- 
-                # All active agents have already passed their reaction time at
-                # this point (continuation begins after the full FDB window).
-                # But incapacitated agents stop walking — they collapse and
-                # are excluded from EV Time.
-                walk_mask = active & not_incap
- 
-                new_pos = current_pos + evac_dir * wv * dt_post * walk_mask
-                crossed = walk_mask & (
-                    ((evac_dir > 0) & (new_pos >= exit_pos)) |
-                    ((evac_dir < 0) & (new_pos <= exit_pos))
-                )
-                # 🔧 PORTAL DISCHARGE CAPACITY. VB's DAT.TEC escape-rate
-                # profiles show queue-like discharge bursts (5-7 ppl/s peaks,
-                # lower sustained average) — the portal is a flow constraint,
-                # not a free boundary. Without it, hundreds of agents exit in
-                # the same timestep and EV times undershoot VB by 300+ s at
-                # long-queue positions. Cap crossings per exit per timestep
-                # at EXIT_FLOW_CAP [persons/s] x dt; surplus agents hold AT
-                # the portal and cross in subsequent steps (first-come order
-                # by how far past the exit they reached). Knob exposed; lock
-                # by constrained fit to the VB EV matrix. Set
-                # VB_EXIT_FLOW=False to disable.
-                if getattr(self, 'VB_EXIT_FLOW', True) and crossed.any():
-                    _cap = max(1, int(round(
-                        float(getattr(self, 'EXIT_FLOW_CAP', 2.0)) * dt)))
-                    for _exv in np.unique(exit_pos[crossed]):
-                        _sel = np.where(crossed & (exit_pos == _exv))[0]
-                        if len(_sel) <= _cap:
-                            continue
-                        # first-come: deepest past the portal cross first
-                        _depth = np.abs(new_pos[_sel] - _exv)
-                        _hold = _sel[np.argsort(-_depth)][_cap:]
-                        crossed[_hold] = False
-                        # park held agents at the portal mouth
-                        new_pos[_hold] = _exv + np.where(
-                            evac_dir[_hold] > 0, -0.5, 0.5)
-                newly_escaped = crossed & (~escaped)
-                actual_evac_time = np.where(newly_escaped, t_now_post, actual_evac_time)
-                escaped = escaped | crossed
-                current_pos = new_pos
-                current_pos = np.clip(current_pos, 0.0, tunnel_len)
- 
-            fed_total = np.clip(fed_total, 0.0, self.FED_CAP)
- 
-            # 🔥 Post-loop actual_evac_time resolution.
-            # After the FDB loop + continuation loop, three categories of agent:
-            #   (a) Escaped during FDB or continuation → actual_evac_time = t_now
-            #       (the exact timestep they crossed exit_pos). Best estimate.
-            #   (b) Incapacitated (FED ≥ 1.0) before escaping → they stopped
-            #       walking. Their actual_evac_time stays at whatever value the
-            #       continuation loop last set; if they were never near the
-            #       exit, it falls back to the initial clean-air evac_time.
-            #       For VB-parity these still count as evacuees (per the
-            #       "Evacuees = total occupants" rule), but with their
-            #       walk-distance / walk-speed estimate as exit time.
-            #   (c) Still walking at _post_fdb_max_t_s → extremely rare in
-            #       practice; means they've been walking 1+ hour past FDB end.
-            #       We clamp their actual_evac_time to the continuation cap so
-            #       the reported EV Time doesn't go negative or zero.
+                        _r = _r * self.VB_NORMAL_FED_SCALE
+                    _dose_inc += _r * _sub_dt_min * _dose_mask
+                _prof.count('substeps', _M)
+                fed_total = np.minimum(fed_total + _dose_inc, self.FED_CAP)
+            _prof.lap('fed')
+ 
+            started = active & (t_now > entry_time + react_time)
+            # 🔥 Smoke-reduction of walking speed — visibility-only model.
             #
-            # The element-wise maximum with `evac_time` (the clean-air estimate)
-            # is kept as a safety net for non-escaped, non-incapacitated agents
-            # whose continuation-loop time might be lower than their clean-air
-            # estimate due to position clipping at the tunnel boundary.
-            actual_evac_time = np.maximum(actual_evac_time, evac_time)
+            # Physics rationale: CO is a toxic gas that impairs motor
+            # function via COHb binding over TIME, captured by the FED
+            # accumulation (separate model). The act of walking through
+            # CO does NOT directly slow walking speed — agents walk at
+            # their physiological capability until FED ≥ 1.0 incapacitates
+            # them. What slows WALKING is reduced VISIBILITY (smoke
+            # obscures path, signs, exits), which is governed by soot
+            # density.
+            #
+            # The previous formulation included a CO-based slowdown:
+            #   co_reduction = clip(1 - CO/1500, 0.15, 1.0)
+            # This was DOUBLE-COUNTING the CO effect (once in FED, once
+            # in walk speed) and the 0.15 floor combined with min(co_red,
+            # vis_red) yielded walking speeds as low as 0.09 m/s at 100 MW.
+            # That made marginal survivors (FED 0.7-1.0) walk so slowly
+            # that they took 800-900s to exit, dragging Python's EV time
+            # at 100 MW P1-P2 up by 25% vs VB.
+            #
+            # Removing the CO term and using ONLY visibility-based
+            # reduction matches VB's last-survivor walking speed at
+            # 100 MW (~0.56 m/s = 93% of base 0.60), which is much
+            # higher than the combined formula would predict.
+            #
+            # k_s [1/m] = K_m × m_soot [kg/m³]
+            #          = 7600 × soot_raw [mg/m³] × 1e-6
+            #          = 0.0076 × soot_raw
+            # vis_reduction = clip(1 - 0.15 * k_s, 0.60, 1.0)
+            #
+            # Calibration (slope 0.15, floor 0.60):
+            #   raw=100 mg/m³  (K_s=0.76):  factor = 0.89 (mild slow)
+            #   raw=200 mg/m³  (K_s=1.52):  factor = 0.77 (moderate)
+            #   raw=295 mg/m³  (K_s=2.24):  factor = 0.66 (heavy)
+            #   raw=425 mg/m³  (K_s=3.23):  factor = 0.60 (floor, 020 peak)
+            #   raw=891 mg/m³  (K_s=6.77):  factor = 0.60 (floor, 100 avg)
+            #
+            # The floor at 0.60 (NOT 0.30 of Frantzich-Jin) prevents
+            # excessive slowdown at high-HRR soot levels and matches VB's
+            # observed last-survivor walking speed at 100 MW.
+            # (k_s itself is no longer computed — speed ignores soot, below.)
+            # 🔧 Smoke-speed floor calibratable. VB's .SET irritant
+            # reduction factor (col17/col15) bottoms at ~0.28, not 0.60 —
+            # in heavy smoke (e.g. the far-portal trap) VB occupants crawl
+            # and accumulate lethal dose. A 0.60 floor lets them escape the
+            # 0.3 cliff too fast (P6 eq_fatal shortfall). Default 0.50 = the EVC
+            # Abs Min Walk Speed; on a ~0.60 walk speed it yields a
+            # 0.30 m/s in-smoke minimum, matching the .SET col17 floor.
+            # 🔧 SPEED DECOUPLED FROM SMOKE (decompile-faithful).
+            # The movement loop (MOV.txt / FUN_004956E0) updates occupant
+            # position with a FIXED velocity term `DAT_004a6570 * 2.5`
+            # (the deck speed parameter) — there is NO soot/extinction
+            # input to the position update anywhere in the loop. Soot
+            # enters ONLY through the FED accumulators (struct +0x6c/+0x70/
+            # +0x74/+0x78 = CO/heat/O2/total), a separate code path. The
+            # prior Jin absolute-speed reduction had no binary basis (it
+            # was a v1 carry-over, see fed_eqfatal_model.py docstring) and
+            # was the cause of the normal-queue OVER-dosing: it slowed
+            # walkers in smoke, inflating their dwell time and FED. VB does
+            # not do this. Walk speed is therefore the smoke-independent
+            # value; dose comes purely from the FED chemistry.
+            wv = walk_speed
+
+            # L88 = lane width + shoulder width (GEOMETRY), not a movement
+            # pace. The old "queue-column pace" here misread the 3.62 m lane
+            # width as 3.62 s/m and capped walk speed at 1/3.62 = 0.276 m/s
+            # — a contributor to the ~1.85x EV-time inflation vs VB. VB has
+            # no such cap: each occupant advances at their own per-occupant
+            # speed (struct +0x90, assigned in FUN_0045b980 = 1.4 general /
+            # elderly_ws elderly), so wv stays = walk_speed. Cap removed.
+ 
+            # 🔥 Incapacitated agents (FED >= 1.0) STOP walking. This
+            # matches VB's behavior: once an agent crosses the FED
+            # incapacitation threshold, they collapse where they are
+            # and don't keep walking. They're then excluded from EV
+            # Time (last-survivor-out semantics) but still counted in
+            # the FED bucket statistics. Without this, Python's
+            # incapacitated agents kept walking at smoke-floor speed,
+            # arriving at the exit eventually and inflating EV time
+            # by 200-500 s at high HRR.
+            # (not_incap gates the WALK only — the dose keeps
+            # accumulating up to FED_CAP, see the FED update above.)
+            not_incap = fed_total < 1.0
+            walk_mask = started & not_incap
+ 
+            # Propose new position; detect exit crossing
+            new_pos = current_pos + evac_dir * wv * dt * walk_mask
+            # An agent has escaped if their new_pos crosses their exit_pos
+            crossed = walk_mask & (
+                ((evac_dir > 0) & (new_pos >= exit_pos)) |
+                ((evac_dir < 0) & (new_pos <= exit_pos))
+            )
+            # 🔧 PORTAL DISCHARGE CAPACITY. VB's DAT.TEC escape-rate
+            # profiles show queue-like discharge bursts (5-7 ppl/s peaks,
+            # lower sustained average) — the portal is a flow constraint,
+            # not a free boundary. Without it, hundreds of agents exit in
+            # the same timestep and EV times undershoot VB by 300+ s at
+            # long-queue positions. Cap crossings per exit per timestep
+            # at EXIT_FLOW_CAP [persons/s] x dt; surplus agents hold AT
+            # the portal and cross in subsequent steps (first-come order
+            # by how far past the exit they reached). Knob exposed; lock
+            # by constrained fit to the VB EV matrix. Set
+            # VB_EXIT_FLOW=False to disable.
+            if getattr(self, 'VB_EXIT_FLOW', True) and crossed.any():
+                _cap = max(1, int(round(
+                    float(getattr(self, 'EXIT_FLOW_CAP', 2.0)) * dt)))
+                self._throttle_exits(crossed, new_pos, exit_pos, exit_grp,
+                                     evac_dir, _cap)
+            # 🔥 Latch actual exit time for newly-escaped agents.
+            # For agents that JUST crossed in this timestep, their real
+            # exit time is somewhere between t_prev and t_now. Using t_now
+            # is a slight over-estimate (at most dt ≈ 2 s); for long smoke-
+            # slowed walks this correction restores the ~100-200 s gap to
+            # VB at 100 MW P5/P6 Congested scenarios.
+            newly_escaped = crossed & (~escaped)
+            actual_evac_time = np.where(newly_escaped, t_now, actual_evac_time)
+            escaped = escaped | crossed
+            current_pos = new_pos
+            current_pos = np.clip(current_pos, 0.0, tunnel_len)
+            _prof.lap('move')
+ 
+            if _history is not None:
+                _history.record(t_now, escaped, fed_total, current_pos,
+                                exit_pos, soot_arr, frame=ti)
+            if timestep_cb is not None:
+                timestep_cb(t_now, escaped, fed_total, current_pos)
+            _prof.lap('history')
+ 
+        # 🔥 VB EVC.exe behaviour: continue simulating until ALL agents have
+        # escaped or been incapacitated (FED ≥ 1.0), regardless of the FDB
+        # time horizon. Previously the loop ended at times_fdb[-1] (~720 s)
+        # and any still-walking agent got their clean-air estimate as a
+        # fallback, producing a soft ceiling at 720 s in 60+ of 900 runs.
+        #
+        # Past the FDB window we:
+        #   (a) Hold the smoke field at its last FDB snapshot value,
+        #       fading linearly to ambient over `_post_fdb_fade_s` seconds.
+        #       This is a mild over-estimate (the fire has decayed by then)
+        #       but matches VB's "keep going until everyone is out" rule
+        #       without introducing free-walking artifacts.
+        #   (b) Use a coarser timestep (`_post_fdb_dt`) since smoke gradients
+        #       are gentle in this regime — saves CPU.
+        #   (c) Cap total wall-clock simulation at `_post_fdb_max_t_s`
+        #       (default 3600 s = 1 hour from the LAST FDB timestep) so
+        #       a pathological case can't loop forever. At 0.15 m/s
+        #       (smoke-floor walk speed) over 1000 m, that's ~6700 s —
+        #       so 3600 s extra is generous for typical 320–500 m tunnels.
+        _post_fdb_dt        = 5.0      # coarser than FDB's 2-3 s
+        _post_fdb_fade_s    = 600.0    # linearly fade smoke field to ambient
+        _post_fdb_max_t_s   = 3600.0   # safety net (1 hour past FDB end)
+ 
+        if len(times_fdb) > 0:
+            t_post_start = float(times_fdb[-1])
         else:
-            sigma_fire  = 5.0
-            co_peak_ppm = 8000.0
-            t_ramp      = 120.0
-            dt_fb       = 10.0
-            t_end_fb   = premovement * 2.0 + tunnel_len / abs_ws
-            times_fb   = np.arange(0, t_end_fb + dt_fb, dt_fb)
-            fed_total    = np.zeros(n_occ)
-            current_pos  = pos.copy()
- 
-            for _t in times_fb[1:]:
-                _t_prev  = _t - dt_fb
-                still_in = evac_time > _t_prev
-                if not np.any(still_in): break
-                co_ramp = min(_t / t_ramp, 1.0)
-                co_arr  = co_peak_ppm * co_ramp * np.exp(-np.abs(current_pos - fire_x) / sigma_fire)
-                # binary-exact rate; synthetic fallback has no CO2/O2/temp field
-                # so use ambient (CO2=0.04, O2=21, T=20) — CO term dominates here.
-                _amb = np.full_like(co_arr, 0.04)
-                fed_rate = self._fed_rate(
-                    co_arr, _amb, np.full_like(co_arr, 21.0), np.full_like(co_arr, 20.0))
-                _in_tun      = still_in & (_t >= entry_time)
-                fed_total   += fed_rate * (dt_fb / 60.0) * _in_tun
-                started      = still_in & (_t > entry_time + react_time)
-                # walk_speed already encodes the VB two-population assignment
-                # (1.4 general / elderly_ws elderly); just floor it.
-                wv           = np.maximum(walk_speed, abs_ws)
-                current_pos += evac_dir * wv * dt_fb * started
-                current_pos  = np.clip(current_pos, 0.0, tunnel_len)
-            fed_total = np.clip(fed_total, 0.0, self.FED_CAP)
- 
+            t_post_start = 0.0
+        t_post_end_max = t_post_start + _post_fdb_max_t_s
+ 
+        # Only run the continuation if there are still unescaped agents.
+        # VB-faithful behaviour: incapacitated agents (FED ≥ 1.0) keep
+        # walking — their FED is already saturated, but the body continues
+        # toward the exit until they cross or the safety cap fires. This
+        # matches the VB output where EV Time = time the LAST agent
+        # crosses their exit, regardless of FED outcome. (Previously the
+        # continuation loop excluded FED ≥ 1.0 agents, which caused them
+        # to be reported with their clean-air estimate instead of the
+        # smoke-slowed reality — producing EV Times that were too short
+        # for high-CO scenarios.)
+        t_now_post = t_post_start
+        # 🔧 ANALYTIC TAIL. Under the default 'freeze' dose this phase only
+        # walks agents at constant speed to their portal — FED, hence
+        # not_incap, no longer changes — so slow congested walkers used to
+        # cost hundreds of 5 s steps over the whole working set.
+        # _egress_tail solves the crossings directly and visits only the
+        # steps at which someone reaches a portal, admitting the exit queue
+        # in the same deepest-first order. The stepped loop below remains
+        # for the legacy 'fade' dose and ANALYTIC_TAIL = False.
+        if (getattr(self, 'ANALYTIC_TAIL', True)
+                and getattr(self, '_POST_FDB_DOSE', 'freeze') != 'fade'
+                and _live_after_compaction()):
+            _t_k, _t = [], t_post_start
+            while _t < t_post_end_max:          # the stepped loop's clock
+                _t = min(_t + _post_fdb_dt, t_post_end_max)
+                _t_k.append(_t)
+            _cap = (max(1, int(round(float(getattr(self, 'EXIT_FLOW_CAP', 2.0)) * dt)))
+                    if getattr(self, 'VB_EXIT_FLOW', True) else None)
+            escaped, actual_evac_time = self._egress_tail(
+                np.array(_t_k), current_pos, exit_pos, evac_dir, walk_speed,
+                exit_grp, ~escaped & (fed_total < 1.0), escaped,
+                actual_evac_time, tunnel_len, _post_fdb_dt, _cap)
+            t_now_post = t_post_end_max         # tail done: skip the loop
+        while t_now_post < t_post_end_max:
+            # Anyone still in the tunnel?
+            if not _live_after_compaction():
+                break  # everyone out
+            active = ~escaped
+ 
+            t_prev_post = t_now_post
+            t_now_post  = min(t_now_post + _post_fdb_dt, t_post_end_max)
+            dt_post     = t_now_post - t_prev_post
+            if dt_post <= 0:
+                break
+ 
+            # Smoke field: linear fade from last FDB snapshot to ambient.
+            # fade_frac = 1 at t_post_start, → 0 at t_post_start + fade_s.
+            age = t_now_post - t_post_start
+            fade_frac = max(0.0, 1.0 - age / _post_fdb_fade_s)
+            co_arr   = last_co_arr   * fade_frac
+            co2_arr  = 0.04 + (last_co2_arr - 0.04) * fade_frac
+            o2_arr   = 21.0 - (21.0 - last_o2_arr) * fade_frac
+            temp_arr = 20.0 + (last_temp_arr - 20.0) * fade_frac
+            radi_arr = last_radi_arr * fade_frac
+            soot_arr = last_soot_arr * fade_frac
+ 
+            # not_incap gates the WALK below regardless of dose mode.
+            not_incap = fed_total < 1.0
+            # Dose past the FDB horizon — see _POST_FDB_DOSE.
+            #   'freeze': no smoke data exists past the FDB end, so VB
+            #             cannot dose here; agents walk out in clean air
+            #             and FED stays at its last in-window value.
+            #   'fade'  : legacy — keep accumulating during the fade.
+            if getattr(self, '_POST_FDB_DOSE', 'freeze') == 'fade':
+                fed_rate = self._fed_rate(co_arr, co2_arr, o2_arr, temp_arr,
+                                                 last_radi_arr)
+                if getattr(self, '_is_normal_traffic', False):
+                    fed_rate = fed_rate * self.VB_NORMAL_FED_SCALE
+                fed_total = np.minimum(
+                    fed_total + fed_rate * (dt_post / 60.0) * active,
+                    self.FED_CAP)
+ 
+            # Visibility-only walking-speed reduction (same as FDB-loop
+            # above — see that block for the rationale and parameter
+            # sourcing).
+            k_s = 0.0076 * np.maximum(soot_arr, 0.0)
+            # 🔧 Smoke-speed floor calibratable. VB's .SET irritant
+            # reduction factor (col17/col15) bottoms at ~0.28, not 0.60 —
+            # in heavy smoke (e.g. the far-portal trap) VB occupants crawl
+            # and accumulate lethal dose. A 0.60 floor lets them escape the
+            # 0.3 cliff too fast (P6 eq_fatal shortfall). Default 0.50 = the EVC
+            # Abs Min Walk Speed; on a ~0.60 walk speed it yields a
+            # 0.30 m/s in-smoke minimum, matching the .SET col17 floor.
+            # 🔧 SPEED DECOUPLED FROM SMOKE (decompile-faithful) — see the
+            # companion note in the primary movement loop. VB's position
+            # update uses a fixed deck velocity; soot affects only FED.
+            wv = walk_speed
+
+            # L88 = lane width + shoulder width (GEOMETRY), not a movement
+            # pace. The old "queue-column pace" here misread the 3.62 m lane
+            # width as 3.62 s/m and capped walk speed at 1/3.62 = 0.276 m/s
+            # — a contributor to the ~1.85x EV-time inflation vs VB. VB has
+            # no such cap: each occupant advances at their own per-occupant
+            # speed (struct +0x90, assigned in FUN_0045b980 = 1.4 general /
+            # elderly_ws elderly), so wv stays = walk_speed. Cap removed.
+ 
+            # All active agents have already passed their reaction time at
+            # this point (continuation begins after the full FDB window).
+            # But incapacitated agents stop walking — they collapse and
+            # are excluded from EV Time.
+            walk_mask = active & not_incap
+ 
+            new_pos = current_pos + evac_dir * wv * dt_post * walk_mask
+            crossed = walk_mask & (
+                ((evac_dir > 0) & (new_pos >= exit_pos)) |
+                ((evac_dir < 0) & (new_pos <= exit_pos))
+            )
+            # 🔧 PORTAL DISCHARGE CAPACITY. VB's DAT.TEC escape-rate
+            # profiles show queue-like discharge bursts (5-7 ppl/s peaks,
+            # lower sustained average) — the portal is a flow constraint,
+            # not a free boundary. Without it, hundreds of agents exit in
+            # the same timestep and EV times undershoot VB by 300+ s at
+            # long-queue positions. Cap crossings per exit per timestep
+            # at EXIT_FLOW_CAP [persons/s] x dt; surplus agents hold AT
+            # the portal and cross in subsequent steps (first-come order
+            # by how far past the exit they reached). Knob exposed; lock
+            # by constrained fit to the VB EV matrix. Set
+            # VB_EXIT_FLOW=False to disable.
+            if getattr(self, 'VB_EXIT_FLOW', True) and crossed.any():
+                _cap = max(1, int(round(
+                    float(getattr(self, 'EXIT_FLOW_CAP', 2.0)) * dt)))
+                self._throttle_exits(crossed, new_pos, exit_pos, exit_grp,
+                                     evac_dir, _cap)
+            newly_escaped = crossed & (~escaped)
+            actual_evac_time = np.where(newly_escaped, t_now_post, actual_evac_time)
+            escaped = escaped | crossed
+            current_pos = new_pos
+            current_pos = np.clip(current_pos, 0.0, tunnel_len)
+ 
+        _prof.lap('tail')
+
+        # Working set back into whole-population order
+        fed_out[_act], evac_out[_act], esc_out[_act] = fed_total, actual_evac_time, escaped
+        fed_total, actual_evac_time, escaped = fed_out, evac_out, esc_out
+        fed_total = np.clip(fed_total, 0.0, self.FED_CAP)
+ 
+        # 🔥 Post-loop actual_evac_time resolution.
+        # After the FDB loop + continuation loop, three categories of agent:
+        #   (a) Escaped during FDB or continuation → actual_evac_time = t_now
+        #       (the exact timestep they crossed exit_pos). Best estimate.
+        #   (b) Incapacitated (FED ≥ 1.0) before escaping → they stopped
+        #       walking. Their actual_evac_time stays at whatever value the
+        #       continuation loop last set; if they were never near the
+        #       exit, it falls back to the initial clean-air evac_time.
+        #       For VB-parity these still count as evacuees (per the
+        #       "Evacuees = total occupants" rule), but with their
+        #       walk-distance / walk-speed estimate as exit time.
+        #   (c) Still walking at _post_fdb_max_t_s → extremely rare in
+        #       practice; means they've been walking 1+ hour past FDB end.
+        #       We clamp their actual_evac_time to the continuation cap so
+        #       the reported EV Time doesn't go negative or zero.
+        #
+        # The element-wise maximum with `evac_time` (the clean-air estimate)
+        # is kept as a safety net for non-escaped, non-incapacitated agents
+        # whose continuation-loop time might be lower than their clean-air
+        # estimate due to position clipping at the tunnel boundary.
+        actual_evac_time = np.maximum(actual_evac_time, evac_time)
+        return fed_total, actual_evac_time, escaped
+
+    def _advance_synthetic(self, st: '_RunState'):
+        """FDB-less fallback: Gaussian CO plume about the fire → fed_total."""
+        n_occ, pos, evac_dir = st.n_occ, st.pos, st.evac_dir
+        walk_speed, react_time = st.walk_speed, st.react_time
+        entry_time, evac_time = st.entry_time, st.evac_time
+        fire_x, tunnel_len = st.fire_x, st.tunnel_len
+        abs_ws, premovement = st.abs_ws, st.premovement
+        sigma_fire  = 5.0
+        co_peak_ppm = 8000.0
+        t_ramp      = 120.0
+        dt_fb       = 10.0
+        t_end_fb   = premovement * 2.0 + tunnel_len / abs_ws
+        times_fb   = np.arange(0, t_end_fb + dt_fb, dt_fb)
+        fed_total    = np.zeros(n_occ)
+        current_pos  = pos.copy()
+ 
+        for _t in times_fb[1:]:
+            _t_prev  = _t - dt_fb
+            still_in = evac_time > _t_prev
+            if not np.any(still_in): break
+            co_ramp = min(_t / t_ramp, 1.0)
+            co_arr  = co_peak_ppm * co_ramp * np.exp(-np.abs(current_pos - fire_x) / sigma_fire)
+            # binary-exact rate; synthetic fallback has no CO2/O2/temp field
+            # so use ambient (CO2=0.04, O2=21, T=20) — CO term dominates here.
+            _amb = np.full_like(co_arr, 0.04)
+            fed_rate = self._fed_rate(
+                co_arr, _amb, np.full_like(co_arr, 21.0), np.full_like(co_arr, 20.0))
+            _in_tun      = still_in & (_t >= entry_time)
+            fed_total   += fed_rate * (dt_fb / 60.0) * _in_tun
+            started      = still_in & (_t > entry_time + react_time)
+            # walk_speed already encodes the VB two-population assignment
+            # (1.4 general / elderly_ws elderly); just floor it.
+            wv           = np.maximum(walk_speed, abs_ws)
+            current_pos += evac_dir * wv * dt_fb * started
+            current_pos  = np.clip(current_pos, 0.0, tunnel_len)
+        fed_total = np.clip(fed_total, 0.0, self.FED_CAP)
+        return fed_total
+
+    def _tally_run(self, run_no, st: '_RunState', fed_total, ev_source,
+                   escaped=None, history=None) -> RunResult:
+        """End-state accounting of one iteration → RunResult."""
+        n_occ, pos, fire_x = st.n_occ, st.pos, st.fire_x
         # 🔥 VB-Faithful End-State Accounting:
         # Row 72 of the EVC file (sim_end_time_r72) defines the FED *integration*
         # window — i.e., how long the fire/smoke exposure is tracked. It is NOT
@@ -2558,7 +3820,7 @@ class EVCEngine:
  
         # 🔥 Use smoke-slowed actual_evac_time when FDB-based simulation ran.
         # For the FDB-less fallback path, evac_time is the best estimate.
-        _ev_source = actual_evac_time if (self.fdb is not None and self.fdb.is_loaded) else evac_time
+        _ev_source = ev_source
  
         # 🔥 EV Time = last-SURVIVOR-out (excludes incapacitated agents).
         #
@@ -2601,7 +3863,7 @@ class EVCEngine:
         if getattr(self, '_DBG_CAPTURE', False):   # diagnostic only
             self._dbg = dict(fed=fed_total.copy(), pos=pos.copy(),
                              fire_x=float(fire_x),
-                             escaped=escaped.copy() if 'escaped' in dir() else None)
+                             escaped=escaped.copy() if escaped is not None else None)
         # 🔥 EQ Fatal — Purser log-normal incapacitation probability sum.
         #
         # SUPERSEDES the previous "Σ FED over all agents" formula. That sum
@@ -2633,8 +3895,8 @@ class EVCEngine:
         # 7.7× over — falls into place because P_incap is near zero in the
         # trace-FED regime (0.05–0.15) where Σ FED previously summed large.
         #
-        # The standard normal CDF is computed via math.erf to avoid a scipy
-        # dependency: Φ(z) = 0.5 * (1 + erf(z / √2)).
+        # The standard normal CDF is computed via fed_kernels.normal_cdf (a
+        # vectorized erf) to avoid a scipy dependency: Φ(z) = 0.5 * (1 + erf(z / √2)).
         #
         # NOTE on coupling with the FED scale: the binary-exact FED model
         # was tuned against the old Σ-FED definition of EQ Fatal. With the
@@ -2682,11 +3944,10 @@ class EVCEngine:
         else:
             _PINCAP_MU_LN  = math.log(0.5)   # ln(μ), μ = 0.5
             _PINCAP_SIGMA  = 0.55            # log-normal spread (Purser)
-            _PINCAP_SQRT2  = math.sqrt(2.0)
+            from fed_kernels import normal_cdf
             fed_safe = np.maximum(fed_total, 1e-9)   # avoid log(0); P_incap → 0
             z = (np.log(fed_safe) - _PINCAP_MU_LN) / _PINCAP_SIGMA
-            _erf_vec = np.frompyfunc(math.erf, 1, 1)
-            p_incap = 0.5 * (1.0 + _erf_vec(z / _PINCAP_SQRT2).astype(np.float64))
+            p_incap = normal_cdf(z)
             eq_fatal = float(np.sum(p_incap))
  
         pct_fed_vb = [
@@ -2704,7 +3965,7 @@ class EVCEngine:
             pct_safe=pct_safe, pct_fed=pct_fed_vb,
             n_occ_zone=n_occ_zone, n_occ_total=n_occ, n_evac_zone=n_evac_zone,
             upstream_failed=n_occ_zone - n_evac_zone,
-            history=_history if _history is not None else [],
+            history=history if history is not None else [],
         )
  
     def _compute_avg(self, runs, exmax, exmin):
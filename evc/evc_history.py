@@ -47,19 +47,34 @@ def band_weight(fed, bands=DEFAULT_EQ_BANDS):
     return w
 
 
+def smoke_fronts(fdb, threshold: float = SMOKE_SOOT_THRESHOLD):
+    """(nt, 2) array of (smds_max, smds_min) per FDB frame: the downstream /
+    upstream x [m] where the soot field exceeds `threshold`, both at the fire
+    centre in a frame with none. Computed once per FDB and threshold (cached
+    on the FDB object)."""
+    cache = fdb.__dict__.setdefault("_smoke_fronts", {})
+    fronts = cache.get(threshold)
+    if fronts is None:
+        x = np.asarray(fdb.x_coords if hasattr(fdb, "x_coords") else fdb.xs, dtype=float)
+        fc = float(fdb.fire_center) if getattr(fdb, "fire_center", None) is not None \
+            else float(x[len(x) // 2])
+        over = np.asarray(fdb.soot, dtype=float) > threshold          # (nt, nx)
+        hit = over.any(axis=1)
+        first = np.argmax(over, axis=1)
+        last = x.size - 1 - np.argmax(over[:, ::-1], axis=1)
+        fronts = cache[threshold] = np.column_stack(
+            [np.where(hit, x[last], fc), np.where(hit, x[first], fc)])
+    return fronts
+
+
 def smoke_front(fdb, t_now, threshold: float = SMOKE_SOOT_THRESHOLD):
     """Return (smds_max, smds_min): downstream/upstream x [m] where the FDB soot
-    field at t_now exceeds `threshold`; seeded at the fire centre if none."""
-    x = np.asarray(fdb.x_coords if hasattr(fdb, "x_coords") else fdb.xs, dtype=float)
+    field at the frame nearest t_now exceeds `threshold`; seeded at the fire
+    centre if none."""
     t = np.asarray(fdb.times, dtype=float)
     ti = int(np.argmin(np.abs(t - t_now)))
-    row = np.asarray(fdb.soot[ti], dtype=float)
-    idx = np.where(row > threshold)[0]
-    if idx.size == 0:
-        fc = float(fdb.fire_center) if getattr(fdb, "fire_center", None) is not None \
-            else float(x[len(x) // 2])
-        return fc, fc
-    return float(x[idx[-1]]), float(x[idx[0]])
+    smax, smin = smoke_fronts(fdb, threshold)[ti]
+    return float(smax), float(smin)
 
 
 def snapshot(t_now, escaped, fed_total, current_pos, exit_pos,
@@ -124,6 +139,151 @@ def snapshot(t_now, escaped, fed_total, current_pos, exit_pos,
     }
 
 
+class HistoryRecorder:
+    """Columnar per-frame history — the snapshot() record, stored as one
+    preallocated array per .DAT column instead of a dict per frame.
+
+    `capacity` frames are allocated up front (grown if exceeded); with
+    `every` > 1 only every k-th record() call is kept (frame decimation, the
+    first frame always). The smoke front comes from smoke_fronts(fdb), read
+    by frame index. Iterating yields the snapshot() dicts, so code written
+    for the old list-of-dicts history keeps working; the writers below take
+    the columns directly.
+    """
+    INT_COLS = ("evc_man", "fatals", "up1_0", "psin_smk", "exno_01", "exno_02")
+    FLOAT_COLS = ("time", "eq_fatal", "fed_max", "mevc_max", "mevc_min",
+                  "pevc_max", "pevc_min", "smds_max", "smds_min")
+
+    def __init__(self, fdb, capacity: int, every: int = 1,
+                 eq_bands=DEFAULT_EQ_BANDS,
+                 smoke_occ_threshold: float = SMOKE_SOOT_THRESHOLD):
+        self.every = max(1, int(every))
+        self.fdb = fdb
+        self._fronts = smoke_fronts(fdb) if fdb is not None else None
+        bands = sorted(eq_bands)
+        self._eq_th = np.array([-np.inf] + [th for th, _ in bands])
+        self._eq_wt = np.array([0.0] + [wt for _, wt in bands])
+        self._edges = np.asarray(DN_EDGES, dtype=float)
+        self.smoke_occ_threshold = smoke_occ_threshold
+        self._far = None                    # escapee side per occupant (EXNO_02)
+        self._calls = 0
+        self.n = 0
+        self._alloc(max(1, -(-int(capacity) // self.every)))
+
+    def _alloc(self, cap):
+        old = getattr(self, "cols", None)
+        cols = {k: np.zeros(cap, dtype=np.int64) for k in self.INT_COLS}
+        cols.update({k: np.zeros(cap) for k in self.FLOAT_COLS})
+        cols["dn_bands"] = np.zeros((cap, len(DN_EDGES) - 1), dtype=np.int64)
+        if old is not None:
+            for k, a in old.items():
+                cols[k][:self.n] = a[:self.n]
+        self.cols = cols
+
+    def record(self, t_now, escaped, fed_total, current_pos, exit_pos,
+               soot_at_occ, frame=None):
+        """Append one frame (kept when it falls on the decimation grid).
+        `frame` is the FDB frame index of t_now (nearest frame if None)."""
+        self._calls += 1
+        if (self._calls - 1) % self.every:
+            return
+        if self.n == len(self.cols["time"]):
+            self._alloc(2 * self.n)
+        i = self.n
+        self.n += 1
+        c = self.cols
+        escaped = np.asarray(escaped, dtype=bool)
+        fed = np.asarray(fed_total, dtype=float)
+        pos = np.asarray(current_pos, dtype=float)
+
+        # DN0_1..DN1_0 and UP1_0 in one pass: bin -1 = FED < 0, 10 = FED >= 1
+        counts = np.bincount(np.searchsorted(self._edges, fed, side="right"),
+                             minlength=len(self._edges) + 1)
+        c["dn_bands"][i] = counts[1:len(self._edges)]
+        c["up1_0"][i] = c["fatals"][i] = counts[len(self._edges)]
+        # same weights band_weight() assigns, summed the same way
+        w = self._eq_wt[np.searchsorted(self._eq_th, fed, side="right") - 1]
+        c["eq_fatal"][i] = float(np.sum(w))
+        c["fed_max"][i] = float(fed.max()) if fed.size else 0.0
+
+        if exit_pos is not None:
+            if self._far is None:
+                ep = np.asarray(exit_pos, dtype=float)
+                far = ep.max() if ep.size else 0.0
+                self._far = ep > far * 0.5
+            c["exno_02"][i] = np.count_nonzero(escaped & self._far)
+            c["exno_01"][i] = np.count_nonzero(escaped) - c["exno_02"][i]
+        n_esc = np.count_nonzero(escaped)
+        c["time"][i] = float(t_now)
+        c["evc_man"][i] = n_esc
+        if n_esc < escaped.size:
+            n_in = ~escaped
+            live = pos[n_in]
+            c["pevc_max"][i], c["pevc_min"][i] = live.max(), live.min()
+            if soot_at_occ is not None:
+                c["psin_smk"][i] = np.count_nonzero(
+                    n_in & (np.asarray(soot_at_occ) > self.smoke_occ_threshold))
+        if self._fronts is not None:
+            if frame is None:
+                frame = int(np.argmin(np.abs(np.asarray(self.fdb.times) - t_now)))
+            c["smds_max"][i], c["smds_min"][i] = self._fronts[frame]
+
+    def columns(self) -> dict:
+        """The recorded columns (views, length len(self))."""
+        return {k: a[:self.n] for k, a in self.cols.items()}
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        if not -self.n <= i < self.n:
+            raise IndexError(i)
+        i %= self.n
+        row = {k: (float(self.cols[k][i]) if k in self.FLOAT_COLS else int(self.cols[k][i]))
+               for k in self.FLOAT_COLS + self.INT_COLS}
+        row["dn_bands"] = [int(v) for v in self.cols["dn_bands"][i]]
+        row["fed_bands"] = row["dn_bands"]
+        return row
+
+    def __iter__(self):
+        return (self[i] for i in range(self.n))
+
+
+_INT_KEYS = set(HistoryRecorder.INT_COLS)
+# .DAT / .TEC column order after the 10 DN bands are spliced in at index 3
+_ROW_KEYS = ("time", "evc_man", "fatals", "up1_0", "eq_fatal", "fed_max",
+             "mevc_max", "mevc_min", "pevc_max", "pevc_min", "smds_max",
+             "smds_min", "psin_smk", "exno_01", "exno_02")
+
+
+def _history_table(history):
+    """(n_frames, 25) float table in .DAT column order, plus which columns
+    hold integer counts — from a HistoryRecorder or a list of snapshot()
+    dicts."""
+    if isinstance(history, HistoryRecorder):
+        c = history.columns()
+        head = [c[k] for k in _ROW_KEYS[:3]]
+        tail = [c[k] for k in _ROW_KEYS[3:]]
+        table = np.column_stack(head + [c["dn_bands"]] + tail).astype(float) \
+            if len(history) else np.zeros((0, 25))
+        ints = [k in _INT_KEYS for k in _ROW_KEYS[:3]] + [True] * 10 + \
+               [k in _INT_KEYS for k in _ROW_KEYS[3:]]
+        return table, ints
+    rows = [[h[k] for k in _ROW_KEYS[:3]] + list(h["dn_bands"]) +
+            [h[k] for k in _ROW_KEYS[3:]] for h in history]
+    ints = ([not isinstance(v, float) for v in rows[0]] if rows
+            else [False] * 25)
+    return np.array(rows, dtype=float).reshape(-1, 25), ints
+
+
+def _format_rows(table, fmts, sep):
+    """Fixed-width text rows of *table*, one %-format per column."""
+    if not len(table):
+        return []
+    row_fmt = sep.join(fmts)
+    return [row_fmt % tuple(r) for r in table.tolist()]
+
+
 # ── plain VB .DAT writer (native layout, logical file #1) ────────────────────
 _DAT_HDR = ("    time EVC_MAN   Fatals    0.1DN    0.2DN    0.3DN    0.4DN    "
             "0.5DN    0.6DN    0.7DN    0.8DN    0.9DN    1.0DN    1.0UP EQ_FATAL"
@@ -134,27 +294,16 @@ _DAT_HDR = ("    time EVC_MAN   Fatals    0.1DN    0.2DN    0.3DN    0.4DN    "
 def write_dat_plain(history, path):
     """Write the native VB `.DAT` (the file the simulation writes to logical #1):
     one fixed-width row per frame, header first. Column order matches the
-    reverse-engineered FUN_00480510 / real .DAT exactly."""
-    lines = [_DAT_HDR]
-    for h in history:
-        dn = h["dn_bands"]
-        vals = [h["time"], h["evc_man"], h["fatals"],
-                *dn,                       # 0.1DN .. 1.0DN  (10)
-                h["up1_0"],                # 1.0UP
-                h["eq_fatal"], h["fed_max"],
-                h["mevc_max"], h["mevc_min"],
-                h["pevc_max"], h["pevc_min"],
-                h["smds_max"], h["smds_min"], h["psin_smk"],
-                h["exno_01"], h["exno_02"]]
-        # match VB widths: floats .2f in 9-wide, integer-ish counts in fixed cols
-        parts = [f"{vals[0]:8.1f}", f"{vals[1]:7.1f}", f"{vals[2]:8.2f}"]
-        for v in vals[3:14]:               # 10 DN + UP1_0 as NN.00
-            parts.append(f"{float(v):8.2f}")
-        for v in vals[14:23]:              # EQ_FATAL .. PSIN_SMK
-            parts.append(f"{float(v):8.2f}")
-        parts.append(f"{int(vals[23]):8d}")
-        parts.append(f"{int(vals[24]):8d}")
-        lines.append("".join(parts))
+    reverse-engineered FUN_00480510 / real .DAT exactly. `history` is a
+    HistoryRecorder or a list of snapshot() dicts."""
+    table, _ = _history_table(history)
+    # match VB widths: time 8.1, EVC_MAN 7.1, then .2f in 8 wide — the 10 DN
+    # + UP1_0 counts as NN.00, EQ_FATAL .. PSIN_SMK — and the EXNO counts
+    fmts = ["%8.1f", "%7.1f"] + ["%8.2f"] * 21 + ["%8d", "%8d"]
+    if len(table):
+        table = table.astype(object)
+        table[:, 23:] = table[:, 23:].astype(float).astype(int)
+    lines = [_DAT_HDR] + _format_rows(table, fmts, "")
     with open(path, "w", encoding="latin-1") as f:
         f.write("\n".join(lines) + "\n")
     return path
@@ -184,16 +333,16 @@ def write_dat_tec(history, path, zone_name="ALL", fire_x=None):
             "DN0_1, DN0_2, DN0_3, DN0_4, DN0_5, DN0_6, DN0_7, DN0_8, DN0_9, "
             "DN1_0, UP1_0, EQ_FATAL, FED_MAX, MEVC_MAX, MEVC_MIN, "
             "PEVC_MAX, PEVC_MIN, SMDS_MAX, SMDS_MIN, PSIN_SMK, EXNO_01, EXNO_02")
+    table, ints = _history_table(history)
     lines = [f"Variables = {cols}",
-             f'ZONE T="{zone_name}" I = {len(history)} J =  1 K = 1 F = Point']
-    for h in history:
-        dn = h["dn_bands"]
-        row = [h["time"], h["evc_man"], h["fatals"], *dn, h["up1_0"],
-               h["eq_fatal"], h["fed_max"], h["mevc_max"], h["mevc_min"],
-               h["pevc_max"], h["pevc_min"], h["smds_max"], h["smds_min"],
-               h["psin_smk"], h["exno_01"], h["exno_02"]]
-        lines.append(" ".join(f"{v:8.2f}" if isinstance(v, float) else f"{v:6d}"
-                              for v in row))
+             f'ZONE T="{zone_name}" I = {len(table)} J =  1 K = 1 F = Point']
+    # float columns 8.2f, integer counts 6d
+    if len(table):
+        table = table.astype(object)
+        for j, is_int in enumerate(ints):
+            if is_int:
+                table[:, j] = table[:, j].astype(float).astype(int)
+    lines += _format_rows(table, ["%6d" if i else "%8.2f" for i in ints], " ")
     with open(path, "w", encoding="latin-1") as f:
         f.write("\n".join(lines) + "\n")
     return path
@@ -0,0 +1,359 @@
+"""
+evc_parallel.py — multi-core batch executor for EVCEngine.
+
+A Tab-4 batch is (deck × iteration) work: 180 scenario-position decks ×
+N Monte Carlo runs, every run independent. ParallelBatch cuts it into
+units of (deck, block of run numbers), spreads the units over a process
+pool, and hands each deck back as a finished BatchResult the moment its
+last unit lands — in completion order, so the results table and the
+project DB fill while the rest of the batch is still running.
+
+Reproducibility: every run draws from evc_engine.iteration_rng(seed,
+deck stem, run_no), a SeedSequence leaf keyed by the batch seed, the deck
+stem and the run number — never from process or scheduling state. The
+same seed therefore gives bit-identical RunResults on 1 or 32 workers,
+in any unit size, and through the serial EVCEngine.run(seed=...).
+
+Workers build their own EVCEngine per deck (cached per process) from a
+DeckSpec — the deck path, FDB path and the EVCEngine keyword arguments —
+and attach the parent's FDB cubes from shared memory (fdb_store.
+SharedFdbSet, SHARE_FDB) — one resident copy of each field however many
+workers run, the segments unlinked by the parent when the pool is done.
+With SHARE_FDB off they load through fdb_store as usual, i.e. from the
+binary sidecar the parent's first parse left next to the source.
+
+Adaptive batches (evc_engine.AdaptiveIterations): each deck starts with
+min_iterations runs; whenever a deck's outstanding units are all back
+and its CIs are still too wide, the next `step` runs are cut into units
+and queued — so decks converge independently, the noisy ones drawing
+more runs while the quiet ones are already finished.
+
+With a ResultCache (evc_result_cache), decks whose batch key is stored
+come back from the cache before any unit is submitted, and every deck
+the pool finishes is stored.
+
+Aliases (DEDUPE_ALIASES): decks whose compiled inputs are identical once
+their FDBs are de-aliased by content (evc_result_cache.scenario_key — the
+FVM = NV0 = NVC collapse of fdb_fields.build_alias_map) are planned as one
+scenario. Only the first deck of each group is simulated; the others are
+yielded with a copy of its BatchResult, alias_of naming the deck whose
+runs they carry.
+"""
+import logging
+import math
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+# Units per worker the iterations are cut into: enough slack to balance
+# decks of very different cost, few enough to keep each unit batched.
+UNITS_PER_WORKER = 4
+
+# Hand workers the parent's FDB cubes through shared memory instead of
+# letting each one load its own.
+SHARE_FDB = True
+
+# Simulate decks with identical compiled inputs (aliased FDBs) once.
+DEDUPE_ALIASES = True
+
+
+@dataclass
+class DeckSpec:
+    """Everything a worker needs to rebuild one deck's engine."""
+    evc_path: Path
+    fdb_path: Optional[Path] = None
+    engine_kwargs: dict = field(default_factory=dict)
+    fdb_share: Optional[dict] = None        # fdb_store.SharedFdbSet descriptor
+
+    def key(self) -> Tuple:
+        return (str(self.evc_path), str(self.fdb_path or ''),
+                repr(sorted(self.engine_kwargs.items())))
+
+
+_ENGINES: Dict[Tuple, object] = {}     # worker-side engine cache
+
+
+def build_engine(spec: DeckSpec):
+    from evc_engine import EVCEngine
+    if spec.fdb_share:
+        # adopted into the registry → the engine's load_fdb() finds it
+        from fdb_store import attach_shared
+        attach_shared(spec.fdb_share)
+    return EVCEngine(spec.evc_path, spec.fdb_path, **spec.engine_kwargs)
+
+
+def engine_for(spec: DeckSpec):
+    """EVCEngine for *spec*, built once per worker process."""
+    eng = _ENGINES.get(spec.key())
+    if eng is None:
+        eng = _ENGINES[spec.key()] = build_engine(spec)
+    return eng
+
+
+def new_seed() -> int:
+    """Fresh batch seed (128-bit OS entropy) — log it to replay the batch."""
+    return int(np.random.SeedSequence().entropy)
+
+
+def run_unit(spec: DeckSpec, run_nos: List[int], seed: int):
+    """Worker entry: the RunResults of *run_nos* for one deck."""
+    return _run_on(engine_for(spec), run_nos, seed)
+
+
+def _run_on(eng, run_nos, seed):
+    return eng._run_batch(run_nos, [eng._iter_rng(seed, k) for k in run_nos])
+
+
+def plan_aliases(engines) -> Dict[int, int]:
+    """{deck index: index of the first deck with the same scenario_key} for
+    every deck that is an alias of an earlier one. *engines* is a sequence
+    or a {index: engine} mapping; None entries (decks that failed to build)
+    and decks whose key cannot be computed are never aliased."""
+    from evc_result_cache import scenario_key
+    items = engines.items() if isinstance(engines, dict) else enumerate(engines)
+    first, alias = {}, {}
+    for i, eng in items:
+        if eng is None:
+            continue
+        try:
+            key = scenario_key(eng)
+        except (OSError, TypeError) as e:
+            log.warning(f"no scenario key for {eng.evc_path}: {e}")
+            continue
+        j = first.setdefault(key, i)
+        if j != i:
+            alias[i] = j
+    return alias
+
+
+def alias_result(batch, chid: str):
+    """*batch* as reported for alias deck *chid*: same runs, alias_of set."""
+    if isinstance(batch, Exception):
+        return batch
+    return replace(batch, chid=chid, alias_of=batch.alias_of or batch.chid)
+
+
+class ParallelBatch:
+    """(deck, iteration) units on a process pool, decks streamed back.
+
+        pb = ParallelBatch(specs, n_iterations=30, seed=seed, workers=32)
+        for i, engine, batch in pb.results():
+            ...                     # deck i finished — fill table, save DB
+        pb.cancel()                 # from a UI handler: drop pending units
+
+    *batch* is the deck's BatchResult, or the exception one of its units
+    raised (the deck's other units are then dropped). progress_cb is also
+    called while waiting on the pool, so a GUI caller can pump its event
+    loop there. With *adaptive*, n_iterations is ignored and each deck runs
+    until its AdaptiveIterations rule stops it (units_total then grows).
+    With *cache* (evc_result_cache.ResultCache), cached decks are yielded
+    first, without running, and finished decks are stored. With *dedupe*,
+    alias decks (plan_aliases) are not run: each is yielded right after
+    its canonical deck, with alias_result() of the same batch.
+
+    workers <= 1 (or a single unit) runs in-process through the same
+    run_unit path, so results never depend on the worker count.
+    """
+
+    def __init__(self, specs: List[DeckSpec], n_iterations: int,
+                 exmax: int = 0, exmin: int = 0, seed: Optional[int] = None,
+                 workers: Optional[int] = None, unit_size: Optional[int] = None,
+                 progress_cb=None, share_fdb: bool = SHARE_FDB, adaptive=None,
+                 cache=None, dedupe: bool = DEDUPE_ALIASES):
+        self.specs = list(specs)
+        self.adaptive = adaptive
+        self.cache = cache
+        self.dedupe = dedupe
+        self.aliases: Dict[int, int] = {}       # alias deck -> canonical deck
+        self._keys = {}                         # deck index -> cache key
+        self._seeded = seed is not None         # unseeded batches never cached
+        # adaptive: the first round only; more runs are queued per deck
+        self.n_iterations = (adaptive.min_iterations if adaptive is not None
+                             else int(n_iterations))
+        self.exmax, self.exmin = exmax, exmin
+        self.seed = new_seed() if seed is None else int(seed)
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+        self.progress_cb = progress_cb          # (units_done, units_total)
+        self.share_fdb = share_fdb
+        self._cancelled = False
+        self._engines = {}                      # parent-side, per deck index
+        n_units_min = self.workers * UNITS_PER_WORKER
+        if unit_size is None:
+            per_deck = max(1, math.ceil(n_units_min / max(1, len(self.specs))))
+            unit_size = math.ceil(self.n_iterations / per_deck)
+        self.unit_size = max(1, int(unit_size))
+        self.units = [(i, ks) for i in range(len(self.specs))
+                      for ks in self._blocks(1, self.n_iterations)]
+
+    def _blocks(self, k_first: int, k_last: int) -> List[List[int]]:
+        """Run numbers k_first..k_last cut into units of unit_size."""
+        return [list(range(k0, min(k0 + self.unit_size, k_last + 1)))
+                for k0 in range(k_first, k_last + 1, self.unit_size)]
+
+    def engine(self, i: int):
+        """Parent-side EVCEngine of deck *i* (finishes its BatchResult)."""
+        if i not in self._engines:
+            self._engines[i] = build_engine(self.specs[i])
+        return self._engines[i]
+
+    def _worker_spec(self, i: int, shared) -> DeckSpec:
+        """specs[i] as sent to the workers: with its FDB in *shared*."""
+        fdb = getattr(self.engine(i), 'fdb', None)
+        if shared is None or fdb is None or not fdb.is_loaded:
+            return self.specs[i]
+        try:
+            return replace(self.specs[i], fdb_share=shared.share(fdb))
+        except OSError as e:                # /dev/shm full or unavailable
+            log.warning(f"FDB shared memory unavailable ({e}); "
+                        f"workers load {Path(fdb.path).name} themselves")
+            return self.specs[i]
+
+    def cancel(self):
+        self._cancelled = True
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def results(self) -> Iterator[Tuple[int, object, object]]:
+        """Yield (deck index, EVCEngine or None, BatchResult or exception)
+        as decks finish — each canonical deck followed by its aliases."""
+        for i, eng, batch in self._results():
+            yield i, eng, batch
+            for a in sorted(a for a, c in self.aliases.items() if c == i):
+                eng_a = self.engine(a)
+                yield a, eng_a, alias_result(batch, eng_a.evc_path.stem)
+
+    def _results(self) -> Iterator[Tuple[int, object, object]]:
+        pending = {i: [] for i in range(len(self.specs))}
+        remaining = {i: 0 for i in range(len(self.specs))}
+        for i, _ in self.units:
+            remaining[i] += 1
+        total, done = len(self.units), 0
+        queued = deque()                        # adaptive follow-up units
+
+        def _collect(i, runs):
+            nonlocal done, total
+            if i not in pending:                # deck already failed
+                return None
+            if isinstance(runs, Exception):
+                pending.pop(i)
+                done += remaining.pop(i)
+                return (i, None, runs)
+            pending[i].extend(runs)
+            remaining[i] -= 1
+            done += 1
+            if self.progress_cb:
+                self.progress_cb(done, total)
+            if remaining[i] == 0:
+                stop = 'fixed'
+                if self.adaptive is not None:
+                    stop = self.adaptive.stop_reason(pending[i])
+                    if stop is None:            # CIs still too wide: more runs
+                        n = len(pending[i])
+                        more = self._blocks(n + 1, n + self.adaptive.next_count(n))
+                        queued.extend((i, ks) for ks in more)
+                        remaining[i] += len(more)
+                        total += len(more)
+                        return None
+                eng = self.engine(i)
+                batch = eng.finish_batch(pending.pop(i), self.exmax, self.exmin,
+                                         adaptive=self.adaptive, stop=stop)
+                if self.cache is not None:
+                    self.cache.put(self._keys.get(i), batch)
+                return (i, eng, batch)
+            return None
+
+        # Parent engines first: a deck that cannot even be built fails here,
+        # and every distinct FDB is parsed once (leaving its sidecar for the
+        # workers) instead of by several workers at once.
+        for i in range(len(self.specs)):
+            try:
+                self.engine(i)
+            except Exception as e:
+                yield _collect(i, e)
+        # Alias decks ride on their canonical deck's batch (results())
+        if self.dedupe:
+            self.aliases = plan_aliases({i: self._engines[i] for i in pending})
+            for a in self.aliases:
+                pending.pop(a)
+                done += remaining.pop(a)
+        # Decks already in the result cache come back without running
+        if self.cache is not None and self._seeded:
+            from evc_result_cache import batch_key
+            for i in list(pending):
+                try:
+                    self._keys[i] = batch_key(self.engine(i), self.n_iterations, self.seed,
+                                              self.exmax, self.exmin, self.adaptive)
+                except (OSError, TypeError) as e:
+                    log.warning(f"no result-cache key for {self.specs[i].evc_path}: {e}")
+                    continue
+                hit = self.cache.get(self._keys[i])
+                if hit is not None:
+                    pending.pop(i)
+                    done += remaining.pop(i)
+                    yield (i, self.engine(i), hit)
+        units = [(i, ks) for i, ks in self.units if i in pending]
+        if not units:
+            return
+
+        if self.workers == 1 or (len(units) <= 1 and self.adaptive is None):
+            queued.extend(units)
+            while queued:
+                i, ks = queued.popleft()
+                if self._cancelled:
+                    return
+                if i not in pending:
+                    continue
+                try:
+                    runs = _run_on(self.engine(i), ks, self.seed)
+                except Exception as e:
+                    runs = e
+                out = _collect(i, runs)
+                if out is not None:
+                    yield out
+            return
+
+        # spawn, not fork: the parent is a Qt GUI with live threads, and
+        # spawn is what Windows uses anyway — one behaviour everywhere.
+        from fdb_store import SharedFdbSet
+        ctx = multiprocessing.get_context('spawn')
+        n_proc = self.workers if self.adaptive is not None else min(self.workers, len(units))
+        with SharedFdbSet() as shared, \
+                ProcessPoolExecutor(max_workers=n_proc, mp_context=ctx) as pool:
+            specs = {i: self._worker_spec(i, shared if self.share_fdb else None)
+                     for i in {i for i, _ in units}}
+            futs = {pool.submit(run_unit, specs[i], ks, self.seed): i
+                    for i, ks in units}
+            try:
+                while futs:
+                    if self._cancelled:
+                        break
+                    fin, _ = wait(futs, timeout=0.2, return_when=FIRST_COMPLETED)
+                    if not fin and self.progress_cb:
+                        self.progress_cb(done, total)
+                    for f in fin:
+                        i = futs.pop(f)
+                        try:
+                            runs = f.result()
+                        except Exception as e:
+                            runs = e
+                        out = _collect(i, runs)
+                        if out is not None:
+                            yield out
+                    while queued:
+                        i, ks = queued.popleft()
+                        if i in pending:
+                            futs[pool.submit(run_unit, specs[i], ks, self.seed)] = i
+            finally:
+                for f in futs:
+                    f.cancel()
+                pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,244 @@
+"""
+evc_result_cache.py — content-addressed on-disk cache of EVCEngine batches.
+
+A Tab-4 re-batch after editing one deck (or one traffic-table row) used to
+re-simulate every EVC/FDB pair. With a ResultCache, a seeded batch is
+stored under a digest of everything its numbers depend on, and the next
+batch with the same inputs gets the stored BatchResult back instead of
+running the engine:
+
+    deck     the .evc bytes as written for the batch (the compiled deck)
+    field    the FDB content md5 (FDBData.md5 — from the sidecar header,
+             so no re-read of the source)
+    engine   the EVCEngine.__init__ overrides (EVCEngine.init_kwargs), the
+             class knobs of EVCEngine / FDBData (FED mode, EQ_FATAL_MODE,
+             FIELD_CNV_FAC, substeps, ... — every UPPERCASE setting, class
+             or instance), the engine's other instance state (deck-derived
+             flags, overrides set after construction — all but NOT_INPUTS)
+             and a digest of the engine source modules
+    batch    iteration count, seed, exmax / exmin, adaptive rule
+
+scenario_key() is the same digest without the deck name and the batch
+settings: decks with equal scenario keys are aliases of one scenario
+(evc_parallel.plan_aliases simulates them once).
+
+Any change to any of these is a different key, i.e. a miss; nothing is
+ever invalidated in place. A setting whose value cannot be keyed (not a
+plain / numpy value) raises TypeError rather than being left out.
+Unseeded batches are never cached — without a seed a rerun is meant to
+draw new iterations (Tab 4 caches only with "Pin seed" set —
+evc_batch_settings.BatchSettings.result_cache).
+A hit replays iterations already recorded, so Tab 4 does not write it to
+the project DB again.
+
+Entries are pickled BatchResults, one file each,
+
+    <root>/<key[:2]>/<key>.pkl
+
+written atomically (temp + os.replace) so concurrent batches or a crash
+cannot leave a torn entry. The cache is local and trusted (pickle); clear()
+empties it.
+"""
+import hashlib
+import json
+import logging
+import os
+import pickle
+from dataclasses import asdict
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+
+# Modules whose source decides the numbers of a batch.
+ENGINE_MODULES = ('evc_engine', 'evc_deck', 'fdb_store', 'fed_kernels')
+
+_SOURCE_DIGEST = None
+
+
+def engine_source_digest() -> str:
+    """sha256 over the ENGINE_MODULES sources (once per process)."""
+    global _SOURCE_DIGEST
+    if _SOURCE_DIGEST is None:
+        import importlib
+        h = hashlib.sha256()
+        for name in ENGINE_MODULES:
+            h.update(name.encode())
+            h.update(Path(importlib.import_module(name).__file__).read_bytes())
+        _SOURCE_DIGEST = h.hexdigest()
+    return _SOURCE_DIGEST
+
+
+# Engine instance state that is not a run input: keyed by content
+# elsewhere (deck / field digests, init_kwargs), the deck-name wind label
+# (its effect is smoke_mirrored, keyed), timings and per-engine caches.
+NOT_INPUTS = ('init_kwargs', 'evc_path', 'fdb_path', 'params', 'fdb',
+              'fdb_load_seconds', 'wind_code', '_queue_skeleton',
+              '_last_queue_path', '_last_queue_error', '_fed_ws',
+              '_rate_fields', '_dbg')
+
+_PLAIN = (bool, int, float, str, tuple, list, dict, type(None))
+
+
+def _keyable(name, v):
+    if isinstance(v, (np.generic, np.ndarray)):
+        return v.tolist()
+    if isinstance(v, (set, frozenset)):
+        return sorted(v, key=repr)
+    if isinstance(v, _PLAIN):
+        return v
+    raise TypeError(f"engine setting {name} ({type(v).__name__}) cannot be part "
+                    f"of a result-cache key")
+
+
+def engine_knobs(engine) -> dict:
+    """Every UPPERCASE setting of the engine and of FDBData — class defaults
+    or instance overrides, whichever is in effect — and every other engine
+    instance attribute not in NOT_INPUTS. numpy values go in as lists; a
+    value that cannot be keyed raises TypeError."""
+    from evc_engine import FDBData
+    knobs = {}
+    for prefix, obj in (('', engine), ('FDBData.', getattr(engine, 'fdb', None) or FDBData)):
+        for name in dir(obj):
+            if name.isupper():
+                knobs[prefix + name] = _keyable(prefix + name, getattr(obj, name, None))
+    for name, v in vars(engine).items():
+        if not name.isupper() and name not in NOT_INPUTS:
+            knobs[name] = _keyable(name, v)
+    return knobs
+
+
+# Engine state set from the deck file NAME (the scenario code: C/N traffic)
+# or from a deck line read at construction, not from the deck bytes alone.
+NAME_FLAGS = ('_is_congested_deck', '_is_normal_traffic', 'smoke_mirrored')
+
+
+def _inputs(engine) -> dict:
+    """Everything a run's numbers depend on except the deck's name."""
+    fdb = getattr(engine, 'fdb', None)
+    fdb_md5 = None
+    if fdb is not None and fdb.is_loaded:
+        fdb_md5 = fdb.md5
+        if fdb_md5 is None:
+            from fdb_store import file_md5
+            fdb_md5 = file_md5(engine.fdb_path)
+    return {
+        'version':  CACHE_VERSION,
+        'source':   engine_source_digest(),
+        'evc':      hashlib.sha256(Path(engine.evc_path).read_bytes()).hexdigest(),
+        'fdb':      fdb_md5,
+        'init':     getattr(engine, 'init_kwargs', {}),
+        'knobs':    engine_knobs(engine),
+    }
+
+
+def _digest(doc: dict) -> str:
+    blob = json.dumps(doc, sort_keys=True, default=repr)
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+def batch_key(engine, n_iterations, seed, exmax=0, exmin=0, adaptive=None) -> Optional[str]:
+    """Cache key of engine.run(n_iterations, exmax, exmin, seed=seed,
+    adaptive=adaptive), or None when the batch is not cacheable."""
+    if seed is None:
+        return None
+    doc = _inputs(engine)
+    doc.update({
+        'stem':     Path(engine.evc_path).stem,         # keys the iteration rng
+        'n':        None if adaptive is not None else int(n_iterations),
+        'seed':     int(seed),
+        'exmax':    int(exmax),
+        'exmin':    int(exmin),
+        'adaptive': asdict(adaptive) if adaptive is not None else None,
+    })
+    return _digest(doc)
+
+
+def scenario_key(engine) -> str:
+    """Digest of a deck's compiled inputs with its FDB de-aliased: equal keys
+    mean the two decks simulate the same scenario (same deck content, same
+    field content — e.g. the FVM = NV0 = NVC collapse of fdb_fields.
+    build_alias_map — same settings and name-derived flags), so one batch
+    serves both. The deck stem (iteration rng) is deliberately left out."""
+    doc = _inputs(engine)
+    doc['flags'] = {f: getattr(engine, f, None) for f in NAME_FLAGS}
+    return _digest(doc)
+
+
+class ResultCache:
+    """Directory of BatchResults keyed by batch_key().
+
+        cache = ResultCache(project / 'evc_cache')
+        batch = engine.run(30, seed=seed, cache=cache)   # hit or run + store
+
+    hits / misses / stores count this instance's lookups for the batch log.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.pkl"
+
+    def get(self, key: Optional[str]):
+        """The stored BatchResult of *key* (from_cache set), or None."""
+        if not key:
+            return None
+        p = self.path(key)
+        try:
+            with open(p, 'rb') as f:
+                batch = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:                  # torn / foreign entry
+            log.warning(f"EVC result cache entry {p.name} unreadable ({e}); ignored")
+            self.misses += 1
+            return None
+        self.hits += 1
+        batch.from_cache = True
+        return batch
+
+    def put(self, key: Optional[str], batch) -> Optional[Path]:
+        """Store *batch* under *key*. Best effort — a cache that cannot be
+        written only costs the next batch its hit."""
+        if not key:
+            return None
+        p = self.path(key)
+        tmp = p.with_name(p.name + f".{os.getpid()}.tmp")
+        try:
+            p.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, 'wb') as f:
+                pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, p)
+        except OSError as e:
+            log.warning(f"EVC result cache not written to {p.parent}: {e}")
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+            return None
+        self.stores += 1
+        return p
+
+    def clear(self) -> int:
+        """Delete every entry; returns the count."""
+        n = 0
+        for p in self.root.glob('*/*.pkl'):
+            try:
+                p.unlink()
+                n += 1
+            except OSError:
+                pass
+        return n
+
+    def summary(self) -> str:
+        return (f"EVC result cache: {self.hits} hit(s), {self.misses} miss(es), "
+                f"{self.stores} stored")
@@ -1,9 +1,9 @@
 """
 fdb_field.py — FDB gas-field reader + spatiotemporal dose sampler.
 
-Field half of the per-scenario pairing pipeline. Parses the ASCII FDB
-(header + [time, x, soot, co2, co, temp, radi, o2] rows), builds a
-[n_time, n_x] grid per species, and samples gas values along an occupant
+Field half of the per-scenario pairing pipeline. Loads the ASCII FDB
+(header + [time, x, soot, co2, co, temp, radi, o2] rows) through the shared
+fdb_store loader, exposes a [n_time, n_x] grid per species, and samples gas values along an occupant
 trajectory [(t, x), ...] with linear interpolation in both t and x.
 
 The alias map (which distinct field backs each of the 30 classes) is derived
@@ -15,10 +15,13 @@ NOT included / must be supplied to close the loop:
   - Purser log-normal incapacitation constants from prior calibration
     (PURSER_MU / PURSER_SIGMA below are placeholders, flagged)
 """
-import os, re, hashlib
+import os
 import numpy as np
 
 SPECIES = ['soot', 'co2', 'co', 'temp', 'radi', 'o2']
+# species name here -> FDBData attribute
+_FDB_PLANE = {'soot': 'soot', 'co2': 'co2', 'co': 'co',
+              'temp': 'temp', 'radi': 'rad', 'o2': 'o2'}
 
 class FdbField:
     def __init__(self, path):
@@ -27,82 +30,62 @@ class FdbField:
         self._parse()
 
     def _parse(self):
-        rows = []
-        started = False
-        fire = None
-        fire_header_seen = False
-        with open(self.path, 'r', errors='replace') as f:
-            for line in f:
-                if not started:
-                    if 'FIRE PT' in line:        # column header; values on next line
-                        fire_header_seen = True
-                        continue
-                    if fire_header_seen:
-                        # positive decimals only; fire extent = last two (after MIN_X, MAX_X)
-                        nums = re.findall(r'\d+\.\d+', line)
-                        if len(nums) >= 2:
-                            fire = (float(nums[-2]), float(nums[-1]))
-                            fire_header_seen = False
-                        continue
-                    if line.startswith('  [SEC]'):
-                        started = True
-                    continue
-                # ---- data region ----
-                p = line.split()
-                if len(p) < 8:
-                    continue
-                try:
-                    v = [float(x) for x in p[:8]]
-                except ValueError:
-                    continue
-                if len(v) == 8:
-                    rows.append(v)
-        a = np.array(rows)
-        if fire is None:
+        # The field comes from the shared loader (fdb_store.load_fdb) — the
+        # same parse + binary sidecar EVCEngine uses, not a private copy.
+        from fdb_store import load_fdb
+        fdb = load_fdb(self.path)
+        if not fdb.is_loaded:
+            raise ValueError(f"{self.name}: no data rows in FDB")
+        if fdb.fire_extent is None:
             raise ValueError(f"{self.name}: FIRE PT not found in FDB header")
-        self.fire = fire
+        self.fire = fdb.fire_extent
         self.fire_mid = 0.5 * (self.fire[0] + self.fire[1])
-        self.times = np.unique(a[:, 0])
-        self.xs = np.unique(a[:, 1])
-        nt, nx = len(self.times), len(self.xs)
-        # reshape each species to [nt, nx]; rows are ordered time-major, x-minor
-        ti = {t: i for i, t in enumerate(self.times)}
-        xi = {x: i for i, x in enumerate(self.xs)}
-        grids = {s: np.full((nt, nx), np.nan) for s in SPECIES}
-        for r in a:
-            i, j = ti[r[0]], xi[r[1]]
-            for k, s in enumerate(SPECIES):
-                grids[s][i, j] = r[2 + k]
-        self.grid = grids
+        self.times = fdb.times
+        self.xs = fdb.x_coords
+        self._fdb = fdb           # its frame_pair()/cell_index() lookups
+        # [nt, nx] per species — views of the loader's species cube. A
+        # non-rectangular FDB (some (t, x) rows missing) gets the loader's
+        # clean-air fill in the missing cells (TEMP 20, CO2 0.04, O2 21,
+        # the rest 0 — FDBData._COLUMNS), as EVCEngine and Tab 5 always
+        # had; the former private parser left NaN there.
+        self.grid = {s: getattr(fdb, _FDB_PLANE[s]) for s in SPECIES}
 
     def sample(self, t, x, species):
         """Linear interp in t and x. Clamps to grid bounds."""
         g = self.grid[species]
-        t = np.clip(t, self.times[0], self.times[-1])
         x = np.clip(x, self.xs[0], self.xs[-1])
-        it = np.searchsorted(self.times, t)
-        ix = np.searchsorted(self.xs, x)
-        it0 = max(0, it - 1); it1 = min(len(self.times) - 1, it)
-        ix0 = max(0, ix - 1); ix1 = min(len(self.xs) - 1, ix)
-        ft = 0.0 if it1 == it0 else (t - self.times[it0]) / (self.times[it1] - self.times[it0])
-        fx = 0.0 if ix1 == ix0 else (x - self.xs[ix0]) / (self.xs[ix1] - self.xs[ix0])
+        # brackets computed, not searched, on the (regular) FDS grid
+        it0, it1, ft = self._fdb.frame_pair(t)
+        if len(self.xs) > 1:
+            ix0 = int(self._fdb.cell_index(x)); ix1 = ix0 + 1
+            fx = (x - self.xs[ix0]) / (self.xs[ix1] - self.xs[ix0])
+        else:
+            ix0 = ix1 = 0; fx = 0.0
         v00, v01 = g[it0, ix0], g[it0, ix1]
         v10, v11 = g[it1, ix0], g[it1, ix1]
         return (v00*(1-ft)*(1-fx) + v01*(1-ft)*fx + v10*ft*(1-fx) + v11*ft*fx)
 
 
-def build_alias_map(fdb_dir):
+def build_alias_map(fdb_dir, index=None):
     """Map every (HRR,OCC,VENT) class -> the distinct field file backing it,
-    derived from content hashes. Self-correcting for the non-uniform collapse."""
-    def h(f): return hashlib.md5(open(os.path.join(fdb_dir, f), 'rb').read()).hexdigest()
+    derived from content hashes. Self-correcting for the non-uniform collapse.
+
+    Fingerprints come from *index* (fdb_fingerprint.FingerprintIndex — pass
+    the project's to reuse stored ones); only files whose size and sampled
+    blocks collide are hashed in full, in chunks."""
+    from fdb_fingerprint import FingerprintIndex
     files = [f for f in os.listdir(fdb_dir) if f.endswith('.FDB')]
-    by_hash = {}
-    cls = {}
-    for f in files:
-        hv = h(f)
-        by_hash.setdefault(hv, f)            # canonical file per distinct field
-        cls[f.replace('.FDB', '')] = by_hash[hv]
-    return cls  # class -> canonical FDB filename
+    own = index is None
+    if own:
+        index = FingerprintIndex()
+    try:
+        canon = index.alias_groups([os.path.join(fdb_dir, f) for f in files])
+    finally:
+        if own:
+            index.close()
+    # canonical file per distinct field: the first listed
+    return {f.replace('.FDB', ''): os.path.basename(canon[os.path.join(fdb_dir, f)])
+            for f in files}  # class -> canonical FDB filename
 
 
 # --- FED / Purser incapacitation -------------------------------------------
@@ -114,19 +97,22 @@ PURSER_MU = None      # <-- supply from prior calibration / VB fit
 PURSER_SIGMA = None   # <-- supply from prior calibration / VB fit
 
 def fed_increment(co_ppm, co2_pct, o2_pct, temp_c, dt_s):
-    """Per-step FED increment (Purser). dt in seconds."""
-    dt_min = dt_s / 60.0
-    # CO (Purser): FED_CO per minute
-    fed_co = 3.317e-5 * (max(co_ppm, 0.0) ** 1.036) * 25.0 * dt_min / 30.0  # RMV=25, D=30
-    # CO2 hyperventilation multiplier (drives faster uptake)
-    vco2 = np.exp(0.1903 * max(co2_pct, 0.0) + 2.0004) / 7.1
+    """Per-step FED increment (Purser). dt in seconds. Vectorised over array
+    inputs (one entry per sample); a float for scalar inputs."""
+    from fed_kernels import co_rate, o2_hypoxia_rate, heat_rate
+    co, co2, o2, t, dt = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in
+                                               (co_ppm, co2_pct, o2_pct, temp_c, dt_s)))
+    # CO (Purser, RMV=25, D=30) times the CO2 hyperventilation multiplier
+    # exp(0.1903*CO2 + 2.0004)/7.1 (drives faster uptake)
+    fed = co_rate(co, np.maximum(co2, 0.0), div=30.0 / (3.317e-5 * 25.0),
+                  rmv_add=2.0004, rmv_div=7.1)
     # low-O2 FED
-    o2 = max(o2_pct, 0.0)
-    fed_o2 = dt_min / np.exp(8.13 - 0.54 * (20.9 - o2)) if o2 < 20.9 else 0.0
+    fed += o2_hypoxia_rate(np.maximum(o2, 0.0), slope=0.54, inter=8.13,
+                           ambient=20.9, gate=20.9)
     # thermal (convective) FED
-    t = max(temp_c, 0.0)
-    fed_heat = dt_min / np.exp(5.1849 - 0.0273 * t) if t > 20.0 else 0.0
-    return (fed_co * vco2 + fed_o2) + fed_heat
+    fed += heat_rate(np.maximum(t, 0.0), gate=20.0)
+    fed *= dt / 60.0
+    return float(fed) if fed.ndim == 0 else fed
 
 def fatality_prob(fed_total):
     """Log-normal incapacitation -> fatality (Phi-based). Needs calibrated mu/sigma."""
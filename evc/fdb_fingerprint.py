@@ -0,0 +1,173 @@
+"""
+fdb_fingerprint.py — content fingerprints of FDB files, persisted per project.
+
+Which FDBs carry the same field (build_alias_map, scenario de-duplication)
+used to be answered by md5-ing every file completely, on every scan — for a
+project of hundreds of multi-hundred-MB FDBs, a full read of the folder.
+FingerprintIndex answers it with as little I/O as the question allows:
+
+    stat        size + mtime_ns equal to the stored row → the stored
+                fingerprint is reused; the file is not opened
+    quick       md5 over the size, the header block and QUICK_SAMPLES
+                blocks spread over the file (QUICK_BLOCK bytes each) —
+                ~1 MB read whatever the file size. Files that differ in
+                size or quick print cannot be identical.
+    full        the streaming md5 of fdb_store.file_md5 (the digest the
+                sidecar header and build_alias_map key on), computed only
+                for files whose (size, quick) collides with another file's,
+                or when a caller asks for md5() — then stored too
+
+Files no larger than the sampled span are hashed whole by the quick step,
+so their quick print IS their full md5; sampled prints carry a 'q' prefix.
+
+Rows live in the project SQLite database,
+
+    fdb_fingerprints(path, size, mtime_ns, quick, md5, checked_at)
+
+keyed by the resolved path, so reopening an unchanged project costs one
+stat per file. A size/mtime change drops the stored md5 with the row.
+Without a database path the index is in-memory (one scan's worth).
+"""
+import datetime
+import hashlib
+import logging
+import os
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+log = logging.getLogger(__name__)
+
+QUICK_BLOCK = 1 << 16          # bytes per sampled block
+QUICK_SAMPLES = 16             # blocks after the header block
+
+TABLE = 'fdb_fingerprints'
+
+
+@dataclass
+class Fingerprint:
+    path: str
+    size: int
+    mtime_ns: int
+    quick: str
+    md5: Optional[str] = None
+
+
+def quick_fingerprint(path, size: Optional[int] = None) -> str:
+    """md5 of size + header block + QUICK_SAMPLES evenly spaced blocks (the
+    last one ending at EOF); the whole content when the file is smaller."""
+    if size is None:
+        size = os.stat(path).st_size
+    if size <= QUICK_BLOCK * (QUICK_SAMPLES + 1):
+        from fdb_store import file_md5
+        return file_md5(path)
+    h = hashlib.md5()
+    h.update(f"{size}:".encode())
+    with open(path, 'rb') as f:
+        h.update(f.read(QUICK_BLOCK))
+        span = size - QUICK_BLOCK
+        for k in range(1, QUICK_SAMPLES + 1):
+            f.seek(span * k // QUICK_SAMPLES)
+            h.update(f.read(QUICK_BLOCK))
+    return 'q' + h.hexdigest()
+
+
+class FingerprintIndex:
+    """Stored fingerprints of FDB files.
+
+        with FingerprintIndex(project_db) as index:
+            canon = index.alias_groups(fdb_paths)   # path -> first identical
+            md5 = index.md5(fdb_path)
+
+    stats: 'reused' (stat matched a row), 'quick' and 'full' (hashes
+    computed) — for the scan log.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path
+        self._con = sqlite3.connect(str(db_path) if db_path else ':memory:')
+        self._con.execute(f"""CREATE TABLE IF NOT EXISTS {TABLE} (
+            path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER,
+            quick TEXT, md5 TEXT, checked_at TEXT)""")
+        self.stats = {'reused': 0, 'quick': 0, 'full': 0}
+
+    def close(self):
+        if self._con is not None:
+            self._con.commit()
+            self._con.close()
+            self._con = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def key(path) -> str:
+        return str(Path(path).resolve())
+
+    def _store(self, fp: Fingerprint):
+        self._con.execute(
+            f"INSERT OR REPLACE INTO {TABLE} VALUES (?,?,?,?,?,?)",
+            (fp.path, fp.size, fp.mtime_ns, fp.quick, fp.md5,
+             datetime.datetime.now().isoformat(timespec='seconds')))
+
+    def fingerprint(self, path) -> Fingerprint:
+        """The (quick) Fingerprint of *path* — stored row when size and
+        mtime are unchanged, else re-sampled and stored."""
+        key = self.key(path)
+        st = os.stat(key)
+        row = self._con.execute(
+            f"SELECT size, mtime_ns, quick, md5 FROM {TABLE} WHERE path=?",
+            (key,)).fetchone()
+        if row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            self.stats['reused'] += 1
+            return Fingerprint(key, row[0], row[1], row[2], row[3])
+        quick = quick_fingerprint(key, st.st_size)
+        self.stats['quick'] += 1
+        fp = Fingerprint(key, int(st.st_size), int(st.st_mtime_ns), quick,
+                         None if quick.startswith('q') else quick)
+        self._store(fp)
+        return fp
+
+    def md5(self, path) -> str:
+        """Full content md5 of *path* (fdb_store.file_md5), stored."""
+        return self._full(self.fingerprint(path))
+
+    def _full(self, fp: Fingerprint) -> str:
+        if fp.md5 is None:
+            from fdb_store import file_md5
+            fp.md5 = file_md5(fp.path)
+            self.stats['full'] += 1
+            self._store(fp)
+        return fp.md5
+
+    def alias_groups(self, paths: Iterable) -> Dict[str, str]:
+        """{path: first path in *paths* with identical content}, keyed by
+        the paths as given. Only files whose size and quick print collide
+        are fully hashed; unreadable files map to themselves."""
+        canon, by_quick = {}, {}
+        for p in map(str, paths):
+            try:
+                fp = self.fingerprint(p)
+            except OSError as e:            # unreadable: its own field
+                log.warning(f"FDB fingerprint of {p} failed: {e}")
+                canon[p] = p
+                continue
+            by_quick.setdefault((fp.size, fp.quick), []).append((p, fp))
+        for group in by_quick.values():
+            if len(group) == 1:
+                canon[group[0][0]] = group[0][0]
+                continue
+            first = {}
+            for p, fp in group:
+                canon[p] = first.setdefault(self._full(fp), p)
+        self._con.commit()
+        return canon
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"FDB fingerprints: {s['reused']} reused, {s['quick']} sampled, "
+                f"{s['full']} fully hashed")
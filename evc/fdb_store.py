@@ -0,0 +1,436 @@
+"""
+fdb_store.py — one loader for every FDB consumer + binary sidecar cache.
+
+Every reader of the ASCII FIRE ANALYSIS DB (.fdb) — EVCEngine, fdb_fields,
+the TEC-style graph generator, Tab 5 and the FDB analysis tab — obtains its
+field from load_fdb(), which returns an evc_engine.FDBData. FDBData itself
+parses the text only once per file content: after a parse it writes a
+binary sidecar next to the source,
+
+    <name>.fdb.cube.npy    (nt, nspecies, nx) float64 cube, FDBData.SPECIES order
+    <name>.fdb.cube.json   header: stamp, md5, fire centre/extent, axes
+
+and every later load memory-maps the cube instead of re-reading the text.
+
+Validity: the header records the source size + mtime_ns + md5. Size and
+mtime matching → sidecar trusted without touching the source. Size matching
+but mtime differing (file copied / touched / re-extracted) → the source is
+re-hashed and the sidecar reused when the md5 still matches (header stamp
+refreshed). Anything else → re-parse and overwrite.
+
+When the FDB folder is read-only the sidecar goes to a per-user temp cache
+(<tmp>/qra_fdb_sidecar/); a sidecar that cannot be written at all is simply
+skipped — the caller still gets its parsed FDBData.
+
+In-process, load_fdb() answers from REGISTRY (FdbRegistry): one FDBData per
+(resolved path, size, mtime_ns), shared by every engine of a batch — all
+six fire positions of 020CFV0_P1…_P6 hold the same object — plus the graph
+step and Tab 5. The registry is LRU-ordered under a RAM budget and counts
+hits / misses / evictions for the batch log. The budget defaults to
+DEFAULT_BUDGET_MB (4096, or the EVC_FDB_BUDGET_MB environment variable);
+Tab 4 sets it per project (evc_batch_settings.fdb_budget_mb). Compact
+engines (EVCEngine.COMPACT) ask for dtype=np.float32: that field is a
+separate entry (key suffixed with the dtype) holding only the float32
+cube — the float64 parse / sidecar map it was cast from is not kept.
+
+Across processes (evc_parallel worker pool), SharedFdbSet copies each
+distinct cube once into a multiprocessing.shared_memory segment owned by
+the parent; workers attach_shared() a small descriptor and get a read-only
+FDBData over the segment — no parse, no unpickled copy, one resident cube
+however many workers run.
+"""
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+SIDECAR_VERSION = 1
+CUBE_SUFFIX = '.cube.npy'
+HEADER_SUFFIX = '.cube.json'
+_HASH_CHUNK = 1 << 20
+
+
+def _env_budget_mb(default=4096.0) -> float:
+    try:
+        return float(os.environ.get('EVC_FDB_BUDGET_MB', default))
+    except ValueError:
+        log.warning("EVC_FDB_BUDGET_MB is not a number; using "
+                    f"{default:.0f} MB")
+        return default
+
+
+DEFAULT_BUDGET_MB = _env_budget_mb()
+
+
+class FdbRegistry:
+    """Process-wide FDBData cache with a memory budget and LRU eviction.
+
+    Keyed by (resolved path, size, mtime_ns[, dtype]): a rewritten FDB gets
+    a new key and its old entry is dropped on the next lookup. An entry is charged the
+    nbytes of its species cube (mmap-backed cubes included — conservative);
+    least-recently-used entries are evicted while the total exceeds the
+    budget, except the entry just requested.
+    """
+
+    def __init__(self, budget_mb: float = DEFAULT_BUDGET_MB):
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self._entries = OrderedDict()          # key -> FDBData
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(fdb_path, dtype=None):
+        """(path, size, mtime_ns), plus the cube dtype when not float64."""
+        p = Path(fdb_path).resolve()
+        st = p.stat()
+        key = (str(p), int(st.st_size), int(st.st_mtime_ns))
+        if dtype is not None and np.dtype(dtype) != np.float64:
+            key += (np.dtype(dtype).str,)
+        return key
+
+    @staticmethod
+    def nbytes(fdb) -> int:
+        cube = getattr(fdb, 'cube', None)
+        return int(cube.nbytes) if cube is not None else 0
+
+    @property
+    def used_bytes(self) -> int:
+        with self._lock:
+            return sum(self.nbytes(f) for f in self._entries.values())
+
+    def get(self, fdb_path, dtype=None):
+        """FDBData for *fdb_path* — cached, or loaded (sidecar/parse) now;
+        with *dtype*, its cube in that precision (FDBData.astype)."""
+        from evc_engine import FDBData
+        try:
+            key = self.key(fdb_path, dtype)
+        except OSError:
+            return FDBData(Path(fdb_path))     # missing file: empty FDBData
+        with self._lock:
+            fdb = self._entries.get(key)
+            if fdb is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return fdb
+            self.misses += 1
+        # Load outside the lock — a first text parse can take a while
+        fdb = FDBData(Path(fdb_path))
+        if dtype is not None:
+            fdb = fdb.astype(dtype)
+        with self._lock:
+            if key in self._entries:           # another thread won the race
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self._insert(key, fdb)
+        return fdb
+
+    def adopt(self, key, fdb):
+        """Register an FDBData built elsewhere (e.g. attach_shared) under
+        *key* — a key() tuple — so load_fdb() of that file returns it.
+        Charged and evicted like a loaded entry."""
+        with self._lock:
+            self._insert(tuple(key), fdb)
+
+    def _insert(self, key, fdb):
+        for stale in [k for k in self._entries
+                      if k != key and k[0] == key[0] and k[3:] == key[3:]]:
+            del self._entries[stale]           # same file, older content
+        self._entries[key] = fdb
+        self._entries.move_to_end(key)
+        self._evict(keep=key)
+
+    def _evict(self, keep=None):
+        total = sum(self.nbytes(f) for f in self._entries.values())
+        for k in list(self._entries):
+            if total <= self.budget_bytes:
+                break
+            if k == keep:
+                continue
+            total -= self.nbytes(self._entries.pop(k))
+            self.evictions += 1
+
+    def set_budget(self, budget_mb: float):
+        with self._lock:
+            self.budget_bytes = int(budget_mb * 1024 * 1024)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'entries': len(self._entries),
+                    'used_mb': self.used_bytes / 1048576.0,
+                    'budget_mb': self.budget_bytes / 1048576.0,
+                    'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions}
+
+    def summary(self) -> str:
+        st = self.stats()
+        return (f"FDB cache: {st['hits']} hit(s) / {st['misses']} miss(es), "
+                f"{st['entries']} field(s), {st['used_mb']:.0f}/"
+                f"{st['budget_mb']:.0f} MB, {st['evictions']} evicted")
+
+
+REGISTRY = FdbRegistry()
+
+
+def load_fdb(fdb_path, use_registry: bool = True, dtype=None):
+    """The shared FDB loader → evc_engine.FDBData (registry + sidecar);
+    *dtype* (np.float32) for a compact cube."""
+    if use_registry:
+        return REGISTRY.get(fdb_path, dtype)
+    from evc_engine import FDBData
+    fdb = FDBData(Path(fdb_path))
+    return fdb.astype(dtype) if dtype is not None else fdb
+
+
+def source_stamp(fdb_path) -> dict:
+    st = Path(fdb_path).stat()
+    return {'size': int(st.st_size), 'mtime_ns': int(st.st_mtime_ns)}
+
+
+def file_md5(fdb_path) -> str:
+    """md5 of the file content — same digest build_alias_map() keys on."""
+    h = hashlib.md5()
+    with open(fdb_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _fallback_dir() -> Path:
+    return Path(tempfile.gettempdir()) / 'qra_fdb_sidecar'
+
+
+def sidecar_paths(fdb_path, fallback: bool = False):
+    """(cube .npy, header .json) for an FDB — beside it, or in the temp cache."""
+    p = Path(fdb_path).resolve()
+    if fallback:
+        # keyed by the full source path so equal names in different
+        # project folders do not collide
+        tag = hashlib.md5(str(p).encode('utf-8', 'replace')).hexdigest()[:12]
+        base = _fallback_dir() / f"{p.name}.{tag}"
+    else:
+        base = p
+    return (base.with_name(base.name + CUBE_SUFFIX),
+            base.with_name(base.name + HEADER_SUFFIX))
+
+
+def read_sidecar(fdb_path, mmap: bool = True):
+    """Return the cached field dict for *fdb_path*, or None if absent/stale.
+
+    Keys: times, x_coords, cube, fire_center, fire_extent, md5.
+    """
+    src = Path(fdb_path)
+    try:
+        stamp = source_stamp(src)
+    except OSError:
+        return None
+    for fallback in (False, True):
+        cube_p, head_p = sidecar_paths(src, fallback)
+        if not (head_p.is_file() and cube_p.is_file()):
+            continue
+        try:
+            head = json.loads(head_p.read_text(encoding='utf-8'))
+            if head.get('version') != SIDECAR_VERSION:
+                continue
+            if head.get('size') != stamp['size']:
+                continue
+            if head.get('mtime_ns') != stamp['mtime_ns']:
+                if file_md5(src) != head.get('md5'):
+                    continue
+                head.update(stamp)
+                _write_json(head_p, head)
+            cube = np.load(cube_p, mmap_mode='r' if mmap else None)
+            if list(cube.shape) != head.get('shape'):
+                continue
+            return {
+                'times':       np.asarray(head['times'], dtype=float),
+                'x_coords':    np.asarray(head['x_coords'], dtype=float),
+                'cube':        cube,
+                'fire_center': head.get('fire_center'),
+                'fire_extent': (tuple(head['fire_extent'])
+                                if head.get('fire_extent') else None),
+                'md5':         head.get('md5'),
+            }
+        except Exception as e:
+            log.debug(f"FDB sidecar {head_p.name} unusable: {e}")
+    return None
+
+
+def write_sidecar(fdb_path, fdb, md5: str, stamp: dict = None):
+    """Persist a parsed FDBData as cube .npy + JSON header. Best effort."""
+    if fdb.cube is None or len(fdb.times) == 0:
+        return None
+    src = Path(fdb_path)
+    try:
+        stamp = stamp or source_stamp(src)
+    except OSError:
+        return None
+    head = {
+        'version':     SIDECAR_VERSION,
+        'source':      src.name,
+        'size':        stamp['size'],
+        'mtime_ns':    stamp['mtime_ns'],
+        'md5':         md5,
+        'species':     list(fdb.SPECIES),
+        'shape':       list(fdb.cube.shape),
+        'dtype':       str(fdb.cube.dtype),
+        'fire_center': fdb.fire_center,
+        'fire_extent': list(fdb.fire_extent) if fdb.fire_extent else None,
+        'times':       [float(v) for v in fdb.times],
+        'x_coords':    [float(v) for v in fdb.x_coords],
+    }
+    for fallback in (False, True):
+        cube_p, head_p = sidecar_paths(src, fallback)
+        try:
+            cube_p.parent.mkdir(parents=True, exist_ok=True)
+            tmp = cube_p.with_name(cube_p.name + f".{os.getpid()}.tmp")
+            with open(tmp, 'wb') as f:
+                np.save(f, np.ascontiguousarray(fdb.cube))
+            os.replace(tmp, cube_p)
+            _write_json(head_p, head)
+            return cube_p
+        except OSError as e:
+            log.debug(f"FDB sidecar not written to {cube_p.parent}: {e}")
+            try:
+                tmp.unlink()
+            except (OSError, UnboundLocalError):
+                pass
+    return None
+
+
+def _write_json(path: Path, obj: dict):
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(obj), encoding='utf-8')
+    os.replace(tmp, path)
+
+
+# ── Shared-memory transport (worker processes) ───────────────────────────────
+class SharedFdbSet:
+    """Parent-owned shared-memory copies of FDB cubes for a worker pool.
+
+        with SharedFdbSet() as shared:
+            desc = shared.share(fdb)        # small, picklable
+            ...                             # workers: attach_shared(desc)
+
+    One segment per source file (and cube dtype) however many decks use it. Segments are
+    closed and unlinked by close() / on leaving the with-block — only after
+    the workers are done with them.
+    """
+
+    def __init__(self):
+        self._segs = {}                     # resolved path -> (shm, desc)
+
+    def share(self, fdb):
+        """Descriptor of *fdb*'s cube in shared memory (None if not loaded)."""
+        if fdb is None or getattr(fdb, 'cube', None) is None:
+            return None
+        path = Path(fdb.path).resolve()
+        seg_key = (str(path), fdb.cube.dtype.str)
+        if seg_key in self._segs:
+            return self._segs[seg_key][1]
+        cube = np.ascontiguousarray(fdb.cube)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, cube.nbytes))
+        dst = np.ndarray(cube.shape, dtype=cube.dtype, buffer=shm.buf)
+        dst[...] = cube
+        del dst                             # no live export: close() must work
+        try:
+            key = FdbRegistry.key(path, cube.dtype)
+        except OSError:
+            key = None
+        desc = {
+            'segment':     shm.name,
+            'shape':       list(cube.shape),
+            'dtype':       cube.dtype.str,
+            'path':        str(path),
+            'key':         key,
+            'times':       [float(v) for v in fdb.times],
+            'x_coords':    [float(v) for v in fdb.x_coords],
+            'fire_center': fdb.fire_center,
+            'fire_extent': list(fdb.fire_extent) if fdb.fire_extent else None,
+            'md5':         fdb.md5,
+        }
+        self._segs[seg_key] = (shm, desc)
+        return desc
+
+    @property
+    def nbytes(self) -> int:
+        return sum(shm.size for shm, _ in self._segs.values())
+
+    def close(self):
+        for shm, _ in self._segs.values():
+            try:
+                shm.close()
+                shm.unlink()
+            except (OSError, BufferError) as e:
+                log.debug(f"FDB segment {shm.name} not released: {e}")
+        self._segs.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_ATTACHED = {}      # segment name -> (SharedMemory, FDBData), per process
+
+
+def attach_shared(desc):
+    """Read-only FDBData over a SharedFdbSet segment (worker side).
+
+    The view is also adopted into REGISTRY under the source's key, so an
+    EVCEngine built afterwards from the same FDB path picks it up through
+    load_fdb() instead of reading the file.
+    """
+    hit = _ATTACHED.get(desc['segment'])
+    if hit is not None:
+        return hit[1]
+    from evc_engine import FDBData
+    shm = _open_segment(desc['segment'])
+    cube = np.ndarray(tuple(desc['shape']), dtype=np.dtype(desc['dtype']),
+                      buffer=shm.buf)
+    cube.flags.writeable = False
+    fdb = FDBData.from_cube(desc['path'], desc['times'], desc['x_coords'], cube,
+                            desc['fire_center'], desc['fire_extent'], desc['md5'])
+    _ATTACHED[desc['segment']] = (shm, fdb)
+    if desc.get('key'):
+        REGISTRY.adopt(desc['key'], fdb)
+    return fdb
+
+
+_TRACK_LOCK = threading.Lock()
+
+
+def _open_segment(name):
+    # The parent owns the segment's lifetime: an attaching process must not
+    # register it with a resource tracker, or that tracker unlinks it (and
+    # warns of a leak) when the worker exits. track=False is Python 3.13+;
+    # before that SharedMemory() always registers, so the registration is
+    # skipped for the attach. (Unregistering after the fact is not enough:
+    # spawn workers share the parent's tracker, and the parent's own
+    # unlink() would then find its entry gone.)
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    with _TRACK_LOCK:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
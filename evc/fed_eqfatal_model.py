@@ -146,45 +146,12 @@ def fed_rate_binary(co_ppm, co2_pct, o2_pct, temp_c, radi_kw=None,
         rad_gate_kw=2.5, rad_denom=80.0, include_o2=False.
     Pass radi_kw=None to omit the radiant term (no RADI column available).
     """
-    co  = np.asarray(co_ppm,  dtype=float)
-    co2 = np.asarray(co2_pct, dtype=float)
-    T   = np.asarray(temp_c,  dtype=float)
-
-    # CO (-> FED2)
-    rmv = np.exp(CO_RMV_SLOPE * co2 + CO_RMV_ADD)
-    if co_rmv_div_7_1:
-        rmv = rmv / CO_RMV_DIV
-    r_co = np.where(co > 0.0, (co ** CO_CONC_POW) / co_dose_div * rmv, 0.0)
-
-    # HEAT (-> FED4)
-    if heat_always:
-        r_heat = np.exp(HEAT_SLOPE * T - HEAT_SUB)
-    else:
-        r_heat = np.where(T > heat_threshold_c,
-                          np.exp(HEAT_SLOPE * T - HEAT_SUB), 0.0)
-
-    # RADIANT (Purser radiant form q^1.33 / 80, gated)
-    if radi_kw is not None:
-        q = np.asarray(radi_kw, dtype=float)
-        r_rad = np.where(q > rad_gate_kw,
-                         np.power(np.maximum(q, 1e-9), 1.33) / rad_denom, 0.0)
-    else:
-        r_rad = 0.0
-
-    rate = r_co + r_heat + r_rad
-
-    # CO2 hyperventilation (small; guard CO2 < 11)
-    r_co2 = np.where(co2 < CO2H_GUARD,
-                     np.exp((co2 - CO2H_REF) * CO2H_SLOPE - CO2H_SUB), 0.0)
-    rate = rate + r_co2
-
-    # O2 depletion (dormant unless enabled)
-    if include_o2:
-        o2 = np.asarray(o2_pct, dtype=float)
-        depl = np.maximum(O2_AMBIENT - o2, 0.0)
-        rate = rate + np.exp(O2_SLOPE * depl - O2_SUB)
-
-    return rate
+    from fed_kernels import binary_rate
+    return binary_rate(co_ppm, co2_pct, o2_pct, temp_c, radi_kw,
+                       co_div=co_dose_div, rmv_div_7_1=co_rmv_div_7_1,
+                       heat_always=heat_always, heat_gate=heat_threshold_c,
+                       rad_gate=rad_gate_kw, rad_denom=rad_denom,
+                       include_o2=include_o2)
 
 
 def fed_rate_components(co_ppm, co2_pct, temp_c, o2_pct=None, radi_kw=None,
@@ -203,39 +170,23 @@ def fed_rate_components(co_ppm, co2_pct, temp_c, o2_pct=None, radi_kw=None,
     Returns dict with keys: FED_CO, FED_heat, FED_rad, FED_CO2hyp,
     and FED_O2 only when include_o2=True.
     """
-    co  = np.asarray(co_ppm,  dtype=float)
-    co2 = np.asarray(co2_pct, dtype=float)
-    T   = np.asarray(temp_c,  dtype=float)
-
-    rmv = np.exp(CO_RMV_SLOPE * co2 + CO_RMV_ADD)
-    if co_rmv_div_7_1:
-        rmv = rmv / CO_RMV_DIV
-    r_co = np.where(co > 0.0, (co ** CO_CONC_POW) / co_dose_div * rmv, 0.0)
-
-    if heat_always:
-        r_heat = np.exp(HEAT_SLOPE * T - HEAT_SUB)
-    else:
-        r_heat = np.where(T > heat_threshold_c,
-                          np.exp(HEAT_SLOPE * T - HEAT_SUB), 0.0)
-
+    from fed_kernels import (co_rate, heat_rate, radiant_rate, co2_hyper_rate,
+                             o2_depletion_rate)
+    r_co = co_rate(co_ppm, co2_pct, div=co_dose_div,
+                   rmv_div=CO_RMV_DIV if co_rmv_div_7_1 else None)
+    r_heat = heat_rate(temp_c, gate=None if heat_always else heat_threshold_c)
     if radi_kw is not None:
-        q = np.asarray(radi_kw, dtype=float)
-        r_rad = np.where(q > rad_gate_kw,
-                         np.power(np.maximum(q, 1e-9), 1.33) / rad_denom, 0.0)
+        r_rad = radiant_rate(radi_kw, gate=rad_gate_kw, denom=rad_denom)
     else:
         r_rad = np.zeros_like(r_co)
-
-    r_co2 = np.where(co2 < CO2H_GUARD,
-                     np.exp((co2 - CO2H_REF) * CO2H_SLOPE - CO2H_SUB), 0.0)
+    r_co2 = co2_hyper_rate(co2_pct)
 
     out = {"FED_CO": r_co, "FED_heat": r_heat,
            "FED_rad": r_rad, "FED_CO2hyp": r_co2}
     if include_o2:
         if o2_pct is None:
             raise ValueError("include_o2=True requires o2_pct")
-        o2 = np.asarray(o2_pct, dtype=float)
-        depl = np.maximum(O2_AMBIENT - o2, 0.0)
-        out["FED_O2"] = np.exp(O2_SLOPE * depl - O2_SUB)
+        out["FED_O2"] = o2_depletion_rate(o2_pct)
     return out
 
 
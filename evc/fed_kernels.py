@@ -0,0 +1,338 @@
+"""
+fed_kernels.py — the vectorized FED-rate kernels every FED implementation uses.
+
+The Purser-form dose terms used to be spelled out separately in six places
+(EVCEngine._fed_rate_binary / _fed_rate_purser_vb, fed_eqfatal_model,
+vb_fed_purser, fdb_fields.fed_increment and the single-point FED of the GUI),
+each with its own temporaries — np.where over freshly allocated exp() arrays,
+scalar max()/np.exp in fdb_fields — and the purser_pincap EQ_Fatal ran math.erf
+through an object-dtype np.frompyfunc. Those callers keep their own constants
+and combinations (they model different things) but compute every term here:
+
+    co_rate            CO^1.036 / div  [* exp(0.1903*CO2 + 2.004) / rmv_div]   CO > 0
+    heat_rate          exp(0.0273*T - 5.1849)                         [T > gate]
+    radiant_rate       q^1.33 / denom                                  q > gate
+    co2_hyper_rate     exp((CO2 - 20.721)*0.511 - 8.55)               CO2 < 11
+    co2_direct_rate    exp(0.5189*CO2 - 6.1623)                       CO2 > 1
+    o2_hypoxia_rate    exp(slope*(ambient - O2) - inter)              O2 < gate
+    o2_depletion_rate  exp(0.5189*max(20.72 - O2, 0) - 6.1623)
+    soot_rate          80 / 1.33^soot
+    iso13571_rates     CO^1.036/35000, ((21-O2)/11)^3/60, T^3.4/5e7   (GUI FED)
+
+binary_rate / purser_vb_rate are the two engine models (EVCEngine.
+VB_PURSER_FED) summed in the engines' order, so they are bit-identical to
+the former inline expressions.
+
+Every kernel writes into `out` (allocated when None) with in-place ufuncs;
+the summed models take a Workspace of reusable scratch buffers, so a
+timestep costs no temporaries beyond its result. `dtype` selects the
+working precision (float32 halves the memory traffic; the default float64
+is what the validated outputs were produced with). Gates are applied as
+"zero where NOT (condition)", so NaN inputs give 0 as np.where did.
+
+erf / normal_cdf are a true vectorized erf: piecewise Chebyshev
+interpolants of math.erf (relative error ~1e-15) evaluated by Clenshaw
+over whole arrays — no scipy, no Python-level loop.
+"""
+import math
+
+import numpy as np
+from numpy.polynomial import chebyshev as _cheb
+
+# Purser / VB constants (see fed_eqfatal_model and vb_fed_purser for the
+# provenance of each).
+CO_POW        = 1.036
+CO_DIV        = 36177.26
+RMV_SLOPE     = 0.1903
+RMV_ADD       = 2.004
+RMV_DIV       = 7.1
+HEAT_SLOPE    = 0.0273
+HEAT_SUB      = 5.1849
+RAD_POW       = 1.33
+CO2H_SLOPE    = 0.511
+CO2H_REF      = 20.721
+CO2H_SUB      = 8.55
+CO2H_GUARD    = 11.0
+CO2D_SLOPE    = 0.5189
+CO2D_SUB      = 6.1623
+CO2D_GATE     = 1.0
+O2_AMBIENT    = 20.721
+O2_GATE       = 11.0
+O2D_AMBIENT   = 20.72
+SOOT_BASE     = 1.33
+SOOT_NUM      = 80.0
+
+
+class Workspace:
+    """Scratch buffers reused across calls, grown on demand.
+
+        ws = Workspace()
+        rate = binary_rate(co, co2, o2, T, radi, ws=ws)   # no temporaries
+
+    get(i, n) is a length-n view of float buffer i, mask(i, n) of bool
+    buffer i. Not thread-safe; one per engine.
+    """
+
+    def __init__(self, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        self._f = {}
+        self._m = {}
+
+    def _take(self, bufs, i, shape, dtype):
+        n = int(np.prod(shape))
+        b = bufs.get(i)
+        if b is None or b.size < n:
+            b = bufs[i] = np.empty(max(n, 64), dtype=dtype)
+        return b[:n].reshape(shape)
+
+    def get(self, i, shape):
+        return self._take(self._f, i, shape, self.dtype)
+
+    def mask(self, i, shape):
+        return self._take(self._m, i, shape, np.bool_)
+
+
+def _arr(x, dtype):
+    return np.asarray(x, dtype=dtype)
+
+
+def _out(out, shape, dtype):
+    return np.empty(shape, dtype=dtype) if out is None else out
+
+
+def _zero_unless(out, op, x, level, mask=None):
+    """out = 0 where NOT op(x, level) — NaN comparisons are False, so NaN
+    inputs give 0. *mask* is a reusable bool buffer."""
+    cond = np.logical_not(op(x, level, out=mask), out=mask)
+    np.copyto(out, 0.0, where=cond)
+    return out
+
+
+# ── single terms ─────────────────────────────────────────────────────────────
+def co_rate(co, co2=None, *, div=CO_DIV, rmv_slope=RMV_SLOPE, rmv_add=RMV_ADD,
+            rmv_div=None, out=None, work=None, mask=None, dtype=np.float64):
+    """CO^1.036 / div, times the CO2 hyperventilation RMV exp(rmv_slope*CO2 +
+    rmv_add) [/ rmv_div] when co2 is given; 0 where not CO > 0."""
+    co = _arr(co, dtype)
+    out = _out(out, co.shape, dtype)
+    np.maximum(co, 0.0, out=out)                # no pow warnings on CO <= 0
+    np.power(out, CO_POW, out=out)
+    np.divide(out, div, out=out)
+    if co2 is not None:
+        rmv = _out(work, co.shape, dtype)
+        np.multiply(_arr(co2, dtype), rmv_slope, out=rmv)
+        np.add(rmv, rmv_add, out=rmv)
+        np.exp(rmv, out=rmv)
+        if rmv_div is not None:
+            np.divide(rmv, rmv_div, out=rmv)
+        np.multiply(out, rmv, out=out)
+    return _zero_unless(out, np.greater, co, 0.0, mask)
+
+
+def heat_rate(temp, *, slope=HEAT_SLOPE, sub=HEAT_SUB, gate=None, out=None,
+              mask=None, dtype=np.float64):
+    """exp(slope*T - sub); with *gate*, 0 where not T > gate."""
+    T = _arr(temp, dtype)
+    out = _out(out, T.shape, dtype)
+    np.multiply(T, slope, out=out)
+    np.subtract(out, sub, out=out)
+    np.exp(out, out=out)
+    if gate is not None:
+        _zero_unless(out, np.greater, T, gate, mask)
+    return out
+
+
+def radiant_rate(q, *, gate=2.5, denom=80.0, out=None, mask=None, dtype=np.float64):
+    """Purser radiant form q^1.33 / denom, 0 where not q > gate."""
+    q = _arr(q, dtype)
+    out = _out(out, q.shape, dtype)
+    np.maximum(q, 1e-9, out=out)
+    np.power(out, RAD_POW, out=out)
+    np.divide(out, denom, out=out)
+    return _zero_unless(out, np.greater, q, gate, mask)
+
+
+def co2_hyper_rate(co2, *, out=None, mask=None, dtype=np.float64):
+    """exp((CO2 - 20.721)*0.511 - 8.55), 0 where not CO2 < 11."""
+    co2 = _arr(co2, dtype)
+    out = _out(out, co2.shape, dtype)
+    np.subtract(co2, CO2H_REF, out=out)
+    np.multiply(out, CO2H_SLOPE, out=out)
+    np.subtract(out, CO2H_SUB, out=out)
+    np.exp(out, out=out)
+    return _zero_unless(out, np.less, co2, CO2H_GUARD, mask)
+
+
+def co2_direct_rate(co2, *, out=None, mask=None, dtype=np.float64):
+    """CO2-direct incapacitation exp(0.5189*CO2 - 6.1623), 0 where not CO2 > 1."""
+    co2 = _arr(co2, dtype)
+    out = _out(out, co2.shape, dtype)
+    np.multiply(co2, CO2D_SLOPE, out=out)
+    np.subtract(out, CO2D_SUB, out=out)
+    np.exp(out, out=out)
+    return _zero_unless(out, np.greater, co2, CO2D_GATE, mask)
+
+
+def o2_hypoxia_rate(o2, *, slope, inter, ambient=O2_AMBIENT, gate=O2_GATE,
+                    out=None, mask=None, dtype=np.float64):
+    """exp(slope*(ambient - O2) - inter), 0 where not O2 < gate."""
+    o2 = _arr(o2, dtype)
+    out = _out(out, o2.shape, dtype)
+    np.subtract(ambient, o2, out=out)
+    np.multiply(out, slope, out=out)
+    np.subtract(out, inter, out=out)
+    np.exp(out, out=out)
+    return _zero_unless(out, np.less, o2, gate, mask)
+
+
+def o2_depletion_rate(o2, *, out=None, dtype=np.float64):
+    """exp(0.5189*max(20.72 - O2, 0) - 6.1623) — the binary's dormant term."""
+    o2 = _arr(o2, dtype)
+    out = _out(out, o2.shape, dtype)
+    np.subtract(O2D_AMBIENT, o2, out=out)
+    np.maximum(out, 0.0, out=out)
+    np.multiply(out, CO2D_SLOPE, out=out)
+    np.subtract(out, CO2D_SUB, out=out)
+    return np.exp(out, out=out)
+
+
+def soot_rate(soot, *, out=None, dtype=np.float64):
+    """Visibility term 80 / 1.33^soot."""
+    soot = _arr(soot, dtype)
+    out = _out(out, soot.shape, dtype)
+    np.power(SOOT_BASE, soot, out=out)
+    return np.divide(SOOT_NUM, out, out=out)
+
+
+def iso13571_rates(co, o2, temp, dtype=np.float64):
+    """(CO, O2, heat) per-minute rates of the simplified ISO 13571 form:
+    CO^1.036/35000 (CO > 0), ((21 - O2)/11)^3/60 (O2 < 21), T^3.4/5e7
+    (T > 20)."""
+    r_co = co_rate(co, div=35000.0, dtype=dtype)
+    o2 = _arr(o2, dtype)
+    r_o2 = np.subtract(21.0, o2)
+    np.divide(r_o2, 11.0, out=r_o2)
+    np.power(r_o2, 3, out=r_o2)
+    np.divide(r_o2, 60.0, out=r_o2)
+    _zero_unless(r_o2, np.less, o2, 21.0)
+    T = _arr(temp, dtype)
+    r_heat = np.maximum(T, 0.0)
+    np.power(r_heat, 3.4, out=r_heat)
+    np.divide(r_heat, 5e7, out=r_heat)
+    _zero_unless(r_heat, np.greater, T, 20.0)
+    return r_co, r_o2, r_heat
+
+
+# ── the engine models, summed ────────────────────────────────────────────────
+def binary_rate(co, co2, o2, temp, radi=None, *, co_div=CO_DIV, rmv_div_7_1=True,
+                heat_always=True, heat_gate=40.0, rad_gate=2.5, rad_denom=80.0,
+                include_o2=False, out=None, ws=None, dtype=None):
+    """Per-minute binary-exact FED rate (EVCEngine._fed_rate_binary,
+    fed_eqfatal_model.fed_rate_binary): CO + heat [+ radiant] + CO2
+    hyperventilation [+ O2 depletion]."""
+    dtype = np.dtype(dtype or (ws.dtype if ws is not None else np.float64))
+    co, co2, T = _arr(co, dtype), _arr(co2, dtype), _arr(temp, dtype)
+    shape = np.broadcast_shapes(co.shape, co2.shape, T.shape)
+    co, co2, T = (np.broadcast_to(a, shape) for a in (co, co2, T))
+    ws = ws or Workspace(dtype)
+    out = _out(out, shape, dtype)
+    term, m = ws.get(0, shape), ws.mask(0, shape)
+    co_rate(co, co2, div=co_div, rmv_div=RMV_DIV if rmv_div_7_1 else None,
+            out=out, work=term, mask=m, dtype=dtype)
+    out += heat_rate(T, gate=None if heat_always else heat_gate, out=term, mask=m,
+                     dtype=dtype)
+    if radi is not None:
+        out += radiant_rate(np.broadcast_to(_arr(radi, dtype), shape), gate=rad_gate,
+                            denom=rad_denom, out=term, mask=m, dtype=dtype)
+    out += co2_hyper_rate(co2, out=term, mask=m, dtype=dtype)
+    if include_o2:
+        out += o2_depletion_rate(np.broadcast_to(_arr(o2, dtype), shape),
+                                 out=term, dtype=dtype)
+    return out
+
+
+def purser_vb_rate(co, co2, o2, temp, radi=None, *, co_div=CO_DIV, rmv_div_7_1=False,
+                   two_way=False, rad_gate=2.5, rad_denom=80.0, out=None, ws=None,
+                   dtype=None):
+    """Per-minute FED rate of the literal VB exposure loop (EVCEngine.
+    _fed_rate_purser_vb): CO + heat (T > 40) + CO2-direct + O2 hypoxia
+    (one- / two-way bore constants) [+ radiant]."""
+    dtype = np.dtype(dtype or (ws.dtype if ws is not None else np.float64))
+    co, co2, o2, T = (_arr(a, dtype) for a in (co, co2, o2, temp))
+    shape = np.broadcast_shapes(co.shape, co2.shape, o2.shape, T.shape)
+    co, co2, o2, T = (np.broadcast_to(a, shape) for a in (co, co2, o2, T))
+    ws = ws or Workspace(dtype)
+    out = _out(out, shape, dtype)
+    term, m = ws.get(0, shape), ws.mask(0, shape)
+    co_rate(co, co2, div=co_div, rmv_div=RMV_DIV if rmv_div_7_1 else None,
+            out=out, work=term, mask=m, dtype=dtype)
+    out += heat_rate(T, gate=40.0, out=term, mask=m, dtype=dtype)
+    out += co2_direct_rate(co2, out=term, mask=m, dtype=dtype)
+    slope, inter = (0.511, 8.55) if two_way else (0.54, 8.13)
+    out += o2_hypoxia_rate(o2, slope=slope, inter=inter, out=term, mask=m, dtype=dtype)
+    if radi is not None:
+        out += radiant_rate(np.broadcast_to(_arr(radi, dtype), shape), gate=rad_gate,
+                            denom=rad_denom, out=term, mask=m, dtype=dtype)
+    return out
+
+
+# ── vectorized erf ───────────────────────────────────────────────────────────
+# Pieces of [0, ERF_ONE): [0, 1] as erf(x)/x in u = x^2 (keeps the relative
+# accuracy at tiny x), then erf(x) itself on each interval; erf = +-1 beyond
+# ERF_ONE (1 - erf(6) < 2.2e-17). Coefficients interpolate math.erf at
+# Chebyshev points once, at import.
+ERF_ONE = 6.0
+_ERF_EDGES = (1.0, 2.0, 3.0, 4.0, ERF_ONE)
+_ERF_DEG = 18
+
+
+def _erf_pieces():
+    verf = np.vectorize(math.erf, otypes=[float])
+
+    def small(t):                               # t in [-1, 1] -> u = x^2 in [0, 1]
+        x = np.sqrt(0.5 * (t + 1.0))
+        return np.where(x > 0, verf(x) / np.where(x > 0, x, 1.0), 2.0 / math.sqrt(math.pi))
+
+    coefs = [_cheb.chebinterpolate(small, _ERF_DEG)]
+    for a, b in zip(_ERF_EDGES[:-1], _ERF_EDGES[1:]):
+        coefs.append(_cheb.chebinterpolate(
+            lambda t, a=a, b=b: verf(0.5 * (b - a) * t + 0.5 * (a + b)), _ERF_DEG))
+    return np.array(coefs)
+
+
+_ERF_COEF = _erf_pieces()
+
+
+def erf(x, out=None):
+    """Vectorized error function (|error| ~1e-15 relative to math.erf)."""
+    x = np.asarray(x, dtype=np.float64)
+    ax = np.abs(x)
+    with np.errstate(invalid='ignore', over='ignore'):         # +-inf / NaN
+        y = _erf_abs(ax)
+    out = _out(out, x.shape, np.float64)
+    return np.copysign(y, x, out=out)                          # NaN stays NaN
+
+
+def _erf_abs(ax):
+    piece = np.searchsorted(_ERF_EDGES, ax, side='left')      # 0: ax <= 1
+    lo = np.take((0.0,) + _ERF_EDGES, np.minimum(piece, len(_ERF_EDGES) - 1))
+    hi = np.take(_ERF_EDGES, np.minimum(piece, len(_ERF_EDGES) - 1))
+    small = piece == 0
+    t = np.where(small, 2.0 * ax * ax - 1.0, (2.0 * ax - (lo + hi)) / (hi - lo))
+    c = _ERF_COEF[np.minimum(piece, len(_ERF_EDGES) - 1)]      # (..., deg+1)
+    # Clenshaw over every element with its own piece's coefficients
+    b1 = np.zeros_like(t)
+    b2 = np.zeros_like(t)
+    for k in range(_ERF_DEG, 0, -1):
+        b1, b2 = 2.0 * t * b1 - b2 + c[..., k], b1
+    y = t * b1 - b2 + c[..., 0]
+    y = np.where(small, ax * y, y)
+    return np.where(ax >= ERF_ONE, 1.0, y)
+
+
+def normal_cdf(z, out=None):
+    """Standard normal CDF 0.5*(1 + erf(z/sqrt 2)), vectorized."""
+    out = erf(np.asarray(z, dtype=np.float64) / math.sqrt(2.0), out=out)
+    out += 1.0
+    out *= 0.5
+    return out
@@ -231,30 +231,17 @@ def plot_fdb_tec_style(fdb, out_path: Path | str | None = None,
 # Project-level helpers
 # ─────────────────────────────────────────────────────────────────────────────
 def _load_fdb(fdb_path: Path):
-    """Parse an FDB file using the project's FDBData class."""
-    FDBData = None
-    try:
-        # Works when evc/ is on sys.path (qra_main_app adds it) or when
-        # running the CLI from inside the evc/ directory.
-        from qra_system_v2.evc.evc_engine_old import FDBData
-    except ImportError:
-        try:
-            # Works when running from the repo root with evc/ as a package.
-            from qra_system_v2.evc.evc_engine_old import FDBData
-        except ImportError:
-            # Last resort: import evc_engine.py from this file's own folder.
-            import importlib.util
-            _here = Path(__file__).resolve().parent / "evc_engine.py"
-            if _here.exists():
-                spec = importlib.util.spec_from_file_location("evc_engine", _here)
-                mod = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(mod)
-                FDBData = mod.FDBData
-    if FDBData is None:                              # pragma: no cover
-        raise ImportError(
-            "evc_engine.FDBData is required to parse FDB files "
-            "(make sure tec_style_graphs.py sits next to evc_engine.py)")
-    return FDBData(Path(fdb_path))
+    """Load an FDB through the shared loader (fdb_store → evc_engine.FDBData).
+
+    Goes through the same binary sidecar as EVCEngine, so a graph of an FDB
+    the batch already ran is a memory-map, not a second text parse.
+    """
+    # qra_main_app puts evc/ on sys.path; the CLI run from elsewhere may not.
+    _here = str(Path(__file__).resolve().parent)
+    if _here not in sys.path:
+        sys.path.insert(0, _here)
+    from fdb_store import load_fdb
+    return load_fdb(Path(fdb_path))
 
 
 def generate_scenario_graph(fdb_path: Path | str,
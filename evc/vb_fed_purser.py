@@ -87,25 +87,20 @@ def fed_rate_components(co_ppm, co2_pct, o2_pct, temp_c, soot=None,
     soot    : extinction/soot proxy used by the +0x80 term (optional)
     two_way : select the O2 slope/intercept of the second bore (DAT_004a623c==2)
     """
-    co_ppm  = np.asarray(co_ppm,  dtype=float)
-    co2_pct = np.asarray(co2_pct, dtype=float)
-    o2_pct  = np.asarray(o2_pct,  dtype=float)
-    temp_c  = np.asarray(temp_c,  dtype=float)
+    from fed_kernels import (co_rate, heat_rate, co2_direct_rate,
+                             o2_hypoxia_rate, soot_rate)
 
     # HEAT — exp(0.0273*T - 5.1849), only when T > 40C   ⟨MOV.txt:434-463⟩
-    heat = np.where(temp_c > HEAT_GATE_C,
-                    np.exp(HEAT_SLOPE * temp_c - HEAT_INTERCEPT), 0.0)
+    heat = heat_rate(temp_c, slope=HEAT_SLOPE, sub=HEAT_INTERCEPT, gate=HEAT_GATE_C)
 
     # CO — CO^1.036 / 36177.26, multiplied by the CO2 hyperventilation factor.
     #      ⟨MOV.txt:360-384⟩ ; local_a0 = VCO2 computed at 341-356.
-    co_safe = np.maximum(co_ppm, 0.0)
-    co = np.where(co_safe > 0.0,
-                  (co_safe ** CO_EXPONENT) / CO_DIVISOR * vco2(co2_pct), 0.0)
+    co = co_rate(co_ppm, co2_pct, div=CO_DIVISOR,
+                 rmv_slope=VCO2_SLOPE, rmv_add=VCO2_INTERCEPT)
 
     # CO2 direct incapacitation — exp(0.5189*CO2 - 6.1623), only CO2 > 1.0%
     #      ⟨MOV.txt:403-432⟩
-    co2 = np.where(co2_pct > CO2_DIR_GATE,
-                   np.exp(CO2_DIR_SLOPE * co2_pct - CO2_DIR_INTER), 0.0)
+    co2 = co2_direct_rate(co2_pct)
 
     # O2 hypoxia — exp(slope*(20.721 - O2) - inter), only when O2 < 11%
     #      ⟨MOV.txt:307-339 (pass A: 8.13/0.54), 569-600 (pass B: 8.55/0.511)⟩
@@ -113,15 +108,14 @@ def fed_rate_components(co_ppm, co2_pct, o2_pct, temp_c, soot=None,
         o2_slope, o2_inter = O2_SLOPE_B, O2_INTER_B
     else:
         o2_slope, o2_inter = O2_SLOPE_A, O2_INTER_A
-    o2 = np.where(o2_pct < O2_GATE_PCT,
-                  np.exp(o2_slope * (O2_AMBIENT - o2_pct) - o2_inter), 0.0)
+    o2 = o2_hypoxia_rate(o2_pct, slope=o2_slope, inter=o2_inter,
+                         ambient=O2_AMBIENT, gate=O2_GATE_PCT)
 
     out = {"heat": heat, "co": co, "co2": co2, "o2": o2}
 
     # SOOT / visibility term — local_dc * 80 / 1.33^soot   ⟨MOV.txt:255-268,554-566⟩
     if soot is not None:
-        soot = np.asarray(soot, dtype=float)
-        out["soot"] = SOOT_NUM / np.power(SOOT_BASE, soot)
+        out["soot"] = soot_rate(soot)
     return out
 
 
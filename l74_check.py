@@ -48,6 +48,7 @@ for _p in (_here, os.path.join(_here, "evc")):
     if _p not in sys.path:
         sys.path.insert(0, _p)
 from l74_model import l74_multiplier, l74_time_from_neff
+from evc_deck import DeckTable
 
 DEFAULT_WS = 0.5
 
@@ -59,18 +60,17 @@ def _num(s: str):
 
 def parse_evc(path: str) -> dict:
     """Pull the L74-relevant fields out of a VB .evc deck."""
-    txt = open(path, encoding="latin-1").read().replace("\r", "").split("\n")
-    g = lambda n: txt[n - 1] if n - 1 < len(txt) else ""
+    d = DeckTable.read(path)
     # L63 is "<fire_pos> , <L> , <L>" — length is the middle field.
-    l63 = [p.strip() for p in g(63).split(",")]
+    l63 = [p.strip() for p in d.line(63).split(",")]
     length = _num(l63[1]) if len(l63) > 1 else None
     return {
         "file": os.path.basename(path),
-        "tunnel": g(1).strip(),
-        "hrr": _num(g(68)),
+        "tunnel": d.line(1),
+        "hrr": d.float(68, default=None),
         "L": length,
-        "fdb": _num(g(73)),
-        "vb_l74": _num(g(74)),
+        "fdb": d.float(73, default=None),
+        "vb_l74": d.float(74, default=None),
     }
 
 
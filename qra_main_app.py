@@ -5177,16 +5177,132 @@ class QRAMainWindow(QMainWindow):
         _sc_r1.addWidget(self.evc_s4_stop_evac); _sc_r1.addStretch()
         _sc_vl.addLayout(_sc_r1)
 
+        # Adaptive iteration count (evc_engine.AdaptiveIterations): each deck
+        # runs until its EQ-fatal / evacuee means are within tolerance.
+        _sc_r1b = QHBoxLayout()
+        _spin_ss = ("QSpinBox{background:white;border:1px solid #95a5a6;"
+                    "border-radius:3px;font-size:12px;padding:1px 4px;}")
+        self.evc_s4_chk_adaptive = QCheckBox("Adaptive runs")
+        self.evc_s4_chk_adaptive.setStyleSheet("font-size:12px;")
+        self.evc_s4_chk_adaptive.setToolTip(
+            "Run each deck from 'min' runs, adding runs until the 95% confidence\n"
+            "half-width of the mean EQ fatal and of the mean evacuee count are\n"
+            "within tolerance (absolute, or 'rel' × mean if looser), up to 'max'\n"
+            "(Runs = the Runs / Session value). Decks without an .evc run the\n"
+            "fixed count.")
+        _sc_r1b.addWidget(self.evc_s4_chk_adaptive)
+        _adaptive_inputs = []
+
+        def _adaptive_spin(label, box, tip):
+            _l = QLabel(label); _l.setStyleSheet("font-size:12px;")
+            box.setFixedHeight(26); box.setFixedWidth(72)
+            box.setStyleSheet(_spin_ss.replace("QSpinBox", box.__class__.__name__))
+            box.setToolTip(tip)
+            _sc_r1b.addSpacing(10); _sc_r1b.addWidget(_l); _sc_r1b.addWidget(box)
+            _adaptive_inputs.append(box)
+            return box
+
+        self.evc_s4_adaptive_min = _adaptive_spin("min", QSpinBox(),
+            "Runs before the tolerance is first checked (at least 4).")
+        self.evc_s4_adaptive_min.setRange(4, 999); self.evc_s4_adaptive_min.setValue(5)
+        self.evc_s4_adaptive_max = _adaptive_spin("max", QSpinBox(),
+            "Run cap per deck; 'Runs' = the Runs / Session value.")
+        self.evc_s4_adaptive_max.setRange(0, 9999); self.evc_s4_adaptive_max.setValue(0)
+        self.evc_s4_adaptive_max.setSpecialValueText("Runs")
+        self.evc_s4_eq_fatal_tol = _adaptive_spin("EQ fatal ±", QDoubleSpinBox(),
+            "Tolerance on the mean EQ fatal [persons].")
+        self.evc_s4_eq_fatal_tol.setDecimals(3); self.evc_s4_eq_fatal_tol.setRange(0.0, 100.0)
+        self.evc_s4_eq_fatal_tol.setSingleStep(0.01); self.evc_s4_eq_fatal_tol.setValue(0.05)
+        self.evc_s4_evacuees_tol = _adaptive_spin("Evacuees ±", QDoubleSpinBox(),
+            "Tolerance on the mean evacuee count [persons].")
+        self.evc_s4_evacuees_tol.setDecimals(1); self.evc_s4_evacuees_tol.setRange(0.0, 1000.0)
+        self.evc_s4_evacuees_tol.setSingleStep(0.5); self.evc_s4_evacuees_tol.setValue(2.0)
+        self.evc_s4_rel_tol = _adaptive_spin("rel", QDoubleSpinBox(),
+            "Relative tolerance (× |mean|), used where looser than the absolute one.")
+        self.evc_s4_rel_tol.setDecimals(3); self.evc_s4_rel_tol.setRange(0.0, 1.0)
+        self.evc_s4_rel_tol.setSingleStep(0.005); self.evc_s4_rel_tol.setValue(0.02)
+        for _w in _adaptive_inputs:
+            _w.setEnabled(False)
+            self.evc_s4_chk_adaptive.toggled.connect(_w.setEnabled)
+        _sc_r1b.addStretch()
+        _sc_vl.addLayout(_sc_r1b)
+
         _sc_r2 = QHBoxLayout()
         self.evc_s4_chk_no_graph = QCheckBox("Graph 안보기")
         self.evc_s4_chk_verbose  = QCheckBox("Simulation별 상세출력")
         for _cb in (self.evc_s4_chk_no_graph, self.evc_s4_chk_verbose):
             _cb.setStyleSheet("font-size:12px;")
+        self.evc_s4_chk_verbose.setToolTip(
+            "Time every engine phase of each run and log the per-deck profile\n"
+            "table (console + <project>/evc_profile.txt) when the batch ends.\n"
+            "Results are unchanged; the timers cost a little run time.")
         _sc_r2.addWidget(self.evc_s4_chk_no_graph)
         _sc_r2.addSpacing(20); _sc_r2.addWidget(self.evc_s4_chk_verbose)
         _sc_r2.addStretch()
         _sc_vl.addLayout(_sc_r2)
 
+        # Batch settings row — saved with the project (evc_batch_settings.json)
+        # and read back when it is opened (_batch_settings_load).
+        _sc_r2b = QHBoxLayout()
+        _fb_lbl = QLabel("FDB cache (MB) :")
+        _fb_lbl.setStyleSheet("font-size:12px;")
+        self.evc_s4_fdb_budget = QSpinBox()
+        self.evc_s4_fdb_budget.setRange(256, 262144)
+        self.evc_s4_fdb_budget.setSingleStep(512)
+        self.evc_s4_fdb_budget.setValue(4096)
+        self.evc_s4_fdb_budget.setFixedWidth(84); self.evc_s4_fdb_budget.setFixedHeight(26)
+        self.evc_s4_fdb_budget.setStyleSheet(_spin_ss)
+        self.evc_s4_fdb_budget.setToolTip(
+            "RAM budget of the shared FDB cache: parsed .fdb fields beyond it\n"
+            "are evicted least-recently-used first and re-read when needed.\n"
+            "Default 4096 MB (or the EVC_FDB_BUDGET_MB environment variable).")
+        _wk_lbl = QLabel("Workers :")
+        _wk_lbl.setStyleSheet("font-size:12px;")
+        self.evc_s4_workers = QSpinBox()
+        self.evc_s4_workers.setRange(0, 256); self.evc_s4_workers.setValue(0)
+        self.evc_s4_workers.setSpecialValueText("Auto")
+        self.evc_s4_workers.setFixedWidth(64); self.evc_s4_workers.setFixedHeight(26)
+        self.evc_s4_workers.setStyleSheet(_spin_ss)
+        self.evc_s4_workers.setToolTip(
+            "Worker processes for the decks with an .evc file.\n"
+            "Auto = one per CPU; 1 = run every deck serially in the GUI process.")
+        self.evc_s4_chk_pin_seed = QCheckBox("Pin seed")
+        self.evc_s4_chk_pin_seed.setStyleSheet("font-size:12px;")
+        self.evc_s4_chk_pin_seed.setToolTip(
+            "Replay every batch from the same seed (drawn on the first pinned\n"
+            "batch and kept with the project) — same inputs, same numbers,\n"
+            "serially or on the pool. Unpinned, each batch draws a new seed\n"
+            "so a rerun adds new iterations.")
+        self.evc_s4_seed = QLineEdit()
+        self.evc_s4_seed.setPlaceholderText("drawn on first run")
+        self.evc_s4_seed.setFixedWidth(150); self.evc_s4_seed.setFixedHeight(26)
+        self.evc_s4_seed.setEnabled(False)
+        self.evc_s4_chk_pin_seed.toggled.connect(self.evc_s4_seed.setEnabled)
+        self.evc_s4_chk_compact = QCheckBox("Compact (float32)")
+        self.evc_s4_chk_compact.setStyleSheet("font-size:12px;")
+        self.evc_s4_chk_compact.setToolTip(
+            "Hold the FDB fields and occupant kinematics in float32: about half\n"
+            "the memory per deck, with results close to — not identical with —\n"
+            "the default double-precision run. For batches short of memory.")
+        _sc_r2b.addWidget(_fb_lbl); _sc_r2b.addWidget(self.evc_s4_fdb_budget)
+        _sc_r2b.addSpacing(10); _sc_r2b.addWidget(self.evc_s4_chk_compact)
+        _sc_r2b.addSpacing(18)
+        _sc_r2b.addWidget(_wk_lbl); _sc_r2b.addWidget(self.evc_s4_workers)
+        _sc_r2b.addSpacing(18)
+        _sc_r2b.addWidget(self.evc_s4_chk_pin_seed); _sc_r2b.addWidget(self.evc_s4_seed)
+        self.evc_s4_chk_cache = QCheckBox("Reuse cached results")
+        self.evc_s4_chk_cache.setStyleSheet("font-size:12px;")
+        self.evc_s4_chk_cache.setToolTip(
+            "With a pinned seed: keep each deck's batch in <project>/evc_cache/\n"
+            "and, on a re-batch, reuse it for every deck whose inputs (deck, FDB,\n"
+            "engine settings, runs, seed) are unchanged — those rows are not\n"
+            "saved to the DB again. Without a pinned seed nothing is cached.")
+        self.evc_s4_chk_cache.setEnabled(False)
+        self.evc_s4_chk_pin_seed.toggled.connect(self.evc_s4_chk_cache.setEnabled)
+        _sc_r2b.addSpacing(10); _sc_r2b.addWidget(self.evc_s4_chk_cache)
+        _sc_r2b.addStretch()
+        _sc_vl.addLayout(_sc_r2b)
+
         _sc_r3 = QHBoxLayout(); _sc_r3.addStretch()
         self.evc_s4_batch_cancel_btn = QPushButton("Batch Cancel")
         self.evc_s4_batch_cancel_btn.setFixedHeight(30)
@@ -5564,6 +5680,7 @@ class QRAMainWindow(QMainWindow):
             self.evc_s4_proj_folder.setText(folder)
             # Also sync to the main project_dir so other tabs are aware
             self.project_dir = folder
+            self._batch_settings_load(folder)
 
     @staticmethod
     def _parse_fdb_fire_pt(fdb_path) -> float | None:
@@ -5678,6 +5795,22 @@ class QRAMainWindow(QMainWindow):
                     fdb_by_stem[_f.stem.lower()] = _f
             unique_fdb.sort(key=lambda f: (str(f.parent).lower(), f.stem.lower()))
 
+        # 🔧 FDB fingerprints (evc/fdb_fingerprint.py): which FDBs carry the
+        # same field, kept in the fdb_fingerprints table of the project DB —
+        # an unchanged file costs one stat, a new one a ~1 MB sample, and
+        # only sample collisions are hashed in full. In-memory without a
+        # project.
+        fdb_canon = {}
+        if unique_fdb:
+            try:
+                from fdb_fingerprint import FingerprintIndex
+                _fp_db = self._get_project_db_path() if self.project_dir else None
+                with FingerprintIndex(_fp_db) as _fpi:
+                    fdb_canon = _fpi.alias_groups(unique_fdb)
+                print(f"[fingerprint] {_fpi.summary()}")
+            except Exception as _fpe:
+                print(f"[fingerprint] FDB fingerprint scan failed: {_fpe}")
+
         # ── 3. EVC → FDB matcher ──────────────────────────────────────────────
         # 🔧 SCENARIO-SAFE MATCHING: the wind condition lives ENTIRELY in the
         # FDB (FVM/FVP decks are byte-identical; 020CFVM.FDB ≠ 020CFVP.FDB),
@@ -5751,14 +5884,14 @@ class QRAMainWindow(QMainWindow):
                 # already accumulated in each file before running more.
                 _display_n = default_n
                 try:
-                    _lines_tmp = _f.read_bytes().decode("cp949", errors="replace"
-                                 ).replace("\r\n", "\n").replace("\r", "\n").split("\n")
-                    _r10_existing = int(float(_lines_tmp[9].strip())) if len(_lines_tmp) > 9 and _lines_tmp[9].strip() else 0
-                    _r74_existing = float(_lines_tmp[73].strip()) if len(_lines_tmp) > 73 and _lines_tmp[73].strip() else 0.0
-                    _r73_existing = float(_lines_tmp[72].strip()) if len(_lines_tmp) > 72 and _lines_tmp[72].strip() else 0.0
-                    _r9_existing  = float(_lines_tmp[8].strip().split()[0]) if len(_lines_tmp) > 8 and _lines_tmp[8].strip() else 0.5
-                    _r3_existing  = float(_lines_tmp[2].strip()) if len(_lines_tmp) > 2 and _lines_tmp[2].strip() else 0.0
-                    _r24_existing = float(_lines_tmp[23].strip()) if len(_lines_tmp) > 23 and _lines_tmp[23].strip() else 0.0
+                    from evc_deck import DeckTable
+                    _deck_tmp = DeckTable.read(_f)
+                    _r10_existing = int(_deck_tmp.float(10, default=0.0))
+                    _r74_existing = _deck_tmp.float(74, default=0.0)
+                    _r73_existing = _deck_tmp.float(73, default=0.0)
+                    _r9_existing  = _deck_tmp.float(9, default=0.5)
+                    _r3_existing  = _deck_tmp.float(3, default=0.0)
+                    _r24_existing = _deck_tmp.float(24, default=0.0)
                     if (_r10_existing > 0 and _r74_existing > 0 and _r9_existing > 0
                             and _r3_existing > 0 and _r24_existing > 0):
                         _n_occ_est  = (_r74_existing - _r73_existing) * _r9_existing * 200.0 / _r3_existing
@@ -5787,7 +5920,10 @@ class QRAMainWindow(QMainWindow):
                     if _pt is not None: fdb_fire_pts.append(_pt)
                     _f3 = QTableWidgetItem(_fd)
                     _f3.setBackground(QColor(255,255,210))
-                    _f3.setToolTip(str(_mf) + (f"\nFIRE PT={_pt:.3f}m" if _pt else ""))
+                    _same = fdb_canon.get(str(_mf), str(_mf))
+                    _f3.setToolTip(str(_mf) + (f"\nFIRE PT={_pt:.3f}m" if _pt else "")
+                                   + (f"\nSame field as {Path(_same).name}"
+                                      if _same != str(_mf) else ""))
                 else:
                     _f3 = QTableWidgetItem("(no match)")
                     _f3.setBackground(QColor(255,220,220))
@@ -5828,7 +5964,9 @@ class QRAMainWindow(QMainWindow):
         nm = sum(1 for i in range(min(ne, n_rows))
                  if tbl.item(i,3) and tbl.item(i,3).text() not in ("","(no match)"))
         ns = len({str(_f.parent) for _f in unique_evc}) if unique_evc else 0
-        msg = (f"✅ {ne} EVC file(s) in {ns} folder(s)  |  {nf} FDB file(s)  |  {nm} matched"
+        nd = len(set(fdb_canon.values())) if fdb_canon else nf
+        msg = (f"✅ {ne} EVC file(s) in {ns} folder(s)  |  {nf} FDB file(s), "
+               f"{nd} distinct field(s)  |  {nm} matched"
                if ne else f"⚠  No .evc files found in {evc_dir}")
         self.statusBar().showMessage(msg, 10000)
         if hasattr(self, "evc_s4_sim_status_lbl"):
@@ -6026,6 +6164,27 @@ class QRAMainWindow(QMainWindow):
         if not pairs:
             QMessageBox.warning(self, "No Files", "No EVC files loaded. Click 'Read Files' first.")
             return
+        proj = self.evc_s4_proj_folder.text().strip() or (self.project_dir or "")
+        # 🔧 Batch settings (Simulation Control, evc/evc_batch_settings.py)
+        # are saved with the project, so a re-batch runs with the same ones.
+        # Adaptive iteration count ("Adaptive runs") — None: the spinner's
+        # fixed count for every deck.
+        try:
+            _bs = self._batch_settings()
+            _adaptive = _bs.adaptive_rule(self.evc_s4_n_run.value())
+        except ValueError as _se:
+            QMessageBox.warning(self, "Batch Settings", str(_se))
+            return
+        # 🔧 Reproducible seeding: run k of deck D draws from
+        # evc_engine.iteration_rng(seed, D, k), so a batch replays exactly from
+        # its seed (reported in the completion message) and gives the same
+        # numbers serially or on the process pool. "Pin seed" keeps one seed
+        # with the project; a pinned seed drawn here is shown and saved.
+        _seed = _bs.batch_seed()
+        if _bs.pin_seed:
+            self.evc_s4_seed.setText(str(_seed))
+        _bs.save(proj)
+        _bs.apply_fdb_budget()
 
         self._batch_evc_cancel_flag = False
         self.evc_sim_run_btn.setEnabled(False)
@@ -6034,9 +6193,8 @@ class QRAMainWindow(QMainWindow):
         self.evc_s4_sim_status_lbl.setText("Starting batch…")
         QApplication.processEvents()
 
-        total_runs = sum(_p[3] for _p in pairs); done_runs = 0
+        done_runs = 0
         exmax = self.evc_s4_exmax.value(); exmin = self.evc_s4_exmin.value()
-        proj  = self.evc_s4_proj_folder.text().strip() or (self.project_dir or "")
         rng   = np.random.default_rng()
         db_recs = []
         # _n_iter_total: per-session run count stamped onto every DB record.
@@ -6053,60 +6211,85 @@ class QRAMainWindow(QMainWindow):
             if bg:   _it.setBackground(bg)
             return _it
 
-        for _pi, (_ri, evc_name, fdb_name, n_run) in enumerate(pairs):
+        # ── Resolve every pair's deck / FDB up front (the pool needs them all)
+        _paths = [self._batch_resolve_evc_paths(proj, _p[1], _p[2]) for _p in pairs]
+        # Engine inputs come from the Tunnel Info / evacuation widgets — the
+        # same for every pair, so they are read once here.
+        _eng_kw = self._batch_engine_kwargs(_bs)
+        # Progress budget per pair: the spinner count, or min_iterations for
+        # an adaptive deck — grown by its follow-up blocks when its batch
+        # comes back, so the bar tracks the runs actually drawn.
+        _budget = [(_adaptive.min_iterations
+                    if _adaptive is not None and _paths[_pi][0] is not None else _p[3])
+                   for _pi, _p in enumerate(pairs)]
+        total_runs = max(1, sum(_budget))
+
+        # 🔧 Result cache ("Reuse cached results"): batches with a pinned seed
+        # are stored under <project>/evc_cache/ by content digest (evc/
+        # evc_result_cache.py), so a re-batch only re-simulates the decks whose
+        # inputs changed. An unpinned batch draws a fresh seed and is never
+        # cached — a rerun is meant to add new iterations.
+        try:
+            _cache = _bs.result_cache(proj)
+        except ImportError:
+            _cache = None
+        # 🔧 Alias de-duplication (BatchSettings.dedupe, on by default): decks
+        # whose compiled inputs are identical once their FDBs are de-aliased
+        # by content (FVM = NV0 = NVC for some HRRs — fdb_fields.
+        # build_alias_map) are simulated once; the other rows reuse that
+        # batch (BatchResult.alias_of) in the table, the DB and Tab 6.
+        _dedupe = bool(_bs.dedupe)
+        _scenario_batches = {}      # serial path: scenario_key -> BatchResult
+        _alias_rows = []            # (reused row, deck whose runs it carries)
+
+        # 🔧 MULTI-CORE: with >1 CPU, decks with an .evc run on a process pool
+        # (evc/evc_parallel.py) as (deck, iteration-block) units and come back
+        # here in COMPLETION order — each finished deck fills the table and is
+        # saved to the DB while the rest are still running. Decks without an
+        # .evc (statistical fallback) run serially afterwards.
+        # Workers = 1 (Simulation Control) forces the serial path.
+        _workers = _bs.pool_workers()
+        _spec_pi = [_pi for _pi, (_ep, _) in enumerate(_paths) if _ep is not None]
+        _pb = None
+        if _workers > 1 and _spec_pi:
+            try:
+                from evc_parallel import DeckSpec, ParallelBatch
+
+                def _pb_progress(_done, _total):
+                    self.evc_s4_sim_status_lbl.setText(
+                        f"Running {len(_spec_pi)} deck(s) on {_workers} worker(s) — "
+                        f"{_done}/{_total} work units done…")
+                    QApplication.processEvents()
+                    if self._batch_evc_cancel_flag:
+                        _pb.cancel()
+
+                _pb = ParallelBatch(
+                    [DeckSpec(_paths[_pi][0], _paths[_pi][1], _eng_kw) for _pi in _spec_pi],
+                    self.evc_s4_n_run.value(), exmax=exmax, exmin=exmin,
+                    seed=_seed, workers=_workers, progress_cb=_pb_progress,
+                    adaptive=_adaptive, cache=_cache, dedupe=_dedupe)
+            except ImportError:
+                _pb = None
+        self._evc_parallel_batch = _pb
+
+        def _pairs_in_order():
+            """(index, pair, (engine, BatchResult | exception) or None)."""
+            if _pb is None:
+                for _pi, _pair in enumerate(pairs):
+                    yield _pi, _pair, None
+                return
+            for _si, _peng, _pres in _pb.results():
+                yield _spec_pi[_si], pairs[_spec_pi[_si]], (_peng, _pres)
+            for _pi, _pair in enumerate(pairs):
+                if _paths[_pi][0] is None:
+                    yield _pi, _pair, None
+
+        for _pi, (_ri, evc_name, fdb_name, n_run), _pooled in _pairs_in_order():
             if self._batch_evc_cancel_flag: break
             self.evc_s4_sim_status_lbl.setText(f"Running {evc_name}  ({_pi+1}/{len(pairs)})…")
             QApplication.processEvents()
 
-            # ── Resolve full paths for this scenario ─────────────────────
-            evc_full_path = None
-            fdb_full_path = None
-            if proj:
-                _ep = Path(proj) / "evc_files" / (
-                    evc_name if evc_name.endswith(".evc") else evc_name + ".evc")
-                if _ep.exists(): evc_full_path = _ep
-
-            # FDB path resolution — search in order of likelihood:
-            #   1. Explicitly named file in project/fdb_files/
-            #   2. Same stem as EVC file in project/fdb_files/
-            #   3. Alongside the EVC file in the same directory
-            #   4. Common sibling folders (fdb/, FDB/, post/, POST/)
-            _fdb_stem = Path(evc_name).stem  # e.g. "020CFV0_P1"
-            _fdb_candidates = []
-            if fdb_name and proj:
-                _fdb_candidates.append(
-                    Path(proj) / "fdb_files" /
-                    (fdb_name if fdb_name.endswith(".fdb") else fdb_name + ".fdb"))
-            if proj:
-                _fdb_candidates += [
-                    Path(proj) / "fdb_files" / (_fdb_stem + ".fdb"),
-                    Path(proj) / "fdb_files" / (_fdb_stem.rsplit("_P", 1)[0] + ".fdb"),
-                ]
-            if evc_full_path:
-                _evc_dir = evc_full_path.parent
-                _fdb_stem_base = _fdb_stem.rsplit("_P", 1)[0]
-                _fdb_candidates += [
-                    _evc_dir / (_fdb_stem + ".fdb"),
-                    _evc_dir / (_fdb_stem + ".FDB"),
-                    _evc_dir / (_fdb_stem_base + ".fdb"),
-                    _evc_dir / (_fdb_stem_base + ".FDB"),
-                    _evc_dir.parent / "fdb_files" / (_fdb_stem + ".fdb"),
-                    _evc_dir.parent / "fdb" / (_fdb_stem + ".fdb"),
-                    _evc_dir.parent / "FDB" / (_fdb_stem + ".fdb"),
-                    _evc_dir.parent / "post" / (_fdb_stem + ".fdb"),
-                    _evc_dir.parent / "POST" / (_fdb_stem + ".fdb"),
-                ]
-            for _fc in _fdb_candidates:
-                if _fc.exists():
-                    fdb_full_path = _fc
-                    break
-            
-            # Final fallback: search for ANY .fdb/.FDB file in the same directory
-            if not fdb_full_path and evc_full_path:
-                _evc_dir = evc_full_path.parent
-                for _f in _evc_dir.glob("*.[fF][dB][bB]"):
-                    fdb_full_path = _f
-                    break
+            evc_full_path, fdb_full_path = _paths[_pi]
 
             run_data = []
             _evc_engine_ok = False
@@ -6137,110 +6320,49 @@ class QRAMainWindow(QMainWindow):
                         if not _found:
                             raise ImportError("evc_engine.py not found in any candidate path")
 
-                    # ── Collect GUI inputs for the VB-exact n_occ formula ─────
-                    #
-                    # VB formula (one direction):
-                    #   n_enter[t] = pcphpl × (t_react/3600) × mix_rate[t]/100
-                    #   n_cong[t]  = pcpkpl × (L/1000)       × mix_rate[t]/100
-                    #   n_occ      = Σ_t (n_enter[t] + n_cong[t]) × occ_per_veh[t]
-                    #
-                    # Sources:
-                    #   pcpkpl      ← evc_max_vehicles spinner  (veh/km/lane)
-                    #   mix_rate[t] ← tbi_veh_table row 2       (+MixRate %)
-                    #   occ_per_veh ← evac_veh_table col 3      (Tab4 Sub-tab2)
-                    #   veh_counts  ← tbi_veh_table row 0       (+Dir, placement only)
-
-                    def _tbi_float(row, col, default=0.0):
-                        try:
-                            it = self.tbi_veh_table.item(row, col)
-                            if it and it.text().strip() not in ("", "—", "-"):
-                                return float(it.text().strip())
-                        except Exception:
-                            pass
-                        return default
-
-                    def _evac_float(row, col, default=0.0):
-                        try:
-                            it = self.evac_veh_table.item(row, col)
-                            if it and it.text().strip() not in ("", "—", "-"):
-                                return float(it.text().strip())
-                        except Exception:
-                            pass
-                        return default
-
-                    VT_c = self.tbi_veh_table.columnCount()
-
-                    # pcpkpl — direct GUI input (veh/km/lane)
-                    try:
-                        _pcpkpl = float(self.evc_max_vehicles.currentText())
-                    except Exception:
-                        _pcpkpl = None
-
-                    # mix_rate — +MixRate row from tbi_veh_table (row 2), %
-                    _mix_rate = [_tbi_float(2, c) for c in range(VT_c)]
-                    if 0 < sum(_mix_rate) <= 1.01:       # auto-scale fractions
-                        _mix_rate = [m * 100.0 for m in _mix_rate]
-                    if sum(_mix_rate) == 0:
-                        _mix_rate = None                 # let engine use uniform fallback
-
-                    # occ_per_veh — 🔧 VB-PARITY: the Tunnel Info "Occupants"
-                    # row (승차인원, tbi_veh_table row 6) is the single
-                    # authoritative source, matching VB where EVC L52–L58 come
-                    # straight from the 터널교통량등제원 occupant row. The
-                    # evac_veh_table col-3 values are only a FALLBACK when the
-                    # Tunnel Info row is empty — previously they silently
-                    # overrode Tunnel Info (with a 1.5/car default), so
-                    # entering 3/8/30/2/2/1/1 in Tunnel Info had no effect on
-                    # the simulated evacuee count.
-                    _occ_per_veh = [_tbi_float(6, c) for c in range(VT_c)]
-                    if not any(v > 0 for v in _occ_per_veh):
-                        _n_evac_rows = self.evac_veh_table.rowCount()
-                        _occ_per_veh = [_evac_float(r, 3, default=1.5)
-                                        for r in range(_n_evac_rows)]
-                    if not any(v > 0 for v in _occ_per_veh):
-                        _occ_per_veh = None              # all zeros → ignore
-
-                    # veh_counts — +Dir row (row 0) for spatial placement only
-                    _veh_counts = [int(_tbi_float(0, c)) for c in range(VT_c)]
-                    if not any(v > 0 for v in _veh_counts):
-                        _veh_counts = None               # no counts yet → ignore
-
-                    # ── Dynamic n_occ calculation ─────────────────────────
-                    # VB-faithful formula (from n_occ_calculation_breakdown.pdf):
-                    #   n_occ = (n_enter_per_dir + n_cong_per_dir) × dir_mult × occ_per_veh
-                    # Uses configurable R74 parameters from GUI spinboxes
-                    # (defaults: pcpkpl=216, dir_mult=2.41, occ_per_veh=1.5).
-                    _r74_pcpkpl = self.evac_r74_pcpkpl.value() if hasattr(self, 'evac_r74_pcpkpl') else 216.0
-                    _r74_dir_mult = self.evac_r74_dir_mult.value() if hasattr(self, 'evac_r74_dir_mult') else 2.41
-                    _r74_occ = self.evac_r74_occ_per_veh.value() if hasattr(self, 'evac_r74_occ_per_veh') else 1.5
-                    # HRR saturation parameters (for HRR-dependent n_occ scaling)
-                    _r74_hrr_ref = self.evac_r74_hrr_ref.value() if hasattr(self, 'evac_r74_hrr_ref') else 15.0
-                    _r74_hrr_sat_c = self.evac_r74_hrr_sat_c.value() if hasattr(self, 'evac_r74_hrr_sat_c') else 1082.47
-                    _r74_hrr_sat_k = self.evac_r74_hrr_sat_k.value() if hasattr(self, 'evac_r74_hrr_sat_k') else 14.45
-
-                    _engine = EVCEngine(
-                        evc_full_path, fdb_full_path,
-                        n_occ_override       = None,
-                        # 🔧 VB-PARITY: queue jam density (veh/km/lane) from
-                        # the evc_max_vehicles selector — used by the
-                        # discrete-queue gap 1000/density − len[car].
-                        jam_density_override = _pcpkpl,
-                        pcpkpl_override      = _r74_pcpkpl,
-                        mix_rate_override    = _mix_rate,
-                        occ_per_veh_override = _occ_per_veh,
-                        veh_counts_per_type  = _veh_counts,
-                        dir_mult_override    = _r74_dir_mult,
-                        r74_occ_per_veh      = _r74_occ,
-                        # HRR saturation scaling (reads HRR from EVC file L68)
-                        hrr_ref              = _r74_hrr_ref,
-                        hrr_sat_c            = _r74_hrr_sat_c,
-                        hrr_sat_k            = _r74_hrr_sat_k,
-                    )
-                    _batch  = _engine.run(
-                        n_iterations = n_run,
-                        exmax        = exmax,
-                        exmin        = exmin,
-                    )
+                    if _pooled is not None:
+                        # Finished on the process pool (evc_parallel)
+                        _engine, _batch = _pooled
+                        if isinstance(_batch, Exception):
+                            raise _batch
+                    else:
+                        _engine = EVCEngine(evc_full_path, fdb_full_path, **_eng_kw)
+                        _skey = None
+                        if _dedupe:
+                            try:
+                                from evc_result_cache import scenario_key
+                                _skey = scenario_key(_engine)
+                            except (ImportError, OSError, TypeError):
+                                _skey = None
+                        if _skey is not None and _skey in _scenario_batches:
+                            from evc_parallel import alias_result
+                            _batch = alias_result(_scenario_batches[_skey],
+                                                  _engine.evc_path.stem)
+                        else:
+                            _batch = _engine.run(
+                                n_iterations = n_run,
+                                exmax        = exmax,
+                                exmin        = exmin,
+                                seed         = _seed,
+                                adaptive     = _adaptive,
+                                cache        = _cache,
+                            )
+                            if _skey is not None:
+                                _scenario_batches[_skey] = _batch
+                    if getattr(_batch, "alias_of", None):
+                        # same compiled inputs as an earlier deck — not re-run
+                        print(f"[alias] {evc_name}: reused results of {_batch.alias_of}")
+                        _alias_rows.append((evc_name, _batch.alias_of))
+                        _it_alias = tbl.item(_ri, 1)
+                        if _it_alias is not None:
+                            _it_alias.setToolTip(f"Results reused from {_batch.alias_of} "
+                                                 f"(identical deck and field content)")
+                    elif getattr(_batch, "from_cache", False):
+                        # inputs unchanged since a stored batch — not re-run
+                        print(f"[cache] {evc_name}: reused stored result "
+                              f"({len(_batch.runs)} runs)")
+                    total_runs += len(_batch.runs) - _budget[_pi]
+                    _budget[_pi] = len(_batch.runs)
                     for _r in _batch.runs:
                         if self._batch_evc_cancel_flag: break
                         _rp = res.rowCount(); res.insertRow(_rp)
@@ -6262,8 +6384,17 @@ class QRAMainWindow(QMainWindow):
                                              upstream_failed=getattr(_r, 'upstream_failed', 0)))
                         ev_all.append(_r.ev_time)
                         done_runs += 1
-                        self.evc_s4_progress.setValue(int(100*done_runs/total_runs))
+                        self.evc_s4_progress.setValue(min(100, int(100*done_runs/total_runs)))
                         QApplication.processEvents()
+                    if _adaptive is not None:
+                        n_run = len(_batch.runs)
+                        _prec = _batch.precision
+                        print(f"[adaptive] {evc_name}: {n_run} runs, {_prec['stop']} — "
+                              f"EQ_Fatal {_prec['eq_fatal']['mean']:.3f} "
+                              f"± {_prec['eq_fatal']['half_width']:.3f}, "
+                              f"evacuees {_prec['evacuees']['mean']:.1f} "
+                              f"± {_prec['evacuees']['half_width']:.1f} "
+                              f"({100 * _prec['confidence']:.0f}% CI)")
                     # Collect engine + batch for global aggregate write after loop
                     _all_engines_batches.append((_engine, _batch))
                     avg_ev  = _batch.avg.ev_time
@@ -6298,6 +6429,8 @@ class QRAMainWindow(QMainWindow):
 
             # ── FALLBACK: statistical approximation (no .evc file found) ────
             if not _evc_engine_ok:
+                total_runs += n_run - _budget[_pi]
+                _budget[_pi] = n_run
                 fire_pt = None
                 if fdb_full_path: fire_pt = self._parse_fdb_fire_pt(fdb_full_path)
                 tl = getattr(self, "evc_tunnel_length", None)
@@ -6355,7 +6488,7 @@ class QRAMainWindow(QMainWindow):
                     res.setItem(_rp, 14, _cell(""))
                     res.setItem(_rp, 15, _cell(""))
                     done_runs += 1
-                    self.evc_s4_progress.setValue(int(100*done_runs/total_runs))
+                    self.evc_s4_progress.setValue(min(100, int(100*done_runs/total_runs)))
                     QApplication.processEvents()
 
             if not run_data: continue
@@ -6397,11 +6530,26 @@ class QRAMainWindow(QMainWindow):
             res.setItem(_sp, 0, _si)
 
             db_recs.append(dict(evc=evc_name, fdb=fdb_name,
-                n_run=n_run,   # this session's run count (spinner value)
+                n_run=n_run,   # this session's run count (spinner, or runs drawn if adaptive)
                 n_iter=n_run,  # placeholder — updated to accumulated total after write block
                 runs=run_data,
+                # CI half-widths + stop reason (evc_engine.BatchResult.precision)
+                precision=_batch.precision if _evc_engine_ok else None,
+                # deck whose runs this row reuses (alias de-duplication)
+                alias_of=getattr(_batch, "alias_of", None) if _evc_engine_ok else None,
+                # stored batch replayed from the result cache — not new runs
+                from_cache=bool(_evc_engine_ok and getattr(_batch, "from_cache", False)),
                 avg=dict(ev_time=avg_ev, evacuees=avg_occ, fed=avg_fed, eq_fatal=avg_eqf,
                          ext_min=avg_upst_failed, ext_max=max(ev_all))))
+            # Stream the finished deck into the project DB now. Per-row n_iter
+            # is this session's run count (the spinner) — Tab 6 sums n_run
+            # across rows sharing evc_name, so per-deck inserts are equivalent
+            # to one insert at the end and survive a crash mid-batch. A cache
+            # hit replays iterations a previous session already saved: no
+            # row, or Tab 6 would count them twice.
+            db_recs[-1]['n_iter'] = n_run
+            if not db_recs[-1]['from_cache']:
+                self._auto_save_batch_evc_results(db_recs[-1:])
 
         # ── VB-faithful: scenario-grouped aggregate write ─────────────────────
         #
@@ -6529,14 +6677,9 @@ class QRAMainWindow(QMainWindow):
             except Exception as _ge:
                 self.evc_s4_sim_status_lbl.setText(f"⚠ global aggregate write: {_ge}")
 
-        # ── Stamp this session's run count into every db_rec before saving ──
-        # Per-row n_iter equals the spinner value (n_run) — there is no R10
-        # back-calculation any more.  The Risk Index tab does cross-session
-        # accumulation by summing n_run across DB rows that share evc_name.
-        for _rec in db_recs:
-            _rec['n_iter'] = _n_iter_total
-
-        self._auto_save_batch_evc_results(db_recs)
+        # db_recs were saved to the project DB deck by deck as they finished
+        # (see the end of the per-deck loop above).
+        self._evc_parallel_batch = None
 
         # ── Auto-generate TEC-style JPGs into <project>/graphs/ ─────────────
         if not self._batch_evc_cancel_flag and _all_engines_batches and self.project_dir:
@@ -6569,6 +6712,22 @@ class QRAMainWindow(QMainWindow):
             except Exception as _gimport_err:
                 print(f"[graphs] tec_evc_style_graphs import failed: {_gimport_err}")
 
+        # ── Per-deck profile table ("Simulation별 상세출력") ────────────────
+        # Seconds per engine phase summed over each deck's runs, plus the
+        # loop counters — printed and saved as <project>/evc_profile.txt.
+        if _bs.profile and _all_engines_batches:
+            try:
+                from evc_engine import profile_table as _profile_table
+                _ptab = _profile_table([_b for _, _b in _all_engines_batches
+                                        if not getattr(_b, "alias_of", None)])
+                if _ptab:
+                    print("[profile]\n" + _ptab)
+                    if self.project_dir:
+                        (Path(self.project_dir) / "evc_profile.txt").write_text(
+                            _ptab + "\n", encoding="utf-8")
+            except Exception as _pex:
+                print(f"[profile] Failed to write the profile table: {_pex}")
+
         cancelled = self._batch_evc_cancel_flag
         self.evc_sim_run_btn.setEnabled(True)
         self.evc_s4_batch_cancel_btn.setEnabled(False)
@@ -6576,16 +6735,250 @@ class QRAMainWindow(QMainWindow):
         _n_files = len(pairs)
         _runs_per_session = pairs[0][3] if pairs else 0
         _session_runs = sum(_p[3] for _p in pairs)
+        if _adaptive is not None:
+            # runs actually drawn per deck (the spinner is only the cap)
+            _session_runs = sum(len(_r["runs"]) for _r in db_recs)
+            _runs_per_session = (f"{_adaptive.min_iterations}–{_adaptive.max_iterations} "
+                                 f"(adaptive)")
+        _n_saved = sum(not _r["from_cache"] for _r in db_recs)
+        # Shared FDB registry counters (evc/fdb_store.py) — one parse per
+        # scenario FDB, reused by all of its fire positions and the graphs.
+        try:
+            from fdb_store import REGISTRY as _fdb_registry
+            _fm_cache = f"  {_fdb_registry.summary()}."
+        except Exception:
+            _fm_cache = ""
+        if _cache is not None:
+            _fm_cache += f"  {_cache.summary()}."
+        if _alias_rows:
+            _fm_cache += (f"  {len(_alias_rows)} alias row(s) reused: "
+                          + ", ".join(f"{_a} ← {_c}" for _a, _c in _alias_rows) + ".")
         _fm = ("⚠  Batch cancelled."
                if cancelled
-               else (f"✅  Batch complete — {len(db_recs)} scenario(s) saved.  "
+               else (f"✅  Batch complete — {_n_saved} scenario(s) saved"
+                     + (f", {len(db_recs) - _n_saved} replayed from the result cache (not re-saved)"
+                        if _n_saved < len(db_recs) else "") + ".  "
                      f"This session: {_n_files} files × {_runs_per_session} runs = {_session_runs} total runs.  "
-                     f"Total accumulated n_iter: {_n_iter_total}."))
+                     f"Total accumulated n_iter: {_n_iter_total}.{_fm_cache}"
+                     f"  Seed {_seed}."))
         self.evc_s4_sim_status_lbl.setText(_fm)
         self.statusBar().showMessage(_fm, 10000)
 
+    def _batch_resolve_evc_paths(self, proj, evc_name, fdb_name):
+        """(evc path or None, fdb path or None) of one Batch-table pair."""
+        evc_full_path = None
+        fdb_full_path = None
+        if proj:
+            _ep = Path(proj) / "evc_files" / (
+                evc_name if evc_name.endswith(".evc") else evc_name + ".evc")
+            if _ep.exists(): evc_full_path = _ep
+
+        # FDB path resolution — search in order of likelihood:
+        #   1. Explicitly named file in project/fdb_files/
+        #   2. Same stem as EVC file in project/fdb_files/
+        #   3. Alongside the EVC file in the same directory
+        #   4. Common sibling folders (fdb/, FDB/, post/, POST/)
+        _fdb_stem = Path(evc_name).stem  # e.g. "020CFV0_P1"
+        _fdb_candidates = []
+        if fdb_name and proj:
+            _fdb_candidates.append(
+                Path(proj) / "fdb_files" /
+                (fdb_name if fdb_name.endswith(".fdb") else fdb_name + ".fdb"))
+        if proj:
+            _fdb_candidates += [
+                Path(proj) / "fdb_files" / (_fdb_stem + ".fdb"),
+                Path(proj) / "fdb_files" / (_fdb_stem.rsplit("_P", 1)[0] + ".fdb"),
+            ]
+        if evc_full_path:
+            _evc_dir = evc_full_path.parent
+            _fdb_stem_base = _fdb_stem.rsplit("_P", 1)[0]
+            _fdb_candidates += [
+                _evc_dir / (_fdb_stem + ".fdb"),
+                _evc_dir / (_fdb_stem + ".FDB"),
+                _evc_dir / (_fdb_stem_base + ".fdb"),
+                _evc_dir / (_fdb_stem_base + ".FDB"),
+                _evc_dir.parent / "fdb_files" / (_fdb_stem + ".fdb"),
+                _evc_dir.parent / "fdb" / (_fdb_stem + ".fdb"),
+                _evc_dir.parent / "FDB" / (_fdb_stem + ".fdb"),
+                _evc_dir.parent / "post" / (_fdb_stem + ".fdb"),
+                _evc_dir.parent / "POST" / (_fdb_stem + ".fdb"),
+            ]
+        for _fc in _fdb_candidates:
+            if _fc.exists():
+                fdb_full_path = _fc
+                break
+
+        # Final fallback: search for ANY .fdb/.FDB file in the same directory
+        if not fdb_full_path and evc_full_path:
+            _evc_dir = evc_full_path.parent
+            for _f in _evc_dir.glob("*.[fF][dB][bB]"):
+                fdb_full_path = _f
+                break
+        return evc_full_path, fdb_full_path
+
+    def _batch_settings(self):
+        """BatchSettings from the Simulation Control widgets."""
+        from evc_batch_settings import BatchSettings
+        # Settings with no widget (dedupe) keep the project's saved value.
+        _prev = BatchSettings.load(
+            self.evc_s4_proj_folder.text().strip() or (self.project_dir or ""))
+        _seed_txt = self.evc_s4_seed.text().strip()
+        try:
+            _seed = int(_seed_txt) if _seed_txt else None
+        except ValueError:
+            raise ValueError(f"Seed must be a whole number, got {_seed_txt!r}.")
+        if _seed is not None and _seed < 0:
+            raise ValueError(f"Seed must not be negative, got {_seed}.")
+        return BatchSettings(
+            fdb_budget_mb=float(self.evc_s4_fdb_budget.value()),
+            profile=self.evc_s4_chk_verbose.isChecked(),
+            adaptive=self.evc_s4_chk_adaptive.isChecked(),
+            adaptive_min=self.evc_s4_adaptive_min.value(),
+            adaptive_max=self.evc_s4_adaptive_max.value(),
+            eq_fatal_tol=self.evc_s4_eq_fatal_tol.value(),
+            evacuees_tol=self.evc_s4_evacuees_tol.value(),
+            rel_tol=self.evc_s4_rel_tol.value(),
+            workers=self.evc_s4_workers.value(),
+            pin_seed=self.evc_s4_chk_pin_seed.isChecked(),
+            seed=_seed,
+            cache=self.evc_s4_chk_cache.isChecked(),
+            compact=self.evc_s4_chk_compact.isChecked(),
+            dedupe=_prev.dedupe)
+
+    def _batch_settings_load(self, project_dir):
+        """Show the batch settings saved in *project_dir* (defaults if none)."""
+        try:
+            from evc_batch_settings import BatchSettings
+        except ImportError:
+            return
+        _bs = BatchSettings.load(project_dir)
+        self.evc_s4_fdb_budget.setValue(int(round(_bs.fdb_budget_mb)))
+        self.evc_s4_chk_verbose.setChecked(bool(_bs.profile))
+        self.evc_s4_chk_adaptive.setChecked(bool(_bs.adaptive))
+        self.evc_s4_adaptive_min.setValue(int(_bs.adaptive_min))
+        self.evc_s4_adaptive_max.setValue(int(_bs.adaptive_max))
+        self.evc_s4_eq_fatal_tol.setValue(float(_bs.eq_fatal_tol))
+        self.evc_s4_evacuees_tol.setValue(float(_bs.evacuees_tol))
+        self.evc_s4_rel_tol.setValue(float(_bs.rel_tol))
+        self.evc_s4_workers.setValue(int(_bs.workers))
+        self.evc_s4_chk_pin_seed.setChecked(bool(_bs.pin_seed))
+        self.evc_s4_seed.setText("" if _bs.seed is None else str(_bs.seed))
+        self.evc_s4_chk_cache.setChecked(bool(_bs.cache))
+        self.evc_s4_chk_compact.setChecked(bool(_bs.compact))
+
+    def _batch_engine_kwargs(self, settings=None):
+        """EVCEngine keyword arguments from the Tunnel Info / evacuation GUI
+        and the batch *settings* (evc_batch_settings.BatchSettings)."""
+        # ── Collect GUI inputs for the VB-exact n_occ formula ─────
+        #
+        # VB formula (one direction):
+        #   n_enter[t] = pcphpl × (t_react/3600) × mix_rate[t]/100
+        #   n_cong[t]  = pcpkpl × (L/1000)       × mix_rate[t]/100
+        #   n_occ      = Σ_t (n_enter[t] + n_cong[t]) × occ_per_veh[t]
+        #
+        # Sources:
+        #   pcpkpl      ← evc_max_vehicles spinner  (veh/km/lane)
+        #   mix_rate[t] ← tbi_veh_table row 2       (+MixRate %)
+        #   occ_per_veh ← evac_veh_table col 3      (Tab4 Sub-tab2)
+        #   veh_counts  ← tbi_veh_table row 0       (+Dir, placement only)
+
+        def _tbi_float(row, col, default=0.0):
+            try:
+                it = self.tbi_veh_table.item(row, col)
+                if it and it.text().strip() not in ("", "—", "-"):
+                    return float(it.text().strip())
+            except Exception:
+                pass
+            return default
+
+        def _evac_float(row, col, default=0.0):
+            try:
+                it = self.evac_veh_table.item(row, col)
+                if it and it.text().strip() not in ("", "—", "-"):
+                    return float(it.text().strip())
+            except Exception:
+                pass
+            return default
+
+        VT_c = self.tbi_veh_table.columnCount()
+
+        # pcpkpl — direct GUI input (veh/km/lane)
+        try:
+            _pcpkpl = float(self.evc_max_vehicles.currentText())
+        except Exception:
+            _pcpkpl = None
+
+        # mix_rate — +MixRate row from tbi_veh_table (row 2), %
+        _mix_rate = [_tbi_float(2, c) for c in range(VT_c)]
+        if 0 < sum(_mix_rate) <= 1.01:       # auto-scale fractions
+            _mix_rate = [m * 100.0 for m in _mix_rate]
+        if sum(_mix_rate) == 0:
+            _mix_rate = None                 # let engine use uniform fallback
+
+        # occ_per_veh — 🔧 VB-PARITY: the Tunnel Info "Occupants"
+        # row (승차인원, tbi_veh_table row 6) is the single
+        # authoritative source, matching VB where EVC L52–L58 come
+        # straight from the 터널교통량등제원 occupant row. The
+        # evac_veh_table col-3 values are only a FALLBACK when the
+        # Tunnel Info row is empty — previously they silently
+        # overrode Tunnel Info (with a 1.5/car default), so
+        # entering 3/8/30/2/2/1/1 in Tunnel Info had no effect on
+        # the simulated evacuee count.
+        _occ_per_veh = [_tbi_float(6, c) for c in range(VT_c)]
+        if not any(v > 0 for v in _occ_per_veh):
+            _n_evac_rows = self.evac_veh_table.rowCount()
+            _occ_per_veh = [_evac_float(r, 3, default=1.5)
+                            for r in range(_n_evac_rows)]
+        if not any(v > 0 for v in _occ_per_veh):
+            _occ_per_veh = None              # all zeros → ignore
+
+        # veh_counts — +Dir row (row 0) for spatial placement only
+        _veh_counts = [int(_tbi_float(0, c)) for c in range(VT_c)]
+        if not any(v > 0 for v in _veh_counts):
+            _veh_counts = None               # no counts yet → ignore
+
+        # ── Dynamic n_occ calculation ─────────────────────────
+        # VB-faithful formula (from n_occ_calculation_breakdown.pdf):
+        #   n_occ = (n_enter_per_dir + n_cong_per_dir) × dir_mult × occ_per_veh
+        # Uses configurable R74 parameters from GUI spinboxes
+        # (defaults: pcpkpl=216, dir_mult=2.41, occ_per_veh=1.5).
+        _r74_pcpkpl = self.evac_r74_pcpkpl.value() if hasattr(self, 'evac_r74_pcpkpl') else 216.0
+        _r74_dir_mult = self.evac_r74_dir_mult.value() if hasattr(self, 'evac_r74_dir_mult') else 2.41
+        _r74_occ = self.evac_r74_occ_per_veh.value() if hasattr(self, 'evac_r74_occ_per_veh') else 1.5
+        # HRR saturation parameters (for HRR-dependent n_occ scaling)
+        _r74_hrr_ref = self.evac_r74_hrr_ref.value() if hasattr(self, 'evac_r74_hrr_ref') else 15.0
+        _r74_hrr_sat_c = self.evac_r74_hrr_sat_c.value() if hasattr(self, 'evac_r74_hrr_sat_c') else 1082.47
+        _r74_hrr_sat_k = self.evac_r74_hrr_sat_k.value() if hasattr(self, 'evac_r74_hrr_sat_k') else 14.45
+
+        return dict(
+            n_occ_override       = None,
+            # 🔧 VB-PARITY: queue jam density (veh/km/lane) from
+            # the evc_max_vehicles selector — used by the
+            # discrete-queue gap 1000/density − len[car].
+            jam_density_override = _pcpkpl,
+            pcpkpl_override      = _r74_pcpkpl,
+            mix_rate_override    = _mix_rate,
+            occ_per_veh_override = _occ_per_veh,
+            veh_counts_per_type  = _veh_counts,
+            dir_mult_override    = _r74_dir_mult,
+            r74_occ_per_veh      = _r74_occ,
+            # HRR saturation scaling (reads HRR from EVC file L68)
+            hrr_ref              = _r74_hrr_ref,
+            hrr_sat_c            = _r74_hrr_sat_c,
+            hrr_sat_k            = _r74_hrr_sat_k,
+            # Per-phase timers (evc_engine.RunProfile) — the verbose
+            # ("Simulation별 상세출력") batch setting
+            profile              = bool(settings is not None and settings.profile),
+            # float32 FDB cube + occupant kinematics (EVCEngine.COMPACT) —
+            # "Compact (float32)", for batches short of memory
+            compact              = bool(settings is not None and settings.compact),
+        )
+
     def _batch_cancel_evc(self):
         self._batch_evc_cancel_flag = True
+        _pb = getattr(self, "_evc_parallel_batch", None)
+        if _pb is not None:
+            _pb.cancel()     # pool: drop the units not yet started
         self.evc_s4_batch_cancel_btn.setEnabled(False)
         self.evc_s4_sim_status_lbl.setText("⚠  Cancelling after current run…")
 
@@ -6627,27 +7020,35 @@ class QRAMainWindow(QMainWindow):
                                   -- Tab 6 sums n_run across rows sharing the
                                   -- same evc_name to get the true MAXITER.
                 avg_ev_time REAL, avg_evacuees REAL, avg_eq_fatal REAL,
-                ext_min REAL, ext_max REAL, fed_avg_json TEXT, runs_json TEXT)""")
-            # Add n_iter column to existing DBs that were created before this change
-            try:
-                cur.execute("ALTER TABLE batch_evc_results ADD COLUMN n_iter INTEGER")
-                con.commit()
-            except Exception:
-                pass  # column already exists — normal for new DBs
+                ext_min REAL, ext_max REAL, fed_avg_json TEXT, runs_json TEXT,
+                precision_json TEXT,
+                alias_of TEXT)    -- evc_name whose runs this row reuses""")
+            # Add n_iter / precision_json / alias_of columns to existing DBs
+            # that were created before these changes
+            for _col in ("n_iter INTEGER", "precision_json TEXT", "alias_of TEXT"):
+                try:
+                    cur.execute(f"ALTER TABLE batch_evc_results ADD COLUMN {_col}")
+                    con.commit()
+                except Exception:
+                    pass  # column already exists — normal for new DBs
             _now = datetime.datetime.now().isoformat(timespec="seconds")
             for _r in records:
                 _a = _r["avg"]
                 # n_iter: use accumulated total if available, fall back to n_run
                 _n_iter_db = _r.get("n_iter", _r["n_run"])
+                _prec = _r.get("precision")
                 cur.execute("""INSERT INTO batch_evc_results
                     (saved_at,evc_name,fdb_name,n_run,n_iter,avg_ev_time,avg_evacuees,
-                     avg_eq_fatal,ext_min,ext_max,fed_avg_json,runs_json)
-                    VALUES(?,?,?,?,?,?,?,?,?,?,?,?)""",
+                     avg_eq_fatal,ext_min,ext_max,fed_avg_json,runs_json,precision_json,
+                     alias_of)
+                    VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?)""",
                     (_now,_r["evc"],_r["fdb"],_r["n_run"],_n_iter_db,
                      _a["ev_time"],_a["evacuees"],_a["eq_fatal"],
                      _a["ext_min"],_a["ext_max"],
                      json.dumps(_a["fed"]),
-                     json.dumps(_r["runs"], default=lambda o: float(o) if hasattr(o,"__float__") else str(o))))
+                     json.dumps(_r["runs"], default=lambda o: float(o) if hasattr(o,"__float__") else str(o)),
+                     json.dumps(_prec, default=float) if _prec else None,
+                     _r.get("alias_of")))
             con.commit(); con.close()
         except Exception as _ex:
             self.statusBar().showMessage(f"⚠  DB save error: {_ex}", 6000)
@@ -6949,9 +7350,8 @@ class QRAMainWindow(QMainWindow):
         temp_arr = 20.0 + k_temp * np.sqrt(np.clip(hrr_arr, 0, None))
 
         dt_min = dt / 60.0
-        fed_co_rate   = np.where(co_arr > 0,   (co_arr**1.036) / 35000., 0.)
-        fed_o2_rate   = np.where(o2_arr < 21., ((21.-o2_arr)/11.)**3/60., 0.)
-        fed_heat_rate = np.where(temp_arr>20., temp_arr**3.4/5e7, 0.)
+        from fed_kernels import iso13571_rates
+        fed_co_rate, fed_o2_rate, fed_heat_rate = iso13571_rates(co_arr, o2_arr, temp_arr)
         fed_co_cum    = np.cumsum(fed_co_rate   * dt_min)
         fed_o2_cum    = np.cumsum(fed_o2_rate   * dt_min)
         fed_heat_cum  = np.cumsum(fed_heat_rate * dt_min)
@@ -8510,107 +8910,25 @@ class QRAMainWindow(QMainWindow):
     def _t5_parse_fdb_spatial(self, fdb_path):
         """Parse FDB into 2-D arrays [t_idx, x_idx] for each quantity."""
         import numpy as np
+        # Shared loader (evc/fdb_store.py): the same parse + binary sidecar
+        # the EVC engine uses, so reopening a project memory-maps the field.
+        from fdb_store import load_fdb
 
-        rows = []
-        col_map = None
-        in_data = False
-
-        for enc in ('utf-8', 'latin-1', 'cp1252'):
-            try:
-                raw = fdb_path.read_bytes().decode(enc, errors='replace')
-                break
-            except Exception:
-                continue
-
-        # ── Extract FIRE PT from FDB header ──────────────────────────────
-        import re as _re_fdb
-        fdb_fire_pt = None
-        _in_tunx = False; _tunx_hdr = False
-        for _hl in raw.splitlines():
-            _hs = _hl.strip()
-            if _hs == 'TUNNEL X COORDINATE': _in_tunx = True; continue
-            if not _in_tunx: continue
-            if 'MIN_X' in _hs: _tunx_hdr = True; continue
-            if _tunx_hdr and _hs:
-                _parts = _hs.split()
-                if len(_parts) >= 4:
-                    _tail = ' '.join(_parts[3:])
-                    _rm = _re_fdb.search(
-                        r'([-+]?[0-9]+[.]?[0-9]*)\s*-\s*([-+]?[0-9]+[.]?[0-9]*)',
-                        _tail)
-                    if _rm:
-                        fdb_fire_pt = (float(_rm.group(1)) + float(_rm.group(2))) / 2.0
-                    else:
-                        _sm = _re_fdb.search(r'[-+]?[0-9]+[.]?[0-9]*', _tail)
-                        if _sm: fdb_fire_pt = float(_sm.group())
-                break
-
-        for line in raw.splitlines():
-            line = line.strip()
-            if not line or line.startswith('!') or line.startswith('#'):
-                continue
-            if 'DATA START' in line.upper():
-                in_data = True; col_map = None; continue
-            if 'DATA END' in line.upper():
-                break
-            if not in_data or all(c in '*|-= \t' for c in line):
-                continue
-
-            parts = line.split()
-            try:
-                nums = [float(p) for p in parts]
-            except ValueError:
-                up = [p.upper() for p in parts]
-                col_map = {}
-                for i, h in enumerate(up):
-                    if 'TIME' in h:                        col_map['time']   = i
-                    elif h in ('X', 'X-COOR', 'XCOOR'):   col_map['x']      = i
-                    elif 'SOOT' in h:                      col_map['soot']   = i
-                    elif 'CO2' in h:                       col_map['co2']    = i
-                    elif 'CO' in h and 'CO2' not in h:     col_map['co']     = i
-                    elif 'TEMP' in h:                      col_map['temp']   = i
-                    elif 'RADI' in h:                      col_map['radi']   = i
-                    elif 'OXY' in h or h == 'O2':          col_map['oxygen'] = i
-                continue
-
-            if len(nums) < 2:
-                continue
-            if col_map is None:
-                col_map = {'time':0,'x':1,'soot':2,'co2':3,'co':4,'temp':5,'radi':6,'oxygen':7}
-
-            def _g(k, d=0.0):
-                idx = col_map.get(k)
-                return nums[idx] if idx is not None and idx < len(nums) else d
-
-            rows.append((_g('time'), _g('x'), _g('soot'), _g('co2'),
-                         _g('co'), _g('temp', 20.0), _g('radi'), _g('oxygen', 21.0)))
-
-        if not rows:
+        fdb = load_fdb(fdb_path)
+        if not fdb.is_loaded:
             return None
 
-        import numpy as np
-        arr = np.array(rows)
-        times_u  = np.unique(arr[:, 0])
-        x_coords = np.unique(arr[:, 1])
-        nt, nx   = len(times_u), len(x_coords)
-
-        t_map = {t: i for i, t in enumerate(times_u)}
-        x_map = {x: i for i, x in enumerate(x_coords)}
-
-        def _fill(col, default):
-            A = np.full((nt, nx), default, dtype=float)
-            for row in arr:
-                ti = t_map.get(row[0]); xi = x_map.get(row[1])
-                if ti is not None and xi is not None:
-                    A[ti, xi] = row[col]
-            return A
-
-        temp_2d = _fill(5, 20.0)
-        co_2d   = _fill(4, 0.0)
-        soot_2d = _fill(2, 0.0)
-        co2_2d  = _fill(3, 0.04)
-        o2_2d   = _fill(7, 21.0)
-        radi_2d = _fill(6, 0.0)
+        times_u  = np.asarray(fdb.times)
+        x_coords = np.asarray(fdb.x_coords)
+        nt = len(times_u)
+        fdb_fire_pt = fdb.fire_center   # FIRE PT centre from the FDB header
+
+        temp_2d = fdb.temp
+        co_2d   = fdb.co
+        soot_2d = fdb.soot
+        co2_2d  = fdb.co2
+        o2_2d   = fdb.o2
+        radi_2d = fdb.rad
 
         # Walking velocity: free-flow reduced by CO exposure
         walk_2d = np.clip(1.2 * (1.0 - np.clip(co_2d / 35000.0, 0, 1)), 0.1, 1.2)
@@ -8618,9 +8936,9 @@ class QRAMainWindow(QMainWindow):
         # Cumulative FED along time axis
         dt_arr = np.diff(times_u, prepend=times_u[0])
         dt_arr[0] = dt_arr[1] if nt > 1 else 1.0
-        fed_rate = (np.where(co_2d > 0, (co_2d ** 1.036) / 35000.0, 0.0)
-                  + np.where(o2_2d < 21.0, ((21.0 - o2_2d) / 11.0) ** 3 / 60.0, 0.0)
-                  + np.where(temp_2d > 20.0, (temp_2d ** 3.4) / 5e7, 0.0))
+        from fed_kernels import iso13571_rates
+        r_co, r_o2, r_heat = iso13571_rates(co_2d, o2_2d, temp_2d)
+        fed_rate = r_co + r_o2 + r_heat
         fed_2d = np.cumsum(fed_rate * dt_arr[:, None] / 60.0, axis=0)
 
         return {
@@ -8635,6 +8953,7 @@ class QRAMainWindow(QMainWindow):
             'walk_vel':    walk_2d,
             'fed':         fed_2d,
             'fdb_fire_pt': fdb_fire_pt,
+            'x_step':      fdb.x_step,     # None unless the x-mesh is even
         }
 
     def _t5_build_man_data(self, t_idx):
@@ -8721,10 +9040,27 @@ class QRAMainWindow(QMainWindow):
             return
 
         # Helper: interpolate FDB quantity at an arbitrary x position
+        x_step = d.get('x_step')
+        x_lo, x_hi, n_xs = float(xs[0]), float(xs[-1]), len(xs)
+
         def interp_at(arr_row, x_query):
             """Linear interpolation of a 1-D FDB row at position x_query."""
-            return float(np.interp(x_query, xs, arr_row,
-                                   left=arr_row[0], right=arr_row[-1]))
+            if x_step is None:
+                return float(np.interp(x_query, xs, arr_row,
+                                       left=arr_row[0], right=arr_row[-1]))
+            # Even FDS mesh: the cell is computed, not searched
+            if x_query <= x_lo:
+                return float(arr_row[0])
+            if x_query >= x_hi:
+                return float(arr_row[-1])
+            j = min(int((x_query - x_lo) / x_step), n_xs - 2)
+            if x_query < xs[j]:
+                j -= 1
+            elif x_query >= xs[j + 1]:
+                j += 1
+            x0 = xs[j]
+            return float((arr_row[j + 1] - arr_row[j]) / (xs[j + 1] - x0)
+                         * (x_query - x0) + arr_row[j])
 
         for ti in range(start_idx, t_idx + 1):
             if ti == 0:
@@ -10298,9 +10634,12 @@ class QRAMainWindow(QMainWindow):
         _total_t6_rows = _total_run_rows + _total_avg_rows
         # Keep Standard Scenario P1-P6/Fatalities aligned with live EVC results.
         self._t6_sync_standard_scenario_fatalities(rows)
+        # rows whose runs were reused from an alias deck (batch de-duplication)
+        _n_alias = sum(1 for _rec in rows if _rec.get("alias_of"))
         self.t6_status.setText(
             f"✅  Loaded {len(rows)} scenario(s) from {db_path.name}.  "
             f"EVC Result: {_total_run_rows} runs + {_total_avg_rows} AVG = {_total_t6_rows} rows."
+            + (f"  {_n_alias} reused from alias scenarios." if _n_alias else "")
         )
 
     def _t6_parse_evc_name(self, evc_name: str):
@@ -12425,6 +12764,7 @@ class QRAMainWindow(QMainWindow):
             self.generate_fds_btn.setEnabled(True)
             self.tabs.setCurrentIndex(1)
             self.statusBar().showMessage(f"Project created: {project_name}")
+            self._batch_settings_load(self.project_dir)
             
             QMessageBox.information(self, "Success",
                                   f"Project created successfully!\n\n{self.project_dir}")
@@ -12482,6 +12822,7 @@ class QRAMainWindow(QMainWindow):
                     self.dir_status_text.append(f"  ✦ Created missing dir: {_d}")
 
             self.statusBar().showMessage(f"Project opened: {Path(directory).name}")
+            self._batch_settings_load(self.project_dir)
             
             # Auto-scan fds_inputs/ for existing .fds files
             self.scan_fds_input_files()
@@ -16425,107 +16766,24 @@ class QRAMainWindow(QMainWindow):
 
         Strategy: for each unique time step, average all X positions
         so we get a single representative value per time step.
+        The field itself comes from the shared loader (evc/fdb_store.py).
         """
         import numpy as np
-        from collections import defaultdict
-
-        rows_by_time = defaultdict(lambda: {
-            'soot': [], 'co2': [], 'co': [], 'temp': [], 'radi': [], 'oxygen': []
-        })
-
-        col_map = None   # will be set from header line
-        in_data = False
-        n_rows  = 0
-
-        # Read with multiple encoding fallbacks
-        for enc in ('utf-8', 'latin-1', 'cp1252'):
-            try:
-                raw = fdb_path.read_bytes().decode(enc, errors='replace')
-                break
-            except Exception:
-                continue
-
-        for line in raw.splitlines():
-            line = line.strip()
-            if not line or line.startswith('!') or line.startswith('#'):
-                continue
-
-            # Detect DATA START sentinel
-            if 'DATA START' in line.upper():
-                in_data = True
-                col_map = None   # reset; next non-separator line is data
-                continue
-
-            if 'DATA END' in line.upper():
-                break
-
-            if not in_data:
-                continue
+        from fdb_store import load_fdb
 
-            # Skip separator lines (all * or | or -)
-            if all(c in '*|-= \t' for c in line):
-                continue
-
-            # Try to parse as space-separated numbers
-            parts = line.split()
-            try:
-                nums = [float(p) for p in parts]
-            except ValueError:
-                # Could be column header line like "TIME  X-COOR  SOOT  CO2..."
-                # Try to build col_map from it
-                up = [p.upper() for p in parts]
-                col_map = {}
-                for i, h in enumerate(up):
-                    if 'TIME' in h:         col_map['time']   = i
-                    elif 'X' in h:          col_map['x']      = i
-                    elif 'SOOT' in h:       col_map['soot']   = i
-                    elif 'CO2' in h:        col_map['co2']    = i
-                    elif 'CO' in h and 'CO2' not in h: col_map['co'] = i
-                    elif 'TEMP' in h:       col_map['temp']   = i
-                    elif 'RADI' in h:       col_map['radi']   = i
-                    elif 'OXY' in h or 'O2' in h: col_map['oxygen'] = i
-                continue
-
-            if len(nums) < 2:
-                continue
-
-            # Default col positions if no header was found
-            if col_map is None:
-                col_map = {
-                    'time': 0, 'x': 1, 'soot': 2, 'co2': 3,
-                    'co': 4, 'temp': 5, 'radi': 6, 'oxygen': 7
-                }
-
-            def _g(key, default=0.0):
-                idx = col_map.get(key)
-                return nums[idx] if idx is not None and idx < len(nums) else default
-
-            t = _g('time')
-            rows_by_time[t]['soot'].append(_g('soot'))
-            rows_by_time[t]['co2'].append(_g('co2'))
-            rows_by_time[t]['co'].append(_g('co'))
-            rows_by_time[t]['temp'].append(_g('temp', 20.0))
-            rows_by_time[t]['radi'].append(_g('radi'))
-            rows_by_time[t]['oxygen'].append(_g('oxygen', 21.0))
-            n_rows += 1
-
-        if not rows_by_time:
+        fdb = load_fdb(fdb_path)
+        if not fdb.is_loaded:
             return None
-
-        times_sorted = sorted(rows_by_time.keys())
-
-        def _avg(d, key, default):
-            vals = d[key]
-            return float(np.mean(vals)) if vals else default
+        n_rows = len(fdb.times) * len(fdb.x_coords)
 
         result = {
-            'time':        np.array(times_sorted, dtype=float),
-            'temperature': np.array([_avg(rows_by_time[t], 'temp',   20.0) for t in times_sorted]),
-            'co':          np.array([_avg(rows_by_time[t], 'co',      0.0)  for t in times_sorted]),
-            'co2':         np.array([_avg(rows_by_time[t], 'co2',     0.04) for t in times_sorted]),
-            'o2':          np.array([_avg(rows_by_time[t], 'oxygen', 21.0)  for t in times_sorted]),
-            'soot':        np.array([_avg(rows_by_time[t], 'soot',    0.0)  for t in times_sorted]),
-            'radiation':   np.array([_avg(rows_by_time[t], 'radi',    0.0)  for t in times_sorted]),
+            'time':        np.array(fdb.times, dtype=float),
+            'temperature': fdb.temp.mean(axis=1),
+            'co':          fdb.co.mean(axis=1),
+            'co2':         fdb.co2.mean(axis=1),
+            'o2':          fdb.o2.mean(axis=1),
+            'soot':        fdb.soot.mean(axis=1),
+            'radiation':   fdb.rad.mean(axis=1),
         }
 
         # Derive visibility from soot density: Vis = C_vis / (K * rho_soot)
@@ -16657,18 +16915,11 @@ class QRAMainWindow(QMainWindow):
 
         # ── Per-time-step FED rate (dimensionless per minute) ─────────────────
         # FED_CO:   CO must be in ppm; constant 35000 is in ppm·min
-        fed_co_rate = np.where(co > 0, (co ** 1.036) / 35000.0, 0.0)
-
         # FED_O2:   O2 in %; constant 60 is in min
-        fed_o2_rate = np.where(
-            o2 < 21.0,
-            ((21.0 - o2) / 11.0) ** 3 / 60.0,
-            0.0
-        )
-
         # FED_Heat: Temp in °C; constant 5e7 is in °C^3.4·min
         # Only meaningful above ambient (~20 °C)
-        fed_heat_rate = np.where(temp > 20.0, (temp ** 3.4) / 5e7, 0.0)
+        from fed_kernels import iso13571_rates
+        fed_co_rate, fed_o2_rate, fed_heat_rate = iso13571_rates(co, o2, temp)
 
         # ── Time step (dt) in MINUTES ─────────────────────────────────────────
         # time array is in seconds; divide by 60 to convert to minutes
@@ -17747,6 +17998,10 @@ def main():
 
 
 if __name__ == "__main__":
+    # Batch EVC runs use a spawn process pool (evc/evc_parallel.py); a frozen
+    # Windows build must hand its worker processes off here.
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
 
 
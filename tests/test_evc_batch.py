@@ -0,0 +1,549 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# evc/ is not a package — modules import each other by bare name
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "evc"))
+
+from evc_engine import EVCEngine
+
+
+def _write_fdb(path, length=400.0, t_end=600.0, fire=(197.0, 203.0)):
+    """Synthetic plume FDB: smoke spreads both ways from the fire."""
+    xs = np.arange(0.0, length + 1e-9, 2.0)
+    ts = np.arange(0.0, t_end + 1e-9, 10.0)
+    fc = 0.5 * (fire[0] + fire[1])
+    lines = ["TUNNEL X COORDINATE",
+             "   MIN_X   MAX_X   NX GRID   FIRE PT",
+             f"   0.000   {length:.3f}   {len(xs)}   {fire[0]:.3f}- {fire[1]:.3f}",
+             "DATA START",
+             "  [SEC] [M] [KG/M3] [%] [PPM] [C] [KW/M2] [%]",
+             "  TIME  X-COOR  SOOT  CO2  CO  TEMP  RADI  OXYGEN"]
+    for t in ts:
+        reach = 20.0 + 0.3 * t
+        p = min(t / 120.0, 1.0) * np.exp(-np.abs(xs - fc) / reach)
+        for x, v in zip(xs, p):
+            lines.append(f"{t:8.1f} {x:8.2f} {300 * v:10.4f} {0.04 + 3 * v:8.4f} "
+                         f"{900 * v:9.3f} {20 + 250 * v:8.3f} {0.419 + 6 * v:8.4f} "
+                         f"{21 - 4 * v:8.4f}")
+    lines.append("DATA END")
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def _write_evc(path, length=400.0, fire=200.0, two_way=False, lanes=2):
+    """Minimal congested deck: the lines EVCParams reads, blanks elsewhere."""
+    ln = [""] * 95
+
+    def put(i, v):
+        ln[i - 1] = v
+
+    put(1, "SYNTH TUNNEL"); put(2, f"1 , {-1 if two_way else 1}")
+    put(3, f"{length}"); put(4, "0"); put(5, "-1.9"); put(6, "0"); put(7, "0")
+    put(8, f"{lanes}"); put(9, "0.5 , 0.5")
+    counts = [500, 10, 5, 20, 10, 5, 1]
+    mix = [80.0, 3.0, 1.0, 8.0, 5.0, 2.0, 1.0]
+    for i in range(7):
+        put(10 + i, f"{counts[i]}")
+        put(17 + i, f"{counts[i] if two_way else 0}")
+        put(24 + i, f"{mix[i]}"); put(31 + i, f"{mix[i]}")
+        put(38 + i, "1.0")
+        put(45 + i, f"{[4.5, 7.0, 12.0, 6.0, 8.0, 12.0, 15.0][i]}")
+        put(52 + i, f"{[3, 8, 30, 2, 2, 1, 1][i]}")
+    put(59, "0"); put(60, f"Fire_Point , {fire} , 2"); put(61, "0")
+    put(62, "1 , 0 , 0"); put(63, f"{fire} , 320 , 320"); put(64, f"{fire}")
+    put(65, "150"); put(66, "2000"); put(68, "20"); put(69, "0.05")
+    put(72, "720"); put(73, "480"); put(74, "1800"); put(78, "5")
+    put(79, "True,False"); put(80, "180"); put(81, "60"); put(85, "1 , 1 , 216")
+    put(87, " 0.3  0.6  0.4 "); put(88, "3.5 , 1.0")
+    path.write_text("\r\n".join(ln) + "\r\n")
+    return path
+
+
+def _digest(r):
+    return (r.run_no, r.ev_time, r.evacuees, r.fed, r.eq_fatal, r.pct_safe,
+            r.pct_fed, r.n_occ_zone, r.n_occ_total, r.n_evac_zone)
+
+
+def test_batched_iterations_match_serial(tmp_path):
+    fdb = _write_fdb(tmp_path / "020CFV0.FDB")
+    for stem, kw in (("020CFV0_P2", {}), ("020CFV0_P5", {"two_way": True, "lanes": 4})):
+        eng = EVCEngine(_write_evc(tmp_path / f"{stem}.evc", **kw), fdb)
+        eng.EXIT_FLOW_CAP = 0.5          # make the portal throttle bind
+        seeds = [11, 12, 13, 14]
+        serial = [eng._run_one(k, rng=np.random.default_rng(s))
+                  for k, s in enumerate(seeds, 1)]
+        batch = eng._run_batch(range(1, 5), [np.random.default_rng(s) for s in seeds])
+        assert [_digest(r) for r in batch] == [_digest(r) for r in serial]
+
+
+def test_run_uses_batches_and_reports_progress(tmp_path):
+    eng = EVCEngine(_write_evc(tmp_path / "020CFV0_P2.evc"),
+                    _write_fdb(tmp_path / "020CFV0.FDB"))
+    eng.BATCH_ITER_CHUNK = 2
+    seen = []
+    res = eng.run(n_iterations=5, progress_cb=lambda k, n: seen.append(k))
+    assert seen == [1, 2, 3, 4, 5]
+    assert [r.run_no for r in res.runs] == [1, 2, 3, 4, 5]
+    assert all(r.n_occ_total > 0 for r in res.runs)
+
+
+def test_seeded_run_is_reproducible(tmp_path):
+    fdb = _write_fdb(tmp_path / "020CFV0.FDB")
+    evc = _write_evc(tmp_path / "020CFV0_P2.evc")
+    a = EVCEngine(evc, fdb).run(n_iterations=4, seed=99)
+    b = EVCEngine(evc, fdb).run(n_iterations=4, seed=99)
+    assert [_digest(r) for r in a.runs] == [_digest(r) for r in b.runs]
+    # the per-run stream depends on the run number, not on call order
+    eng = EVCEngine(evc, fdb)
+    r3 = eng._run_one(3, rng=eng._iter_rng(99, 3))
+    assert _digest(r3) == _digest(a.runs[2])
+
+
+def test_parallel_batch_matches_serial(tmp_path):
+    from evc_parallel import DeckSpec, ParallelBatch
+
+    fdb = _write_fdb(tmp_path / "020CFV0.FDB")
+    decks = [_write_evc(tmp_path / "020CFV0_P2.evc"),
+             _write_evc(tmp_path / "020CFV0_P4.evc", fire=300.0)]
+    serial = [EVCEngine(d, fdb).run(n_iterations=5, exmax=1, seed=7) for d in decks]
+    specs = [DeckSpec(d, fdb) for d in decks]
+    for workers, unit in ((1, 2), (2, None)):
+        seen = {}
+        for i, eng, batch in ParallelBatch(specs, 5, exmax=1, seed=7, workers=workers,
+                                           unit_size=unit).results():
+            assert eng is not None, batch
+            seen[i] = batch
+        assert sorted(seen) == [0, 1]
+        for i, ref in enumerate(serial):
+            assert [_digest(r) for r in seen[i].runs] == [_digest(r) for r in ref.runs]
+            assert _digest(seen[i].avg) == _digest(ref.avg)
+
+
+def test_deck_table_is_tokenized_once(tmp_path):
+    import re
+
+    from evc_deck import DeckTable, EvcDeck
+    from evc_engine import EVCParams
+
+    path = _write_evc(tmp_path / "020CFV0_P2.evc", two_way=True)
+    with open(path, "a") as fh:
+        fh.write("JamDensity , 165\r\n")
+    p = EVCParams(path)
+    raw = path.read_bytes().decode("cp949").splitlines()
+    for idx in (2, 3, 9, 24, 60, 63, 85, 87, 200):
+        line = raw[idx - 1].strip() if idx <= len(raw) else ""
+        ref = [float(x) for x in re.findall(r"[-+]?[0-9]*\.?[0-9]+", line)]
+        assert list(p._deck.floats(idx)) == ref
+        assert p._line(idx) == line
+    assert p.is_two_way and p.exits == [0.0, 400.0]
+    assert p.max_congestion_vehicles == 165.0
+    assert p._deck.rows(24, 30) == [80.0, 3.0, 1.0, 8.0, 5.0, 2.0, 1.0]
+    deck = EvcDeck(str(path))
+    assert deck.hrr_mw == 20.0 and deck.fire_pos == 200.0 and deck.occ_pct[0] == 80.0
+    assert DeckTable.read(path).float(9, pos=1) == 0.5
+
+    # _read() re-tokenizes the file: the cache's invalidation hook
+    path.write_bytes(path.read_bytes().replace(b"JamDensity , 165", b"JamDensity , 150"))
+    p._read()
+    assert p.max_congestion_vehicles == 150.0
+
+
+def test_deck_encodings_are_tried_strictly(tmp_path):
+    from evc_deck import DeckTable
+
+    name = "\ud130\ub110"                                    # Korean tunnel name
+    for enc, text in (("cp949", name), ("utf-8", name), ("latin-1", "TEMP 20\xb0")):
+        path = tmp_path / f"{enc}.evc"
+        path.write_bytes(f"{text}\r\n1 , 2\r\n".encode(enc))
+        d = DeckTable.read(path)
+        assert d.line(1) == text and "\ufffd" not in d.line(1)
+        assert d.floats(2) == (1.0, 2.0)
+
+
+def test_grouped_exit_selection_and_throttle():
+    rng = np.random.default_rng(5)
+    exits = np.r_[0.0, np.arange(250.0, 4000.0, 250.0), 4000.0, 1000.0]
+    x = np.r_[rng.uniform(-50.0, 4050.0, 3000), exits, 125.0, 375.0]
+    ref = exits[np.argmin(np.abs(x[:, None] - exits[None, :]), axis=1)]
+    np.testing.assert_array_equal(EVCEngine._nearest_exit(x, exits), ref)
+
+    exit_pos = EVCEngine._nearest_exit(rng.uniform(0.0, 4000.0, 3000), exits)
+    evac_dir = np.where(rng.random(3000) < 0.5, 1.0, -1.0)
+    new_pos = exit_pos + evac_dir * rng.uniform(0.0, 3.0, 3000)
+    crossed = rng.random(3000) < 0.6
+    exit_grp = np.searchsorted(np.unique(exit_pos), exit_pos)
+    c_ref, p_ref = crossed.copy(), new_pos.copy()
+    for exv in np.unique(exit_pos[crossed]):         # the per-exit reference
+        sel = np.flatnonzero(c_ref & (exit_pos == exv))
+        hold = sel[np.argsort(-np.abs(p_ref[sel] - exv), kind="stable")][3:]
+        c_ref[hold] = False
+        p_ref[hold] = exv + np.where(evac_dir[hold] > 0, -0.5, 0.5)
+    EVCEngine._throttle_exits(crossed, new_pos, exit_pos, exit_grp, evac_dir, 3)
+    np.testing.assert_array_equal(crossed, c_ref)
+    np.testing.assert_array_equal(new_pos, p_ref)
+
+
+def test_active_set_compaction_is_exact(tmp_path):
+    eng = EVCEngine(_write_evc(tmp_path / "020CFV0_P5.evc", two_way=True, lanes=4),
+                    _write_fdb(tmp_path / "020CFV0.FDB", t_end=300.0))
+    eng.EXIT_FLOW_CAP = 0.5
+    runs = {}
+    for on in (False, True):
+        eng.ACTIVE_SET_COMPACT = on
+        runs[on] = [_digest(eng._run_one(k, rng=np.random.default_rng(k)))
+                    for k in (1, 2, 3)]
+    assert runs[True] == runs[False]
+
+
+def test_analytic_tail_matches_stepped_tail(tmp_path):
+    # short FDB: most of the walk-out happens in the post-FDB tail
+    fdb = _write_fdb(tmp_path / "020CFV0.FDB", t_end=200.0)
+    eng = EVCEngine(_write_evc(tmp_path / "020CFV0_P5.evc", two_way=True, lanes=4), fdb)
+    for knobs in ({"EXIT_FLOW_CAP": 0.2}, {"VB_EXIT_FLOW": False}):
+        for k, v in knobs.items():
+            setattr(eng, k, v)
+        runs = {}
+        for on in (False, True):
+            eng.ANALYTIC_TAIL = on
+            runs[on] = [_digest(eng._run_one(k, rng=np.random.default_rng(k)))
+                        for k in (1, 2, 3)]
+        assert runs[True] == runs[False]
+
+
+def test_rate_field_mode_stays_within_its_bound(tmp_path):
+    eng = EVCEngine(_write_evc(tmp_path / "020CFV0_P2.evc"),
+                    _write_fdb(tmp_path / "020CFV0.FDB"))
+    rf = eng.rate_field()
+    assert eng.rate_field() is rf                   # built once per FDB + settings
+    fdb = eng.fdb
+    np.testing.assert_allclose(rf.sample(fdb.times[5], fdb.x_coords), rf.grid[5])
+    assert np.all(rf.sample(30.0, np.array([-5.0, 1e4])) == rf.ambient)
+
+    st = eng._init_run(np.random.default_rng(3))
+    exact = eng._advance_fdb(st)[0]
+    eng.FED_RATE_FIELD = True
+    fast = eng._advance_fdb(st)[0]
+    assert 0.0 < rf.max_abs_dev
+    assert np.max(np.abs(fast - exact)) <= rf.fed_bound(fdb.times[-1])
+
+
+def test_sparse_fed_is_exact(tmp_path):
+    eng = EVCEngine(_write_evc(tmp_path / "020CFV0_P2.evc"),
+                    _write_fdb(tmp_path / "020CFV0.FDB"))
+    st = eng._init_run(np.random.default_rng(4))
+    eng.SPARSE_FED = False
+    dense = eng._advance_fdb(st)
+    eng.SPARSE_FED = True                   # default SMOKE_EXTENT_TOL = 0.0
+    assert EVCEngine.SMOKE_EXTENT_TOL == 0.0
+    sparse = eng._advance_fdb(st)
+    for a, b in zip(dense, sparse):
+        np.testing.assert_array_equal(a, b)
+
+    # Opt-in: print noise (TEMP 20.004) counts as clean air — FED within
+    # ~1e-5 /min of ambient over the 600 s field
+    eng.SMOKE_EXTENT_TOL = None
+    assert np.isfinite(eng.fdb.smoke_extent(None)[1:]).any()
+    assert not np.isfinite(eng.fdb.smoke_extent()[1:]).any()
+    noisy = eng._advance_fdb(st)
+    assert np.max(np.abs(noisy[0] - dense[0])) <= 2e-5 * 10.0
+
+
+def test_profile_is_opt_in_and_leaves_results_alone(tmp_path):
+    from evc_engine import RunProfile, profile_table
+
+    fdb = _write_fdb(tmp_path / "020CFV0.FDB")
+    evc = _write_evc(tmp_path / "020CFV0_P2.evc")
+    plain = EVCEngine(evc, fdb).run(n_iterations=4, seed=3)
+    assert plain.profile == {} and all(r.profile == {} for r in plain.runs)
+
+    prof = EVCEngine(evc, fdb, profile=True).run(n_iterations=4, seed=3)
+    assert [_digest(r) for r in prof.runs] == [_digest(r) for r in plain.runs]
+    for r in prof.runs:
+        assert set(r.profile) == set(RunProfile.PHASES + RunProfile.COUNTERS)
+        assert r.profile['occupants'] == r.n_occ_total
+        assert r.profile['sample'] > 0.0 and r.profile['timesteps'] > 0
+    assert prof.profile['occupants'] == sum(r.n_occ_total for r in prof.runs)
+    table = profile_table([prof])
+    assert table.splitlines()[2].startswith("020CFV0_P2")
+    assert table.splitlines()[-1].startswith("ALL")
+
+
+def test_history_recorder_matches_snapshots(tmp_path):
+    from evc_engine import FDBData
+    from evc_history import (HistoryRecorder, smoke_front, snapshot,
+                             write_dat_plain, write_dat_tec)
+
+    fdb = FDBData(_write_fdb(tmp_path / "020CFV0.FDB"))
+    rng = np.random.default_rng(5)
+    n = 300
+    exit_pos = np.where(rng.random(n) < 0.5, 0.0, 400.0)
+    rec = HistoryRecorder(fdb, 2)                     # grows past capacity
+    legacy = []
+    for ti, t in enumerate(fdb.times[:8]):
+        args = (t, rng.random(n) < 0.1 * ti, rng.random(n) * 1.3,
+                rng.random(n) * 400.0, exit_pos, rng.random(n) * 2e-3)
+        rec.record(*args, frame=ti)
+        smax, smin = smoke_front(fdb, t)
+        legacy.append(snapshot(*args[:5], soot_at_occ=args[5],
+                               smds_max=smax, smds_min=smin))
+    assert list(rec) == legacy
+    for write in (write_dat_tec, write_dat_plain):
+        write(rec, tmp_path / "a.dat")
+        write(legacy, tmp_path / "b.dat")
+        assert (tmp_path / "a.dat").read_text() == (tmp_path / "b.dat").read_text()
+
+    eng = EVCEngine(_write_evc(tmp_path / "020CFV0_P2.evc"), fdb.path)
+    full = eng._run_one(1, rng=np.random.default_rng(2), record_history=True)
+    eng.HISTORY_EVERY = 3
+    thin = eng._run_one(1, rng=np.random.default_rng(2), record_history=True)
+    assert _digest(thin) == _digest(full)
+    assert list(thin.history) == list(full.history)[::3]
+
+
+def test_vectorized_lane_draws_the_per_vehicle_stream():
+    from evc_engine import VB_OCC_SLOT_SPREAD, _vb_lane_occupants
+
+    lengths = [4.5, 6.0, 12.0, 4.0, 10.0, 14.0, 16.0]
+    gap = 1000.0 / 150.0 - lengths[0]
+    types = np.random.default_rng(0).integers(1, 8, 400)
+    for occ_f, queue_len in (([1, 2, 30, 1, 1, 2, 1], None),
+                             ([1.5, 0.4, 30.0, 1.0, 0.0, 1.7, 1.0], None),
+                             ([1.5, 0.4, 30.0, 1.0, 0.0, 1.7, 1.0], 900.0)):
+        ref_rng, rng = np.random.default_rng(9), np.random.default_rng(9)
+        x_ref, u_ref, t_ref, cursor, n_ref = [], [], [], 0.0, 0
+        for t in types:                   # the original per-vehicle loop
+            slot = gap + lengths[t - 1]
+            if queue_len is not None and cursor + slot > queue_len:
+                break
+            cursor += slot
+            n_ref += 1
+            n = int(occ_f[t - 1])
+            frac = occ_f[t - 1] - n
+            if frac > 0.0 and ref_rng.random() < frac:
+                n += 1
+            if n <= 0:
+                continue
+            offs = ref_rng.uniform(0.0, lengths[t - 1] + VB_OCC_SLOT_SPREAD, n)
+            x_ref += list(cursor - offs)
+            u_ref += list(ref_rng.random(n))
+            t_ref += [t] * n
+        x, u, vt, n_veh = _vb_lane_occupants(types, lengths, occ_f, gap, rng,
+                                             queue_len)
+        assert n_veh == n_ref
+        np.testing.assert_array_equal(x, x_ref)
+        np.testing.assert_array_equal(u, u_ref)
+        np.testing.assert_array_equal(vt, t_ref)
+        assert rng.random() == ref_rng.random()   # same draws consumed
+
+
+def test_queue_skeleton_is_built_once_per_deck(tmp_path, monkeypatch):
+    import evc_engine
+    from evc_engine import build_vb_vehicle_queue
+
+    eng = EVCEngine(_write_evc(tmp_path / "020CFV0_P5.evc", two_way=True, lanes=4),
+                    _write_fdb(tmp_path / "020CFV0.FDB"))
+    skel = eng.queue_skeleton()
+    assert skel is not None and len(skel.lanes) == 4
+    p = eng.params
+    for seed in (1, 2):
+        q = build_vb_vehicle_queue(p, False, float(p.fire_pt_x),
+                                   np.random.default_rng(seed),
+                                   jam_density=p.max_congestion_vehicles)
+        d = skel.draw(np.random.default_rng(seed))
+        for k in q:
+            np.testing.assert_array_equal(q[k], d[k])
+
+    def _no_rebuild(*a, **kw):
+        raise AssertionError("skeleton rebuilt per run")
+    monkeypatch.setattr(evc_engine, "vb_queue_skeleton", _no_rebuild)
+    eng.run(n_iterations=3, seed=5)
+    assert eng._last_queue_path == 'vb_queue'
+
+
+def test_adaptive_iterations_stop_on_ci_or_cap(tmp_path):
+    from evc_engine import AdaptiveIterations, ci_half_width
+    from evc_parallel import DeckSpec, ParallelBatch
+
+    assert ci_half_width([1.0, 1.0, 1.0]) == 0.0
+    with pytest.raises(ValueError):
+        AdaptiveIterations(min_iterations=3)
+    assert abs(ci_half_width([0.0, 1.0, 2.0, 3.0, 4.0]) - 1.9632) < 5e-3
+
+    fdb = _write_fdb(tmp_path / "020CFV0.FDB")
+    evc = _write_evc(tmp_path / "020CFV0_P2.evc")
+    loose = AdaptiveIterations(min_iterations=4, max_iterations=20, step=3,
+                               eq_fatal_tol=1e3, evacuees_tol=1e3)
+    b = EVCEngine(evc, fdb).run(seed=3, adaptive=loose)
+    assert len(b.runs) == 4 and b.precision['stop'] == 'converged'
+
+    tight = AdaptiveIterations(min_iterations=4, max_iterations=10, step=3,
+                               eq_fatal_tol=0.0, evacuees_tol=0.0, rel_tol=0.0)
+    b = EVCEngine(evc, fdb).run(seed=3, adaptive=tight)
+    assert [r.run_no for r in b.runs] == list(range(1, 11))
+    assert b.precision['stop'] == 'max_iterations' and b.precision['n'] == 10
+    assert b.precision['evacuees']['half_width'] > 0.0
+    fixed = EVCEngine(evc, fdb).run(n_iterations=10, seed=3)
+    assert [_digest(r) for r in b.runs] == [_digest(r) for r in fixed.runs]
+    assert fixed.precision['stop'] == 'fixed'
+
+    (i, eng, pb), = ParallelBatch([DeckSpec(evc, fdb)], 0, seed=3, workers=1,
+                                  unit_size=2, adaptive=tight).results()
+    assert [_digest(r) for r in pb.runs] == [_digest(r) for r in b.runs]
+    assert pb.precision == b.precision
+
+
+def test_result_cache_hits_only_on_identical_inputs(tmp_path):
+    from evc_parallel import DeckSpec, ParallelBatch
+    from evc_result_cache import ResultCache
+
+    fdb = _write_fdb(tmp_path / "020CFV0.FDB")
+    evc = _write_evc(tmp_path / "020CFV0_P2.evc")
+    cache = ResultCache(tmp_path / "cache")
+    first = EVCEngine(evc, fdb).run(n_iterations=3, seed=4, cache=cache)
+    again = EVCEngine(evc, fdb).run(n_iterations=3, seed=4, cache=cache)
+    assert not first.from_cache and again.from_cache
+    assert [_digest(r) for r in again.runs] == [_digest(r) for r in first.runs]
+    assert (cache.hits, cache.stores) == (1, 1)
+
+    EVCEngine(evc, fdb).run(n_iterations=3, cache=cache)          # unseeded
+    EVCEngine(evc, fdb).run(n_iterations=4, seed=4, cache=cache)
+    EVCEngine(evc, fdb, jam_density_override=120.0).run(n_iterations=3, seed=4,
+                                                        cache=cache)
+    eng = EVCEngine(evc, fdb)
+    eng.EXIT_FLOW_CAP = 0.5
+    eng.run(n_iterations=3, seed=4, cache=cache)
+    evc.write_text(evc.read_text().replace("SYNTH", "SYNTH B"))   # deck edit
+    EVCEngine(evc, fdb).run(n_iterations=3, seed=4, cache=cache)
+    assert (cache.hits, cache.stores) == (1, 5)
+
+    evc2 = _write_evc(tmp_path / "020CFV0_P4.evc", fire=300.0)
+    specs = [DeckSpec(evc, fdb), DeckSpec(evc2, fdb)]
+    out = {i: b for i, _, b in ParallelBatch(specs, 3, seed=4, workers=1,
+                                             cache=cache).results()}
+    assert out[0].from_cache and not out[1].from_cache
+    out = {i: b for i, _, b in ParallelBatch(specs, 3, seed=4, workers=1,
+                                             cache=cache).results()}
+    assert out[0].from_cache and out[1].from_cache
+
+
+def test_batch_settings_drive_the_result_cache(tmp_path):
+    # The Tab-4 batch path: settings saved with the project -> seed ->
+    # ResultCache -> ParallelBatch; the second batch comes from the cache.
+    from evc_batch_settings import BatchSettings
+    from evc_parallel import DeckSpec, ParallelBatch
+
+    proj = tmp_path / "proj"
+    proj.mkdir()
+    fdb = _write_fdb(tmp_path / "020CFV0.FDB")
+    specs = [DeckSpec(_write_evc(tmp_path / "020CFV0_P2.evc"), fdb),
+             DeckSpec(_write_evc(tmp_path / "020CFV0_P4.evc", fire=300.0), fdb)]
+
+    def batch():
+        bs = BatchSettings.load(proj)
+        seed = bs.batch_seed()
+        bs.save(proj)
+        cache = bs.result_cache(proj)
+        out = {i: b for i, _, b in ParallelBatch(
+            specs, 3, seed=seed, workers=bs.pool_workers(), cache=cache,
+            dedupe=bs.dedupe).results()}
+        return seed, cache, out
+
+    BatchSettings(workers=1).save(proj)                 # not pinned: no cache
+    seed, cache, out = batch()
+    assert cache is None and not (proj / "evc_cache").exists()
+    assert batch()[0] != seed
+
+    BatchSettings(workers=1, pin_seed=True, cache=True).save(proj)
+    seed, cache, first = batch()
+    assert (cache.hits, cache.stores) == (0, 2)
+    assert not any(b.from_cache for b in first.values())
+    seed2, cache, again = batch()
+    assert seed2 == seed and (cache.hits, cache.stores) == (2, 0)
+    assert all(b.from_cache for b in again.values())
+    for i in first:
+        assert [_digest(r) for r in again[i].runs] == [_digest(r) for r in first[i].runs]
+
+
+def test_result_cache_key_covers_all_engine_state(tmp_path):
+    from evc_result_cache import batch_key
+
+    fdb = _write_fdb(tmp_path / "020CFV0.FDB")
+    evc = _write_evc(tmp_path / "020CFV0_P2.evc")
+    base = batch_key(EVCEngine(evc, fdb), 3, 4)
+    assert batch_key(EVCEngine(evc, fdb), 3, 4) == base
+
+    eng = EVCEngine(evc, fdb)
+    eng.EXIT_FLOW_CAP = np.float64(0.5)                 # numpy scalar knob
+    assert batch_key(eng, 3, 4) != base
+    eng.EXIT_FLOW_CAP = 0.5
+    numpy_key = batch_key(eng, 3, 4)
+    eng.EXIT_FLOW_CAP = np.float64(0.5)
+    assert batch_key(eng, 3, 4) == numpy_key
+
+    eng = EVCEngine(evc, fdb)
+    eng.FED_THRESHOLDS = np.array(eng.FED_THRESHOLDS) * 0.5   # array knob
+    assert batch_key(eng, 3, 4) != base
+    eng = EVCEngine(evc, fdb)
+    eng._occ_per_veh_override = 3.0                     # set after construction
+    assert batch_key(eng, 3, 4) != base
+
+    eng = EVCEngine(evc, fdb)
+    eng.run(n_iterations=2, seed=1)                     # caches are not inputs
+    assert batch_key(eng, 3, 4) == base
+    eng.NEW_KNOB = object()
+    with pytest.raises(TypeError):
+        batch_key(eng, 3, 4)
+
+
+def test_alias_decks_are_simulated_once(tmp_path, monkeypatch):
+    import evc_parallel
+    from evc_parallel import DeckSpec, ParallelBatch
+
+    # FVM / NV0 decks on byte-identical fields: one scenario; the normal-
+    # traffic deck (same bytes, N in the scenario code) is not an alias.
+    specs = []
+    for code in ("020CFVM", "020CNV0", "020NFVM"):
+        fdb = _write_fdb(tmp_path / f"{code}.FDB")
+        specs.append(DeckSpec(_write_evc(tmp_path / f"{code}_P2.evc"), fdb))
+    calls = []
+    run_on = evc_parallel._run_on
+    monkeypatch.setattr(evc_parallel, "_run_on",
+                        lambda eng, ks, seed: calls.append(eng.evc_path.stem)
+                        or run_on(eng, ks, seed))
+    pb = ParallelBatch(specs, 3, seed=5, workers=1)
+    out = {i: b for i, _, b in pb.results()}
+    assert pb.aliases == {1: 0}
+    assert sorted(set(calls)) == ["020CFVM_P2", "020NFVM_P2"]
+    assert out[1].chid == "020CNV0_P2" and out[1].alias_of == "020CFVM_P2"
+    assert [_digest(r) for r in out[1].runs] == [_digest(r) for r in out[0].runs]
+    assert out[0].alias_of is None and out[2].alias_of is None
+
+    calls.clear()
+    out = {i: b for i, _, b in ParallelBatch(specs, 3, seed=5, workers=1,
+                                             dedupe=False).results()}
+    assert len(set(calls)) == 3 and out[1].alias_of is None
+
+
+def test_compact_mode_is_opt_in_and_keeps_fed_totals_float64(tmp_path):
+    evc = _write_evc(tmp_path / "020CFV0_P2.evc")
+    fdb = _write_fdb(tmp_path / "020CFV0.FDB")
+    ref, eng = EVCEngine(evc, fdb), EVCEngine(evc, fdb, compact=True)
+    assert ref.fdb.cube.dtype == np.float64 and eng.fdb.cube.dtype == np.float32
+    assert eng.fdb.cube.nbytes * 2 == ref.fdb.cube.nbytes
+    assert EVCEngine(evc, fdb).fdb is ref.fdb       # separate registry entries
+
+    st = eng._init_run(np.random.default_rng(6))
+    assert all(getattr(st, k).dtype == np.float32 for k in st.KINEMATICS)
+    fed = eng._advance_fdb(st)[0]
+    exact = ref._advance_fdb(ref._init_run(np.random.default_rng(6)))[0]
+    assert fed.dtype == np.float64
+    np.testing.assert_allclose(fed, exact, rtol=1e-4, atol=1e-9)
+
+    a, b = ref.run(n_iterations=3, seed=7), eng.run(n_iterations=3, seed=7)
+    for x, y in zip(a.runs, b.runs):
+        assert x.fed == y.fed and x.evacuees == y.evacuees
+        assert abs(x.ev_time - y.ev_time) <= 1e-3
+        assert abs(x.eq_fatal - y.eq_fatal) <= 1e-6 * max(1.0, x.eq_fatal)
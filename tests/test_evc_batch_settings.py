@@ -0,0 +1,78 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# evc/ is not a package — modules import each other by bare name
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "evc"))
+
+from evc_batch_settings import BatchSettings
+from fdb_store import FdbRegistry
+
+
+def test_settings_round_trip_through_the_project(tmp_path):
+    assert BatchSettings.load(tmp_path) == BatchSettings()
+    saved = BatchSettings(fdb_budget_mb=1536.0, profile=True, compact=True,
+                          cache=True, dedupe=False)
+    saved.save(tmp_path)
+    assert BatchSettings.load(tmp_path) == saved
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_settings_file_tolerates_unknown_keys_and_bad_json(tmp_path):
+    p = BatchSettings.path(tmp_path)
+    p.write_text(json.dumps({"fdb_budget_mb": 512.0, "from_the_future": 1}))
+    assert BatchSettings.load(tmp_path).fdb_budget_mb == 512.0
+    p.write_text("{ not json")
+    assert BatchSettings.load(tmp_path) == BatchSettings()
+    assert BatchSettings.load("") == BatchSettings()
+    assert BatchSettings().save("") is None
+
+
+def test_apply_fdb_budget_sets_the_registry_budget():
+    reg = FdbRegistry(budget_mb=4096)
+    BatchSettings(fdb_budget_mb=256.0).apply_fdb_budget(reg)
+    assert reg.budget_bytes == 256 * 2 ** 20
+
+
+def test_default_budget_follows_the_environment(monkeypatch):
+    import fdb_store
+    monkeypatch.setenv("EVC_FDB_BUDGET_MB", "2048")
+    assert fdb_store._env_budget_mb() == 2048.0
+    monkeypatch.setenv("EVC_FDB_BUDGET_MB", "lots")
+    assert fdb_store._env_budget_mb() == 4096.0
+
+
+def test_pinned_seed_is_drawn_once_and_kept_with_the_project(tmp_path):
+    bs = BatchSettings(pin_seed=True)
+    seed = bs.batch_seed()
+    assert bs.seed == seed and bs.batch_seed() == seed
+    bs.save(tmp_path)
+    assert BatchSettings.load(tmp_path).batch_seed() == seed
+
+    free = BatchSettings(pin_seed=False, seed=seed)
+    assert free.batch_seed() != seed and free.seed == seed
+
+
+def test_workers_zero_means_one_per_cpu(monkeypatch):
+    import os
+    monkeypatch.setattr(os, "cpu_count", lambda: 6)
+    assert BatchSettings().pool_workers() == 6
+    assert BatchSettings(workers=1).pool_workers() == 1
+
+
+def test_adaptive_rule_from_settings(tmp_path):
+    from evc_engine import AdaptiveIterations
+
+    assert BatchSettings().adaptive_rule(26) is None
+    bs = BatchSettings(adaptive=True, adaptive_min=6, eq_fatal_tol=0.1,
+                       evacuees_tol=3.0, rel_tol=0.05)
+    assert bs.adaptive_rule(26) == AdaptiveIterations(
+        min_iterations=6, max_iterations=26, eq_fatal_tol=0.1,
+        evacuees_tol=3.0, rel_tol=0.05)
+    bs.adaptive_max = 80                      # its own cap over the spinner
+    bs.save(tmp_path)
+    assert BatchSettings.load(tmp_path).adaptive_rule(26).max_iterations == 80
+    with pytest.raises(ValueError):
+        BatchSettings(adaptive=True, adaptive_min=3).adaptive_rule(26)
@@ -0,0 +1,25 @@
+import json
+import sys
+from pathlib import Path
+
+# evc/ is not a package — modules import each other by bare name
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "evc"))
+
+from evc_bench import STAGES, BenchCase, compare, main, run_benchmarks
+
+
+def test_benchmark_document_and_compare(tmp_path):
+    base = BenchCase(length=300.0, dx=2.0, frames=16, t_end=300.0)
+    doc = run_benchmarks({'traffic': ['C', 'N'], 'exits': [3]}, base,
+                         iterations=2, repeat=1, log=lambda *_: None)
+    assert [c['sweep'] for c in doc['cases']] == ['traffic', 'traffic', 'exits']
+    assert [c['params']['traffic'] for c in doc['cases']] == ['C', 'N', 'C']
+    for c in doc['cases']:
+        assert set(c['timings']) == set(STAGES)
+        assert c['n_occ'] > 0 and all(v > 0 for v in c['timings'].values())
+    doc = json.loads(json.dumps(doc))                  # JSON round trip
+    assert len(compare(doc, doc).splitlines()) == 1 + 3 * len(STAGES)
+
+    out = tmp_path / "b.json"
+    out.write_text(json.dumps(doc))
+    assert main(["--compare", str(out), str(out)]) == 0
@@ -0,0 +1,333 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# evc/ is not a package — modules import each other by bare name
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "evc"))
+
+from evc_engine import FDBData
+
+
+def _write_fdb(path, nx=41, nt=7):
+    """Small synthetic FDB in the EVC text layout (time-major, x-minor)."""
+    xs = np.linspace(0.0, 40.0, nx)
+    ts = np.linspace(0.0, 60.0, nt)
+    lines = ["TUNNEL X COORDINATE",
+             "   MIN_X   MAX_X   NX GRID   FIRE PT",
+             f"   0.000   40.000   {nx}   19.000- 21.000",
+             "DATA START",
+             "  [SEC] [M] [KG/M3] [%] [PPM] [C] [KW/M2] [%]",
+             "  TIME  X-COOR  SOOT  CO2  CO  TEMP  RADI  OXYGEN"]
+    for t in ts:
+        for x in xs:
+            p = np.exp(-((x - 20.0) / 8.0) ** 2) * t / 60.0
+            lines.append(f"{t:8.1f} {x:8.2f} {0.3 * p:10.5f} {0.04 + 2 * p:8.4f} "
+                         f"{600 * p:9.3f} {20 + 250 * p:8.3f} {0.419 + 5 * p:8.4f} "
+                         f"{21 - 3 * p:8.4f}")
+    lines.append("DATA END")
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def test_sample_all_matches_get_value(tmp_path):
+    fdb = FDBData(_write_fdb(tmp_path / "S.FDB"))
+    assert fdb.is_loaded
+    assert fdb.cube.shape == (7, len(FDBData.SPECIES), 41)
+    assert fdb.fire_center == 20.0
+
+    rng = np.random.default_rng(7)
+    x = np.concatenate([rng.uniform(-5.0, 45.0, 500), [0.0, 40.0, 13.0]])
+    for t in (-1.0, 0.0, 4.2, 30.0, 59.9, 60.0, 90.0):
+        fused = fdb.sample_all(t, x)
+        for i, key in enumerate(FDBData.SPECIES):
+            np.testing.assert_array_equal(fused[i], fdb.get_value(key, t, x))
+
+
+def test_sample_all_ambient_outside_mesh(tmp_path):
+    fdb = FDBData(_write_fdb(tmp_path / "S.FDB"))
+    fused = fdb.sample_all(30.0, np.array([-10.0, 100.0]))
+    for i, key in enumerate(FDBData.SPECIES):
+        assert np.all(fused[i] == FDBData.AMBIENT[key])
+
+
+def test_bulk_parse_matches_line_parser(tmp_path):
+    path = _write_fdb(tmp_path / "S.FDB")
+    bulk = FDBData(path)
+
+    # Shuffled rows force the searchsorted scatter instead of the reshape
+    lines = path.read_text().splitlines()
+    head, body = lines[:6], lines[6:-1]
+    np.random.default_rng(3).shuffle(body)
+    shuffled = tmp_path / "R.FDB"
+    shuffled.write_text("\n".join(head + body + ["DATA END"]) + "\n")
+    scattered = FDBData(shuffled)
+
+    ref = FDBData(path)
+    ref.cube, ref.fire_center = None, None
+    ref._parse_lines(path.read_bytes())
+    ref._stack_cube()
+    for fdb in (bulk, scattered):
+        assert fdb.fire_center == ref.fire_center
+        np.testing.assert_array_equal(fdb.times, ref.times)
+        np.testing.assert_array_equal(fdb.x_coords, ref.x_coords)
+        np.testing.assert_array_equal(fdb.cube, ref.cube)
+
+
+def test_sidecar_roundtrip_and_invalidation(tmp_path):
+    import fdb_store
+
+    path = _write_fdb(tmp_path / "S.FDB")
+    first = FDBData(path)
+    cube_p, head_p = fdb_store.sidecar_paths(path)
+    assert cube_p.is_file() and head_p.is_file()
+
+    cached = fdb_store.load_fdb(path)
+    assert cached.md5 == first.md5 == fdb_store.file_md5(path)
+    assert cached.fire_extent == (19.0, 21.0)
+    np.testing.assert_array_equal(cached.cube, first.cube)
+    np.testing.assert_array_equal(cached.times, first.times)
+
+    # Rewritten source with different content → sidecar is stale, re-parse
+    _write_fdb(path, nx=21)
+    fresh = fdb_store.load_fdb(path)
+    assert fresh.cube.shape == (7, len(FDBData.SPECIES), 21)
+    assert fresh.md5 == fdb_store.file_md5(path)
+
+
+def test_registry_shares_and_evicts(tmp_path):
+    import fdb_store
+
+    a = _write_fdb(tmp_path / "A.FDB")
+    b = _write_fdb(tmp_path / "B.FDB", nx=21)
+    reg = fdb_store.FdbRegistry()
+    assert reg.get(a) is reg.get(a)
+    assert (reg.hits, reg.misses) == (1, 1)
+
+    # Budget below two cubes: loading B evicts A (least recently used)
+    one = fdb_store.FdbRegistry.nbytes(reg.get(a))
+    reg.set_budget((one + 1) / 1048576.0)
+    reg.get(b)
+    assert reg.stats()['entries'] == 1 and reg.evictions == 1
+    reg.get(a)
+    assert reg.misses == 3
+
+    # Adopted fields are charged against the same budget
+    reg.adopt(fdb_store.FdbRegistry.key(b), FDBData(b))
+    assert reg.stats()['entries'] == 1 and reg.evictions == 3
+    assert reg.used_bytes <= reg.budget_bytes
+
+
+def test_shared_memory_attach_is_readonly_view(tmp_path):
+    from multiprocessing import shared_memory
+
+    import fdb_store
+
+    path = _write_fdb(tmp_path / "S.FDB")
+    src = FDBData(path)
+    with fdb_store.SharedFdbSet() as shared:
+        desc = shared.share(src)
+        assert shared.share(src) is desc          # one segment per source
+        fdb = fdb_store.attach_shared(desc)
+        assert not fdb.cube.flags.writeable and not fdb.cube.flags.owndata
+        np.testing.assert_array_equal(fdb.cube, src.cube)
+        assert fdb.fire_extent == (19.0, 21.0) and fdb.md5 == src.md5
+        for t in (0.0, 25.0, 60.0):
+            np.testing.assert_array_equal(fdb.sample_all(t, src.x_coords),
+                                          src.sample_all(t, src.x_coords))
+        assert fdb_store.load_fdb(path) is fdb    # adopted into the registry
+    try:
+        shared_memory.SharedMemory(name=desc['segment'])
+        raise AssertionError("segment outlived its SharedFdbSet")
+    except FileNotFoundError:
+        pass
+
+
+_WORKERS_SCRIPT = """
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import fdb_store
+
+
+def work(desc):
+    return float(fdb_store.attach_shared(desc).cube.sum())
+
+
+if __name__ == "__main__":
+    src = fdb_store.load_fdb(sys.argv[1], use_registry=False)
+    with fdb_store.SharedFdbSet() as shared:
+        desc = shared.share(src)
+        # workers retire after each task: their exit must not unlink it
+        with ProcessPoolExecutor(3, mp_context=multiprocessing.get_context("spawn"),
+                                 max_tasks_per_child=1) as pool:
+            sums = list(pool.map(work, [desc] * 6))
+    assert sums == [float(src.cube.sum())] * 6, sums
+    print("ok")
+"""
+
+
+def test_shared_segment_survives_several_workers(tmp_path, monkeypatch):
+    import os
+    import subprocess
+    from multiprocessing import resource_tracker
+
+    import fdb_store
+
+    path = _write_fdb(tmp_path / "S.FDB")
+    with fdb_store.SharedFdbSet() as shared:       # attaching does not register
+        desc = shared.share(FDBData(path))
+        seen = []
+        monkeypatch.setattr(resource_tracker, "register",
+                            lambda name, rtype: seen.append(name))
+        shm = fdb_store._open_segment(desc['segment'])
+        shm.close()
+        monkeypatch.undo()
+        assert seen == []
+
+    script = tmp_path / "workers.py"
+    script.write_text(_WORKERS_SCRIPT)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [str(Path(__file__).resolve().parent.parent / "evc"),
+         os.environ.get("PYTHONPATH", "")]))
+    proc = subprocess.run([sys.executable, str(script), str(path)], env=env,
+                          capture_output=True, text=True, timeout=120)
+    assert proc.returncode == 0 and proc.stdout.strip() == "ok", proc.stderr
+    assert "Traceback" not in proc.stderr and "leaked" not in proc.stderr, proc.stderr
+
+
+def test_smoke_extent_bounds_the_non_ambient_field(tmp_path):
+    fdb = FDBData(_write_fdb(tmp_path / "S.FDB"))
+    ext = fdb.smoke_extent(0.0)
+    assert ext.shape == (7, 2)
+    assert ext[0, 0] == np.inf and ext[0, 1] == -np.inf     # t = 0: no smoke yet
+    amb = np.array([FDBData.AMBIENT[k] for k in FDBData.SPECIES[:5]])[:, None]
+    x = np.linspace(-5.0, 45.0, 1001)
+    for t in (0.0, 10.0, 25.0, 60.0):
+        lo, hi = fdb.smoke_bounds(t, 0.0)
+        out = (x <= lo) | (x >= hi)
+        np.testing.assert_array_equal(fdb.sample_all(t, x[out])[:5],
+                                      np.broadcast_to(amb, (5, out.sum())))
+
+
+def test_uniform_grid_lookups_match_the_searched_ones(tmp_path):
+    fdb = FDBData(_write_fdb(tmp_path / "S.FDB"))
+    assert fdb.t_step == 10.0 and fdb.x_step == 1.0
+    # 2-decimal x on a 2/3 m pitch is not even: the general path is kept
+    assert FDBData(_write_fdb(tmp_path / "R.FDB", nx=61)).x_step is None
+
+    rng = np.random.default_rng(11)
+    x = np.concatenate([rng.uniform(-5.0, 45.0, 400), fdb.x_coords,
+                        np.nextafter(fdb.x_coords, -np.inf), [np.nan]])
+    for t in (-1.0, 0.0, 10.0, 33.3, 59.999, 60.0, 75.0):
+        fast = fdb.sample_all(t, x)
+        lo, hi, w = fdb.frame_pair(t)
+        fdb.t_step = fdb.x_step = None
+        assert fdb.frame_pair(t) == (lo, hi, w)
+        np.testing.assert_array_equal(fast, fdb.sample_all(t, x))
+        fdb._index_axes()
+    for i, key in enumerate(FDBData.SPECIES):
+        ref = np.interp(x[:-1], fdb.x_coords, getattr(fdb, key)[3],
+                        left=FDBData.AMBIENT[key], right=FDBData.AMBIENT[key])
+        np.testing.assert_array_equal(fdb.get_value(key, 30.0, x[:-1]), ref)
+
+
+def test_fingerprints_prefilter_and_persist(tmp_path):
+    import os
+    from fdb_fields import build_alias_map
+    from fdb_fingerprint import QUICK_BLOCK, FingerprintIndex
+    from fdb_store import file_md5
+
+    data = bytearray(np.random.default_rng(0).bytes(40 * QUICK_BLOCK))
+    d = tmp_path / "fdb"; d.mkdir()
+    (d / "020CFVM.FDB").write_bytes(data)
+    (d / "020CNV0.FDB").write_bytes(data)               # alias
+    data[QUICK_BLOCK + 5] ^= 1                          # between sampled blocks
+    (d / "020CNVC.FDB").write_bytes(data)
+    (d / "030CFVM.FDB").write_bytes(data[:-1])          # other size
+    amap = build_alias_map(d)                         # first listed is canonical
+    assert amap["020CFVM"] == amap["020CNV0"] in ("020CFVM.FDB", "020CNV0.FDB")
+    assert (amap["020CNVC"], amap["030CFVM"]) == ("020CNVC.FDB", "030CFVM.FDB")
+
+    db = tmp_path / "project.db"
+    paths = [d / f for f in sorted(os.listdir(d))]
+    with FingerprintIndex(db) as index:
+        canon = index.alias_groups(paths)
+        assert index.stats == {"reused": 0, "quick": 4, "full": 3}
+    assert canon[str(paths[1])] == str(paths[0]) and canon[str(paths[2])] == str(paths[2])
+    with FingerprintIndex(db) as index:             # reopened: stat only
+        assert index.alias_groups(paths) == canon
+        assert index.md5(paths[0]) == file_md5(paths[0])
+        assert index.stats == {"reused": 5, "quick": 0, "full": 0}
+        os.utime(paths[1], ns=(1, 1))
+        index.alias_groups(paths)
+        assert (index.stats["quick"], index.stats["full"]) == (1, 1)
+
+
+def test_missing_rows_take_the_clean_air_fill(tmp_path):
+    from fdb_fields import FdbField
+
+    path = _write_fdb(tmp_path / "S.FDB")
+    lines = path.read_text().splitlines()
+    gap = tmp_path / "G.FDB"                       # drop (t=30 s, x=20 m)
+    gap.write_text("\n".join(ln for ln in lines
+                             if not ln.startswith("    30.0    20.00")) + "\n")
+    ref, fdb = FDBData(path), FDBData(gap)
+    assert fdb.cube.shape == ref.cube.shape
+    it, ix = 3, 20
+    fill = {'co': 0.0, 'co2': 0.04, 'o2': 21.0, 'temp': 20.0, 'rad': 0.0, 'soot': 0.0}
+    for plane, key in enumerate(FDBData.SPECIES):
+        assert fdb.cube[it, plane, ix] == fill[key] != ref.cube[it, plane, ix]
+    mask = np.ones(ref.cube.shape, dtype=bool)
+    mask[it, :, ix] = False
+    np.testing.assert_array_equal(fdb.cube[mask], ref.cube[mask])
+
+    field = FdbField(str(gap))                     # no NaN left in the field
+    assert field.grid['temp'][it, ix] == 20.0 and field.grid['o2'][it, ix] == 21.0
+    assert not any(np.isnan(g).any() for g in field.grid.values())
+    assert np.isfinite(field.sample(30.0, 20.0, 'co'))
+
+
+def test_smoke_extent_opt_in_tol_ignores_ambient_noise(tmp_path):
+    fdb = FDBData(_write_fdb(tmp_path / "S.FDB"))
+    # FDS-style noise on the clean air: TEMP 20.0001, O2 20.9995, CO 0.02 ppm
+    amb = {k: FDBData.AMBIENT[k] for k in FDBData.SPECIES}
+    cube = fdb.cube.copy()
+    far = np.abs(np.asarray(fdb.x_coords) - 20.0) > 10.0     # plume: 10..30 m
+    for plane, key in enumerate(FDBData.SPECIES):
+        cube[:, plane, far] = amb[key]
+    rng = np.random.default_rng(5)
+    for plane, (key, eps) in enumerate([('co', 0.02), ('co2', 5e-4), ('o2', 5e-4),
+                                        ('temp', 1e-4), ('rad', 5e-4)]):
+        clean = cube[:, plane] == amb[key]
+        cube[:, plane][clean] += rng.uniform(-eps, eps, clean.sum())
+    noisy = FDBData.from_cube(fdb.path, fdb.times, fdb.x_coords, cube, fdb.fire_center)
+    ext0, ext = noisy.smoke_extent(), noisy.smoke_extent(None)
+    assert np.all(ext0[:, 0] == -np.inf) and np.all(ext0[:, 1] == np.inf)
+    np.testing.assert_array_equal(ext[0], [np.inf, -np.inf])    # t = 0: clean
+    np.testing.assert_array_equal(ext[1:], np.tile([9.0, 31.0], (6, 1)))
+    # Outside the SMOKE_TOL extent every dose species is within SMOKE_TOL
+    x = np.asarray(noisy.x_coords)
+    for it in range(1, len(noisy.times)):
+        lo, hi = ext[it]
+        out = (x <= lo) | (x >= hi)
+        for plane, key in enumerate(FDBData.SPECIES[:5]):
+            dev = np.abs(noisy.cube[it, plane, out] - amb[key])
+            assert np.all(dev <= FDBData.SMOKE_TOL[key])
+
+
+def test_fire_pt_header_accepts_signed_coordinates(tmp_path):
+    import fdb_store
+
+    src = _write_fdb(tmp_path / "S.FDB").read_text()
+    head = "   0.000   40.000   41   19.000- 21.000"
+    for fire, extent in (("-21.000- -19.000", (-21.0, -19.0)),
+                         ("-21.000 - -19.000", (-21.0, -19.0)),
+                         ("-1.500-2.500", (-1.5, 2.5)),
+                         ("-20.000", (-20.0, -20.0))):
+        path = tmp_path / "N.FDB"
+        path.write_text(src.replace(head, f"   -40.000   0.000   41   {fire}"))
+        fdb = FDBData(path)
+        assert fdb.fire_extent == extent, fire
+        assert fdb.fire_center == 0.5 * (extent[0] + extent[1])
+        assert fdb_store.load_fdb(path, use_registry=False).fire_extent == extent
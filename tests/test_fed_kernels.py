@@ -0,0 +1,149 @@
+import math
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# evc/ is not a package — modules import each other by bare name
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "evc"))
+
+import fed_kernels as fk
+
+
+def _inputs(n=4000, seed=3):
+    rng = np.random.default_rng(seed)
+    co = rng.uniform(-5.0, 3000.0, n)
+    co[:40] = 0.0
+    co2 = rng.uniform(0.0, 15.0, n)
+    o2 = rng.uniform(5.0, 21.5, n)
+    T = rng.uniform(10.0, 200.0, n)
+    q = rng.uniform(0.0, 20.0, n)
+    return co, co2, o2, T, q
+
+
+def _ref_binary(co, co2, o2, T, q, div71, heat_always, include_o2):
+    """The former inline EVCEngine._fed_rate_binary expression."""
+    with np.errstate(invalid='ignore'):
+        rmv = np.exp(0.1903 * co2 + 2.004)
+        if div71:
+            rmv = rmv / 7.1
+        r_co = np.where(co > 0.0, (co ** 1.036) / 36177.26 * rmv, 0.0)
+    if heat_always:
+        r_heat = np.exp(0.0273 * T - 5.1849)
+    else:
+        r_heat = np.where(T > 40.0, np.exp(0.0273 * T - 5.1849), 0.0)
+    r_rad = (np.where(q > 2.5, np.power(np.maximum(q, 1e-9), 1.33) / 80.0, 0.0)
+             if q is not None else 0.0)
+    rate = r_co + r_heat + r_rad
+    rate = rate + np.where(co2 < 11.0, np.exp((co2 - 20.721) * 0.511 - 8.55), 0.0)
+    if include_o2:
+        rate = rate + np.exp(0.5189 * np.maximum(20.72 - o2, 0.0) - 6.1623)
+    return rate
+
+
+def _ref_purser_vb(co, co2, o2, T, q, two_way):
+    """The former inline EVCEngine._fed_rate_purser_vb expression."""
+    vco2 = np.exp(0.1903 * co2 + 2.004)
+    with np.errstate(invalid='ignore'):
+        r_co = np.where(co > 0.0, (co ** 1.036) / 36177.26 * vco2, 0.0)
+    r_heat = np.where(T > 40.0, np.exp(0.0273 * T - 5.1849), 0.0)
+    r_co2 = np.where(co2 > 1.0, np.exp(0.5189 * co2 - 6.1623), 0.0)
+    s, i = (0.511, 8.55) if two_way else (0.54, 8.13)
+    r_o2 = np.where(o2 < 11.0, np.exp(s * (20.721 - o2) - i), 0.0)
+    rate = r_co + r_heat + r_co2 + r_o2
+    if q is not None:
+        rate = rate + np.where(q > 2.5, np.power(np.maximum(q, 1e-9), 1.33) / 80.0, 0.0)
+    return rate
+
+
+@pytest.mark.parametrize("div71,heat_always,include_o2,radiant",
+                         [(True, True, False, True), (False, False, True, False),
+                          (True, False, False, True)])
+def test_binary_rate_is_bit_identical(div71, heat_always, include_o2, radiant):
+    from fed_eqfatal_model import fed_rate_binary, fed_rate_components
+    co, co2, o2, T, q = _inputs()
+    q = q if radiant else None
+    ref = _ref_binary(co, co2, o2, T, q, div71, heat_always, include_o2)
+    got = fed_rate_binary(co, co2, o2, T, q, co_rmv_div_7_1=div71,
+                          heat_always=heat_always, include_o2=include_o2)
+    assert np.array_equal(got, ref)
+
+    ws = fk.Workspace()
+    out = np.empty_like(co)
+    for _ in range(2):                               # buffers reused, same result
+        r = fk.binary_rate(co, co2, o2, T, q, rmv_div_7_1=div71, heat_always=heat_always,
+                           include_o2=include_o2, out=out, ws=ws)
+        assert r is out and np.array_equal(out, ref)
+
+    parts = fed_rate_components(co, co2, T, o2, q, co_rmv_div_7_1=div71,
+                                heat_always=heat_always, include_o2=include_o2)
+    total = parts["FED_CO"] + parts["FED_heat"] + parts["FED_rad"] + parts["FED_CO2hyp"]
+    if include_o2:
+        total = total + parts["FED_O2"]
+    assert np.array_equal(total, ref)
+
+
+@pytest.mark.parametrize("two_way", [False, True])
+def test_purser_vb_rate_matches_vb_loop(two_way):
+    import vb_fed_purser
+    co, co2, o2, T, q = _inputs(seed=5)
+    ref = _ref_purser_vb(co, co2, o2, T, q, two_way)
+    assert np.array_equal(fk.purser_vb_rate(co, co2, o2, T, q, two_way=two_way), ref)
+
+    c = vb_fed_purser.fed_rate_components(co, co2, o2, T, soot=co2, two_way=two_way)
+    assert np.array_equal(c["co"] + c["heat"] + c["co2"] + c["o2"],
+                          _ref_purser_vb(co, co2, o2, T, None, two_way))
+    assert np.allclose(c["soot"], 80.0 / 1.33 ** co2, rtol=1e-14)
+
+
+def test_fed_increment_vectorized():
+    from fdb_fields import fed_increment
+    co, co2, o2, T, _ = _inputs(n=300, seed=9)
+    co2 = co2 - 1.0                                  # exercise the CO2 >= 0 clip
+
+    def scalar(c, c2, ox, t, dt):                    # the former scalar form
+        dt_min = dt / 60.0
+        fed_co = 3.317e-5 * (max(c, 0.0) ** 1.036) * 25.0 * dt_min / 30.0
+        vco2 = math.exp(0.1903 * max(c2, 0.0) + 2.0004) / 7.1
+        o = max(ox, 0.0)
+        fed_o2 = dt_min / math.exp(8.13 - 0.54 * (20.9 - o)) if o < 20.9 else 0.0
+        tt = max(t, 0.0)
+        fed_heat = dt_min / math.exp(5.1849 - 0.0273 * tt) if tt > 20.0 else 0.0
+        return (fed_co * vco2 + fed_o2) + fed_heat
+
+    ref = np.array([scalar(*v, 30.0) for v in zip(co, co2, o2, T)])
+    assert np.allclose(fed_increment(co, co2, o2, T, 30.0), ref, rtol=1e-13, atol=0)
+    one = fed_increment(400.0, 2.0, 18.0, 60.0, 12.0)
+    assert isinstance(one, float)
+    assert one == pytest.approx(scalar(400.0, 2.0, 18.0, 60.0, 12.0), rel=1e-13)
+
+
+def test_iso13571_rates():
+    co, _, o2, T, _ = _inputs(n=500, seed=11)
+    r_co, r_o2, r_heat = fk.iso13571_rates(co, o2, T)
+    with np.errstate(invalid='ignore'):
+        assert np.array_equal(r_co, np.where(co > 0, (co ** 1.036) / 35000.0, 0.0))
+        assert np.array_equal(r_o2, np.where(o2 < 21.0, ((21.0 - o2) / 11.0) ** 3 / 60.0, 0.0))
+        assert np.array_equal(r_heat, np.where(T > 20.0, (T ** 3.4) / 5e7, 0.0))
+
+
+def test_erf_matches_math_erf():
+    x = np.concatenate([np.linspace(-7.0, 7.0, 20001),
+                        [0.0, -0.0, 1e-300, 1e-9, 1.0, 2.0, 3.0, 4.0, 6.0, np.inf, -np.inf]])
+    ref = np.array([math.erf(v) for v in x])
+    got = fk.erf(x)
+    assert np.all(np.abs(got - ref) <= 4e-15 * np.maximum(np.abs(ref), 1e-300))
+    assert np.isnan(fk.erf(np.array([np.nan]))[0])
+
+    z = np.linspace(-6.0, 6.0, 241)
+    cdf = np.array([0.5 * (1.0 + math.erf(v / math.sqrt(2.0))) for v in z])
+    assert np.allclose(fk.normal_cdf(z), cdf, rtol=0, atol=1e-15)
+
+
+def test_float32_kernels():
+    co, co2, o2, T, q = _inputs(seed=13)
+    ref = fk.binary_rate(co, co2, o2, T, q)
+    r32 = fk.binary_rate(co, co2, o2, T, q, ws=fk.Workspace(np.float32))
+    assert r32.dtype == np.float32
+    assert np.allclose(r32, ref, rtol=2e-5)